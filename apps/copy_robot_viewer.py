@@ -13,10 +13,14 @@ Version: 1.0
 
 from flask import Flask, render_template_string, request, jsonify
 import sqlite3
+import sys
 from pathlib import Path
 import json
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.core.memory_fts import keyword_condition
+
 app = Flask(__name__)
 
 # コピーロボットDBのパス
@@ -341,12 +345,17 @@ def events():
     search = request.args.get('search', '')
 
     if search:
-        cursor.execute("""
+        # FTS5 index if built (tools/build_memory_fts.py), LIKE otherwise
+        condition, params = keyword_condition(conn, 'sister_shared_events', {
+            'event_name': [search],
+            'description': [search],
+        })
+        cursor.execute(f"""
             SELECT event_id, event_name, event_date, location, category, created_at
             FROM sister_shared_events
-            WHERE event_name LIKE ? OR description LIKE ?
+            WHERE {condition}
             ORDER BY event_id DESC
-        """, (f'%{search}%', f'%{search}%'))
+        """, params)
     else:
         cursor.execute("""
             SELECT event_id, event_name, event_date, location, category, created_at
@@ -0,0 +1,148 @@
+"""
+Embedding Provider Benchmark
+
+Compares the local ONNX embedding backend with the OpenAI API model:
+- CPU throughput (texts/sec) for fp32 and int8 ONNX models, per batch size
+- Single-query latency (p50/p99)
+- Recall@k of local nearest neighbours against text-embedding-3-small
+  neighbours (the API model is treated as ground truth)
+
+The corpus is one text per line (--corpus). Without it, a small built-in
+set of Japanese chat-like sentences is used.
+
+Usage:
+    python benchmarks/embedding_provider_benchmark.py --model-dir models/multilingual-e5-small
+    python benchmarks/embedding_provider_benchmark.py --model-dir models/multilingual-e5-small \
+        --corpus data/memory_texts.txt --recall
+
+Requirements:
+    - model.onnx and tokenizer.json in --model-dir
+    - OPENAI_API_KEY for --recall
+
+Created: 2026-10-19
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.line_bot_vps.embedding_provider import OnnxEmbeddingProvider, OpenAIEmbeddingProvider
+
+BUILTIN_CORPUS = [
+    "俺、犬アレルギーなんだよね",
+    "最近ラーメンにハマってる",
+    "週末はキャンプに行く予定",
+    "ネットスーパーのスキルを持った異世界もののアニメ",
+    "推しのVTuberの配信を毎日見てる",
+    "仕事が忙しくて寝不足",
+    "猫を2匹飼っている",
+    "来月北海道に旅行する",
+    "ゲームはFPSが好き",
+    "コーヒーはブラック派",
+    "朝はパン派です",
+    "大学で情報工学を勉強している",
+    "ライブのチケットが当たった",
+    "筋トレを始めて3ヶ月",
+    "辛い食べ物が苦手",
+    "好きな季節は秋",
+]
+
+
+def load_corpus(path: str, size: int) -> List[str]:
+    if path:
+        with open(path, encoding='utf-8') as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = BUILTIN_CORPUS
+    # サイズに満たない場合は繰り返して水増し（スループット計測用）
+    while len(texts) < size:
+        texts = texts + [f"{t}（{len(texts)}）" for t in texts]
+    return texts[:size]
+
+
+def neighbours(matrix: np.ndarray, k: int) -> np.ndarray:
+    """各行のk近傍（自分自身を除く）"""
+    matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    sims = matrix @ matrix.T
+    np.fill_diagonal(sims, -np.inf)
+    return np.argsort(-sims, axis=1)[:, :k]
+
+
+def recall_at_k(truth: np.ndarray, predicted: np.ndarray) -> float:
+    hits = sum(len(set(t) & set(p)) for t, p in zip(truth, predicted))
+    return hits / truth.size
+
+
+def bench_throughput(provider, texts: List[str]) -> float:
+    provider.embed_documents(texts[:8])  # warm-up
+    start = time.perf_counter()
+    provider.embed_documents(texts)
+    return len(texts) / (time.perf_counter() - start)
+
+
+def bench_query_latency(provider, texts: List[str], n: int = 100) -> List[float]:
+    latencies = []
+    for text in texts[:n]:
+        t0 = time.perf_counter()
+        provider.embed_query(text)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding provider benchmark")
+    parser.add_argument("--model-dir", required=True)
+    parser.add_argument("--corpus", default=None)
+    parser.add_argument("--size", type=int, default=2000, help="texts for throughput")
+    parser.add_argument("--batch-sizes", default="8,32,64")
+    parser.add_argument("--recall", action="store_true", help="compare neighbours with OpenAI")
+    parser.add_argument("--recall-size", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    texts = load_corpus(args.corpus, args.size)
+
+    print("=" * 60)
+    print("Embedding provider benchmark")
+    print(f"  model={args.model_dir}, texts={len(texts)}, cpu={os.cpu_count()}")
+    print("=" * 60)
+
+    print(f"\n{'model':<12}{'batch':>8}{'texts/sec':>12}{'q p50 ms':>10}{'q p99 ms':>10}")
+    local = {}
+    for quantized in (False, True):
+        label = "onnx int8" if quantized else "onnx fp32"
+        for batch_size in map(int, args.batch_sizes.split(",")):
+            provider = OnnxEmbeddingProvider(args.model_dir, quantized=quantized, batch_size=batch_size)
+            throughput = bench_throughput(provider, texts)
+            latencies = bench_query_latency(provider, texts)
+            print(f"{label:<12}{batch_size:>8}{throughput:>12,.1f}"
+                  f"{np.percentile(latencies, 50):>10.2f}{np.percentile(latencies, 99):>10.2f}")
+            local[label] = provider
+
+    if not args.recall:
+        return 0
+
+    sample = load_corpus(args.corpus, args.recall_size)
+    openai_provider = OpenAIEmbeddingProvider()
+    start = time.perf_counter()
+    truth_vectors = np.array(openai_provider.embed_documents(sample), dtype=np.float32)
+    api_elapsed = time.perf_counter() - start
+    truth = neighbours(truth_vectors, args.k)
+
+    print(f"\nRecall@{args.k} vs {openai_provider.name} ({len(sample)} texts, "
+          f"API {len(sample) / api_elapsed:,.1f} texts/sec)")
+    for label, provider in local.items():
+        predicted = neighbours(np.array(provider.embed_documents(sample), dtype=np.float32), args.k)
+        print(f"  {label:<12} {recall_at_k(truth, predicted):.3f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Knowledge Index Benchmark
+
+Compares learned_knowledge search paths at 1k / 100k / 1M rows:
+- numpy:   CharacterVectorIndex exact search (matrix product + argpartition)
+- hnsw:    CharacterVectorIndex with HNSW (only if hnswlib is installed)
+- pgvector (--db): ivfflat search on a scratch table, one round-trip per query
+
+Reports build/load time, search p50/p99 and, for HNSW, recall@k against
+the exact result.
+
+Note: 1M x 1536 float32 is ~6 GB. Use --dim 384 (local ONNX model size)
+or skip the 1M size on small machines.
+
+Usage:
+    python benchmarks/knowledge_index_benchmark.py
+    python benchmarks/knowledge_index_benchmark.py --sizes 1000,100000,1000000 --dim 384
+    python benchmarks/knowledge_index_benchmark.py --sizes 1000,100000 --db
+
+Requirements (--db):
+    - POSTGRES_* environment variables (or .env), pgvector
+
+Created: 2026-10-19
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from typing import List
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.line_bot_vps.knowledge_index import CharacterVectorIndex, HNSW_AVAILABLE
+from src.line_bot_vps.vector_codec import encode_text, build_copy_payload
+
+
+def percentiles(samples: List[float]) -> str:
+    ms = np.array(samples) * 1000
+    return f"p50={np.percentile(ms, 50):.3f}ms p99={np.percentile(ms, 99):.3f}ms"
+
+
+def make_vectors(n: int, dim: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def bench_index(vectors: np.ndarray, queries: np.ndarray, k: int, hnsw: bool):
+    label = "hnsw" if hnsw else "numpy"
+    start = time.perf_counter()
+    index = CharacterVectorIndex(vectors.shape[1], hnsw_threshold=1 if hnsw else None)
+    # 差分更新と同じ経路（5000件ずつ追記）で構築
+    for offset in range(0, len(vectors), 5000):
+        chunk = vectors[offset:offset + 5000]
+        index.append(chunk, [{'id': offset + i} for i in range(len(chunk))])
+    build = time.perf_counter() - start
+
+    latencies, results = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        results.append([pos for pos, _ in index.search(q, k)])
+        latencies.append(time.perf_counter() - t0)
+    print(f"  {label:<9} build={build:.2f}s  search {percentiles(latencies)}")
+    return results
+
+
+def bench_pgvector(cursor, vectors: np.ndarray, queries: np.ndarray, k: int):
+    table = "bench_knowledge_index"
+    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.execute(f"CREATE TABLE {table} (id BIGINT PRIMARY KEY, embedding vector({vectors.shape[1]}))")
+
+    start = time.perf_counter()
+    cursor.copy_expert(
+        f"COPY {table} (id, embedding) FROM STDIN WITH (FORMAT binary)",
+        io.BytesIO(build_copy_payload(enumerate(vectors)))
+    )
+    lists = max(1, int(np.sqrt(len(vectors))))
+    cursor.execute(f"CREATE INDEX ON {table} USING ivfflat (embedding vector_cosine_ops) WITH (lists = {lists})")
+    cursor.execute(f"ANALYZE {table}")
+    build = time.perf_counter() - start
+
+    latencies = []
+    for q in queries:
+        t0 = time.perf_counter()
+        cursor.execute(
+            f"SELECT id, embedding <=> %s::vector AS distance FROM {table} ORDER BY distance LIMIT %s",
+            (encode_text(q), k)
+        )
+        cursor.fetchall()
+        latencies.append(time.perf_counter() - t0)
+    print(f"  {'pgvector':<9} build={build:.2f}s  search {percentiles(latencies)}")
+
+    cursor.execute(f"DROP TABLE {table}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="learned_knowledge index benchmark")
+    parser.add_argument("--sizes", default="1000,100000")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--db", action="store_true", help="include pgvector path")
+    args = parser.parse_args()
+
+    cursor = None
+    if args.db:
+        import psycopg2
+        from dotenv import load_dotenv
+        load_dotenv()
+        conn = psycopg2.connect(
+            host=os.getenv('POSTGRES_HOST', 'localhost'),
+            port=int(os.getenv('POSTGRES_PORT', '5432')),
+            user=os.getenv('POSTGRES_USER'),
+            password=os.getenv('POSTGRES_PASSWORD'),
+            database=os.getenv('POSTGRES_DATABASE'),
+        )
+        conn.autocommit = True
+        cursor = conn.cursor()
+
+    print("=" * 60)
+    print(f"Knowledge index benchmark (dim={args.dim}, k={args.k}, hnswlib={'yes' if HNSW_AVAILABLE else 'no'})")
+    print("=" * 60)
+
+    queries = make_vectors(args.queries, args.dim, seed=1)
+    for size in map(int, args.sizes.split(",")):
+        print(f"\n[{size:,} rows]")
+        vectors = make_vectors(size, args.dim, seed=0)
+
+        exact = bench_index(vectors, queries, args.k, hnsw=False)
+        if HNSW_AVAILABLE:
+            approx = bench_index(vectors, queries, args.k, hnsw=True)
+            hits = sum(len(set(a) & set(e)) for a, e in zip(approx, exact))
+            print(f"  hnsw recall@{args.k} = {hits / (len(exact) * args.k):.3f}")
+        if cursor is not None:
+            bench_pgvector(cursor, vectors, queries, args.k)
+
+        del vectors
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
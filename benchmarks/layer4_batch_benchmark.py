@@ -0,0 +1,163 @@
+"""
+Layer 4 Batch Judge Benchmark
+
+LLMContextJudge throughput on a backlog of flagged comments:
+- sequential: one LLM call per comment (previous bulk_judge behaviour)
+- batched:    JSON-array prompts of --batch-size items, --concurrency calls
+              in parallel
+- cached:     the same backlog again with a warm VerdictCache
+
+Uses a simulated judge (fixed latency per call plus per item) so the
+numbers show the call structure, not a particular model. Pass --ollama
+to run against a local Ollama model instead.
+
+Usage:
+    python benchmarks/layer4_batch_benchmark.py
+    python benchmarks/layer4_batch_benchmark.py --comments 200 --latency 0.8 --batch-size 10 --concurrency 4
+    python benchmarks/layer4_batch_benchmark.py --ollama qwen2.5:14b --comments 30
+
+Created: 2026-10-19
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.core.llm_provider import BaseLLMProvider, LLMResponse
+from src.line_bot.llm_context_judge import LLMContextJudge
+from src.line_bot.verdict_cache import VerdictCache
+
+TEMPLATES = [
+    "今日買った{w}がかっこいい", "{w}って何？", "配信で{w}の話して", "{w}はやめてほしい",
+    "昨日の{w}の件どう思う？", "{w}www", "それ{w}じゃん",
+]
+WORDS = ["パンツ", "バカ", "炎上", "引退", "本名", "宗教", "選挙", "ゴミ", "学校", "前世"]
+
+
+class SimulatedJudgeProvider(BaseLLMProvider):
+    """Answers judge prompts after latency + per_item * items seconds"""
+
+    def __init__(self, latency: float, per_item: float):
+        self.latency = latency
+        self.per_item = per_item
+        self.calls = 0
+
+    def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000
+    ) -> LLMResponse:
+        self.calls += 1
+        verdict = {
+            "is_sensitive": False,
+            "confidence": 0.9,
+            "reason": "simulated",
+            "recommended_action": "allow",
+            "false_positive": True,
+            "context_analysis": "simulated"
+        }
+        match = re.search(r"\*\*メッセージ一覧（JSON）\*\*:\n(.*)\n", prompt)
+        if match:
+            items = json.loads(match.group(1))
+            content = json.dumps([dict(verdict, id=item["id"]) for item in items], ensure_ascii=False)
+        else:
+            items = [None]
+            content = json.dumps(verdict, ensure_ascii=False)
+        time.sleep(self.latency + self.per_item * len(items))
+        return LLMResponse(content=content, model="simulated", provider="simulated")
+
+    def get_provider_name(self) -> str:
+        return "simulated"
+
+    def get_model_name(self) -> str:
+        return "simulated"
+
+    def estimate_cost(self, input_tokens: int, output_tokens: int) -> float:
+        return 0.0
+
+
+def make_backlog(n: int, repeat_ratio: float, seed: int = 0):
+    rng = random.Random(seed)
+    texts: List[str] = []
+    words: List[List[str]] = []
+    for _ in range(n):
+        if texts and rng.random() < repeat_ratio:
+            i = rng.randrange(len(texts))
+            texts.append(texts[i])
+            words.append(words[i])
+            continue
+        w = rng.choice(WORDS)
+        texts.append(rng.choice(TEMPLATES).format(w=w) + "!" * rng.randint(0, 3))
+        words.append([w])
+    return texts, words
+
+
+def run(label: str, judge: LLMContextJudge, texts, words, provider=None):
+    before = judge.get_bulk_stats()
+    calls_before = getattr(provider, "calls", 0)
+    start = time.perf_counter()
+    if label == "sequential":
+        results = [judge.judge_with_context(t, w) for t, w in zip(texts, words)]
+    else:
+        results = judge.bulk_judge(texts, words)
+    elapsed = time.perf_counter() - start
+    after = judge.get_bulk_stats()
+    hits = after["cache_hits"] - before["cache_hits"]
+    calls = getattr(provider, "calls", 0) - calls_before
+    print(f"  {label:<11} {len(texts) / elapsed:>8.1f} items/s  {elapsed:>7.2f}s  "
+          f"LLM calls {calls:>4}  cache hits {hits}/{len(texts)}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Layer 4 batch judge benchmark")
+    parser.add_argument("--comments", type=int, default=100)
+    parser.add_argument("--repeat-ratio", type=float, default=0.3, help="Share of repeated phrases in the backlog")
+    parser.add_argument("--latency", type=float, default=0.5, help="Simulated seconds per LLM call")
+    parser.add_argument("--per-item", type=float, default=0.05, help="Simulated extra seconds per item in a call")
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--ollama", default=None, help="Ollama model to use instead of the simulation")
+    args = parser.parse_args()
+
+    if args.ollama:
+        from src.core.llm_ollama import OllamaProvider
+        provider = OllamaProvider(
+            base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
+            model=args.ollama
+        )
+    else:
+        provider = SimulatedJudgeProvider(args.latency, args.per_item)
+
+    texts, words = make_backlog(args.comments, args.repeat_ratio)
+    print(f"\n=== Layer 4 judging: {len(texts)} comments ({len(set(texts))} distinct) ===")
+
+    run("sequential", LLMContextJudge(provider), texts, words, provider)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = VerdictCache(db_path=os.path.join(tmp, "verdict_cache.db"))
+        judge = LLMContextJudge(
+            provider,
+            verdict_cache=cache,
+            batch_size=args.batch_size,
+            max_concurrency=args.concurrency
+        )
+        run("batched", judge, texts, words, provider)
+        run("cached", judge, texts, words, provider)
+        stats = cache.get_stats()
+        print(f"\n  cache: {stats['entries']} entries, hit rate {stats['hit_rate']:.0%} "
+              f"({stats['hits']} hits / {stats['misses']} misses)")
+
+
+if __name__ == "__main__":
+    main()
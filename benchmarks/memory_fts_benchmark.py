@@ -0,0 +1,187 @@
+"""
+Memory FTS Benchmark
+
+LIKE '%kw%' full scans vs the FTS5 trigram index (src/core/memory_fts.py)
+on a synthetic sisters_memory.db-shaped database (default 100k events):
+- event search      (copy_robot_viewer /events, BotanIdentity.recall_memory)
+- memory search     (CopyRobotMemoryLoader.search_memories_by_keyword)
+- multi-pattern     (HallucinationDetector._verify_viewer_interaction)
+
+Each query is run through keyword_condition() before and after building
+the index. Row counts are compared to check that both paths match.
+
+Usage:
+    python benchmarks/memory_fts_benchmark.py
+    python benchmarks/memory_fts_benchmark.py --events 100000 --repeat 20
+
+Created: 2026-10-19
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.core.memory_fts import ensure_fts_indexes, keyword_condition
+
+PLACES = ["ロサンゼルス", "東京", "大阪", "京都", "北海道", "沖縄", "学校", "公園", "水族館"]
+THINGS = ["誕生日パーティー", "引っ越し", "運動会", "ピアノの発表会", "夏祭り", "期末テスト", "家族旅行", "お泊まり会"]
+DETAILS = ["みんなで笑った", "少し緊張した", "雨が降っていた", "おいしいご飯を食べた", "写真をたくさん撮った"]
+RARE = ["初配信", "視聴者からコメントをもらった", "スパチャ"]
+
+
+def create_db(path: str, n: int, seed: int = 0):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE sister_shared_events (
+            event_id INTEGER PRIMARY KEY,
+            event_number INTEGER,
+            event_name TEXT,
+            event_date TEXT,
+            description TEXT,
+            location TEXT,
+            category TEXT,
+            cultural_context TEXT,
+            botan_absolute_day INTEGER,
+            created_at TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE botan_memories (
+            memory_id INTEGER PRIMARY KEY,
+            event_id INTEGER,
+            memory_date TEXT,
+            diary_entry TEXT,
+            botan_emotion TEXT,
+            botan_thought TEXT,
+            botan_action TEXT
+        )
+    """)
+    events, memories = [], []
+    for i in range(1, n + 1):
+        place, thing = rng.choice(PLACES), rng.choice(THINGS)
+        description = f"{place}で{thing}。{rng.choice(DETAILS)}。{rng.choice(DETAILS)}。"
+        if rng.random() < 0.001:
+            description += rng.choice(RARE) + "。"
+        events.append((
+            i, i, f"{place}の{thing}", f"20{rng.randint(10, 25)}-01-01", description, place,
+            rng.choice(["family", "school", "travel"]), None, i, ""
+        ))
+        memories.append((
+            i, i, f"20{rng.randint(10, 25)}-01-01", f"今日は{place}で{thing}だった。{rng.choice(DETAILS)}。",
+            rng.choice(["嬉しい", "楽しい", "不安"]), f"{thing}のことをまた考えた", f"{place}に行った"
+        ))
+    conn.executemany(f"INSERT INTO sister_shared_events VALUES ({', '.join('?' * 10)})", events)
+    conn.executemany(f"INSERT INTO botan_memories VALUES ({', '.join('?' * 7)})", memories)
+    conn.commit()
+    return conn
+
+
+def queries(conn: sqlite3.Connection) -> Dict[str, Callable[[], int]]:
+    def event_search():
+        condition, params = keyword_condition(conn, 'sister_shared_events', {
+            'event_name': ['ピアノの発表会'], 'description': ['ピアノの発表会'],
+        })
+        return len(conn.execute(
+            f"SELECT event_id FROM sister_shared_events WHERE {condition} ORDER BY event_id DESC", params
+        ).fetchall())
+
+    def rare_event_search():
+        condition, params = keyword_condition(conn, 'sister_shared_events', {
+            'event_name': ['初配信'], 'description': ['初配信'],
+        })
+        return len(conn.execute(
+            f"SELECT event_id FROM sister_shared_events WHERE {condition}", params
+        ).fetchall())
+
+    def memory_search():
+        condition, params = keyword_condition(conn, 'botan_memories', {
+            'diary_entry': ['お泊まり会'], 'botan_thought': ['お泊まり会'],
+        })
+        return len(conn.execute(
+            f"SELECT memory_id FROM botan_memories WHERE {condition} ORDER BY memory_date DESC LIMIT 5", params
+        ).fetchall())
+
+    def multi_pattern():
+        condition, params = keyword_condition(conn, 'sister_shared_events', {
+            'description': ['視聴者から', '視聴者が', 'リスナーから', 'ファンから',
+                            'コメントをもらった', 'コメントがあった', 'スパチャ'],
+            'event_name': ['視聴者との'],
+        })
+        return conn.execute(
+            f"SELECT COUNT(*) FROM sister_shared_events WHERE ({condition} OR category = 'viewer_interaction')",
+            params
+        ).fetchone()[0]
+
+    return {
+        'event search': event_search,
+        'rare event search': rare_event_search,
+        'memory search': memory_search,
+        'multi-pattern': multi_pattern,
+    }
+
+
+def run(conn: sqlite3.Connection, repeat: int) -> Dict[str, Tuple[float, int]]:
+    results = {}
+    for name, query in queries(conn).items():
+        samples: List[float] = []
+        rows = 0
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            rows = query()
+            samples.append(time.perf_counter() - t0)
+        samples.sort()
+        results[name] = (samples[len(samples) // 2] * 1000, rows)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="memory FTS benchmark")
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "sisters_memory.db")
+    t0 = time.perf_counter()
+    conn = create_db(path, args.events)
+    print(f"created {args.events:,} events in {time.perf_counter() - t0:.1f}s ({path})")
+
+    like = run(conn, args.repeat)
+
+    t0 = time.perf_counter()
+    ensure_fts_indexes(conn)
+    build = time.perf_counter() - t0
+    size = os.path.getsize(path) / 1e6
+
+    fts = run(conn, args.repeat)
+
+    print("=" * 60)
+    print(f"Memory FTS benchmark ({args.events:,} events, FTS build {build:.1f}s, db {size:.0f} MB)")
+    print("=" * 60)
+    for name in like:
+        like_ms, like_rows = like[name]
+        fts_ms, fts_rows = fts[name]
+        status = "ok" if like_rows == fts_rows else "MISMATCH"
+        print(f"  {name:<18} LIKE p50={like_ms:8.3f}ms  FTS p50={fts_ms:8.3f}ms  rows={fts_rows} [{status}]")
+
+    # Trigger maintenance cost
+    t0 = time.perf_counter()
+    with conn:
+        conn.executemany(
+            "INSERT INTO sister_shared_events (event_name, description) VALUES (?, ?)",
+            [(f"追加イベント{i}", "初配信の準備") for i in range(1000)]
+        )
+    print(f"  insert 1,000 events with triggers: {(time.perf_counter() - t0) * 1000:.1f}ms")
+    conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Memory Keyword Index Benchmark
+
+Recall/latency of sister-memory keyword matching on the sisters_memory.db
+schema ({character}_memories JOIN sister_shared_events):
+- substring: MemoryRetrievalLogic._calculate_keyword_match per memory
+             (re.findall(r'\\w+') tokens, substring search)
+- ngram:     MemoryKeywordIndex (character bigram postings, IDF coverage)
+
+Recall is measured by self-retrieval: for sampled memories, a
+conversational query is built around the memory's event name
+("そういえば{event_name}のこと覚えてる？"), and recall@k is the share of
+queries whose source memory ranks in the keyword top-k.
+
+Without a real database, --synthetic N creates a temporary SQLite file
+with the same schema.
+
+Usage:
+    python benchmarks/memory_keyword_index_benchmark.py --db /home/koshikawa/toExecUnit/sisters_memory.db
+    python benchmarks/memory_keyword_index_benchmark.py --synthetic 20000 --character kasho
+
+Created: 2026-10-19
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.core.memory_retrieval_logic import MemoryRetrievalLogic, Memory
+from src.core.memory_store import CHARACTER_COLUMNS, get_memory_store
+from src.core.memory_scoring import MemoryKeywordIndex, searchable_fields
+
+QUERY_TEMPLATES = [
+    "そういえば{}のこと覚えてる？",
+    "{}の時って楽しかったよね",
+    "ねえ、{}の話をもう一回聞かせて",
+]
+
+PLACES = ["ロサンゼルス", "東京", "学校", "公園", "ビーチ", "空港", "水族館", "図書館"]
+THINGS = ["誕生日", "引っ越し", "運動会", "初めての配信", "ピアノの発表会", "夏祭り", "テスト", "旅行"]
+SEASONS = ["春", "夏", "秋", "冬", "雨の日", "雪の日", "夜", "朝"]
+FEELINGS = ["嬉しい", "楽しい", "ワクワク", "悲しい", "不安", "穏やか", "感動"]
+
+
+def create_synthetic_db(path: str, n: int, seed: int = 0):
+    """Create a sisters_memory.db-shaped database with n events"""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE sister_shared_events (
+            event_id INTEGER PRIMARY KEY,
+            event_name TEXT,
+            event_date TEXT
+        )
+    """)
+    for own, sister1, sister2 in CHARACTER_COLUMNS.values():
+        conn.execute(f"""
+            CREATE TABLE {own}_memories (
+                event_id INTEGER,
+                absolute_day INTEGER,
+                {own}_emotion TEXT,
+                {own}_action TEXT,
+                {own}_thought TEXT,
+                diary_entry TEXT,
+                {sister1}_observed_behavior TEXT,
+                {sister2}_observed_behavior TEXT,
+                {sister1}_inferred_feeling TEXT,
+                {sister2}_inferred_feeling TEXT,
+                memory_importance INTEGER,
+                created_at TEXT
+            )
+        """)
+
+    events, rows = [], []
+    for event_id in range(1, n + 1):
+        place, thing = rng.choice(PLACES), rng.choice(THINGS)
+        name = f"{rng.choice(SEASONS)}の{place}で{thing}"
+        events.append((event_id, name, f"{rng.randint(2008, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"))
+        feeling = rng.choice(FEELINGS)
+        rows.append((
+            event_id, event_id, feeling, f"{place}で{thing}に参加した", f"{thing}は{feeling}と考えた",
+            f"今日は{place}で{thing}。みんなと過ごして{feeling}気持ちになった。",
+            "笑っていた", None, "楽しそう", None, rng.randint(1, 10), ""
+        ))
+    conn.executemany("INSERT INTO sister_shared_events VALUES (?, ?, ?)", events)
+    for own, _, _ in CHARACTER_COLUMNS.values():
+        conn.executemany(f"INSERT INTO {own}_memories VALUES ({', '.join('?' * 12)})", rows)
+    conn.commit()
+    conn.close()
+
+
+def top_positions(scores: np.ndarray, k: int) -> List[int]:
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return [int(i) for i in top if scores[i] > 0]
+
+
+def percentiles(samples: List[float]) -> str:
+    ms = np.array(samples) * 1000
+    return f"p50={np.percentile(ms, 50):.3f}ms p99={np.percentile(ms, 99):.3f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="sister memory keyword index benchmark")
+    parser.add_argument("--db", default="/home/koshikawa/toExecUnit/sisters_memory.db")
+    parser.add_argument("--synthetic", type=int, default=0, help="create a temporary db with N events")
+    parser.add_argument("--character", default="botan")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    db_path = args.db
+    if args.synthetic:
+        db_path = os.path.join(tempfile.mkdtemp(), "sisters_memory.db")
+        create_synthetic_db(db_path, args.synthetic)
+    elif not os.path.exists(db_path):
+        print(f"[ERROR] {db_path} not found (use --synthetic N)")
+        return 1
+
+    memories = get_memory_store(db_path, args.character, Memory).memories()
+    if not memories:
+        print("[ERROR] no memories")
+        return 1
+
+    # Keyword scoring only: skip __init__
+    logic = MemoryRetrievalLogic.__new__(MemoryRetrievalLogic)
+    logic.character = args.character
+
+    t0 = time.perf_counter()
+    index = MemoryKeywordIndex()
+    for memory in memories:
+        index.add(searchable_fields(memory))
+    build = time.perf_counter() - t0
+
+    rng = random.Random(1)
+    targets = rng.sample(range(len(memories)), min(args.queries, len(memories)))
+    queries = [(rng.choice(QUERY_TEMPLATES).format(memories[i].event_name), i) for i in targets]
+
+    print("=" * 60)
+    print(f"Memory keyword index benchmark ({args.character}, {len(memories):,} memories, "
+          f"{len(queries)} queries, k={args.k})")
+    print("=" * 60)
+
+    substring_latency, substring_hits, substring_matched = [], 0, []
+    for query, target in queries:
+        t0 = time.perf_counter()
+        scores = np.array([logic._calculate_keyword_match(query, m) for m in memories])
+        substring_latency.append(time.perf_counter() - t0)
+        substring_hits += target in top_positions(scores, args.k)
+        substring_matched.append(int(np.count_nonzero(scores)))
+
+    ngram_latency, ngram_hits, ngram_matched = [], 0, []
+    for query, target in queries:
+        t0 = time.perf_counter()
+        scores = index.scores(query)
+        ngram_latency.append(time.perf_counter() - t0)
+        ngram_hits += target in top_positions(scores, args.k)
+        ngram_matched.append(int(np.count_nonzero(scores)))
+
+    print(f"  {'substring':<10} recall@{args.k}={substring_hits / len(queries):.3f}  "
+          f"matched/query={np.mean(substring_matched):.1f}  {percentiles(substring_latency)}")
+    print(f"  {'ngram':<10} recall@{args.k}={ngram_hits / len(queries):.3f}  "
+          f"matched/query={np.mean(ngram_matched):.1f}  {percentiles(ngram_latency)}  build={build:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Memory Scoring Benchmark
+
+Compares sister-memory relevance scoring at 100 .. 1M memories:
+- loop:       MemoryRetrievalLogic._calculate_relevance_score per memory + sort
+- vectorized: MemoryScoreColumns (precomputed columns, NumPy weighted sum,
+              partition top-k)
+
+Uses synthetic Memory rows (no database). The per-memory loop is skipped
+above --loop-max memories because it takes minutes at 1M.
+
+Usage:
+    python benchmarks/memory_scoring_benchmark.py
+    python benchmarks/memory_scoring_benchmark.py --sizes 100,1000,10000,100000,1000000 --loop-max 100000
+
+Created: 2026-10-19
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import List
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.core.memory_retrieval_logic import MemoryRetrievalLogic, Memory
+from src.core.memory_scoring import MemoryScoreColumns
+
+WORDS = ["VTuber", "配信", "夢", "歌", "ゲーム", "学校", "お姉ちゃん", "ロサンゼルス", "誕生日", "旅行"]
+EMOTIONS = ["嬉しい", "楽しい", "感動", "悲しい", "不安", "穏やか", "ワクワク", ""]
+THOUGHTS = ["学んだことがある", "考えたけどわからない", "楽しかった", "また行きたい"]
+QUERIES = [("VTuber 夢", None), ("配信 楽しい", "嬉しい"), ("誕生日", "悲しい"), ("旅行 ロサンゼルス", None)]
+
+
+def make_memories(n: int, seed: int = 0) -> List[Memory]:
+    rng = random.Random(seed)
+    memories = []
+    for i in range(n):
+        memories.append(Memory(
+            event_id=i,
+            event_name=" ".join(rng.sample(WORDS, 2)),
+            event_date=f"{rng.randint(2008, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            absolute_day=i,
+            own_emotion=rng.choice(EMOTIONS),
+            own_action=rng.choice(WORDS) + "をした",
+            own_thought=rng.choice(THOUGHTS),
+            diary_entry=f"今日は{rng.choice(WORDS)}の日。{rng.choice(['お姉ちゃんと', '一人で'])}過ごした。",
+            sister1_observed_behavior=rng.choice([None, "笑っていた"]),
+            memory_importance=rng.randint(1, 10)
+        ))
+    return memories
+
+
+def percentiles(samples: List[float]) -> str:
+    ms = np.array(samples) * 1000
+    return f"p50={np.percentile(ms, 50):.3f}ms p99={np.percentile(ms, 99):.3f}ms"
+
+
+def bench_loop(logic: MemoryRetrievalLogic, memories: List[Memory], repeat: int) -> str:
+    latencies = []
+    for _ in range(repeat):
+        for context, emotion in QUERIES:
+            t0 = time.perf_counter()
+            scored = [logic._calculate_relevance_score(m, context, emotion) for m in memories]
+            scored = [s for s in scored if s.total_score >= 0.3]
+            scored.sort(key=lambda s: s.total_score, reverse=True)
+            scored[:5]
+            latencies.append(time.perf_counter() - t0)
+    return percentiles(latencies)
+
+
+def bench_vectorized(logic: MemoryRetrievalLogic, memories: List[Memory], repeat: int):
+    t0 = time.perf_counter()
+    columns = MemoryScoreColumns(logic._calculate_personality_affinity)
+    columns.sync(memories)
+    columns.top_k("warmup")
+    build = time.perf_counter() - t0
+
+    latencies = []
+    for _ in range(repeat):
+        for context, emotion in QUERIES:
+            t0 = time.perf_counter()
+            columns.top_k(context, emotion, top_k=5, relevance_threshold=0.3)
+            latencies.append(time.perf_counter() - t0)
+    return build, percentiles(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="sister memory scoring benchmark")
+    parser.add_argument("--sizes", default="100,1000,10000,100000,1000000")
+    parser.add_argument("--loop-max", type=int, default=100000, help="largest size for the per-memory loop")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--character", default="botan")
+    args = parser.parse_args()
+
+    # Scoring only: skip __init__ (no database needed)
+    logic = MemoryRetrievalLogic.__new__(MemoryRetrievalLogic)
+    logic.character = args.character
+
+    print("=" * 60)
+    print(f"Memory scoring benchmark (character={args.character}, queries={len(QUERIES)}x{args.repeat})")
+    print("=" * 60)
+
+    for size in map(int, args.sizes.split(",")):
+        print(f"\n[{size:,} memories]")
+        memories = make_memories(size)
+
+        if size <= args.loop_max:
+            print(f"  {'loop':<11} search {bench_loop(logic, memories, args.repeat)}")
+        else:
+            print(f"  {'loop':<11} skipped (> --loop-max)")
+
+        build, latency = bench_vectorized(logic, memories, args.repeat)
+        print(f"  {'vectorized':<11} build={build:.2f}s  search {latency}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""
+NG Filter Benchmark
+
+Layer1PreFilter (sensitive_system/core/filter.py) throughput in comments/sec
+at different NG dictionary sizes (default 1k / 10k / 100k words):
+- linear:    the previous implementation (normalize every NG word and test
+             it against every comment)
+- automaton: Aho-Corasick over pre-normalized words (keyword_engine.py)
+
+The NG words live in a temporary database created from
+sensitive_system/database/schema.sql. Detections of both implementations
+are compared comment by comment.
+
+Usage:
+    python benchmarks/ng_filter_benchmark.py
+    python benchmarks/ng_filter_benchmark.py --sizes 1000 10000 100000 --comments 5000
+
+Created: 2026-10-19
+"""
+
+import argparse
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+import unicodedata
+from typing import Dict, List
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'sensitive_system'))
+
+from core.filter import Layer1PreFilter
+
+KANA = [chr(c) for c in range(ord('ァ'), ord('ヶ') + 1)] + [chr(c) for c in range(ord('ぁ'), ord('ゖ') + 1)]
+FILLER = ["配信", "楽しい", "です", "！", "今日も", "ありがとう", "かわいい", "www", "初見です", "こんばんは", " "]
+
+
+def create_db(path: str, n_words: int, seed: int = 0) -> List[str]:
+    """Synthetic ng_words table (~96% partial, ~4% exact, up to 20 regex)"""
+    rng = random.Random(seed)
+    schema = os.path.join(ROOT, 'sensitive_system', 'database', 'schema.sql')
+    conn = sqlite3.connect(path)
+    with open(schema, encoding='utf-8') as f:
+        conn.executescript(f.read())
+
+    words = set()
+    while len(words) < n_words:
+        words.add(''.join(rng.choice(KANA) for _ in range(rng.randint(3, 6))))
+    words = sorted(words)
+
+    rows = []
+    for i, word in enumerate(words):
+        r = rng.random()
+        if i % max(1, n_words // 20) == 0:
+            pattern_type, regex = 'regex', f"{re.escape(word[:2])}\\d+"
+        elif r < 0.04:
+            pattern_type, regex = 'exact', None
+        else:
+            pattern_type, regex = 'partial', None
+        rows.append((
+            word, 'synthetic', None, rng.randint(1, 10), pattern_type, regex,
+            None, rng.choice(['mask', 'warn', 'log', 'block']), 'benchmark'
+        ))
+    conn.executemany("""
+        INSERT INTO ng_words (word, category, subcategory, severity, pattern_type,
+                              regex_pattern, alternative_text, action, added_by)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+    conn.close()
+    return words
+
+
+def make_comments(words: List[str], n: int, seed: int = 1) -> List[str]:
+    """Random chat comments, ~30% containing an (often obfuscated) NG word"""
+    rng = random.Random(seed)
+    comments = []
+    for _ in range(n):
+        parts = [rng.choice(FILLER) for _ in range(rng.randint(3, 10))]
+        if rng.random() < 0.3:
+            word = rng.choice(words)
+            if rng.random() < 0.5:
+                word = rng.choice(['・', '○', ' ', '\u200b']).join(word)
+            parts.insert(rng.randrange(len(parts) + 1), word)
+        comments.append(''.join(parts))
+    return comments
+
+
+def linear_normalize(text: str) -> str:
+    """Previous Layer1PreFilter.normalize_text"""
+    text = unicodedata.normalize('NFKC', text)
+    text = text.lower()
+    text = re.sub(r'\s+', '', text)
+    text = re.sub(r'[.･・。、]', '', text)
+    text = re.sub(r'[○●◯◆◇]', '', text)
+    text = re.sub(r'[\u200b-\u200f\ufeff]', '', text)
+    return text
+
+
+def linear_detect(cache: Dict[str, List[dict]], text: str) -> List[dict]:
+    """Previous Layer1PreFilter.detect_ng_words"""
+    detected = []
+    normalized_text = linear_normalize(text)
+    for ng in cache['exact']:
+        if linear_normalize(ng['word']) == normalized_text:
+            detected.append(ng)
+    for ng in cache['partial']:
+        if linear_normalize(ng['word']) in normalized_text:
+            detected.append(ng)
+    for ng in cache['regex']:
+        if ng['regex_pattern'] and re.search(ng['regex_pattern'], normalized_text):
+            detected.append(ng)
+    return detected
+
+
+def run(n_words: int, n_comments: int, linear_max: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'sensitive_filter.db')
+        words = create_db(db_path, n_words)
+
+        start = time.perf_counter()
+        ng_filter = Layer1PreFilter(db_path=db_path)
+        build_time = time.perf_counter() - start
+
+        comments = make_comments(words, n_comments)
+
+        start = time.perf_counter()
+        automaton_results = [ng_filter.filter_comment(c) for c in comments]
+        automaton_time = time.perf_counter() - start
+
+        # The linear version is O(words x comments): only run a sample
+        sample = comments[:max(1, linear_max * 1000 // n_words)]
+        start = time.perf_counter()
+        linear_results = [linear_detect(ng_filter.ng_words_cache, c) for c in sample]
+        linear_time = time.perf_counter() - start
+
+    mismatches = sum(
+        1 for expected, actual in zip(linear_results, automaton_results)
+        if [ng['word'] for ng in expected] != [ng['word'] for ng in actual['detected_words']]
+    )
+    flagged = sum(1 for r in automaton_results if r['detected_words'])
+
+    print(f"\n=== {n_words:,} NG words ===")
+    print(f"  build (load + automaton): {build_time * 1000:.0f}ms")
+    print(f"  linear:    {len(sample) / linear_time:>10,.0f} comments/sec  ({len(sample)} comments)")
+    print(f"  automaton: {n_comments / automaton_time:>10,.0f} comments/sec  ({n_comments} comments, {flagged} flagged)")
+    print(f"  speedup:   {(n_comments / automaton_time) / (len(sample) / linear_time):.0f}x")
+    print(f"  detections match: {'yes' if mismatches == 0 else f'NO ({mismatches} of {len(sample)} differ)'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NG filter benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--comments", type=int, default=5000)
+    parser.add_argument("--linear-max", type=int, default=2000,
+                        help="Linear run size: comments at 1k words (scaled down for larger dictionaries)")
+    args = parser.parse_args()
+
+    for n_words in args.sizes:
+        run(n_words, args.comments, args.linear_max)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+pgvector Codec Benchmark
+
+Compares how embeddings are sent to PostgreSQL:
+- legacy:  '[' + ','.join(map(str, embedding)) + ']' bound twice per search
+- text:    vector_codec.encode_text (float32/float16 shortest digits), bound once
+- binary:  vector_codec.build_copy_payload (COPY ... FORMAT binary)
+
+Offline section (always): encode time and payload size per vector.
+Database section (--db): insert/search latency and table size for
+vector(1536) vs halfvec(1536) on scratch tables that are dropped afterwards.
+
+Usage:
+    python benchmarks/pgvector_codec_benchmark.py
+    python benchmarks/pgvector_codec_benchmark.py --db --rows 20000
+
+Requirements (--db):
+    - POSTGRES_* environment variables (or .env)
+    - pgvector >= 0.7.0 (halfvec)
+
+Created: 2026-10-19
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from typing import Callable, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.line_bot_vps.vector_codec import EMBEDDING_DIM, encode_text, build_copy_payload
+
+
+def legacy_literal(embedding: List[float]) -> str:
+    """Pre-codec text literal (str() of each Python float)"""
+    return '[' + ','.join(map(str, embedding)) + ']'
+
+
+def timeit(fn: Callable, repeat: int) -> float:
+    """Average seconds per call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def percentile_ms(samples: List[float], q: float) -> float:
+    return float(np.percentile(np.array(samples) * 1000, q))
+
+
+def run_offline(vectors: np.ndarray, repeat: int):
+    """Encode time and payload size"""
+    as_lists = [v.tolist() for v in vectors[:repeat]]
+    # OpenAI SDK returns float64 Python lists; that is what the legacy path formatted
+    as_float64 = [list(map(float, v)) for v in as_lists]
+
+    print("\n[Offline] per-vector encode time / payload size")
+    print(f"{'codec':<16}{'time (us)':>12}{'bytes':>10}")
+
+    cases = [
+        ("legacy text", lambda i: legacy_literal(as_float64[i])),
+        ("text vector", lambda i: encode_text(as_lists[i], 'vector')),
+        ("text halfvec", lambda i: encode_text(as_lists[i], 'halfvec')),
+    ]
+    for name, fn in cases:
+        elapsed = timeit(lambda: [fn(i) for i in range(len(as_lists))], 1) / len(as_lists)
+        size = np.mean([len(fn(i).encode('ascii')) for i in range(len(as_lists))])
+        print(f"{name:<16}{elapsed * 1e6:>12.1f}{size:>10.0f}")
+
+    for vector_type in ('vector', 'halfvec'):
+        rows = list(enumerate(vectors[:repeat]))
+        elapsed = timeit(lambda: build_copy_payload(rows, vector_type), 1) / len(rows)
+        size = len(build_copy_payload(rows, vector_type)) / len(rows)
+        print(f"{'binary ' + vector_type:<16}{elapsed * 1e6:>12.1f}{size:>10.0f}")
+
+
+def run_database(vectors: np.ndarray, queries: np.ndarray):
+    """Insert/search latency and table size on scratch tables"""
+    import psycopg2
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    conn = psycopg2.connect(
+        host=os.getenv('POSTGRES_HOST', 'localhost'),
+        port=int(os.getenv('POSTGRES_PORT', '5432')),
+        user=os.getenv('POSTGRES_USER'),
+        password=os.getenv('POSTGRES_PASSWORD'),
+        database=os.getenv('POSTGRES_DATABASE'),
+    )
+    conn.autocommit = True
+    cursor = conn.cursor()
+
+    for vector_type in ('vector', 'halfvec'):
+        table = f"bench_codec_{vector_type}"
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(f"""
+            CREATE TABLE {table} (
+                id BIGINT PRIMARY KEY,
+                embedding {vector_type}({EMBEDDING_DIM})
+            )
+        """)
+        print(f"\n[DB] {vector_type}({EMBEDDING_DIM}), rows={len(vectors)}")
+
+        # 1行ずつINSERT（先頭1000行）: legacy vs codec text
+        sample = min(1000, len(vectors))
+        legacy_lat, text_lat = [], []
+        for i in range(sample):
+            t0 = time.perf_counter()
+            cursor.execute(
+                f"INSERT INTO {table} VALUES (%s, %s::{vector_type})",
+                (i, legacy_literal(list(map(float, vectors[i]))))
+            )
+            legacy_lat.append(time.perf_counter() - t0)
+        cursor.execute(f"TRUNCATE {table}")
+        for i in range(sample):
+            t0 = time.perf_counter()
+            cursor.execute(
+                f"INSERT INTO {table} VALUES (%s, %s::{vector_type})",
+                (i, encode_text(vectors[i], vector_type))
+            )
+            text_lat.append(time.perf_counter() - t0)
+        cursor.execute(f"TRUNCATE {table}")
+        print(f"  INSERT legacy text  p50={percentile_ms(legacy_lat, 50):.2f}ms p99={percentile_ms(legacy_lat, 99):.2f}ms")
+        print(f"  INSERT codec text   p50={percentile_ms(text_lat, 50):.2f}ms p99={percentile_ms(text_lat, 99):.2f}ms")
+
+        # 全行をCOPY BINARYで投入
+        t0 = time.perf_counter()
+        cursor.copy_expert(
+            f"COPY {table} (id, embedding) FROM STDIN WITH (FORMAT binary)",
+            io.BytesIO(build_copy_payload(enumerate(vectors), vector_type))
+        )
+        elapsed = time.perf_counter() - t0
+        print(f"  COPY binary         {len(vectors) / elapsed:,.0f} rows/s")
+
+        cursor.execute(
+            f"CREATE INDEX ON {table} USING ivfflat (embedding {vector_type}_cosine_ops) WITH (lists = 100)"
+        )
+        cursor.execute(f"ANALYZE {table}")
+
+        # 検索: 2回バインド（旧） vs 1回バインド（新）
+        double_lat, single_lat = [], []
+        for q in queries:
+            legacy = legacy_literal(list(map(float, q)))
+            t0 = time.perf_counter()
+            cursor.execute(f"""
+                SELECT id, 1 - (embedding <=> %s::{vector_type}) AS similarity
+                FROM {table} ORDER BY embedding <=> %s::{vector_type} LIMIT 5
+            """, (legacy, legacy))
+            cursor.fetchall()
+            double_lat.append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            cursor.execute(f"""
+                SELECT id, embedding <=> %s::{vector_type} AS distance
+                FROM {table} ORDER BY distance LIMIT 5
+            """, (encode_text(q, vector_type),))
+            cursor.fetchall()
+            single_lat.append(time.perf_counter() - t0)
+        print(f"  SEARCH legacy x2    p50={percentile_ms(double_lat, 50):.2f}ms p99={percentile_ms(double_lat, 99):.2f}ms")
+        print(f"  SEARCH codec x1     p50={percentile_ms(single_lat, 50):.2f}ms p99={percentile_ms(single_lat, 99):.2f}ms")
+
+        cursor.execute(
+            "SELECT pg_size_pretty(pg_table_size(%s)), pg_size_pretty(pg_indexes_size(%s))",
+            (table, table)
+        )
+        table_size, index_size = cursor.fetchone()
+        print(f"  size: table={table_size}, indexes={index_size}")
+
+        cursor.execute(f"DROP TABLE {table}")
+
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pgvector codec benchmark")
+    parser.add_argument("--db", action="store_true", help="run database section")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=500, help="vectors for offline section")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    vectors = rng.standard_normal((max(args.rows, args.repeat), EMBEDDING_DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.integers(0, len(vectors), args.queries)]
+
+    print("=" * 60)
+    print("pgvector codec benchmark")
+    print("=" * 60)
+
+    run_offline(vectors, args.repeat)
+    if args.db:
+        run_database(vectors[:args.rows], queries)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Storage Pipeline Benchmark
+
+Replays the storage calls of one LINE Bot chat turn against a StorageBackend.
+Call order follows process_combined_message / generate_response in
+webhook_server_vps.py:
+- get_user_mode, get_conversation_history(30), get_user_language
+- search_learned_knowledge, search_user_memories, get_personality, get_recent_trends
+- increment_personality x2, save_user_memory
+- save_conversation_history x2, save_learning_log, save_session
+
+Embeddings are deterministic pseudo-random vectors, so no OpenAI / LLM calls
+are made. The default embedded backend (SQLite + NumPy) runs fully offline.
+
+Usage:
+    python benchmarks/storage_pipeline_benchmark.py
+    python benchmarks/storage_pipeline_benchmark.py --turns 5000 --users 200 --knowledge 10000
+    STORAGE_BACKEND=postgresql python benchmarks/storage_pipeline_benchmark.py --backend postgresql
+
+Created: 2026-10-19
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from datetime import datetime
+from typing import List
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.line_bot_vps.storage_backend import create_storage_backend, StorageBackend
+
+CHARACTERS = ["botan", "kasho", "yuri"]
+DIM = 1536
+
+
+def fake_embedding(text: str) -> List[float]:
+    """Deterministic embedding seeded by the text hash"""
+    seed = int.from_bytes(hashlib.md5(text.encode('utf-8')).digest()[:4], 'little')
+    return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32).tolist()
+
+
+def seed_knowledge(backend: StorageBackend, rows: int):
+    """Populate learned_knowledge (embedded backend only)"""
+    if not hasattr(backend, "save_learned_knowledge"):
+        print("[WARN] backend has no save_learned_knowledge; skipping knowledge seed")
+        return
+    for i in range(rows):
+        character = CHARACTERS[i % len(CHARACTERS)]
+        word = f"単語{i}"
+        backend.save_learned_knowledge(character, word, f"{word}の意味", None, fake_embedding(word))
+    for character in CHARACTERS:
+        if hasattr(backend, "save_trend"):
+            backend.save_trend(character, "トレンド", {"summary": f"{character}の今日の話題"})
+
+
+def run_turn(backend: StorageBackend, user_id: str, turn: int):
+    """One chat turn's worth of storage calls"""
+    character = CHARACTERS[turn % len(CHARACTERS)]
+    message = f"メッセージ{turn} 好きな食べ物の話"
+
+    backend.get_user_mode(user_id)
+    backend.get_conversation_history(user_id, character, limit=30)
+    backend.get_user_language(user_id)
+
+    query_embedding = fake_embedding(message)
+    backend.search_learned_knowledge(character, query_embedding, top_k=5)
+    backend.search_user_memories(user_id, character, query_embedding, top_k=5)
+    backend.get_personality(user_id)
+    backend.get_recent_trends(character, limit=3)
+
+    backend.increment_personality(user_id, {'serious_interactions': 1})
+    backend.increment_personality(user_id, {'total_conversations': 1, 'positive_interactions': 1})
+    backend.save_user_memory(
+        user_id, character, 'preference', message, message, query_embedding
+    )
+
+    backend.save_conversation_history(user_id, character, 'user', message)
+    backend.save_conversation_history(user_id, character, 'assistant', "応答テキスト")
+    backend.save_learning_log(
+        timestamp=datetime.now().isoformat(),
+        character=character,
+        user_id=user_id,
+        user_message=message,
+        bot_response="応答テキスト",
+        response_time=0.1
+    )
+    backend.save_session(user_id, selected_character=character)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Storage pipeline benchmark")
+    parser.add_argument("--backend", default=os.getenv("STORAGE_BACKEND", "embedded"))
+    parser.add_argument("--db-path", default=":memory:", help="embedded backend only")
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--knowledge", type=int, default=3000)
+    args = parser.parse_args()
+
+    kwargs = {"db_path": args.db_path} if args.backend == "embedded" else {}
+    backend = create_storage_backend(args.backend, **kwargs)
+    if not backend.connect():
+        print("[ERROR] backend connection failed")
+        return 1
+
+    print("=" * 60)
+    print(f"Storage pipeline benchmark: {type(backend).__name__}")
+    print(f"  turns={args.turns}, users={args.users}, knowledge rows={args.knowledge}")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    seed_knowledge(backend, args.knowledge)
+    print(f"Seed: {time.perf_counter() - start:.2f}s")
+
+    latencies = []
+    start = time.perf_counter()
+    for turn in range(args.turns):
+        user_id = f"bench_user_{turn % args.users:05d}"
+        t0 = time.perf_counter()
+        run_turn(backend, user_id, turn)
+        latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+
+    lat_ms = np.array(latencies) * 1000
+    print(f"\nTurns/sec:  {args.turns / total:,.1f}")
+    print(f"Latency p50: {np.percentile(lat_ms, 50):.2f} ms")
+    print(f"Latency p95: {np.percentile(lat_ms, 95):.2f} ms")
+    print(f"Latency p99: {np.percentile(lat_ms, 99):.2f} ms")
+    print(f"Latency max: {lat_ms.max():.2f} ms")
+
+    backend.disconnect()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+Stream Moderation Replay Benchmark
+
+Replays a chat log through StreamModerationPipeline
+(sensitive_system/core/stream_pipeline.py) at a fixed arrival rate and
+reports end-to-end latency (scheduled arrival -> final verdict, including
+time spent waiting for queue space) and comment_log rows written.
+
+The chat log is either a file (one comment per line, or JSONL with a
+"comment"/"message" field and optional "viewer_id"/"viewer_name") or a
+synthetic mix of clean chat, NG comments and ambiguous comments. The NG
+words are the initial set from sensitive_system/database/init_db.py in a
+temporary database. Ambiguous comments go to a simulated LLM (fixed
+latency per call) unless --no-llm is given.
+
+Usage:
+    python benchmarks/stream_moderation_benchmark.py
+    python benchmarks/stream_moderation_benchmark.py --rate 2000 --seconds 10 --workers 1 2 4
+    python benchmarks/stream_moderation_benchmark.py --rate 5000 --regex-rules 200 --workers 0 4
+    python benchmarks/stream_moderation_benchmark.py --log chat.jsonl --rate 500 --llm-latency 0.8
+
+Created: 2026-10-19
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'sensitive_system'))
+
+from core.filter import Layer1PreFilter
+from core.stream_pipeline import StreamModerationPipeline, _percentile
+from database.init_db import insert_initial_ng_words
+
+FILLER = ["配信", "楽しい", "です", "！", "今日も", "ありがとう", "かわいい", "www", "初見です", "こんばんは", "888", "草"]
+KANA = [chr(c) for c in range(ord('ァ'), ord('ヶ') + 1)]
+AMBIGUOUS = ["AIなの？", "中の人いるの？", "政治の話しよう", "宗教ってどう思う？", "年齢いくつ？", "ボットみたいｗ"]
+
+
+def create_db(path: str, regex_rules: int = 0, seed: int = 0):
+    """Initial NG words, plus regex_rules synthetic regex rules for a heavier Layer 1"""
+    rng = random.Random(seed)
+    schema = os.path.join(ROOT, 'sensitive_system', 'database', 'schema.sql')
+    conn = sqlite3.connect(path)
+    with open(schema, encoding='utf-8') as f:
+        conn.executescript(f.read())
+    with contextlib.redirect_stdout(io.StringIO()):
+        insert_initial_ng_words(conn)
+    conn.executemany("""
+        INSERT INTO ng_words (word, category, severity, pattern_type, regex_pattern, action, added_by)
+        VALUES (?, 'synthetic', 3, 'regex', ?, 'log', 'benchmark')
+    """, [
+        (f"synthetic_{i}", ''.join(rng.choice(KANA) for _ in range(2)) + r"\d+")
+        for i in range(regex_rules)
+    ])
+    conn.commit()
+    conn.close()
+
+
+def load_log(path: str) -> List[Tuple[str, str, str]]:
+    """[(comment, viewer_id, viewer_name), ...]"""
+    comments = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith('.jsonl'):
+                record = json.loads(line)
+                comments.append((
+                    record.get('comment') or record.get('message') or '',
+                    record.get('viewer_id'),
+                    record.get('viewer_name')
+                ))
+            else:
+                comments.append((line, None, None))
+    return comments
+
+
+def make_chat(db_path: str, n: int, ng_ratio: float, ambiguous_ratio: float, seed: int = 0):
+    """Synthetic chat: clean filler, NG words (block/mask actions) and ambiguous topics"""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    ng_words = [row[0] for row in conn.execute(
+        "SELECT word FROM ng_words WHERE action IN ('block', 'mask') AND pattern_type != 'regex'"
+    )]
+    conn.close()
+
+    comments = []
+    for i in range(n):
+        parts = [rng.choice(FILLER) for _ in range(rng.randint(2, 8))]
+        r = rng.random()
+        if r < ng_ratio:
+            parts.insert(rng.randrange(len(parts) + 1), rng.choice(ng_words))
+        elif r < ng_ratio + ambiguous_ratio:
+            parts.append(rng.choice(AMBIGUOUS))
+        viewer = rng.randrange(500)
+        comments.append((''.join(parts), f"viewer_{viewer}", f"視聴者{viewer}"))
+    return comments
+
+
+def make_llm(latency: float):
+    async def escalate(comment: str, layer1_result: dict) -> dict:
+        await asyncio.sleep(latency)
+        return {'action': 'pass', 'reason': 'simulated'}
+    return escalate
+
+
+async def replay(db_path: str, comments, rate: float, workers: int, args):
+    pipeline = StreamModerationPipeline(
+        db_path=db_path,
+        workers=workers,
+        queue_size=args.queue_size,
+        chunk_size=args.chunk_size,
+        escalate_func=None if args.no_llm else make_llm(args.llm_latency),
+        llm_concurrency=args.llm_concurrency,
+        max_pending_escalations=args.max_pending,
+        platform='benchmark',
+        stream_id=f'replay_w{workers}'
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        await pipeline.start()
+
+    futures = []
+    start = time.perf_counter()
+    for i, (comment, viewer_id, viewer_name) in enumerate(comments):
+        scheduled = start + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0.001 or i % 32 == 0:
+            # Behind schedule: still yield now and then so the pipeline runs
+            await asyncio.sleep(max(0.0, delay))
+        futures.append(await pipeline.submit(comment, viewer_id, viewer_name, received_at=scheduled))
+    feed_time = time.perf_counter() - start
+
+    results = await asyncio.gather(*futures)
+    total_time = time.perf_counter() - start
+    with contextlib.redirect_stdout(io.StringIO()):
+        await pipeline.stop()
+    stats = pipeline.get_stats()
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT COUNT(*) FROM comment_log WHERE stream_id = ?",
+                        (f'replay_w{workers}',)).fetchone()[0]
+    conn.close()
+
+    def fmt(latencies):
+        if not latencies:
+            return "-"
+        return (f"p50 {_percentile(latencies, 50):7.1f}  p95 {_percentile(latencies, 95):7.1f}  "
+                f"p99 {_percentile(latencies, 99):7.1f}  max {max(latencies):7.1f} ms")
+
+    direct = [r['latency_ms'] for r in results if not r['escalated']]
+    escalated = [r['latency_ms'] for r in results if r['escalated']]
+    print(f"\n  workers={workers}: fed {len(comments) / feed_time:,.0f} msg/s, "
+          f"done {len(comments) / total_time:,.0f} msg/s, comment_log rows {rows}/{len(comments)}")
+    print(f"    all       ({len(results):>6}) {fmt([r['latency_ms'] for r in results])}")
+    print(f"    layer1    ({len(direct):>6}) {fmt(direct)}")
+    print(f"    escalated ({len(escalated):>6}) {fmt(escalated)}")
+    print(f"    actions {stats['actions']}  escalation skipped {stats['escalation_skipped']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream moderation replay benchmark")
+    parser.add_argument("--log", default=None, help="Chat log (.txt: one comment per line, .jsonl)")
+    parser.add_argument("--rate", type=float, default=1000, help="Arrival rate (messages/sec)")
+    parser.add_argument("--seconds", type=float, default=5, help="Replay length for synthetic chat")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--regex-rules", type=int, default=0, help="Extra synthetic regex NG rules")
+    parser.add_argument("--ng-ratio", type=float, default=0.05)
+    parser.add_argument("--ambiguous-ratio", type=float, default=0.05)
+    parser.add_argument("--no-llm", action="store_true", help="Do not escalate ambiguous comments")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Simulated seconds per LLM call")
+    parser.add_argument("--llm-concurrency", type=int, default=32)
+    parser.add_argument("--max-pending", type=int, default=256, help="Max comments waiting for the LLM")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'sensitive_filter.db')
+        create_db(db_path, args.regex_rules)
+
+        if args.log:
+            comments = load_log(args.log)
+        else:
+            comments = make_chat(db_path, int(args.rate * args.seconds),
+                                 args.ng_ratio, args.ambiguous_ratio)
+
+        # Single-threaded Layer 1 capacity for reference
+        ng_filter = Layer1PreFilter(db_path=db_path)
+        sample = comments[:2000]
+        start = time.perf_counter()
+        for comment, _, _ in sample:
+            ng_filter.filter_comment(comment)
+        capacity = len(sample) / (time.perf_counter() - start)
+
+        print(f"\n=== Stream moderation replay: {len(comments)} comments at {args.rate:,.0f} msg/s ===")
+        print(f"  single-thread filter_comment: {capacity:,.0f} msg/s")
+        for workers in args.workers:
+            asyncio.run(replay(db_path, comments, args.rate, workers, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+-- =============================================================================
+-- Migration: NOTIFY on daily_trends changes
+-- Date: 2026-10-19
+-- Target DB: sisters_on_whatsapp
+--
+-- TrendSnapshotCache（src/line_bot_vps/trend_snapshot_cache.py）が
+-- LISTEN daily_trends_changed で受信し、該当キャラクターのスナップショットを
+-- 読み直す。payload はキャラクター名（不明な場合は空文字 = 全キャラクター）。
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION notify_daily_trends_changed() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('daily_trends_changed', COALESCE(OLD.character, ''));
+        RETURN OLD;
+    END IF;
+    PERFORM pg_notify('daily_trends_changed', COALESCE(NEW.character, ''));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_daily_trends_notify ON daily_trends;
+CREATE TRIGGER trg_daily_trends_notify
+    AFTER INSERT OR UPDATE OR DELETE ON daily_trends
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_daily_trends_changed();
+
+-- -----------------------------------------------------------------------------
+-- Summary of changes:
+-- 1. daily_trends の変更時に pg_notify('daily_trends_changed', character)
+-- -----------------------------------------------------------------------------
@@ -0,0 +1,126 @@
+-- =============================================================================
+-- Migration: Incremental conversation statistics counters
+-- Date: 2026-10-19
+-- Target DB: sisters_on_whatsapp
+--
+-- action=stats（get_user_stats）と /api/stats（get_stats）は
+-- conversation_history / learning_logs 全件の COUNT(*) GROUP BY で集計していたため、
+-- 履歴が増えるほど遅くなっていた。
+-- INSERT/UPDATE/DELETE トリガーでカウンターを増減させ、統計は数行の参照で返す。
+-- UPDATE は旧行の分を減らして新行の分を足す（集計キーの列が変わったときのみ発火）。
+--
+-- 既存データの取り込み: python tools/backfill_stats.py
+-- =============================================================================
+
+-- -----------------------------------------------------------------------------
+-- Step 1: Counter tables
+-- -----------------------------------------------------------------------------
+
+-- user_character_stats: ユーザー×キャラクター別の会話数（role='user' のみ）
+CREATE TABLE IF NOT EXISTS user_character_stats (
+    user_id VARCHAR(255) NOT NULL,
+    character VARCHAR(50) NOT NULL,
+    message_count BIGINT NOT NULL DEFAULT 0,
+    last_message_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, character)
+);
+
+-- learning_log_stats: learning_logs のグローバル集計
+-- （キャラクター×Phase 5判定ごと、平均応答時間は sum / count で算出）
+CREATE TABLE IF NOT EXISTS learning_log_stats (
+    character VARCHAR(50) NOT NULL,
+    phase5_response_tier VARCHAR(50) NOT NULL DEFAULT '',
+    log_count BIGINT NOT NULL DEFAULT 0,
+    response_time_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    response_time_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (character, phase5_response_tier)
+);
+
+-- -----------------------------------------------------------------------------
+-- Step 2: conversation_history -> user_character_stats
+-- -----------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION bump_user_character_stats() RETURNS TRIGGER AS $$
+BEGIN
+    -- DELETE / UPDATE: 旧行の分を減らす
+    IF TG_OP IN ('DELETE', 'UPDATE') AND OLD.role = 'user' THEN
+        UPDATE user_character_stats
+        SET message_count = GREATEST(message_count - 1, 0),
+            updated_at = NOW()
+        WHERE user_id = OLD.user_id AND character = OLD.character;
+    END IF;
+
+    -- INSERT / UPDATE: 新行の分を足す（WhatsApp由来の行（user_id なし）は集計対象外）
+    IF TG_OP IN ('INSERT', 'UPDATE')
+       AND NEW.role = 'user' AND NEW.user_id IS NOT NULL AND NEW.character IS NOT NULL THEN
+        INSERT INTO user_character_stats (user_id, character, message_count, last_message_at, updated_at)
+        VALUES (NEW.user_id, NEW.character, 1, NEW.created_at, NOW())
+        ON CONFLICT (user_id, character) DO UPDATE SET
+            message_count = user_character_stats.message_count + 1,
+            last_message_at = GREATEST(user_character_stats.last_message_at, EXCLUDED.last_message_at),
+            updated_at = NOW();
+    END IF;
+
+    RETURN NULL;  -- AFTER トリガーなので戻り値は使われない
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_conversation_history_stats ON conversation_history;
+CREATE TRIGGER trg_conversation_history_stats
+    AFTER INSERT OR DELETE OR UPDATE OF user_id, character, role, created_at ON conversation_history
+    FOR EACH ROW
+    EXECUTE FUNCTION bump_user_character_stats();
+
+-- -----------------------------------------------------------------------------
+-- Step 3: learning_logs -> learning_log_stats
+-- -----------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION bump_learning_log_stats() RETURNS TRIGGER AS $$
+BEGIN
+    -- DELETE / UPDATE: 旧行の分を減らす
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE learning_log_stats
+        SET log_count = GREATEST(log_count - 1, 0),
+            response_time_sum = response_time_sum - COALESCE(OLD.response_time, 0),
+            response_time_count = GREATEST(
+                response_time_count - CASE WHEN OLD.response_time IS NULL THEN 0 ELSE 1 END, 0
+            ),
+            updated_at = NOW()
+        WHERE character = OLD.character
+          AND phase5_response_tier = COALESCE(OLD.phase5_response_tier, '');
+    END IF;
+
+    -- INSERT / UPDATE: 新行の分を足す
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO learning_log_stats (
+            character, phase5_response_tier, log_count,
+            response_time_sum, response_time_count, updated_at
+        ) VALUES (
+            NEW.character, COALESCE(NEW.phase5_response_tier, ''), 1,
+            COALESCE(NEW.response_time, 0),
+            CASE WHEN NEW.response_time IS NULL THEN 0 ELSE 1 END,
+            NOW()
+        )
+        ON CONFLICT (character, phase5_response_tier) DO UPDATE SET
+            log_count = learning_log_stats.log_count + 1,
+            response_time_sum = learning_log_stats.response_time_sum + EXCLUDED.response_time_sum,
+            response_time_count = learning_log_stats.response_time_count + EXCLUDED.response_time_count,
+            updated_at = NOW();
+    END IF;
+
+    RETURN NULL;  -- AFTER トリガーなので戻り値は使われない
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_learning_logs_stats ON learning_logs;
+CREATE TRIGGER trg_learning_logs_stats
+    AFTER INSERT OR DELETE OR UPDATE OF character, phase5_response_tier, response_time ON learning_logs
+    FOR EACH ROW
+    EXECUTE FUNCTION bump_learning_log_stats();
+
+-- -----------------------------------------------------------------------------
+-- Summary of changes:
+-- 1. user_character_stats / learning_log_stats カウンターテーブル作成
+-- 2. conversation_history / learning_logs の INSERT・UPDATE・DELETE でカウンターを増減
+-- 3. 既存データは tools/backfill_stats.py で再集計（トリガー作成後に実行）
+-- -----------------------------------------------------------------------------
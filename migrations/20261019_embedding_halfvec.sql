@@ -0,0 +1,41 @@
+-- =============================================================================
+-- Migration: Store embeddings as halfvec(1536)
+-- Date: 2026-10-19
+-- Target DB: sisters_on_whatsapp
+-- Requires: pgvector >= 0.7.0
+--
+-- user_memories / learned_knowledge の embedding を float16（halfvec）に変換し、
+-- 行サイズとインデックスサイズを約半分にする。
+-- 適用後は環境変数 PGVECTOR_TYPE=halfvec を設定すること
+-- （PostgreSQLManager がクエリ側のキャストを halfvec に切り替える）。
+--
+-- 任意のマイグレーション。vector(1536) のままでも動作する。
+-- =============================================================================
+
+BEGIN;
+
+DROP INDEX IF EXISTS idx_user_memories_embedding;
+DROP INDEX IF EXISTS idx_learned_knowledge_embedding;
+
+ALTER TABLE user_memories
+    ALTER COLUMN embedding TYPE halfvec(1536) USING embedding::halfvec(1536);
+
+ALTER TABLE learned_knowledge
+    ALTER COLUMN embedding TYPE halfvec(1536) USING embedding::halfvec(1536);
+
+CREATE INDEX idx_user_memories_embedding ON user_memories USING ivfflat (embedding halfvec_cosine_ops) WITH (lists = 100);
+CREATE INDEX idx_learned_knowledge_embedding ON learned_knowledge USING ivfflat (embedding halfvec_cosine_ops) WITH (lists = 100);
+
+COMMIT;
+
+-- -----------------------------------------------------------------------------
+-- Rollback:
+--   DROP INDEX idx_user_memories_embedding, idx_learned_knowledge_embedding;
+--   ALTER TABLE user_memories ALTER COLUMN embedding TYPE vector(1536) USING embedding::vector(1536);
+--   ALTER TABLE learned_knowledge ALTER COLUMN embedding TYPE vector(1536) USING embedding::vector(1536);
+--   （インデックスは vector_cosine_ops で作り直す）
+--
+-- Summary of changes:
+-- 1. user_memories.embedding, learned_knowledge.embedding: vector(1536) → halfvec(1536)
+-- 2. ivfflat インデックスを halfvec_cosine_ops で再作成
+-- -----------------------------------------------------------------------------
@@ -0,0 +1,21 @@
+-- =============================================================================
+-- Migration: Watermark index for learned_knowledge incremental refresh
+-- Date: 2026-10-19
+-- Target DB: sisters_on_whatsapp
+--
+-- LearnedKnowledgeIndex（src/line_bot_vps/knowledge_index.py）は
+-- WHERE character = ? AND id > ? ORDER BY id
+-- で差分を読み込む（created_at はNULLになりうるためウォーターマークに使わない）。
+-- その範囲スキャン用の複合インデックス。
+-- =============================================================================
+
+DROP INDEX IF EXISTS idx_learned_knowledge_character_created;
+
+CREATE INDEX IF NOT EXISTS idx_learned_knowledge_character_id
+    ON learned_knowledge (character, id);
+
+-- -----------------------------------------------------------------------------
+-- Summary of changes:
+-- 1. learned_knowledge (character, id) インデックス追加
+--    （旧ウォーターマーク用の (character, created_at, id) インデックスは削除）
+-- -----------------------------------------------------------------------------
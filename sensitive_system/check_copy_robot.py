@@ -27,13 +27,15 @@ class CopyRobotCheckCLI:
     def __init__(self):
         self.console = Console()
 
-    def run(self, copy_robot_db: str, mode: str = 'all'):
+    def run(self, copy_robot_db: str, mode: str = 'all', full: bool = False, workers: int = None):
         """
         Run check
 
         Args:
             copy_robot_db: Path to COPY_ROBOT_YYYYMMDD_HHMMSS.db
             mode: 'sensitive', 'vocabulary', or 'all'
+            full: Re-read every row instead of only rows added since the last scan
+            workers: Filter processes (default: CPU count)
         """
         self.console.print()
         self.console.print(Panel.fit(
@@ -43,26 +45,27 @@ class CopyRobotCheckCLI:
         self.console.print()
 
         # Initialize checker
-        checker = CopyRobotChecker(copy_robot_db)
+        checker = CopyRobotChecker(copy_robot_db, workers=workers)
 
         if mode in ['sensitive', 'all']:
-            self._check_sensitive_content(checker)
+            self._check_sensitive_content(checker, full)
 
         if mode in ['vocabulary', 'all']:
             self._check_vocabulary_usage(checker)
 
-    def _check_sensitive_content(self, checker: CopyRobotChecker):
+    def _check_sensitive_content(self, checker: CopyRobotChecker, full: bool = False):
         """
         Check sensitive content
 
         Args:
             checker: CopyRobotChecker instance
+            full: Full scan (see CopyRobotChecker.scan_copy_robot)
         """
         self.console.print("[bold yellow]1. Sensitive Content Scan[/bold yellow]")
         self.console.print()
 
         with self.console.status("[bold green]Scanning Copy Robot DB..."):
-            results = checker.scan_copy_robot()
+            results = checker.scan_copy_robot(full=full)
 
         # Statistics
         stats = results['statistics']
@@ -101,6 +104,9 @@ class CopyRobotCheckCLI:
             "Sensitive detected",
             f"[{'red' if stats['sensitive_detected'] > 0 else 'green'}]{stats['sensitive_detected']}[/]"
         )
+        table.add_row("Scan mode", "full" if stats['full_scan'] else "incremental")
+        table.add_row("Rows filtered", str(stats['rows_filtered']))
+        table.add_row("Rows from previous scan", str(stats['rows_reused']))
 
         self.console.print(table)
         self.console.print()
@@ -258,6 +264,17 @@ def main():
         default='all',
         help='Check mode (default: all)'
     )
+    parser.add_argument(
+        '--full',
+        action='store_true',
+        help='Re-read every row (use after NG dictionary changes or edited memories)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Filter processes (default: CPU count)'
+    )
 
     args = parser.parse_args()
 
@@ -268,7 +285,7 @@ def main():
 
     # Run check
     cli = CopyRobotCheckCLI()
-    cli.run(args.copy_robot_db, args.mode)
+    cli.run(args.copy_robot_db, args.mode, args.full, args.workers)
 
 
 if __name__ == "__main__":
@@ -17,6 +17,10 @@ from pathlib import Path
 
 # Add parent directory to path for config import
 sys.path.insert(0, str(Path(__file__).parent.parent))
+# src/core (keyword_engine)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src" / "core"))
+
+from keyword_engine import KeywordEngine, KeywordMatches
 
 from config import (
     CHARACTER_INTERESTS,
@@ -67,6 +71,24 @@ class InterestAnalyzer:
             'you', 'then', 'and'
         ]
 
+        # All dictionaries in one automaton: a message is scanned once and
+        # detect_topics / name / continuation / greeting checks read the hits
+        dictionaries = {f"topic:{topic}": kws for topic, kws in self.topic_keywords.items()}
+        dictionaries.update({f"name:{c}": names for c, names in self.name_patterns.items()})
+        dictionaries["continuation"] = self.continuation_keywords
+        dictionaries.update({f"greeting:{t}": kws for t, kws in GREETING_TYPE_KEYWORDS.items()})
+        self.keyword_engine = KeywordEngine(dictionaries, ignore_case=True)
+        self._last_scan = (None, None)
+
+    def _scan(self, message: str) -> KeywordMatches:
+        """Keyword hits for message (the last message's scan is reused)"""
+        last_message, last_matches = self._last_scan
+        if last_message == message:
+            return last_matches
+        matches = self.keyword_engine.scan(message)
+        self._last_scan = (message, matches)
+        return matches
+
     def calculate_interest_scores(
         self,
         message: str,
@@ -142,11 +164,11 @@ class InterestAnalyzer:
             >>> # {'vtuber': 0.6, 'streaming': 0.3}
         """
         detected = {}
-        msg_lower = message.lower()
+        hits = self._scan(message)
 
-        for topic, keywords in self.topic_keywords.items():
+        for topic in self.topic_keywords:
             # Count keyword matches
-            matches = sum(1 for kw in keywords if kw in msg_lower)
+            matches = hits.count(f"topic:{topic}")
 
             if matches > 0:
                 # Relevance score (0.0-1.0)
@@ -204,10 +226,7 @@ class InterestAnalyzer:
         Returns:
             True if name is mentioned
         """
-        msg_lower = message.lower()
-        patterns = self.name_patterns.get(character, [])
-
-        return any(pattern in msg_lower for pattern in patterns)
+        return f"name:{character}" in self._scan(message)
 
     def _is_context_continuation(
         self,
@@ -232,8 +251,7 @@ class InterestAnalyzer:
             return False
 
         # Check for continuation keywords
-        msg_lower = message.lower()
-        return any(kw in msg_lower for kw in self.continuation_keywords)
+        return "continuation" in self._scan(message)
 
     def select_responders(
         self,
@@ -298,12 +316,11 @@ class InterestAnalyzer:
             >>> analyzer.detect_greeting_type("おはよう")
             >>> # 'morning'
         """
-        msg_lower = message.lower()
+        hits = self._scan(message)
 
         # Check in priority order
         for greeting_type in ['morning', 'night', 'casual', 'formal']:
-            keywords = GREETING_TYPE_KEYWORDS[greeting_type]
-            if any(kw in msg_lower for kw in keywords):
+            if f"greeting:{greeting_type}" in hits:
                 return greeting_type
 
         # Default to formal if no specific type detected
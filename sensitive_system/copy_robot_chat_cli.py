@@ -43,6 +43,7 @@ try:
     from src.line_bot.worldview_checker import WorldviewChecker
     from src.core.prompt_manager import PromptManager
     from src.core.llm_tracing import TracedLLM
+    from src.core.memory_fts import keyword_condition
 except ImportError as e:
     print(f"[ERROR] Import failed: {e}")
     print(f"[ERROR] Current directory: {os.getcwd()}")
@@ -165,14 +166,19 @@ class CopyRobotMemoryLoader:
         cursor = conn.cursor()
 
         try:
+            # FTS5 index if built (tools/build_memory_fts.py), LIKE otherwise
+            condition, params = keyword_condition(conn, table_name, {
+                'diary_entry': [keyword],
+                f'{character}_thought': [keyword],
+            })
             cursor.execute(f"""
                 SELECT memory_id, event_id, memory_date, diary_entry,
                        {character}_emotion, {character}_thought
                 FROM {table_name}
-                WHERE diary_entry LIKE ? OR {character}_thought LIKE ?
+                WHERE {condition}
                 ORDER BY memory_date DESC
                 LIMIT ?
-            """, (f"%{keyword}%", f"%{keyword}%", limit))
+            """, (*params, limit))
 
             memories = []
             for row in cursor.fetchall():
@@ -2,18 +2,126 @@
 Copy Robot Checker - Sensitive Content and Vocabulary Analysis
 Created: 2025-10-27
 Purpose: Check Copy Robot DB for sensitive content and vocabulary usage
+
+Sensitive content scans are incremental. Per-row content hashes, scan
+results and the NG dictionary they were computed with are kept in the
+sensitive filter DB (copy_robot_scan_* tables, per copy robot DB path):
+
+- default: only rows above the previous id watermark of each table are
+  filtered (a table whose older rows changed in number is re-read fully)
+- full=True: every row is re-read and only new or edited rows are
+  filtered; after NG dictionary changes, unchanged rows are re-filtered
+  only if they contain a newly added NG word or their stored result
+  contains a removed/changed one (a dictionary change forces full=True)
+
+Rows are filtered in a process pool, one Layer1PreFilter per worker.
 """
 
+import hashlib
+import json
+import os
 import sqlite3
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from collections import defaultdict
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from core.filter import Layer1PreFilter
+from core.filter import Layer1PreFilter, PATTERN_TYPES
+
+CHARACTERS = ['botan', 'kasho', 'yuri']
+EVENT_TABLE = 'sister_shared_events'
+
+
+def _source_spec(table: str) -> Dict:
+    """
+    Columns of a scanned table
+
+    Returns:
+        {
+            'id': row id column,
+            'sort': column the results are ordered by,
+            'record': columns copied into the result record,
+            'text': scanned text columns (result 'field' names)
+        }
+    """
+    if table == EVENT_TABLE:
+        return {
+            'id': 'event_id',
+            'sort': 'event_number',
+            'record': ['event_id', 'event_number', 'event_name', 'event_date'],
+            'text': ['event_name', 'description', 'participants', 'cultural_context']
+        }
+    character = table[:-len('_memories')]
+    return {
+        'id': 'memory_id',
+        'sort': 'memory_date',
+        'record': ['memory_id', 'event_id', 'memory_date'],
+        'text': [f'{character}_emotion', f'{character}_action', f'{character}_thought', 'diary_entry']
+    }
+
+
+def _entry_key(ng: Dict) -> str:
+    """Identity of an NG dictionary entry (any field change makes it a different entry)"""
+    return json.dumps(ng, ensure_ascii=False, sort_keys=True)
+
+
+def _scan_rows(ng_filter: Layer1PreFilter,
+               probe: Optional[Layer1PreFilter],
+               rows: List[Tuple[int, List[Tuple[str, str]], bool]]) -> List[Tuple[int, int, List[Dict]]]:
+    """
+    Filter the text fields of rows
+
+    Args:
+        ng_filter: Filter with the full NG dictionary
+        probe: Filter with only the newly added NG words (for probe_only rows)
+        rows: [(index, [(field, text), ...], probe_only), ...]
+
+    Returns:
+        [(index, text_items, detections), ...] - probe_only rows without a
+        probe hit are left out (their stored result is still valid)
+    """
+    scanned = []
+    for index, fields, probe_only in rows:
+        if probe_only and not any(text and probe.scan_ng_words(text) for _, text in fields):
+            continue
+
+        text_items = 0
+        detections = []
+        for field_name, text in fields:
+            if text:
+                text_items += 1
+                result = ng_filter.filter_comment(text)
+
+                if result['detected_words']:
+                    detections.append({
+                        'field': field_name,
+                        'text': text[:100] + '...' if len(text) > 100 else text,
+                        'action': result['action'],
+                        'detected_words': result['detected_words'],
+                        'max_severity': result['max_severity']
+                    })
+        scanned.append((index, text_items, detections))
+    return scanned
+
+
+# Worker process state (one filter per process, built once)
+_worker_filter: Optional[Layer1PreFilter] = None
+_worker_probe: Optional[Layer1PreFilter] = None
+
+
+def _init_worker(db_path: str, probe_words: Optional[Dict[str, List[Dict]]]):
+    global _worker_filter, _worker_probe
+    _worker_filter = Layer1PreFilter(db_path=db_path)
+    _worker_probe = Layer1PreFilter.from_ng_words(probe_words) if probe_words else None
+
+
+def _scan_chunk(rows):
+    return _scan_rows(_worker_filter, _worker_probe, rows)
 
 
 class CopyRobotChecker:
@@ -28,7 +136,10 @@ class CopyRobotChecker:
     def __init__(self,
                  copy_robot_db_path: str,
                  youtube_learning_db_path: str = None,
-                 sensitive_db_path: str = None):
+                 sensitive_db_path: str = None,
+                 state_db_path: str = None,
+                 workers: int = None,
+                 chunk_size: int = 200):
         """
         Initialize
 
@@ -36,8 +147,13 @@ class CopyRobotChecker:
             copy_robot_db_path: Path to COPY_ROBOT_YYYYMMDD_HHMMSS.db
             youtube_learning_db_path: Path to youtube_learning.db
             sensitive_db_path: Path to sensitive_filter.db
+            state_db_path: Where incremental scan state is kept (default: sensitive_filter.db)
+            workers: Filter processes (default: CPU count, 0/1: in this process)
+            chunk_size: Rows per worker task
         """
         self.copy_robot_db = copy_robot_db_path
+        # Scan state is kept per copy robot DB (resolved path)
+        self._state_db_key = str(Path(copy_robot_db_path).resolve())
 
         if youtube_learning_db_path is None:
             youtube_learning_db_path = "/home/koshikawa/toExecUnit/youtube_learning_system/database/youtube_learning.db"
@@ -46,22 +162,80 @@ class CopyRobotChecker:
         # Initialize sensitive filter
         self.filter = Layer1PreFilter(db_path=sensitive_db_path)
 
+        self.state_db = state_db_path or self.filter.db_path
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.chunk_size = chunk_size
+        self._init_state_db()
+
         # Statistics
-        self.stats = {
+        self.stats = self._new_stats()
+
+        # Detection results
+        self.sensitive_results = []
+
+    @staticmethod
+    def _new_stats() -> Dict:
+        return {
             'events_scanned': 0,
             'memories_scanned': 0,
             'total_text_items': 0,
             'sensitive_detected': 0,
-            'ng_words_found': defaultdict(int)
+            'ng_words_found': defaultdict(int),
+            'full_scan': False,
+            'rows_filtered': 0,
+            'rows_reused': 0,
+            'rows_deleted': 0
         }
 
-        # Detection results
-        self.sensitive_results = []
+    def _init_state_db(self):
+        """Create incremental scan state tables"""
+        conn = sqlite3.connect(self.state_db)
+        try:
+            # State written before it was keyed per DB cannot be attributed to a DB
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(copy_robot_scan_dictionary)")]
+            if columns and 'db' not in columns:
+                conn.executescript("""
+                    DROP TABLE IF EXISTS copy_robot_scan_rows;
+                    DROP TABLE IF EXISTS copy_robot_scan_sources;
+                    DROP TABLE IF EXISTS copy_robot_scan_dictionary;
+                """)
+
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS copy_robot_scan_rows (
+                    source TEXT NOT NULL,
+                    row_id INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    sort_key,
+                    text_items INTEGER NOT NULL,
+                    result TEXT,
+                    PRIMARY KEY (source, row_id)
+                );
+                CREATE TABLE IF NOT EXISTS copy_robot_scan_sources (
+                    source TEXT PRIMARY KEY,
+                    watermark INTEGER NOT NULL,
+                    row_count INTEGER NOT NULL,
+                    scanned_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS copy_robot_scan_dictionary (
+                    db TEXT NOT NULL,
+                    entry TEXT NOT NULL,
+                    PRIMARY KEY (db, entry)
+                );
+            """)
+        finally:
+            conn.close()
 
-    def scan_copy_robot(self) -> Dict:
+    def _source(self, table: str) -> str:
+        """State key of a table of this copy robot DB"""
+        return f"{self._state_db_key}:{table}"
+
+    def scan_copy_robot(self, full: bool = False) -> Dict:
         """
         Scan Copy Robot DB for sensitive content
 
+        Args:
+            full: Re-read every row (edited/deleted rows, NG dictionary changes)
+
         Returns:
             {
                 'events': List[Dict],  # Event scan results
@@ -74,23 +248,61 @@ class CopyRobotChecker:
                 'ng_word_summary': Dict
             }
         """
-        results = {
-            'events': [],
-            'memories': {
-                'botan': [],
-                'kasho': [],
-                'yuri': []
-            },
-            'statistics': {},
-            'ng_word_summary': {}
-        }
-
-        # Scan Events
-        results['events'] = self._scan_events()
+        self.filter.reload_ng_words()
+        self.stats = self._new_stats()
 
-        # Scan Memories (three sisters)
-        for character in ['botan', 'kasho', 'yuri']:
-            results['memories'][character] = self._scan_memories(character)
+        robot = sqlite3.connect(self.copy_robot_db)
+        state = sqlite3.connect(self.state_db)
+        try:
+            entries = {
+                _entry_key(ng): ng
+                for pattern_type in PATTERN_TYPES
+                for ng in self.filter.ng_words_cache[pattern_type]
+            }
+            tables = [EVENT_TABLE] + [f"{character}_memories" for character in CHARACTERS]
+            stored = {row[0] for row in state.execute(
+                "SELECT entry FROM copy_robot_scan_dictionary WHERE db = ?", (self._state_db_key,)
+            )}
+            has_state = state.execute(
+                f"SELECT 1 FROM copy_robot_scan_sources WHERE source IN ({', '.join('?' * len(tables))}) LIMIT 1",
+                [self._source(table) for table in tables]
+            ).fetchone()
+
+            added, removed = set(), set()
+            if has_state and stored != set(entries):
+                added = set(entries) - stored
+                removed = stored - set(entries)
+                if not full:
+                    print(f"[INFO] NG dictionary changed since last scan (+{len(added)}/-{len(removed)}): full scan")
+                    full = True
+            self.stats['full_scan'] = full
+
+            probe_words = None
+            if added:
+                probe_words = {pattern_type: [] for pattern_type in PATTERN_TYPES}
+                for key in added:
+                    probe_words[entries[key]['pattern_type']].append(entries[key])
+
+            tasks = []
+            collected = {}
+            for table in tables:
+                collected[table] = self._collect_rows(robot, state, table, full, removed, bool(added), tasks)
+
+            scanned = self._filter_rows(tasks, probe_words)
+            self._save_state(state, collected, tasks, scanned, entries)
+
+            results = {
+                'events': self._load_results(state, EVENT_TABLE),
+                'memories': {
+                    character: self._load_results(state, f"{character}_memories")
+                    for character in CHARACTERS
+                },
+                'statistics': {},
+                'ng_word_summary': {}
+            }
+        finally:
+            robot.close()
+            state.close()
 
         # Generate statistics
         results['statistics'] = self.stats.copy()
@@ -98,154 +310,192 @@ class CopyRobotChecker:
 
         return results
 
-    def _scan_events(self) -> List[Dict]:
+    def _collect_rows(self, robot: sqlite3.Connection, state: sqlite3.Connection,
+                      table: str, full: bool, removed: set, probing: bool,
+                      tasks: List[Dict]) -> Optional[Dict]:
         """
-        Scan sister_shared_events table
+        Read the rows of a table that need filtering
 
-        Returns:
-            List of events with detected sensitive content
-        """
-        conn = sqlite3.connect(self.copy_robot_db)
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT event_id, event_number, event_name, event_date,
-                   description, participants, cultural_context
-            FROM sister_shared_events
-            ORDER BY event_number
-        """)
-
-        events = cursor.fetchall()
-        conn.close()
-
-        detected_events = []
-
-        for event in events:
-            self.stats['events_scanned'] += 1
-
-            event_id = event[0]
-            event_number = event[1]
-            event_name = event[2]
-            event_date = event[3]
-
-            # Scan text fields
-            text_fields = {
-                'event_name': event[2],
-                'description': event[4],
-                'participants': event[5],
-                'cultural_context': event[6]
-            }
-
-            # Check each field
-            event_detections = []
-            for field_name, text in text_fields.items():
-                if text:
-                    self.stats['total_text_items'] += 1
-                    result = self.filter.filter_comment(text)
-
-                    if result['detected_words']:
-                        self.stats['sensitive_detected'] += 1
-
-                        for ng in result['detected_words']:
-                            self.stats['ng_words_found'][ng['word']] += 1
-
-                        event_detections.append({
-                            'field': field_name,
-                            'text': text[:100] + '...' if len(text) > 100 else text,
-                            'action': result['action'],
-                            'detected_words': result['detected_words'],
-                            'max_severity': result['max_severity']
-                        })
-
-            if event_detections:
-                detected_events.append({
-                    'event_id': event_id,
-                    'event_number': event_number,
-                    'event_name': event_name,
-                    'event_date': event_date,
-                    'detections': event_detections
-                })
-
-        return detected_events
-
-    def _scan_memories(self, character: str) -> List[Dict]:
-        """
-        Scan character-specific memories table
-
-        Args:
-            character: 'botan', 'kasho', or 'yuri'
+        Appends {'table', 'row_id', 'sort_key', 'hash', 'record', 'fields', 'probe_only'}
+        to tasks.
 
         Returns:
-            List of memories with detected sensitive content
+            {'incremental': bool, 'row_ids': all row ids read, 'deleted': row ids
+            no longer present} or None if the table doesn't exist
         """
-        table_name = f"{character}_memories"
+        spec = _source_spec(table)
+        columns = list(dict.fromkeys(spec['record'] + [spec['sort']] + spec['text']))
+        select = f"SELECT {', '.join(columns)} FROM {table}"
 
-        conn = sqlite3.connect(self.copy_robot_db)
-        cursor = conn.cursor()
+        previous = state.execute(
+            "SELECT watermark, row_count FROM copy_robot_scan_sources WHERE source = ?", (self._source(table),)
+        ).fetchone()
 
         try:
-            cursor.execute(f"""
-                SELECT memory_id, event_id, memory_date,
-                       {character}_emotion, {character}_action, {character}_thought, diary_entry
-                FROM {table_name}
-                ORDER BY memory_date
-            """)
-
-            memories = cursor.fetchall()
-            conn.close()
-
+            incremental = False
+            if previous and not full:
+                # Older rows unchanged in number: only rows above the watermark are new
+                count = robot.execute(
+                    f"SELECT COUNT(*) FROM {table} WHERE {spec['id']} <= ?", (previous[0],)
+                ).fetchone()[0]
+                incremental = count == previous[1]
+
+            if incremental:
+                rows = robot.execute(f"{select} WHERE {spec['id']} > ?", (previous[0],)).fetchall()
+            else:
+                rows = robot.execute(select).fetchall()
         except sqlite3.OperationalError:
             # Table doesn't exist
-            conn.close()
-            return []
-
-        detected_memories = []
-
-        for memory in memories:
-            self.stats['memories_scanned'] += 1
-
-            memory_id = memory[0]
-            event_id = memory[1]
-            memory_date = memory[2]
-
-            # Scan text fields
-            text_fields = {
-                f'{character}_emotion': memory[3],
-                f'{character}_action': memory[4],
-                f'{character}_thought': memory[5],
-                'diary_entry': memory[6]
+            return None
+
+        stored = {}
+        if not incremental:
+            stored = {
+                row[0]: (row[1], row[2]) for row in state.execute(
+                    "SELECT row_id, content_hash, result FROM copy_robot_scan_rows WHERE source = ?",
+                    (self._source(table),)
+                )
             }
 
-            # Check each field
-            memory_detections = []
-            for field_name, text in text_fields.items():
-                if text:
-                    self.stats['total_text_items'] += 1
-                    result = self.filter.filter_comment(text)
-
-                    if result['detected_words']:
-                        self.stats['sensitive_detected'] += 1
-
-                        for ng in result['detected_words']:
-                            self.stats['ng_words_found'][ng['word']] += 1
-
-                        memory_detections.append({
-                            'field': field_name,
-                            'text': text[:100] + '...' if len(text) > 100 else text,
-                            'action': result['action'],
-                            'detected_words': result['detected_words'],
-                            'max_severity': result['max_severity']
-                        })
+        row_ids = []
+        for row in rows:
+            values = dict(zip(columns, row))
+            row_id = values[spec['id']]
+            row_ids.append(row_id)
+            content_hash = hashlib.sha1(
+                json.dumps(row, ensure_ascii=False, default=str).encode('utf-8')
+            ).hexdigest()
+
+            probe_only = False
+            if row_id in stored and stored[row_id][0] == content_hash:
+                result = stored[row_id][1]
+                stale = removed and result and any(
+                    _entry_key(ng) in removed
+                    for detection in json.loads(result)['detections']
+                    for ng in detection['detected_words']
+                )
+                if not stale:
+                    if not probing:
+                        self.stats['rows_reused'] += 1
+                        continue
+                    probe_only = True
+
+            tasks.append({
+                'table': table,
+                'row_id': row_id,
+                'sort_key': values[spec['sort']],
+                'hash': content_hash,
+                'record': {column: values[column] for column in spec['record']},
+                'fields': [(column, values[column]) for column in spec['text']],
+                'probe_only': probe_only
+            })
+
+        deleted = set(stored) - set(row_ids)
+        self.stats['rows_deleted'] += len(deleted)
+        return {'incremental': incremental, 'row_ids': row_ids, 'deleted': deleted}
+
+    def _filter_rows(self, tasks: List[Dict], probe_words: Optional[Dict]) -> List[Tuple[int, int, List[Dict]]]:
+        """
+        Filter task rows (process pool when there is more than one chunk)
 
-            if memory_detections:
-                detected_memories.append({
-                    'memory_id': memory_id,
-                    'event_id': event_id,
-                    'memory_date': memory_date,
-                    'detections': memory_detections
-                })
+        Returns:
+            _scan_rows() results, index = position in tasks
+        """
+        rows = [(i, task['fields'], task['probe_only']) for i, task in enumerate(tasks)]
+        chunks = [rows[i:i + self.chunk_size] for i in range(0, len(rows), self.chunk_size)]
+
+        if self.workers <= 1 or len(chunks) <= 1:
+            probe = Layer1PreFilter.from_ng_words(probe_words) if probe_words else None
+            return _scan_rows(self.filter, probe, rows)
+
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, len(chunks)),
+            initializer=_init_worker,
+            initargs=(self.filter.db_path, probe_words)
+        ) as pool:
+            return [item for chunk in pool.map(_scan_chunk, chunks) for item in chunk]
+
+    def _save_state(self, state: sqlite3.Connection, collected: Dict[str, Optional[Dict]],
+                    tasks: List[Dict], scanned: List[Tuple[int, int, List[Dict]]], entries: Dict):
+        """Store filtered rows, watermarks and the NG dictionary used (one transaction)"""
+        probed = sum(1 for task in tasks if task['probe_only'])
+        probe_hits = sum(1 for index, _, _ in scanned if tasks[index]['probe_only'])
+        self.stats['rows_filtered'] += len(scanned)
+        self.stats['rows_reused'] += probed - probe_hits
+
+        now = datetime.now().isoformat()
+        with state:
+            state.executemany("""
+                INSERT OR REPLACE INTO copy_robot_scan_rows
+                (source, row_id, content_hash, sort_key, text_items, result)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [
+                (
+                    self._source(tasks[index]['table']), tasks[index]['row_id'], tasks[index]['hash'],
+                    tasks[index]['sort_key'], text_items,
+                    json.dumps(dict(tasks[index]['record'], detections=detections), ensure_ascii=False)
+                    if detections else None
+                )
+                for index, text_items, detections in scanned
+            ])
+
+            for table, info in collected.items():
+                source = self._source(table)
+                if info is None:
+                    state.execute("DELETE FROM copy_robot_scan_rows WHERE source = ?", (source,))
+                    state.execute("DELETE FROM copy_robot_scan_sources WHERE source = ?", (source,))
+                    continue
+
+                state.executemany(
+                    "DELETE FROM copy_robot_scan_rows WHERE source = ? AND row_id = ?",
+                    [(source, row_id) for row_id in info['deleted']]
+                )
+                watermark, row_count = 0, 0
+                if info['incremental']:
+                    watermark, row_count = state.execute(
+                        "SELECT watermark, row_count FROM copy_robot_scan_sources WHERE source = ?", (source,)
+                    ).fetchone()
+                watermark = max([watermark] + info['row_ids'])
+                row_count += len(info['row_ids'])
+                state.execute("""
+                    INSERT OR REPLACE INTO copy_robot_scan_sources (source, watermark, row_count, scanned_at)
+                    VALUES (?, ?, ?, ?)
+                """, (source, watermark, row_count, now))
+
+            state.execute("DELETE FROM copy_robot_scan_dictionary WHERE db = ?", (self._state_db_key,))
+            state.executemany(
+                "INSERT INTO copy_robot_scan_dictionary (db, entry) VALUES (?, ?)",
+                [(self._state_db_key, key) for key in entries]
+            )
+
+    def _load_results(self, state: sqlite3.Connection, table: str) -> List[Dict]:
+        """
+        Detected rows of a table from the scan state (and add them to the statistics)
 
-        return detected_memories
+        Returns:
+            List of events/memories with detected sensitive content
+        """
+        detected = []
+        for text_items, result in state.execute("""
+            SELECT text_items, result FROM copy_robot_scan_rows
+            WHERE source = ? ORDER BY sort_key, row_id
+        """, (self._source(table),)):
+            if table == EVENT_TABLE:
+                self.stats['events_scanned'] += 1
+            else:
+                self.stats['memories_scanned'] += 1
+            self.stats['total_text_items'] += text_items
+
+            if result is None:
+                continue
+            record = json.loads(result)
+            for detection in record['detections']:
+                self.stats['sensitive_detected'] += 1
+                for ng in detection['detected_words']:
+                    self.stats['ng_words_found'][ng['word']] += 1
+            detected.append(record)
+
+        return detected
 
     def analyze_vocabulary_usage(self) -> Dict:
         """
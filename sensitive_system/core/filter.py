@@ -6,14 +6,30 @@ Purpose: 即座に危険なコンテンツを検出しブロック
 
 import sqlite3
 import re
-import unicodedata
-from typing import Dict, List
+import sys
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
+# sensitive_system（core.*）
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.ng_automaton import normalize_with_offsets, remove_obfuscation
+
+# src/core (keyword_engine)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src" / "core"))
+from keyword_engine import AhoCorasickAutomaton, KeywordEngine
+
+# 検出結果の並び順（exact → partial → regex）
+PATTERN_TYPES = ('exact', 'partial', 'regex')
+
 class Layer1PreFilter:
     """
     レイヤー1: プリフィルタ
     NGワードリスト照合による即座の検出
+
+    NGワードは読み込み時に正規化してまとめておき、コメントは1回の正規化と
+    1パスの走査で検出する（partialはAho-Corasick、exactは辞書引き）。
+    検出位置は元テキスト上の範囲に戻せるので、難読化・全角表記の出現も伏字化できる。
     """
 
     def __init__(self, db_path: str = None):
@@ -29,6 +45,27 @@ class Layer1PreFilter:
 
         self.db_path = str(db_path)
         self.ng_words_cache = self.load_ng_words()
+        self.build_matchers()
+
+    @classmethod
+    def from_ng_words(cls, ng_words_cache: Dict[str, List[dict]]) -> 'Layer1PreFilter':
+        """
+        DBを使わず、指定したNGワードだけで構築（差分チェック用）
+
+        Args:
+            ng_words_cache: load_ng_words() と同じ形式（足りないパターンタイプは空扱い）
+
+        Returns:
+            Layer1PreFilter（reload_ng_words() は使えない）
+        """
+        instance = cls.__new__(cls)
+        instance.db_path = None
+        instance.ng_words_cache = {
+            pattern_type: list(ng_words_cache.get(pattern_type, []))
+            for pattern_type in PATTERN_TYPES
+        }
+        instance.build_matchers()
+        return instance
 
     def load_ng_words(self) -> Dict[str, List[dict]]:
         """
@@ -82,38 +119,82 @@ class Layer1PreFilter:
         NGワードをリロード（DB更新時に使用）
         """
         self.ng_words_cache = self.load_ng_words()
+        self.build_matchers()
 
-    def detect_ng_words(self, text: str) -> List[dict]:
+    def build_matchers(self):
         """
-        NGワードを検出
+        NGワードキャッシュから検出用の構造を構築
+
+        - exact: 正規化済みワード → キャッシュ内の位置
+        - partial: 正規化済みワードのAho-Corasickオートマトン
+        - regex: コンパイル済みパターン
+        """
+        self._exact_words: Dict[str, List[int]] = {}
+        for i, ng in enumerate(self.ng_words_cache['exact']):
+            word = self.normalize_text(ng['word'])
+            if word:
+                self._exact_words.setdefault(word, []).append(i)
+
+        self._partial_automaton = AhoCorasickAutomaton()
+        for i, ng in enumerate(self.ng_words_cache['partial']):
+            self._partial_automaton.add(self.normalize_text(ng['word']), i)
+        self._partial_automaton.build()
+
+        self._regex_patterns: List[Tuple[int, re.Pattern]] = []
+        for i, ng in enumerate(self.ng_words_cache['regex']):
+            if not ng['regex_pattern']:
+                continue
+            try:
+                self._regex_patterns.append((i, re.compile(ng['regex_pattern'])))
+            except re.error as e:
+                print(f"[ERROR] Invalid regex pattern for NG word '{ng['word']}': {e}")
+
+    def scan_ng_words(self, text: str) -> List[Tuple[str, int, Optional[Tuple[int, int]]]]:
+        """
+        NGワードの出現を1パスで検出
 
         Args:
             text: チェック対象テキスト
 
         Returns:
-            検出されたNGワードのリスト
+            [(pattern_type, キャッシュ内の位置, 元テキスト上の範囲 (start, end) or None), ...]
+            範囲がNoneになるのは空文字にマッチした正規表現のみ
         """
-        detected = []
-        normalized_text = self.normalize_text(text)
+        normalized_text, starts, ends = normalize_with_offsets(text)
+        hits = []
 
         # 1. Exact match（完全一致）
-        for ng in self.ng_words_cache['exact']:
-            normalized_word = self.normalize_text(ng['word'])
-            if normalized_word == normalized_text:
-                detected.append(ng)
+        for i in self._exact_words.get(normalized_text, ()):
+            hits.append(('exact', i, (starts[0], ends[-1])))
 
         # 2. Partial match（部分一致）
-        for ng in self.ng_words_cache['partial']:
-            normalized_word = self.normalize_text(ng['word'])
-            if normalized_word in normalized_text:
-                detected.append(ng)
+        for start, end, i in self._partial_automaton.iter_matches(normalized_text):
+            hits.append(('partial', i, (starts[start], ends[end - 1])))
 
         # 3. Regex match（正規表現）
-        for ng in self.ng_words_cache['regex']:
-            if ng['regex_pattern'] and re.search(ng['regex_pattern'], normalized_text):
-                detected.append(ng)
+        for i, pattern in self._regex_patterns:
+            for match in pattern.finditer(normalized_text):
+                start, end = match.span()
+                hits.append(('regex', i, (starts[start], ends[end - 1]) if end > start else None))
+
+        return hits
+
+    def _detected_from_hits(self, hits) -> List[dict]:
+        """出現リストから検出NGワードのリストを作る（ワードごとに1回、種別→重大度順）"""
+        keys = sorted({(PATTERN_TYPES.index(pattern_type), i) for pattern_type, i, _ in hits})
+        return [self.ng_words_cache[PATTERN_TYPES[rank]][i] for rank, i in keys]
+
+    def detect_ng_words(self, text: str) -> List[dict]:
+        """
+        NGワードを検出
+
+        Args:
+            text: チェック対象テキスト
 
-        return detected
+        Returns:
+            検出されたNGワードのリスト
+        """
+        return self._detected_from_hits(self.scan_ng_words(text))
 
     def normalize_text(self, text: str) -> str:
         """
@@ -125,15 +206,9 @@ class Layer1PreFilter:
         Returns:
             正規化後テキスト
         """
-        # 全角→半角
-        text = unicodedata.normalize('NFKC', text)
-        # 小文字化
-        text = text.lower()
-        # 空白除去
-        text = re.sub(r'\s+', '', text)
-        # 特殊文字による回避を検出
-        text = self.remove_obfuscation(text)
-        return text
+        # 全角→半角、小文字化、空白除去、特殊文字による回避の除去
+        # （元テキストとの位置対応を保つため文字単位で行う）
+        return normalize_with_offsets(text)[0]
 
     def remove_obfuscation(self, text: str) -> str:
         """
@@ -148,13 +223,8 @@ class Layer1PreFilter:
         Returns:
             難読化除去後のテキスト
         """
-        # 記号による分割を除去
-        text = re.sub(r'[.･・。、]', '', text)
-        # ○●◯等の記号を除去
-        text = re.sub(r'[○●◯◆◇]', '', text)
-        # ゼロ幅文字を除去
-        text = re.sub(r'[\u200b-\u200f\ufeff]', '', text)
-        return text
+        # 記号による分割、○●◯等の記号、ゼロ幅文字を除去
+        return remove_obfuscation(text)
 
     def filter_comment(self, comment: str) -> dict:
         """
@@ -171,7 +241,8 @@ class Layer1PreFilter:
                 'max_severity': int
             }
         """
-        detected = self.detect_ng_words(comment)
+        hits = self.scan_ng_words(comment)
+        detected = self._detected_from_hits(hits)
 
         if not detected:
             return {
@@ -195,7 +266,7 @@ class Layer1PreFilter:
 
         elif action == 'mask':
             # 伏字処理
-            masked_comment = self.apply_masking(comment, detected)
+            masked_comment = self._mask_hits(comment, hits)
             return {
                 'action': 'mask',
                 'filtered_comment': masked_comment,
@@ -222,17 +293,38 @@ class Layer1PreFilter:
         Returns:
             伏字化後のテキスト
         """
-        masked_text = text
-
-        for ng in detected_words:
-            if ng['alternative_text']:
-                # 代替テキストが設定されている場合
-                masked_text = masked_text.replace(ng['word'], ng['alternative_text'])
-            else:
-                # デフォルトは「***」
-                masked_text = masked_text.replace(ng['word'], '***')
+        targets = {id(ng) for ng in detected_words}
+        hits = [
+            hit for hit in self.scan_ng_words(text)
+            if id(self.ng_words_cache[hit[0]][hit[1]]) in targets
+        ]
+        return self._mask_hits(text, hits)
+
+    def _mask_hits(self, text: str, hits) -> str:
+        """
+        出現範囲を元テキスト上で伏字化
 
-        return masked_text
+        重なる出現は左から順に、同じ開始位置なら長い方を優先する。
+        """
+        spans = []
+        for pattern_type, i, span in hits:
+            if span is None:
+                continue
+            ng = self.ng_words_cache[pattern_type][i]
+            # 代替テキストが設定されていなければ「***」
+            spans.append((span[0], -span[1], ng['alternative_text'] or '***'))
+        spans.sort()
+
+        parts = []
+        position = 0
+        for start, neg_end, replacement in spans:
+            if start < position:
+                continue
+            parts.append(text[position:start])
+            parts.append(replacement)
+            position = -neg_end
+        parts.append(text[position:])
+        return ''.join(parts)
 
 
 class TopicClassifier:
@@ -248,6 +340,7 @@ class TopicClassifier:
             'tier2_identity': ['中の人', '声優', '演者', '本名', '住所', '電話', '実家'],
             'tier3_personal': ['年齢', '学校', '会社', '家族']
         }
+        self.topic_engine = KeywordEngine(self.topic_keywords, ignore_case=True)
 
     def classify_topic(self, text: str) -> List[str]:
         """
@@ -259,16 +352,7 @@ class TopicClassifier:
         Returns:
             ['tier2_ai', 'tier3_personal', ...]
         """
-        topics = []
-        normalized = text.lower()
-
-        for topic, keywords in self.topic_keywords.items():
-            for keyword in keywords:
-                if keyword.lower() in normalized:
-                    topics.append(topic)
-                    break
-
-        return topics
+        return self.topic_engine.scan(text).labels
 
 
 # 使用例
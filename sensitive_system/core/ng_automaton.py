@@ -0,0 +1,78 @@
+"""
+NG Word Automaton
+Created: 2026-10-19
+Purpose: NGワード検出用の正規化と、正規化後→元テキストの位置対応
+
+- normalize_with_offsets(): Layer1PreFilter.normalize_text の正規化
+  （NFKC・小文字化・空白/難読化記号の除去）を文字単位で行い、
+  正規化後の各文字が元テキストのどこから来たかを返す
+- 正規化済みNGワードは src/core/keyword_engine.py の AhoCorasickAutomaton に
+  まとめ、辞書サイズによらずテキスト長に比例する時間で全出現位置を列挙する
+
+難読化された出現（「セ・ッ・ク・ス」等）も元テキスト上の範囲が分かるので、
+伏字化を元テキストの正しい位置に適用できる。
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List, Tuple
+
+# 記号による分割・伏字記号・ゼロ幅文字
+OBFUSCATION_RE = re.compile(r'[.･・。、○●◯◆◇\u200b-\u200f\ufeff]')
+
+# 正規化で除去する文字（空白 + 難読化記号）
+_DROP_RE = re.compile(r'[\s.･・。、○●◯◆◇\u200b-\u200f\ufeff]')
+
+# 直前の文字と結合する半角濁点・半濁点（NFKCで結合文字になる）
+_HALFWIDTH_SOUND_MARKS = 'ﾞﾟ'
+
+
+def remove_obfuscation(text: str) -> str:
+    """記号による分割・伏字記号・ゼロ幅文字を除去"""
+    return OBFUSCATION_RE.sub('', text)
+
+
+@lru_cache(maxsize=65536)
+def _normalize_chunk(chunk: str) -> str:
+    """1文字（+結合文字）を正規化"""
+    return _DROP_RE.sub('', unicodedata.normalize('NFKC', chunk).lower())
+
+
+@lru_cache(maxsize=65536)
+def _is_continuation(ch: str) -> bool:
+    """直前の文字と一緒に正規化すべき文字か"""
+    return ch in _HALFWIDTH_SOUND_MARKS or unicodedata.combining(ch) != 0
+
+
+def normalize_with_offsets(text: str) -> Tuple[str, List[int], List[int]]:
+    """
+    位置対応付きで正規化
+
+    Args:
+        text: 元テキスト
+
+    Returns:
+        (正規化後テキスト, starts, ends)
+        正規化後の i 文字目は元テキストの text[starts[i]:ends[i]] に由来する
+    """
+    out: List[str] = []
+    starts: List[int] = []
+    ends: List[int] = []
+    i, n = 0, len(text)
+    while i < n:
+        j = i + 1
+        while j < n and _is_continuation(text[j]):
+            j += 1
+        normalized = _normalize_chunk(text[i:j])
+        if normalized:
+            out.append(normalized)
+            starts.extend([i] * len(normalized))
+            ends.extend([j] * len(normalized))
+        i = j
+    return ''.join(out), starts, ends
+
+
+def normalize(text: str) -> str:
+    """正規化のみ（位置対応なし）"""
+    return normalize_with_offsets(text)[0]
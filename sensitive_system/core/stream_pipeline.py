@@ -0,0 +1,585 @@
+"""
+Streaming Moderation Pipeline
+Created: 2026-10-19
+Purpose: 配信コメントをストリームのまま判定する（Layer 1 ワーカープール + 曖昧なコメントのみLLM）
+
+構成:
+    submit() → 受付キュー（上限あり、満杯なら submit が待つ = バックプレッシャー）
+             → ディスパッチャ（キューにある分をまとめてチャンク化）
+             → ワーカープール（各プロセスが Layer1PreFilter を1回だけ構築して保持）
+             → 曖昧なコメントのみ LLM 判定（同時実行数・待ち件数に上限）
+             → comment_log / filter_statistics へのまとめ書き込み
+
+判定結果は submit() が返す Future で受け取れる。
+"""
+
+import asyncio
+import inspect
+import json
+import math
+import re
+import sqlite3
+import sys
+import time
+import urllib.request
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Union
+
+from .filter import Layer1PreFilter, TopicClassifier
+
+# src/core (detection_log: filter_statistics rollup)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src" / "core"))
+from detection_log import ensure_tables, record_statistics
+
+# Layer 1 の結果がこれらのアクションならLLMで再判定する
+AMBIGUOUS_ACTIONS = ('warn', 'log')
+
+# LLMが返してよいアクション
+LLM_ACTIONS = ('pass', 'warn', 'log', 'mask', 'block')
+
+EscalateFunc = Callable[[str, dict], Union[dict, Awaitable[dict]]]
+
+
+# ---------------------------------------------------------------------------
+# ワーカー（プロセスごとに1つのフィルタを保持）
+# ---------------------------------------------------------------------------
+
+_worker_filter: Optional[Layer1PreFilter] = None
+_worker_classifier: Optional[TopicClassifier] = None
+_worker_version = 0
+
+
+def _init_worker(db_path: str):
+    """ワーカー初期化（NGワードの読み込みとオートマトン構築はここで1回だけ）"""
+    global _worker_filter, _worker_classifier, _worker_version
+    _worker_filter = Layer1PreFilter(db_path=db_path)
+    _worker_classifier = TopicClassifier()
+    _worker_version = 0
+
+
+def _filter_chunk(comments: List[str], ng_version: int) -> List[dict]:
+    """
+    コメントのチャンクを Layer 1 で判定
+
+    Args:
+        comments: コメントテキスト
+        ng_version: NGワードの世代（ワーカーの世代と違えばリロードする）
+
+    Returns:
+        filter_comment() の結果に 'topics' を加えたもの（コメント順）
+    """
+    global _worker_version
+    if ng_version != _worker_version:
+        _worker_filter.reload_ng_words()
+        _worker_version = ng_version
+
+    results = []
+    for comment in comments:
+        result = _worker_filter.filter_comment(comment)
+        result['topics'] = _worker_classifier.classify_topic(comment)
+        results.append(result)
+    return results
+
+
+def is_ambiguous(layer1_result: dict, escalate_topics: bool = True) -> bool:
+    """
+    Layer 1 だけでは決められないコメントか
+
+    - block / mask: NGワードで確定
+    - warn / log: 文脈次第（「AI」「政治」等）
+    - pass: センシティブなトピックに触れている場合のみ曖昧
+
+    Args:
+        layer1_result: _filter_chunk() の結果
+        escalate_topics: pass でもトピック検出があれば曖昧とする
+
+    Returns:
+        LLM判定に回すべきならTrue
+    """
+    if layer1_result['action'] in AMBIGUOUS_ACTIONS:
+        return True
+    return escalate_topics and layer1_result['action'] == 'pass' and bool(layer1_result['topics'])
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+# ---------------------------------------------------------------------------
+# LLM 判定（Ollama）
+# ---------------------------------------------------------------------------
+
+def make_ollama_escalator(
+    model: str = "gemma2:2b",
+    ollama_host: str = "http://localhost:11434",
+    timeout: float = 30.0
+) -> Callable[[str, dict], dict]:
+    """
+    Ollama で曖昧なコメントを判定する関数を作る
+
+    Args:
+        model: 使用するOllamaモデル
+        ollama_host: OllamaホストURL
+        timeout: タイムアウト（秒）
+
+    Returns:
+        escalate(comment, layer1_result) -> {'action': str, 'reason': str}
+    """
+    def escalate(comment: str, layer1_result: dict) -> dict:
+        words = [ng['word'] for ng in layer1_result['detected_words']]
+        prompt = f"""あなたはVTuber配信のコメントモデレーターです。
+以下のコメントを配信で表示してよいか判定してください。
+
+コメント: {comment}
+検出ワード: {', '.join(words) or 'なし'}
+トピック: {', '.join(layer1_result['topics']) or 'なし'}
+
+次のJSONのみを出力してください:
+{{"action": "pass" または "warn" または "block", "reason": "判定理由（30文字以内）"}}"""
+
+        request = urllib.request.Request(
+            f"{ollama_host}/api/generate",
+            data=json.dumps({"model": model, "prompt": prompt, "stream": False}).encode('utf-8'),
+            headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            text = json.loads(response.read().decode('utf-8')).get('response', '')
+
+        match = re.search(r'\{.*\}', text, re.DOTALL)
+        if not match:
+            raise ValueError(f"LLM response is not JSON: {text[:100]}")
+        return json.loads(match.group(0))
+
+    return escalate
+
+
+# ---------------------------------------------------------------------------
+# パイプライン
+# ---------------------------------------------------------------------------
+
+class StreamModerationPipeline:
+    """
+    配信コメントのストリーミング判定パイプライン
+
+    使用例:
+        pipeline = StreamModerationPipeline(workers=4, escalate_func=make_ollama_escalator())
+        await pipeline.start()
+        verdict = await (await pipeline.submit("コメント", viewer_id="UCxxx"))
+        await pipeline.stop()
+    """
+
+    def __init__(self,
+                 db_path: str = None,
+                 workers: int = 2,
+                 queue_size: int = 10000,
+                 chunk_size: int = 256,
+                 escalate_func: Optional[EscalateFunc] = None,
+                 llm_concurrency: int = 4,
+                 max_pending_escalations: int = 256,
+                 escalate_topics: bool = True,
+                 write_batch_size: int = 500,
+                 flush_interval: float = 1.0,
+                 platform: str = None,
+                 stream_id: str = None):
+        """
+        初期化
+
+        Args:
+            db_path: データベースパス（Noneの場合はデフォルト）
+            workers: Layer 1 ワーカープロセス数（0ならイベントループ外の1スレッドで処理）
+            queue_size: 受付キューの上限（超えると submit() が待つ）
+            chunk_size: ワーカーに1回で渡す最大コメント数
+            escalate_func: 曖昧なコメントの判定関数 (comment, layer1_result) -> {'action', 'reason'}
+                           （同期関数はスレッドで実行、Noneなら Layer 1 の結果をそのまま使う）
+            llm_concurrency: LLM判定の同時実行数
+            max_pending_escalations: LLM判定待ちの上限（超えた分は Layer 1 の結果で確定）
+            escalate_topics: pass でもトピック検出があればLLMに回す
+            write_batch_size: comment_log へのまとめ書き込み件数
+            flush_interval: 書き込み間隔（秒）
+            platform: comment_log.platform
+            stream_id: comment_log.stream_id
+        """
+        if db_path is None:
+            db_dir = Path(__file__).parent.parent / "database"
+            db_path = db_dir / "sensitive_filter.db"
+
+        self.db_path = str(db_path)
+        self.workers = workers
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+        self.escalate_func = escalate_func
+        self.llm_concurrency = llm_concurrency
+        self.max_pending_escalations = max_pending_escalations
+        self.escalate_topics = escalate_topics
+        self.write_batch_size = write_batch_size
+        self.flush_interval = flush_interval
+        self.platform = platform
+        self.stream_id = stream_id
+
+        self._ng_version = 0
+        self._executor: Optional[Executor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._inflight: Optional[asyncio.Semaphore] = None
+        self._llm_semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: set = set()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._flush_event: Optional[asyncio.Event] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._write_buffer: List[dict] = []
+        self._pending_escalations = 0
+        self._closing = False
+
+        self._latencies: Deque[float] = deque(maxlen=100000)
+        self.stats = {
+            'submitted': 0,
+            'processed': 0,
+            'escalated': 0,
+            'escalation_skipped': 0,
+            'escalation_errors': 0,
+            'written': 0,
+            'write_errors': 0,
+            'actions': {}
+        }
+
+    # ------------------------------------------------------------------
+    # 起動・停止
+    # ------------------------------------------------------------------
+
+    async def start(self):
+        """ワーカープールと内部タスクを起動"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            ensure_tables(conn)
+        finally:
+            conn.close()
+
+        if self.workers > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.db_path,)
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1,
+                initializer=_init_worker,
+                initargs=(self.db_path,)
+            )
+
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        # ワーカー数の2倍までチャンクを先行投入（ワーカーを遊ばせない）
+        self._inflight = asyncio.Semaphore(max(1, self.workers) * 2)
+        self._llm_semaphore = asyncio.Semaphore(self.llm_concurrency)
+        self._flush_event = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+
+        # ワーカーの初期化（NGワード読み込み）を先に済ませる
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[
+            loop.run_in_executor(self._executor, _filter_chunk, [], self._ng_version)
+            for _ in range(max(1, self.workers))
+        ])
+
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+        self._writer = asyncio.create_task(self._write_loop())
+        print(f"[INFO] StreamModerationPipeline started: workers={self.workers}, "
+              f"queue_size={self.queue_size}, llm={'on' if self.escalate_func else 'off'}")
+
+    async def stop(self):
+        """受付済みのコメントを処理し終えてから停止"""
+        await self._queue.join()
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks))
+
+        # 書き込み中のバッチは中断せずに終わらせる
+        self._closing = True
+        self._flush_event.set()
+        await self._writer
+        self._dispatcher.cancel()
+        await asyncio.gather(self._dispatcher, return_exceptions=True)
+        await self.flush()
+
+        self._executor.shutdown(wait=True)
+        print(f"[INFO] StreamModerationPipeline stopped: processed={self.stats['processed']}, "
+              f"written={self.stats['written']}")
+
+    def reload_ng_words(self):
+        """NGワードをリロード（各ワーカーは次のチャンクでDBを読み直す）"""
+        self._ng_version += 1
+
+    # ------------------------------------------------------------------
+    # 受付
+    # ------------------------------------------------------------------
+
+    async def submit(self,
+                     comment: str,
+                     viewer_id: str = None,
+                     viewer_name: str = None,
+                     received_at: float = None) -> asyncio.Future:
+        """
+        コメントを受け付ける（キューが満杯なら空くまで待つ）
+
+        Args:
+            comment: コメントテキスト
+            viewer_id: 視聴者ID
+            viewer_name: 視聴者名
+            received_at: 受信時刻（time.perf_counter()、Noneなら現在）
+
+        Returns:
+            判定結果（dict）で完了する Future
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put({
+            'comment': comment,
+            'viewer_id': viewer_id,
+            'viewer_name': viewer_name,
+            'received_at': received_at if received_at is not None else time.perf_counter(),
+            'future': future
+        })
+        self.stats['submitted'] += 1
+        return future
+
+    def submit_nowait(self,
+                      comment: str,
+                      viewer_id: str = None,
+                      viewer_name: str = None) -> Optional[asyncio.Future]:
+        """
+        コメントを受け付ける（キューが満杯なら受け付けずNone）
+
+        Returns:
+            判定結果で完了する Future（満杯ならNone）
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait({
+                'comment': comment,
+                'viewer_id': viewer_id,
+                'viewer_name': viewer_name,
+                'received_at': time.perf_counter(),
+                'future': future
+            })
+        except asyncio.QueueFull:
+            return None
+        self.stats['submitted'] += 1
+        return future
+
+    # ------------------------------------------------------------------
+    # Layer 1
+    # ------------------------------------------------------------------
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch_loop(self):
+        """キューに溜まっている分をチャンクにしてワーカーへ渡す"""
+        while True:
+            items = [await self._queue.get()]
+            while len(items) < self.chunk_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            await self._inflight.acquire()
+            self._spawn(self._run_chunk(items))
+
+    async def _run_chunk(self, items: List[dict]):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(
+                self._executor, _filter_chunk, [item['comment'] for item in items], self._ng_version
+            )
+        except Exception as e:
+            print(f"[ERROR] Layer 1 worker failed: {e}")
+            results = [None] * len(items)
+        finally:
+            self._inflight.release()
+            for _ in items:
+                self._queue.task_done()
+
+        for item, layer1_result in zip(items, results):
+            if layer1_result is None:
+                # ワーカー障害時は表示しない側に倒す
+                layer1_result = {
+                    'action': 'block',
+                    'filtered_comment': None,
+                    'detected_words': [],
+                    'max_severity': 0,
+                    'topics': [],
+                    'error': 'layer1_failed'
+                }
+            if self.escalate_func and is_ambiguous(layer1_result, self.escalate_topics):
+                if self._pending_escalations < self.max_pending_escalations:
+                    self._pending_escalations += 1
+                    self.stats['escalated'] += 1
+                    self._spawn(self._escalate(item, layer1_result))
+                    continue
+                self.stats['escalation_skipped'] += 1
+            self._finalize(item, layer1_result, None)
+
+    # ------------------------------------------------------------------
+    # LLM
+    # ------------------------------------------------------------------
+
+    async def _escalate(self, item: dict, layer1_result: dict):
+        llm_result = None
+        try:
+            async with self._llm_semaphore:
+                if inspect.iscoroutinefunction(self.escalate_func):
+                    llm_result = await self.escalate_func(item['comment'], layer1_result)
+                else:
+                    llm_result = await asyncio.to_thread(self.escalate_func, item['comment'], layer1_result)
+            if not isinstance(llm_result, dict) or llm_result.get('action') not in LLM_ACTIONS:
+                raise ValueError(f"Invalid LLM verdict: {llm_result}")
+        except Exception as e:
+            print(f"[ERROR] LLM escalation failed: {e}")
+            self.stats['escalation_errors'] += 1
+            llm_result = {'action': None, 'error': str(e)}
+        finally:
+            self._pending_escalations -= 1
+
+        self._finalize(item, layer1_result, llm_result)
+
+    # ------------------------------------------------------------------
+    # 確定・書き込み
+    # ------------------------------------------------------------------
+
+    def _finalize(self, item: dict, layer1_result: dict, llm_result: Optional[dict]):
+        """最終判定を確定して Future と書き込みバッファへ"""
+        action = layer1_result['action']
+        filtered_comment = layer1_result['filtered_comment']
+        if llm_result and llm_result.get('action'):
+            action = llm_result['action']
+            if action == 'block':
+                filtered_comment = None
+            elif filtered_comment is None:
+                filtered_comment = item['comment']
+
+        latency = time.perf_counter() - item['received_at']
+        self._latencies.append(latency)
+        self.stats['processed'] += 1
+        self.stats['actions'][action] = self.stats['actions'].get(action, 0) + 1
+
+        result = {
+            'comment': item['comment'],
+            'viewer_id': item['viewer_id'],
+            'viewer_name': item['viewer_name'],
+            'action': action,
+            'filtered_comment': filtered_comment,
+            'detected_words': layer1_result['detected_words'],
+            'max_severity': layer1_result['max_severity'],
+            'topics': layer1_result['topics'],
+            'layer1_action': layer1_result['action'],
+            'escalated': llm_result is not None,
+            'llm_result': llm_result,
+            'latency_ms': latency * 1000
+        }
+
+        self._write_buffer.append(result)
+        if len(self._write_buffer) >= self.write_batch_size:
+            self._flush_event.set()
+
+        if not item['future'].done():
+            item['future'].set_result(result)
+
+    async def _write_loop(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+            await self.flush()
+
+    async def flush(self):
+        """書き込みバッファを comment_log / filter_statistics に書き込む"""
+        async with self._write_lock:
+            rows, self._write_buffer = self._write_buffer, []
+            if not rows:
+                return
+            try:
+                await asyncio.to_thread(self._write_rows, rows)
+                self.stats['written'] += len(rows)
+            except Exception as e:
+                print(f"[ERROR] Failed to write comment_log: {e}")
+                self.stats['write_errors'] += len(rows)
+
+    def _write_rows(self, rows: List[dict]):
+        """1トランザクションで comment_log に追加し、当日の filter_statistics（日別・カテゴリ別）を更新"""
+        log_rows = []
+        stats_rows = []
+        for row in rows:
+            stats_rows.append({
+                'action': row['action'],
+                'sensitivity_score': row['max_severity'] / 10,
+                'processing_time_ms': row['latency_ms'],
+                'tiers': [(ng.get('category') or '').split('_')[0] for ng in row['detected_words']],
+                'categories': [ng.get('category') or 'unknown' for ng in row['detected_words']]
+            })
+            log_rows.append((
+                row['viewer_id'],
+                row['viewer_name'],
+                row['comment'],
+                row['filtered_comment'],
+                row['max_severity'] / 10,
+                json.dumps([ng['word'] for ng in row['detected_words']], ensure_ascii=False),
+                row['action'],
+                json.dumps({
+                    'action': row['layer1_action'],
+                    'max_severity': row['max_severity'],
+                    'topics': row['topics']
+                }, ensure_ascii=False),
+                json.dumps(row['llm_result'], ensure_ascii=False) if row['llm_result'] else None,
+                row['action'] != 'block',
+                self.platform,
+                self.stream_id
+            ))
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.executemany("""
+                INSERT INTO comment_log
+                (viewer_id, viewer_name, original_comment, processed_comment,
+                 sensitivity_score, detected_words, action_taken, layer1_result,
+                 layer3_result, shown_to_sisters, platform, stream_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, log_rows)
+
+            record_statistics(conn, stats_rows)
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # 統計
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict:
+        """
+        処理統計
+
+        Returns:
+            stats + キュー長、LLM待ち件数、レイテンシ（ms: p50/p95/p99/max、直近10万件）
+        """
+        latencies = list(self._latencies)
+        return {
+            **self.stats,
+            'actions': dict(self.stats['actions']),
+            'queue_length': self._queue.qsize() if self._queue else 0,
+            'pending_escalations': self._pending_escalations,
+            'latency_ms': {
+                'p50': _percentile(latencies, 50) * 1000,
+                'p95': _percentile(latencies, 95) * 1000,
+                'p99': _percentile(latencies, 99) * 1000,
+                'max': max(latencies) * 1000 if latencies else 0.0
+            }
+        }
@@ -132,3 +132,12 @@ CREATE TABLE IF NOT EXISTS filter_statistics (
 
 -- Indexes for filter_statistics
 CREATE INDEX IF NOT EXISTS idx_filter_statistics_date ON filter_statistics(date);
+
+-- Table 6b: filter_statistics_categories (カテゴリ別フィルタ統計、検出ログ書き込み時に集計)
+CREATE TABLE IF NOT EXISTS filter_statistics_categories (
+    date DATE NOT NULL,
+    category TEXT NOT NULL,                 -- NGワード/パターンのカテゴリ
+    detections INTEGER DEFAULT 0,           -- 検出数
+    comments INTEGER DEFAULT 0,             -- 検出があったコメント数
+    PRIMARY KEY (date, category)
+);
@@ -11,9 +11,24 @@ Purpose:
 
 import sqlite3
 import re
+import sys
+from pathlib import Path
 from typing import Dict, List, Optional
 from datetime import datetime
 
+# src/core (memory_fts, memory_capabilities, keyword_engine)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src" / "core"))
+from memory_fts import keyword_condition
+from memory_capabilities import (
+    STREAMING_TERMS,
+    TRAVEL_LOCATIONS,
+    VIEWER_INTERACTION_TERMS,
+    capabilities_installed,
+    current_version,
+    load_capabilities,
+)
+from keyword_engine import KeywordEngine, KeywordMatches
+
 
 class HallucinationDetector:
     """
@@ -40,7 +55,7 @@ class HallucinationDetector:
         },
         'travel': {
             'keywords': ['行った', '訪れた', '旅行', '訪問', '観光'],
-            'location_keywords': ['大阪', '京都', '東京', '北海道', '沖縄'],
+            'location_keywords': list(TRAVEL_LOCATIONS),
             'description': 'Travel experience'
         },
         'temporal_recent': {
@@ -107,6 +122,14 @@ class HallucinationDetector:
         self.db = None
         self._connect_db()
 
+        # All fact/aspiration keyword lists in one automaton (case-sensitive like `in`)
+        self.pattern_engine = KeywordEngine(self._pattern_dictionaries(), ignore_case=False)
+        self._last_scan = (None, None)
+
+        # Materialized capabilities (kept up to date by triggers), cached per version
+        self._capabilities = None
+        self._capabilities_enabled = self._init_capabilities()
+
     def _connect_db(self):
         """Connect to sisters_memory.db"""
         try:
@@ -116,6 +139,65 @@ class HallucinationDetector:
             print(f"[ERROR] Failed to connect to database: {e}")
             self.db = None
 
+    def _init_capabilities(self) -> bool:
+        """Use memory_capabilities if installed (False: use direct queries)
+
+        Nothing is created here; install with tools/build_memory_capabilities.py.
+        """
+        if not self.db:
+            return False
+        try:
+            installed = capabilities_installed(self.db, self.FACT_PATTERNS['travel']['location_keywords'])
+            if not installed:
+                print("[INFO] memory_capabilities not installed, using direct queries "
+                      "(run tools/build_memory_capabilities.py)")
+            return installed
+        except sqlite3.Error as e:
+            print(f"[WARNING] memory_capabilities unavailable, using direct queries: {e}")
+            return False
+
+    def get_capabilities(self) -> Optional[Dict]:
+        """
+        Materialized capabilities (see memory_capabilities.load_capabilities)
+
+        Re-read from the database only when an event was written since the
+        last call; otherwise a version lookup and the cached dict.
+
+        Returns:
+            Capabilities dict, or None if not available
+        """
+        if not self._capabilities_enabled:
+            return None
+        try:
+            version = current_version(self.db)
+            if self._capabilities is None or self._capabilities['version'] != version:
+                self._capabilities = load_capabilities(self.db)
+            return self._capabilities
+        except sqlite3.Error as e:
+            print(f"[WARNING] memory_capabilities read failed, using direct queries: {e}")
+            self._capabilities_enabled = False
+            return None
+
+    def _pattern_dictionaries(self) -> Dict[str, List[str]]:
+        """Keyword lists of FACT_PATTERNS / ASPIRATION_PATTERNS by engine label"""
+        dictionaries = {}
+        for fact_type, pattern in self.FACT_PATTERNS.items():
+            dictionaries[f"fact:{fact_type}"] = pattern['keywords']
+            dictionaries[f"fact:{fact_type}:context"] = pattern.get('context_keywords', [])
+        for aspiration_type, pattern in self.ASPIRATION_PATTERNS.items():
+            dictionaries[f"aspiration:{aspiration_type}"] = pattern['keywords']
+            dictionaries[f"aspiration:{aspiration_type}:context"] = pattern['context_keywords']
+        return dictionaries
+
+    def _scan(self, statement: str) -> KeywordMatches:
+        """Keyword hits for statement (the last statement's scan is reused)"""
+        last_statement, last_matches = self._last_scan
+        if last_statement == statement:
+            return last_matches
+        matches = self.pattern_engine.scan(statement)
+        self._last_scan = (statement, matches)
+        return matches
+
     def verify_statement(self, statement: str, character: str = None) -> Dict:
         """
         Verify a statement against sisters_memory.db
@@ -235,18 +317,15 @@ class HallucinationDetector:
             List of detected facts with types and keywords
         """
         detected_facts = []
+        matches = self._scan(statement)
 
         for fact_type, pattern in self.FACT_PATTERNS.items():
-            keywords_found = []
-
-            # Check main keywords
-            for keyword in pattern['keywords']:
-                if keyword in statement:
-                    keywords_found.append(keyword)
+            # Main keywords
+            keywords_found = list(matches.keywords(f"fact:{fact_type}"))
 
             # For streaming, also check context
             if fact_type == 'streaming' and keywords_found:
-                has_context = any(ctx in statement for ctx in pattern['context_keywords'])
+                has_context = f"fact:{fact_type}:context" in matches
                 if has_context:
                     detected_facts.append({
                         'type': fact_type,
@@ -255,7 +334,7 @@ class HallucinationDetector:
                         'context': 'active_experience'
                     })
             elif fact_type == 'viewer_interaction' and keywords_found:
-                has_context = any(ctx in statement for ctx in pattern['context_keywords'])
+                has_context = f"fact:{fact_type}:context" in matches
                 if has_context:
                     detected_facts.append({
                         'type': fact_type,
@@ -283,20 +362,14 @@ class HallucinationDetector:
             List of detected aspirations with types, keywords, and confidence
         """
         detected_aspirations = []
+        matches = self._scan(statement)
 
         for aspiration_type, pattern in self.ASPIRATION_PATTERNS.items():
-            keywords_found = []
-            context_found = []
-
-            # Check main keywords
-            for keyword in pattern['keywords']:
-                if keyword in statement:
-                    keywords_found.append(keyword)
+            # Main keywords
+            keywords_found = list(matches.keywords(f"aspiration:{aspiration_type}"))
 
-            # Check context keywords (optional but increases confidence)
-            for ctx_keyword in pattern['context_keywords']:
-                if ctx_keyword in statement:
-                    context_found.append(ctx_keyword)
+            # Context keywords (optional but increases confidence)
+            context_found = list(matches.keywords(f"aspiration:{aspiration_type}:context"))
 
             # If aspiration keywords found
             if keywords_found:
@@ -363,26 +436,27 @@ class HallucinationDetector:
         - Looks for ACTUAL streaming experience (as broadcaster, not viewer)
         - "配信を見た" (watched stream) ≠ "配信した" (broadcasted)
         """
-        # Check for ACTUAL streaming experience
-        # Must have keywords indicating they are the broadcaster
-        cursor.execute("""
-            SELECT COUNT(*) as count
-            FROM sister_shared_events
-            WHERE (
-                event_name LIKE '%初配信%'
-                OR event_name LIKE '%配信デビュー%'
-                OR event_name LIKE '%配信開始%'
-                OR description LIKE '%配信した%'
-                OR description LIKE '%配信中%'
-                OR category = 'streaming_debut'
-                OR category = 'broadcasting'
-            )
-            AND (cultural_context NOT LIKE '%ごっこ遊び%'
-                OR cultural_context IS NULL)
-        """)
+        capabilities = self.get_capabilities()
+        if capabilities is not None:
+            count = capabilities['streaming_event_count']
+        else:
+            # Check for ACTUAL streaming experience
+            # Must have keywords indicating they are the broadcaster
+            condition, params = keyword_condition(self.db, 'sister_shared_events', STREAMING_TERMS)
+            cursor.execute(f"""
+                SELECT COUNT(*) as count
+                FROM sister_shared_events
+                WHERE (
+                    {condition}
+                    OR category = 'streaming_debut'
+                    OR category = 'broadcasting'
+                )
+                AND (cultural_context NOT LIKE '%ごっこ遊び%'
+                    OR cultural_context IS NULL)
+            """, params)
 
-        result = cursor.fetchone()
-        count = result[0] if result else 0
+            result = cursor.fetchone()
+            count = result[0] if result else 0
 
         if count > 0:
             return {
@@ -407,28 +481,26 @@ class HallucinationDetector:
         - Looks for ACTUAL viewer interaction (as broadcaster receiving interaction)
         - "視聴者として" (as viewer) ≠ "視聴者から" (from viewers)
         """
-        # Check for ACTUAL viewer interaction
-        # Must have keywords indicating they received interaction FROM viewers
-        cursor.execute("""
-            SELECT COUNT(*) as count
-            FROM sister_shared_events
-            WHERE (
-                description LIKE '%視聴者から%'
-                OR description LIKE '%視聴者が%'
-                OR description LIKE '%リスナーから%'
-                OR description LIKE '%ファンから%'
-                OR description LIKE '%コメントをもらった%'
-                OR description LIKE '%コメントがあった%'
-                OR description LIKE '%スパチャ%'
-                OR event_name LIKE '%視聴者との%'
-                OR category = 'viewer_interaction'
-            )
-            AND (cultural_context NOT LIKE '%ごっこ遊び%'
-                OR cultural_context IS NULL)
-        """)
+        capabilities = self.get_capabilities()
+        if capabilities is not None:
+            count = capabilities['viewer_interaction_count']
+        else:
+            # Check for ACTUAL viewer interaction
+            # Must have keywords indicating they received interaction FROM viewers
+            condition, params = keyword_condition(self.db, 'sister_shared_events', VIEWER_INTERACTION_TERMS)
+            cursor.execute(f"""
+                SELECT COUNT(*) as count
+                FROM sister_shared_events
+                WHERE (
+                    {condition}
+                    OR category = 'viewer_interaction'
+                )
+                AND (cultural_context NOT LIKE '%ごっこ遊び%'
+                    OR cultural_context IS NULL)
+            """, params)
 
-        result = cursor.fetchone()
-        count = result[0] if result else 0
+            result = cursor.fetchone()
+            count = result[0] if result else 0
 
         if count > 0:
             return {
@@ -450,17 +522,27 @@ class HallucinationDetector:
         keywords = fact['keywords']
         location_keywords = self.FACT_PATTERNS['travel'].get('location_keywords', [])
 
-        # Check for travel events with specific locations
+        capabilities = self.get_capabilities()
         for location in location_keywords:
-            cursor.execute("""
-                SELECT COUNT(*) as count
-                FROM sister_shared_events
-                WHERE (location LIKE ? OR description LIKE ?)
-                AND (category LIKE '%travel%' OR category LIKE '%旅行%')
-            """, (f'%{location}%', f'%{location}%'))
+            if capabilities is not None:
+                found = location in capabilities['visited_locations']
+            else:
+                # Check for travel events with specific locations
+                condition, params = keyword_condition(self.db, 'sister_shared_events', {
+                    'location': [location],
+                    'description': [location],
+                })
+                cursor.execute(f"""
+                    SELECT COUNT(*) as count
+                    FROM sister_shared_events
+                    WHERE {condition}
+                    AND (category LIKE '%travel%' OR category LIKE '%旅行%')
+                """, params)
 
-            result = cursor.fetchone()
-            if result and result[0] > 0:
+                result = cursor.fetchone()
+                found = bool(result and result[0] > 0)
+
+            if found:
                 return {
                     'exists': True,
                     'confidence': 1.0,
@@ -477,15 +559,21 @@ class HallucinationDetector:
         """
         Verify temporal references (yesterday, last week, etc.)
         """
-        # Get most recent event
-        cursor.execute("""
-            SELECT event_date, event_name, description
-            FROM sister_shared_events
-            ORDER BY created_at DESC
-            LIMIT 1
-        """)
+        capabilities = self.get_capabilities()
+        if capabilities is not None:
+            result = None
+            if capabilities['has_events']:
+                result = (capabilities['latest_event_date'], capabilities['latest_event_name'])
+        else:
+            # Get most recent event
+            cursor.execute("""
+                SELECT event_date, event_name, description
+                FROM sister_shared_events
+                ORDER BY created_at DESC
+                LIMIT 1
+            """)
+            result = cursor.fetchone()
 
-        result = cursor.fetchone()
         if result:
             return {
                 'exists': True,
@@ -7,10 +7,28 @@ Created: 2025-10-24
 Version: 1.0
 """
 
+import math
 import sqlite3
+import unicodedata
 from typing import Optional, List, Dict
 from datetime import datetime
 
+# Minimum Dice coefficient (character bigrams) for two values to count as the same inspiration
+DEFAULT_SIMILARITY_THRESHOLD = 0.5
+
+
+def value_ngrams(text: str) -> List[str]:
+    """
+    Character bigrams of a normalized value (NFKC, lowercase, letters/digits only)
+
+    Japanese has no word boundaries, so values are compared by character
+    bigrams; a one-character value is its own n-gram.
+    """
+    normalized = ''.join(ch for ch in unicodedata.normalize('NFKC', text or '').lower() if ch.isalnum())
+    if len(normalized) < 2:
+        return [normalized] if normalized else []
+    return sorted({normalized[i:i + 2] for i in range(len(normalized) - 1)})
+
 
 class InspirationTracker:
     """
@@ -20,37 +38,115 @@ class InspirationTracker:
     - seed: Initial mention (hallucination)
     - growing: Repeated mentions (confidence increasing)
     - realized: Actual action taken (became reality)
+
+    Uses one long-lived connection (WAL mode). Similar unrealized
+    inspirations are found through a bigram index table
+    (inspiration_ngrams) instead of scanning every row of the character.
     """
 
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD):
         self.db_path = db_path
+        self.similarity_threshold = similarity_threshold
+        self.conn = sqlite3.connect(self.db_path)
+        if self.db_path != ':memory:':
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
         self._create_table()
+        self._backfill_ngrams()
 
-    def _create_table(self):
-        """Create inspiration_events table"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
 
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS inspiration_events (
-                inspiration_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                character TEXT NOT NULL,
-                original_hallucination TEXT NOT NULL,
-                event_id_origin INTEGER NOT NULL,
-                inspired_value TEXT NOT NULL,
-                event_id_realization INTEGER,
-                status TEXT DEFAULT 'seed',
-                confidence REAL DEFAULT 0.0,
-                mention_count INTEGER DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_mentioned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                realized_at TIMESTAMP,
-                FOREIGN KEY (event_id_origin) REFERENCES sister_shared_events(event_id)
-            )
-        ''')
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
-        conn.commit()
-        conn.close()
+    def _create_table(self):
+        """Create inspiration_events table, indexes and the similarity index table"""
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS inspiration_events (
+                    inspiration_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    character TEXT NOT NULL,
+                    original_hallucination TEXT NOT NULL,
+                    event_id_origin INTEGER NOT NULL,
+                    inspired_value TEXT NOT NULL,
+                    event_id_realization INTEGER,
+                    status TEXT DEFAULT 'seed',
+                    confidence REAL DEFAULT 0.0,
+                    mention_count INTEGER DEFAULT 1,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_mentioned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    realized_at TIMESTAMP,
+                    FOREIGN KEY (event_id_origin) REFERENCES sister_shared_events(event_id)
+                )
+            ''')
+            self.conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_inspiration_character_status
+                ON inspiration_events(character, status, last_mentioned_at)
+            ''')
+
+            # Bigram postings of unrealized inspirations (realized ones are never matched)
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS inspiration_ngrams (
+                    character TEXT NOT NULL,
+                    ngram TEXT NOT NULL,
+                    inspiration_id INTEGER NOT NULL,
+                    PRIMARY KEY (character, ngram, inspiration_id)
+                ) WITHOUT ROWID
+            ''')
+            self.conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_inspiration_ngrams_id
+                ON inspiration_ngrams(inspiration_id)
+            ''')
+            # Postings per bigram, to look candidates up through the rarest bigrams only
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS inspiration_ngram_stats (
+                    character TEXT NOT NULL,
+                    ngram TEXT NOT NULL,
+                    doc_count INTEGER NOT NULL,
+                    PRIMARY KEY (character, ngram)
+                ) WITHOUT ROWID
+            ''')
+
+    def _backfill_ngrams(self):
+        """Index unrealized inspirations written before the index existed"""
+        rows = self.conn.execute('''
+            SELECT inspiration_id, character, inspired_value
+            FROM inspiration_events AS e
+            WHERE status != 'realized'
+                AND NOT EXISTS (
+                    SELECT 1 FROM inspiration_ngrams AS g WHERE g.inspiration_id = e.inspiration_id
+                )
+        ''').fetchall()
+        if not rows:
+            return
+        with self.conn:
+            for inspiration_id, character, inspired_value in rows:
+                self._index_value(inspiration_id, character, inspired_value)
+
+    def _index_value(self, inspiration_id: int, character: str, inspired_value: str):
+        postings = [(character, ngram, inspiration_id) for ngram in value_ngrams(inspired_value)]
+        self.conn.executemany(
+            'INSERT INTO inspiration_ngrams (character, ngram, inspiration_id) VALUES (?, ?, ?)',
+            postings
+        )
+        self.conn.executemany('''
+            INSERT INTO inspiration_ngram_stats (character, ngram, doc_count) VALUES (?, ?, 1)
+            ON CONFLICT (character, ngram) DO UPDATE SET doc_count = doc_count + 1
+        ''', [(character, ngram) for character, ngram, _ in postings])
+
+    def _unindex(self, inspiration_id: int):
+        self.conn.execute('''
+            UPDATE inspiration_ngram_stats SET doc_count = doc_count - 1
+            WHERE (character, ngram) IN (
+                SELECT character, ngram FROM inspiration_ngrams WHERE inspiration_id = ?
+            )
+        ''', (inspiration_id,))
+        self.conn.execute('DELETE FROM inspiration_ngrams WHERE inspiration_id = ?', (inspiration_id,))
 
     def record_inspiration_seed(
         self,
@@ -73,9 +169,6 @@ class InspirationTracker:
         Returns:
             inspiration_id
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
         # Check if similar inspiration already exists
         existing = self._find_similar_inspiration(character, inspired_value)
 
@@ -83,21 +176,20 @@ class InspirationTracker:
             # Grow existing inspiration
             inspiration_id = existing['inspiration_id']
             self.grow_inspiration(inspiration_id)
-            conn.close()
             return inspiration_id
 
         # Create new inspiration seed
-        cursor.execute('''
-            INSERT INTO inspiration_events (
-                character, original_hallucination,
-                event_id_origin, inspired_value,
-                status, confidence
-            ) VALUES (?, ?, ?, ?, 'seed', ?)
-        ''', (character, hallucination, event_id, inspired_value, initial_confidence))
-
-        inspiration_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        with self.conn:
+            cursor = self.conn.execute('''
+                INSERT INTO inspiration_events (
+                    character, original_hallucination,
+                    event_id_origin, inspired_value,
+                    status, confidence
+                ) VALUES (?, ?, ?, ?, 'seed', ?)
+            ''', (character, hallucination, event_id, inspired_value, initial_confidence))
+
+            inspiration_id = cursor.lastrowid
+            self._index_value(inspiration_id, character, inspired_value)
 
         print(f"[INSPIRATION SEED] {character}: '{inspired_value}' (ID: {inspiration_id})")
         return inspiration_id
@@ -108,19 +200,14 @@ class InspirationTracker:
 
         Increases confidence and updates status if threshold reached
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
         # Get current state
-        cursor.execute('''
+        row = self.conn.execute('''
             SELECT confidence, mention_count, status, character, inspired_value
             FROM inspiration_events
             WHERE inspiration_id = ?
-        ''', (inspiration_id,))
+        ''', (inspiration_id,)).fetchone()
 
-        row = cursor.fetchone()
         if not row:
-            conn.close()
             return
 
         current_confidence, mention_count, status, character, inspired_value = row
@@ -137,17 +224,15 @@ class InspirationTracker:
             # Still growing, but very close to realization
             new_status = 'growing'
 
-        cursor.execute('''
-            UPDATE inspiration_events
-            SET confidence = ?,
-                mention_count = ?,
-                status = ?,
-                last_mentioned_at = CURRENT_TIMESTAMP
-            WHERE inspiration_id = ?
-        ''', (new_confidence, new_mention_count, new_status, inspiration_id))
-
-        conn.commit()
-        conn.close()
+        with self.conn:
+            self.conn.execute('''
+                UPDATE inspiration_events
+                SET confidence = ?,
+                    mention_count = ?,
+                    status = ?,
+                    last_mentioned_at = CURRENT_TIMESTAMP
+                WHERE inspiration_id = ?
+            ''', (new_confidence, new_mention_count, new_status, inspiration_id))
 
         print(f"[INSPIRATION GROW] {character}: '{inspired_value}' (mentions: {new_mention_count}, confidence: {new_confidence:.2f}, status: {new_status})")
 
@@ -163,34 +248,28 @@ class InspirationTracker:
             inspiration_id: Inspiration ID
             event_id_realization: Event where it was realized
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
         # Get inspiration details
-        cursor.execute('''
+        row = self.conn.execute('''
             SELECT character, inspired_value
             FROM inspiration_events
             WHERE inspiration_id = ?
-        ''', (inspiration_id,))
+        ''', (inspiration_id,)).fetchone()
 
-        row = cursor.fetchone()
         if not row:
-            conn.close()
             return
 
         character, inspired_value = row
 
-        cursor.execute('''
-            UPDATE inspiration_events
-            SET status = 'realized',
-                event_id_realization = ?,
-                realized_at = CURRENT_TIMESTAMP,
-                confidence = 1.0
-            WHERE inspiration_id = ?
-        ''', (event_id_realization, inspiration_id))
-
-        conn.commit()
-        conn.close()
+        with self.conn:
+            self.conn.execute('''
+                UPDATE inspiration_events
+                SET status = 'realized',
+                    event_id_realization = ?,
+                    realized_at = CURRENT_TIMESTAMP,
+                    confidence = 1.0
+                WHERE inspiration_id = ?
+            ''', (event_id_realization, inspiration_id))
+            self._unindex(inspiration_id)
 
         print(f"[INSPIRATION REALIZED] {character}: '{inspired_value}' became reality! (Event #{event_id_realization})")
 
@@ -199,38 +278,67 @@ class InspirationTracker:
         character: str,
         inspired_value: str
     ) -> Optional[Dict]:
-        """Find similar existing inspiration"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Simple similarity: check if key words match
-        # Extract key words from inspired_value
-        key_words = [word for word in inspired_value.split() if len(word) > 2][:3]
+        """
+        Find similar existing inspiration
 
-        cursor.execute('''
-            SELECT inspiration_id, inspired_value, confidence, mention_count, status
-            FROM inspiration_events
-            WHERE character = ?
-                AND status != 'realized'
-            ORDER BY created_at DESC
-        ''', (character,))
+        Most similar unrealized inspiration of the character by Dice
+        coefficient of character bigrams (newest first on ties), if it
+        reaches similarity_threshold.
+        """
+        ngrams = value_ngrams(inspired_value)
+        if not ngrams:
+            return None
+
+        # Dice >= t needs at least t * |A| / (2 - t) shared bigrams, so a match
+        # shares at least one of the |A| - min_shared + 1 rarest bigrams of A
+        threshold = self.similarity_threshold
+        min_shared = min(len(ngrams), max(1, math.ceil(threshold * len(ngrams) / (2 - threshold) - 1e-9)))
+
+        placeholders = ', '.join('?' * len(ngrams))
+        doc_counts = dict(self.conn.execute(f'''
+            SELECT ngram, doc_count FROM inspiration_ngram_stats
+            WHERE character = ? AND ngram IN ({placeholders}) AND doc_count > 0
+        ''', (character, *ngrams)).fetchall())
+        if len(doc_counts) < min_shared:
+            return None
+
+        prefix = sorted(ngrams, key=lambda ngram: doc_counts.get(ngram, 0))[:len(ngrams) - min_shared + 1]
+        prefix = [ngram for ngram in prefix if ngram in doc_counts]
+
+        # Candidates through the prefix bigrams, then shared/total bigrams per candidate
+        row = self.conn.execute(f'''
+            WITH candidates AS (
+                SELECT DISTINCT inspiration_id FROM inspiration_ngrams
+                WHERE character = ? AND ngram IN ({', '.join('?' * len(prefix))})
+            ),
+            scores AS (
+                SELECT g.inspiration_id,
+                       2.0 * SUM(g.ngram IN ({placeholders})) / (? + COUNT(*)) AS similarity
+                FROM candidates AS c
+                JOIN inspiration_ngrams AS g INDEXED BY idx_inspiration_ngrams_id
+                    ON g.inspiration_id = c.inspiration_id
+                GROUP BY g.inspiration_id
+            )
+            SELECT e.inspiration_id, e.inspired_value, e.confidence, e.mention_count, e.status,
+                   s.similarity
+            FROM scores AS s
+            JOIN inspiration_events AS e ON e.inspiration_id = s.inspiration_id
+            WHERE s.similarity >= ? AND e.status != 'realized'
+            ORDER BY s.similarity DESC, e.inspiration_id DESC
+            LIMIT 1
+        ''', (character, *prefix, *ngrams, len(ngrams), threshold - 1e-9)).fetchone()
 
-        rows = cursor.fetchall()
-        conn.close()
+        if not row:
+            return None
 
-        for row in rows:
-            inspiration_id, existing_value, confidence, mention_count, status = row
-            # Simple keyword matching
-            if any(word in existing_value for word in key_words):
-                return {
-                    'inspiration_id': inspiration_id,
-                    'inspired_value': existing_value,
-                    'confidence': confidence,
-                    'mention_count': mention_count,
-                    'status': status
-                }
-
-        return None
+        return {
+            'inspiration_id': row[0],
+            'inspired_value': row[1],
+            'confidence': row[2],
+            'mention_count': row[3],
+            'status': row[4],
+            'similarity': row[5]
+        }
 
     def get_inspirations_by_character(
         self,
@@ -247,8 +355,7 @@ class InspirationTracker:
         Returns:
             List of inspiration records
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
 
         if status:
             cursor.execute('''
@@ -270,7 +377,6 @@ class InspirationTracker:
             ''', (character,))
 
         rows = cursor.fetchall()
-        conn.close()
 
         inspirations = []
         for row in rows:
@@ -291,8 +397,7 @@ class InspirationTracker:
 
     def get_statistics(self) -> Dict:
         """Get overall statistics"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
 
         stats = {}
 
@@ -323,7 +428,6 @@ class InspirationTracker:
                 'avg_confidence': avg_confidence
             }
 
-        conn.close()
         return stats
 
 
@@ -375,5 +479,6 @@ if __name__ == "__main__":
 
     # Cleanup
     import os
+    tracker.close()
     os.remove("test_inspiration.db")
     print("\n✅ All tests completed")
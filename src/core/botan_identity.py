@@ -10,12 +10,19 @@ from pathlib import Path
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 
+try:
+    from .memory_fts import MIN_TERM_LENGTH, fts_columns, keyword_condition
+except ImportError:  # run as a script: python src/core/botan_identity.py
+    from memory_fts import MIN_TERM_LENGTH, fts_columns, keyword_condition
+
 class BotanIdentity:
     """Botan's identity and memory system"""
 
     def __init__(self, db_path: str = "/home/koshikawa/toExecUnit/sisters_memory.db"):
         """Initialize Botan's identity"""
         self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._fts_indexed: Optional[bool] = None
         self.birthdate = datetime.strptime("2008-05-04", "%Y-%m-%d")
         self.current_age_years = 17
         self.current_age_days = 5  # Approximate
@@ -103,16 +110,52 @@ class BotanIdentity:
 
         return la_events
 
-    def recall_memory(self, query: str) -> List[Dict]:
-        """Recall memories based on query"""
+    def _connection(self) -> sqlite3.Connection:
+        """Connection kept for FTS queries (opened on first use)"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+        return self._conn
 
-        # Simple keyword matching
+    def close(self):
+        """Close the FTS connection"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def recall_memory(self, query: str) -> List[Dict]:
+        """Recall memories based on query (substring match on name/description)"""
+
+        if not query:
+            return list(self.major_events)
+
+        if self._fts_indexed is None:
+            columns = fts_columns(self._connection(), 'sister_shared_events')
+            self._fts_indexed = columns is not None and {'event_name', 'description'} <= set(columns)
+
+        # FTS5 index if built (tools/build_memory_fts.py) and the query is long enough for it
+        if self._fts_indexed and len(query) >= MIN_TERM_LENGTH:
+            conn = self._connection()
+            condition, params = keyword_condition(conn, 'sister_shared_events', {
+                'event_name': [query],
+                'description': [query],
+            })
+            cursor = conn.execute(f"""
+                SELECT *
+                FROM sister_shared_events
+                WHERE botan_absolute_day IS NOT NULL
+                AND {condition}
+                ORDER BY botan_absolute_day
+            """, params)
+            return [dict(row) for row in cursor.fetchall()]
+
+        # Otherwise filter the events loaded at startup
         query_lower = query.lower()
 
         matches = []
         for event in self.major_events:
-            event_name = event.get('event_name', '').lower()
-            description = event.get('description', '').lower()
+            event_name = (event.get('event_name') or '').lower()
+            description = (event.get('description') or '').lower()
 
             if query_lower in event_name or query_lower in description:
                 matches.append(event)
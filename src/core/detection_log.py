@@ -0,0 +1,394 @@
+"""
+Detection Log - write-behind comment_log writer with rolled-up statistics
+
+Detection rows are queued in memory and written by a background thread in
+batches, one transaction per flush:
+
+- comment_log: one row per detection (columns of sensitive_system/database/schema.sql)
+- filter_statistics: per-day totals (comments, blocked/masked/warned,
+  tier1-3 detections, weighted average score / processing time)
+- filter_statistics_categories: per-day, per-category detections
+
+The two statistics tables are updated with upserts in the same transaction
+as the log rows, so they always agree with comment_log and statistics
+readers (load_statistics) never scan the log. Rows logged before the
+rollup existed are not included.
+
+Used by DynamicSensitiveDetector (src/line_bot) and, for the statistics
+upserts only, by StreamModerationPipeline (sensitive_system), which has
+its own async batching.
+
+Stdlib only: importable as src.core.detection_log or, with src/core on
+sys.path, as detection_log.
+
+Created: 2026-10-19
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+COMMENT_LOG_COLUMNS = (
+    'viewer_id', 'viewer_name', 'original_comment', 'processed_comment',
+    'sensitivity_score', 'detected_words', 'action_taken', 'layer1_result',
+    'layer2_result', 'layer3_result', 'context_analysis', 'shown_to_sisters',
+    'platform', 'stream_id', 'notes'
+)
+
+# Actions counted in filter_statistics (both verb forms are in use)
+ACTION_COLUMNS = {
+    'block': 'blocked_comments', 'blocked': 'blocked_comments',
+    'mask': 'masked_comments', 'masked': 'masked_comments',
+    'warn': 'warned_comments', 'warned': 'warned_comments',
+}
+
+TIERS = ('tier1', 'tier2', 'tier3')
+
+# Same definitions as sensitive_system/database/schema.sql (for databases created elsewhere)
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS comment_log (
+    log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    viewer_id TEXT,
+    viewer_name TEXT,
+    original_comment TEXT NOT NULL,
+    processed_comment TEXT,
+    sensitivity_score REAL,
+    detected_words TEXT,
+    action_taken TEXT,
+    layer1_result TEXT,
+    layer2_result TEXT,
+    layer3_result TEXT,
+    context_analysis TEXT,
+    shown_to_sisters BOOLEAN DEFAULT 0,
+    platform TEXT,
+    stream_id TEXT,
+    notes TEXT
+);
+CREATE TABLE IF NOT EXISTS filter_statistics (
+    stat_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date DATE NOT NULL,
+    total_comments INTEGER DEFAULT 0,
+    blocked_comments INTEGER DEFAULT 0,
+    masked_comments INTEGER DEFAULT 0,
+    warned_comments INTEGER DEFAULT 0,
+    avg_sensitivity_score REAL,
+    tier1_detections INTEGER DEFAULT 0,
+    tier2_detections INTEGER DEFAULT 0,
+    tier3_detections INTEGER DEFAULT 0,
+    false_positives INTEGER DEFAULT 0,
+    processing_time_avg REAL,
+    UNIQUE(date)
+);
+CREATE TABLE IF NOT EXISTS filter_statistics_categories (
+    date DATE NOT NULL,
+    category TEXT NOT NULL,
+    detections INTEGER DEFAULT 0,
+    comments INTEGER DEFAULT 0,
+    PRIMARY KEY (date, category)
+);
+"""
+
+
+def ensure_tables(conn: sqlite3.Connection):
+    """Create comment_log / filter_statistics / filter_statistics_categories if missing"""
+    conn.executescript(_SCHEMA)
+
+
+def record_statistics(conn: sqlite3.Connection, rows: Sequence[Dict[str, Any]]):
+    """
+    Add a batch of detections to the rollup tables (caller commits)
+
+    Args:
+        conn: Connection (inside the caller's transaction)
+        rows: [{
+            'date': 'YYYY-MM-DD' (default: today),
+            'action': 'block'/'mask'/'warn'/... (see ACTION_COLUMNS),
+            'sensitivity_score': float or None,
+            'processing_time_ms': float or None,
+            'tiers': ['tier1', ...] one entry per detection (optional),
+            'categories': [category, ...] one entry per detection (optional)
+        }, ...]
+    """
+    today = date.today().isoformat()
+    days: Dict[str, Dict[str, Any]] = {}
+    categories: Dict[tuple, List[int]] = defaultdict(lambda: [0, 0])
+
+    for row in rows:
+        day = row.get('date') or today
+        totals = days.setdefault(day, {
+            'total': 0, 'blocked_comments': 0, 'masked_comments': 0, 'warned_comments': 0,
+            'score_sum': 0.0, 'score_count': 0, 'time_sum': 0.0, 'time_count': 0,
+            'tier1': 0, 'tier2': 0, 'tier3': 0
+        })
+        totals['total'] += 1
+        column = ACTION_COLUMNS.get(row.get('action'))
+        if column:
+            totals[column] += 1
+        if row.get('sensitivity_score') is not None:
+            totals['score_sum'] += row['sensitivity_score']
+            totals['score_count'] += 1
+        if row.get('processing_time_ms') is not None:
+            totals['time_sum'] += row['processing_time_ms']
+            totals['time_count'] += 1
+        for tier in row.get('tiers') or ():
+            if tier in TIERS:
+                totals[tier] += 1
+
+        row_categories = row.get('categories') or ()
+        for category in row_categories:
+            categories[(day, category)][0] += 1
+        for category in set(row_categories):
+            categories[(day, category)][1] += 1
+
+    # Averages are merged weighted by total_comments; a batch without
+    # values leaves the stored average unchanged
+    conn.executemany("""
+        INSERT INTO filter_statistics
+        (date, total_comments, blocked_comments, masked_comments, warned_comments,
+         avg_sensitivity_score, tier1_detections, tier2_detections, tier3_detections,
+         processing_time_avg)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(date) DO UPDATE SET
+            avg_sensitivity_score = CASE
+                WHEN excluded.avg_sensitivity_score IS NULL THEN avg_sensitivity_score
+                WHEN avg_sensitivity_score IS NULL THEN excluded.avg_sensitivity_score
+                ELSE (avg_sensitivity_score * total_comments
+                      + excluded.avg_sensitivity_score * excluded.total_comments)
+                     / (total_comments + excluded.total_comments)
+            END,
+            processing_time_avg = CASE
+                WHEN excluded.processing_time_avg IS NULL THEN processing_time_avg
+                WHEN processing_time_avg IS NULL THEN excluded.processing_time_avg
+                ELSE (processing_time_avg * total_comments
+                      + excluded.processing_time_avg * excluded.total_comments)
+                     / (total_comments + excluded.total_comments)
+            END,
+            total_comments = total_comments + excluded.total_comments,
+            blocked_comments = blocked_comments + excluded.blocked_comments,
+            masked_comments = masked_comments + excluded.masked_comments,
+            warned_comments = warned_comments + excluded.warned_comments,
+            tier1_detections = tier1_detections + excluded.tier1_detections,
+            tier2_detections = tier2_detections + excluded.tier2_detections,
+            tier3_detections = tier3_detections + excluded.tier3_detections
+    """, [
+        (
+            day, t['total'], t['blocked_comments'], t['masked_comments'], t['warned_comments'],
+            t['score_sum'] / t['score_count'] if t['score_count'] else None,
+            t['tier1'], t['tier2'], t['tier3'],
+            t['time_sum'] / t['time_count'] if t['time_count'] else None
+        )
+        for day, t in days.items()
+    ])
+
+    conn.executemany("""
+        INSERT INTO filter_statistics_categories (date, category, detections, comments)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(date, category) DO UPDATE SET
+            detections = detections + excluded.detections,
+            comments = comments + excluded.comments
+    """, [(day, category, counts[0], counts[1]) for (day, category), counts in categories.items()])
+
+
+def load_statistics(conn: sqlite3.Connection, days: int = 7) -> Dict[str, Any]:
+    """
+    Read the rollups of the last days (no comment_log scan)
+
+    Returns:
+        {
+            'daily': [{'date', 'total_comments', 'blocked_comments', 'masked_comments',
+                       'warned_comments', 'avg_sensitivity_score', 'tier1_detections',
+                       'tier2_detections', 'tier3_detections', 'processing_time_avg'}, ...],
+            'categories': {category: {'detections': int, 'comments': int}, ...},
+            'total_comments': int
+        }
+    """
+    since = (date.today() - timedelta(days=days - 1)).isoformat()
+    columns = [
+        'date', 'total_comments', 'blocked_comments', 'masked_comments', 'warned_comments',
+        'avg_sensitivity_score', 'tier1_detections', 'tier2_detections', 'tier3_detections',
+        'processing_time_avg'
+    ]
+    daily = [
+        dict(zip(columns, row)) for row in conn.execute(
+            f"SELECT {', '.join(columns)} FROM filter_statistics WHERE date >= ? ORDER BY date",
+            (since,)
+        )
+    ]
+    categories = {
+        category: {'detections': detections, 'comments': comments}
+        for category, detections, comments in conn.execute("""
+            SELECT category, SUM(detections), SUM(comments)
+            FROM filter_statistics_categories
+            WHERE date >= ?
+            GROUP BY category
+            ORDER BY SUM(detections) DESC
+        """, (since,))
+    }
+    return {
+        'daily': daily,
+        'categories': categories,
+        'total_comments': sum(day['total_comments'] for day in daily)
+    }
+
+
+class DetectionLogWriter:
+    """Write-behind writer for comment_log rows and their statistics rollup"""
+
+    def __init__(
+        self,
+        db_path: str,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        max_queue_size: int = 10000
+    ):
+        """
+        Args:
+            db_path: Database with comment_log (tables are created if missing)
+            batch_size: Rows per transaction (a full batch is written immediately)
+            flush_interval: Max seconds a row waits before being written
+            max_queue_size: Queued rows; log() drops rows beyond this
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            ensure_tables(conn)
+        finally:
+            conn.close()
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._closed = False
+        self.stats = {'queued': 0, 'written': 0, 'dropped': 0, 'write_errors': 0, 'flushes': 0}
+
+        self._thread = threading.Thread(target=self._run, name="detection-log-writer", daemon=True)
+        self._thread.start()
+
+    def log(self, comment_row: Dict[str, Any], stats_row: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Queue one detection (does not block)
+
+        Args:
+            comment_row: comment_log values by column name (COMMENT_LOG_COLUMNS,
+                original_comment required)
+            stats_row: record_statistics() row (default: counted as a comment
+                with comment_row's action_taken / sensitivity_score)
+
+        Returns:
+            False if the queue was full or the writer is closed (row dropped)
+        """
+        if stats_row is None:
+            stats_row = {
+                'action': comment_row.get('action_taken'),
+                'sensitivity_score': comment_row.get('sensitivity_score')
+            }
+        if self._closed:
+            self.stats['dropped'] += 1
+            return False
+        try:
+            self._queue.put_nowait((comment_row, stats_row))
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return False
+        self.stats['queued'] += 1
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Write everything queued so far and wait for it
+
+        Returns:
+            False on timeout
+        """
+        if self._closed:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """Write the remaining rows and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Writer counters"""
+        return {**self.stats, 'queue_length': self._queue.qsize()}
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            while True:
+                item = self._queue.get()
+                batch, waiters, stop = [], [], False
+                deadline = time.monotonic() + self.flush_interval
+
+                # Collect until the batch is full, the interval is over, or a flush/close
+                while True:
+                    if item is None:
+                        stop = True
+                        break
+                    if isinstance(item, threading.Event):
+                        waiters.append(item)
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+
+                if stop:
+                    # Drain rows queued before close()
+                    while True:
+                        try:
+                            item = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if isinstance(item, threading.Event):
+                            waiters.append(item)
+                        elif item is not None:
+                            batch.append(item)
+
+                if batch:
+                    self._write(conn, batch)
+                for waiter in waiters:
+                    waiter.set()
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _write(self, conn: sqlite3.Connection, batch: List[tuple]):
+        """One transaction: comment_log rows + rollup upserts"""
+        try:
+            with conn:
+                conn.executemany(f"""
+                    INSERT INTO comment_log ({', '.join(COMMENT_LOG_COLUMNS)})
+                    VALUES ({', '.join('?' * len(COMMENT_LOG_COLUMNS))})
+                """, [
+                    tuple(comment_row.get(column) for column in COMMENT_LOG_COLUMNS)
+                    for comment_row, _ in batch
+                ])
+                record_statistics(conn, [stats_row for _, stats_row in batch])
+            self.stats['written'] += len(batch)
+            self.stats['flushes'] += 1
+        except Exception as e:
+            self.stats['write_errors'] += len(batch)
+            logger.error(f"Failed to write detection log batch ({len(batch)} rows): {e}")
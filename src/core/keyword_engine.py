@@ -0,0 +1,207 @@
+"""
+Keyword Engine - multi-label keyword matching in one pass
+
+Compiles labelled keyword dictionaries ({label: [keyword, ...]}) into a
+single Aho-Corasick automaton and reports every dictionary entry found in
+a text with one scan, instead of one `kw in text` test per keyword.
+
+Used by the keyword-routing modules (TopicClassifier, InterestAnalyzer,
+WorldviewChecker, AutoCharacterSelector, IntegratedJudgmentEngine,
+FactChecker). Matching semantics are those of the loops it replaces:
+
+- substring match (`keyword in text`)
+- ignore_case=True: both sides lowercased (`kw.lower() in text.lower()`)
+- ascii_word_boundary=True: no ASCII letter/digit directly before or after
+  the match (the `(?<![a-zA-Z0-9])kw(?![a-zA-Z0-9])` pattern)
+- duplicate keywords (also across labels) are separate entries, so
+  per-label counts match `sum(1 for kw in keywords if kw in text)`
+
+Empty keywords are ignored.
+
+AhoCorasickAutomaton is the underlying automaton (pattern -> payload,
+every occurrence with its offsets); the NG word pre-filter
+(sensitive_system/core/ng_automaton.py) uses it directly.
+
+Stdlib only: importable as src.core.keyword_engine or, with src/core on
+sys.path, as keyword_engine.
+
+Created: 2026-10-19
+"""
+
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+
+def _is_ascii_alnum(ch: str) -> bool:
+    return ch.isascii() and ch.isalnum()
+
+
+def _lower_keep_length(text: str) -> str:
+    """Lowercase without changing string length (offsets stay valid)"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+
+class AhoCorasickAutomaton:
+    """Multi-pattern search: every occurrence of every pattern in one pass"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # state -> [(pattern length, payload)]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+        self.pattern_count = 0
+
+    def add(self, pattern: str, value: Any):
+        """
+        Add a pattern (call build() after the last add)
+
+        Args:
+            pattern: Pattern, already normalized like the texts (empty is ignored)
+            value: Payload reported with each match
+        """
+        if not pattern:
+            return
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][ch] = nxt
+            state = nxt
+        self._out[state].append((len(pattern), value))
+        self.pattern_count += 1
+
+    def build(self):
+        """Compute failure links and merge suffix outputs into each state"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                if self._out[self._fail[nxt]]:
+                    self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """
+        Every occurrence in text
+
+        Yields:
+            (start, end, value) where text[start:end] is the pattern
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, value in out[state]:
+                yield i + 1 - length, i + 1, value
+
+
+class KeywordMatches:
+    """Result of KeywordEngine.scan()"""
+
+    def __init__(self, engine: "KeywordEngine", entry_ids: Set[int]):
+        self._engine = engine
+        self._by_label: Dict[str, List[str]] = {}
+        for entry_id in sorted(entry_ids):
+            label, keyword = engine.entries[entry_id]
+            self._by_label.setdefault(label, []).append(keyword)
+
+    def __bool__(self) -> bool:
+        return bool(self._by_label)
+
+    def __contains__(self, label: str) -> bool:
+        return label in self._by_label
+
+    @property
+    def labels(self) -> List[str]:
+        """Labels with at least one hit (dictionary order)"""
+        return list(self._by_label)
+
+    def keywords(self, label: str) -> List[str]:
+        """Keywords of label found in the text (dictionary order)"""
+        return self._by_label.get(label, [])
+
+    def count(self, label: str) -> int:
+        """Number of label's dictionary entries found in the text"""
+        return len(self._by_label.get(label, ()))
+
+    def first(self, labels: Optional[Iterable[str]] = None) -> Optional[str]:
+        """First label with a hit (in the given priority order)"""
+        for label in (labels if labels is not None else self._engine.labels):
+            if label in self._by_label:
+                return label
+        return None
+
+    def all_keywords(self) -> List[Tuple[str, str]]:
+        """[(label, keyword), ...] for every hit (dictionary order)"""
+        return [(label, kw) for label, kws in self._by_label.items() for kw in kws]
+
+
+class KeywordEngine:
+    """Labelled keyword dictionaries compiled into one automaton"""
+
+    def __init__(
+        self,
+        dictionaries: Mapping[str, Iterable[str]],
+        ignore_case: bool = True,
+        ascii_word_boundary: bool = False
+    ):
+        """
+        Args:
+            dictionaries: {label: [keyword, ...]} (order is kept in results)
+            ignore_case: Lowercase keywords and text before matching
+            ascii_word_boundary: Reject matches touching ASCII letters/digits
+        """
+        self.ignore_case = ignore_case
+        self.ascii_word_boundary = ascii_word_boundary
+        self.labels: List[str] = list(dictionaries)
+        self.entries: List[Tuple[str, str]] = []
+
+        # payload: entry ids of the pattern
+        self._automaton = AhoCorasickAutomaton()
+
+        ids_by_pattern: Dict[str, List[int]] = {}
+        for label, keywords in dictionaries.items():
+            for keyword in keywords:
+                if not keyword:
+                    continue
+                ids_by_pattern.setdefault(self._normalize(keyword), []).append(len(self.entries))
+                self.entries.append((label, keyword))
+
+        for pattern, ids in ids_by_pattern.items():
+            self._automaton.add(pattern, tuple(ids))
+        self._automaton.build()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _normalize(self, text: str) -> str:
+        return _lower_keep_length(text) if self.ignore_case else text
+
+    def scan(self, text: str) -> KeywordMatches:
+        """Find every dictionary entry in text (one pass)"""
+        text = text or ""
+        boundary = self.ascii_word_boundary
+        n = len(text)
+
+        found: Set[int] = set()
+        for start, end, ids in self._automaton.iter_matches(self._normalize(text)):
+            if boundary:
+                if start > 0 and _is_ascii_alnum(text[start - 1]):
+                    continue
+                if end < n and _is_ascii_alnum(text[end]):
+                    continue
+            found.update(ids)
+        return KeywordMatches(self, found)
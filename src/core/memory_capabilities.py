@@ -0,0 +1,336 @@
+"""
+Memory Capabilities - materialized "what have the sisters done" summary
+
+HallucinationDetector verifies claims in LLM responses ("配信した",
+"視聴者から", "大阪に行った", "昨日") against sister_shared_events. The
+answers only change when events are written, so instead of LIKE/COUNT
+queries per detected fact they are kept in two small tables:
+
+- memory_capabilities (one row, id = 1)
+    streaming_event_count / viewer_interaction_count
+    latest_event_rowid / latest_event_name / latest_event_date / latest_created_at
+    version (incremented on every change, for in-process caches)
+    definition (hash of the term lists the row was computed with)
+- memory_capability_locations (location, event_count): travel events per location
+
+AFTER INSERT/UPDATE/DELETE triggers on sister_shared_events keep both
+tables exact: counts are adjusted from the new/old row only (no table
+scan). The latest event is replaced when the new row is newer and is
+recomputed only when the latest row itself is updated or deleted, through
+the created_at index (one index probe, so bulk updates stay linear). The
+conditions are the LIKE conditions of the detector's original queries.
+
+Nothing is installed implicitly: run tools/build_memory_capabilities.py
+on the database. Readers check capabilities_installed() and fall back to
+direct queries otherwise.
+
+load_capabilities() returns the row as a dict; callers cache it and
+re-read only when current_version() changes (a primary-key lookup).
+
+Stdlib only: importable as src.core.memory_capabilities or, with src/core
+on sys.path, as memory_capabilities.
+
+Created: 2026-10-19
+"""
+
+import hashlib
+import json
+import sqlite3
+from typing import Dict, Optional, Sequence
+
+EVENT_TABLE = "sister_shared_events"
+
+# Actual streaming experience (as broadcaster, not viewer)
+STREAMING_TERMS = {
+    'event_name': ['初配信', '配信デビュー', '配信開始'],
+    'description': ['配信した', '配信中'],
+}
+STREAMING_CATEGORIES = ['streaming_debut', 'broadcasting']
+
+# Interaction received FROM viewers
+VIEWER_INTERACTION_TERMS = {
+    'description': [
+        '視聴者から', '視聴者が', 'リスナーから', 'ファンから',
+        'コメントをもらった', 'コメントがあった', 'スパチャ'
+    ],
+    'event_name': ['視聴者との'],
+}
+VIEWER_INTERACTION_CATEGORIES = ['viewer_interaction']
+
+# Events marked as pretend play do not count as experience
+PRETEND_PLAY = 'ごっこ遊び'
+
+TRAVEL_CATEGORY_TERMS = ['travel', '旅行']
+TRAVEL_LOCATIONS = ['大阪', '京都', '東京', '北海道', '沖縄']
+
+TRIGGER_SUFFIXES = ("ai", "ad", "au")
+CREATED_AT_INDEX = "idx_memory_capabilities_created_at"
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _like(column: str, term: str) -> str:
+    return f"{column} LIKE {_quote('%' + term + '%')}"
+
+
+def _experience_condition(row: str, terms: Dict[str, Sequence[str]], categories: Sequence[str]) -> str:
+    clauses = [_like(f"{row}.{column}", term) for column, values in terms.items() for term in values]
+    clauses += [f"{row}.category = {_quote(category)}" for category in categories]
+    return (
+        f"(({' OR '.join(clauses)})"
+        f" AND ({row}.cultural_context NOT LIKE {_quote('%' + PRETEND_PLAY + '%')}"
+        f" OR {row}.cultural_context IS NULL))"
+    )
+
+
+def streaming_condition(row: str) -> str:
+    """SQL condition: row is an actual streaming event"""
+    return _experience_condition(row, STREAMING_TERMS, STREAMING_CATEGORIES)
+
+
+def viewer_interaction_condition(row: str) -> str:
+    """SQL condition: row is an actual viewer interaction event"""
+    return _experience_condition(row, VIEWER_INTERACTION_TERMS, VIEWER_INTERACTION_CATEGORIES)
+
+
+def travel_condition(row: str, location: str) -> str:
+    """SQL condition: row is a travel event at location (location may be a SQL expression)"""
+    category = " OR ".join(_like(f"{row}.category", term) for term in TRAVEL_CATEGORY_TERMS)
+    return (
+        f"(({row}.location LIKE '%' || {location} || '%'"
+        f" OR {row}.description LIKE '%' || {location} || '%')"
+        f" AND ({category}))"
+    )
+
+
+def _flag(condition: str) -> str:
+    return f"(CASE WHEN {condition} THEN 1 ELSE 0 END)"
+
+
+def definition_hash(locations: Sequence[str] = TRAVEL_LOCATIONS) -> str:
+    """Hash of everything the stored counts depend on"""
+    payload = json.dumps([
+        STREAMING_TERMS, STREAMING_CATEGORIES,
+        VIEWER_INTERACTION_TERMS, VIEWER_INTERACTION_CATEGORIES,
+        PRETEND_PLAY, TRAVEL_CATEGORY_TERMS, list(locations), 2
+    ], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+# Recompute the latest event when the current one was changed/removed
+# (ORDER BY uses CREATED_AT_INDEX)
+_LATEST_FROM_TABLE = f"""
+    UPDATE memory_capabilities SET
+        (latest_event_rowid, latest_event_name, latest_event_date, latest_created_at) = (
+            SELECT rowid, event_name, event_date, created_at FROM {EVENT_TABLE}
+            ORDER BY created_at DESC LIMIT 1
+        )
+    WHERE id = 1
+"""
+
+
+def _latest_from_row(row: str) -> str:
+    """Make row the latest event if it is newer than the current one"""
+    return f"""
+        UPDATE memory_capabilities SET
+            latest_event_rowid = {row}.rowid,
+            latest_event_name = {row}.event_name,
+            latest_event_date = {row}.event_date,
+            latest_created_at = {row}.created_at
+        WHERE id = 1 AND (
+            latest_event_rowid IS NULL
+            OR {row}.created_at > latest_created_at
+            OR (latest_created_at IS NULL AND {row}.created_at IS NOT NULL)
+        )
+    """
+
+
+def _drop_triggers(conn: sqlite3.Connection):
+    for suffix in TRIGGER_SUFFIXES:
+        conn.execute(f"DROP TRIGGER IF EXISTS memory_capabilities_{suffix}")
+
+
+def _create_triggers(conn: sqlite3.Connection):
+    def counts(row: str, sign: str) -> str:
+        return (
+            f"streaming_event_count = streaming_event_count {sign} {_flag(streaming_condition(row))}, "
+            f"viewer_interaction_count = viewer_interaction_count {sign} {_flag(viewer_interaction_condition(row))}"
+        )
+
+    def locations(row: str, sign: str) -> str:
+        return (
+            f"UPDATE memory_capability_locations SET event_count = event_count {sign} 1 "
+            f"WHERE {travel_condition(row, 'memory_capability_locations.location')};"
+        )
+
+    conn.execute(f"""
+        CREATE TRIGGER memory_capabilities_ai AFTER INSERT ON {EVENT_TABLE} BEGIN
+            UPDATE memory_capabilities SET {counts('new', '+')}, version = version + 1 WHERE id = 1;
+            {locations('new', '+')}
+            {_latest_from_row('new')};
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER memory_capabilities_ad AFTER DELETE ON {EVENT_TABLE} BEGIN
+            UPDATE memory_capabilities SET {counts('old', '-')}, version = version + 1 WHERE id = 1;
+            {locations('old', '-')}
+            {_LATEST_FROM_TABLE} AND latest_event_rowid = old.rowid;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER memory_capabilities_au AFTER UPDATE ON {EVENT_TABLE} BEGIN
+            UPDATE memory_capabilities SET {counts('old', '-')}, version = version + 1 WHERE id = 1;
+            {locations('old', '-')}
+            UPDATE memory_capabilities SET {counts('new', '+')} WHERE id = 1;
+            {locations('new', '+')}
+            {_LATEST_FROM_TABLE} AND latest_event_rowid = old.rowid;
+            {_latest_from_row('new')};
+        END
+    """)
+
+
+def refresh_capabilities(conn: sqlite3.Connection, locations: Sequence[str] = TRAVEL_LOCATIONS):
+    """Recompute both tables from sister_shared_events (full scan)"""
+    with conn:
+        conn.execute("DELETE FROM memory_capability_locations")
+        conn.executemany(
+            "INSERT INTO memory_capability_locations (position, location, event_count) VALUES (?, ?, 0)",
+            list(enumerate(locations))
+        )
+        conn.execute(f"""
+            UPDATE memory_capability_locations SET event_count = (
+                SELECT COUNT(*) FROM {EVENT_TABLE} AS e
+                WHERE {travel_condition('e', 'memory_capability_locations.location')}
+            )
+        """)
+        conn.execute(f"""
+            UPDATE memory_capabilities SET
+                streaming_event_count = (
+                    SELECT COUNT(*) FROM {EVENT_TABLE} AS e WHERE {streaming_condition('e')}
+                ),
+                viewer_interaction_count = (
+                    SELECT COUNT(*) FROM {EVENT_TABLE} AS e WHERE {viewer_interaction_condition('e')}
+                ),
+                version = version + 1,
+                definition = ?
+            WHERE id = 1
+        """, (definition_hash(locations),))
+        conn.execute(_LATEST_FROM_TABLE)
+
+
+def ensure_capabilities(conn: sqlite3.Connection, locations: Sequence[str] = TRAVEL_LOCATIONS) -> bool:
+    """Create the tables, index and triggers if needed (rebuilt when the definitions changed)
+
+    Called by tools/build_memory_capabilities.py only; readers use
+    capabilities_installed().
+
+    Args:
+        conn: Writable connection to the memory database
+        locations: Travel locations to track
+
+    Returns:
+        False if the database has no sister_shared_events table
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (EVENT_TABLE,)
+    ).fetchone()
+    if not exists:
+        return False
+
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS memory_capabilities (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                streaming_event_count INTEGER NOT NULL DEFAULT 0,
+                viewer_interaction_count INTEGER NOT NULL DEFAULT 0,
+                latest_event_rowid INTEGER,
+                latest_event_name TEXT,
+                latest_event_date TEXT,
+                latest_created_at TEXT,
+                version INTEGER NOT NULL DEFAULT 0,
+                definition TEXT
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS memory_capability_locations (
+                location TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                event_count INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute("INSERT OR IGNORE INTO memory_capabilities (id) VALUES (1)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {CREATED_AT_INDEX} ON {EVENT_TABLE}(created_at)")
+
+    if capabilities_installed(conn, locations):
+        return True
+
+    with conn:
+        _drop_triggers(conn)
+        _create_triggers(conn)
+    refresh_capabilities(conn, locations)
+    return True
+
+
+def capabilities_installed(conn: sqlite3.Connection, locations: Sequence[str] = TRAVEL_LOCATIONS) -> bool:
+    """True if the tables and triggers exist and match the current definitions (read-only)"""
+    names = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE name LIKE 'memory_capabilit%' OR name = ?",
+        (CREATED_AT_INDEX,)
+    )}
+    expected = {f"memory_capabilities_{suffix}" for suffix in TRIGGER_SUFFIXES}
+    expected |= {"memory_capabilities", "memory_capability_locations", CREATED_AT_INDEX}
+    if not expected <= names:
+        return False
+    row = conn.execute("SELECT definition FROM memory_capabilities WHERE id = 1").fetchone()
+    return row is not None and row[0] == definition_hash(locations)
+
+
+def drop_capabilities(conn: sqlite3.Connection):
+    """Remove the tables, index and triggers"""
+    with conn:
+        _drop_triggers(conn)
+        conn.execute(f"DROP INDEX IF EXISTS {CREATED_AT_INDEX}")
+        conn.execute("DROP TABLE IF EXISTS memory_capability_locations")
+        conn.execute("DROP TABLE IF EXISTS memory_capabilities")
+
+
+def current_version(conn: sqlite3.Connection) -> Optional[int]:
+    """Change counter of the capabilities row (None if not installed)"""
+    row = conn.execute("SELECT version FROM memory_capabilities WHERE id = 1").fetchone()
+    return row[0] if row else None
+
+
+def load_capabilities(conn: sqlite3.Connection) -> Dict:
+    """
+    Returns:
+        {
+            'version': int,
+            'has_streamed': bool, 'streaming_event_count': int,
+            'has_viewer_interaction': bool, 'viewer_interaction_count': int,
+            'visited_locations': [location, ...] (tracking order),
+            'latest_event_name': str or None, 'latest_event_date': str or None,
+            'has_events': bool
+        }
+    """
+    row = conn.execute("""
+        SELECT version, streaming_event_count, viewer_interaction_count,
+               latest_event_rowid, latest_event_name, latest_event_date
+        FROM memory_capabilities WHERE id = 1
+    """).fetchone()
+    locations = [r[0] for r in conn.execute("""
+        SELECT location FROM memory_capability_locations
+        WHERE event_count > 0 ORDER BY position
+    """)]
+    return {
+        'version': row[0],
+        'has_streamed': row[1] > 0,
+        'streaming_event_count': row[1],
+        'has_viewer_interaction': row[2] > 0,
+        'viewer_interaction_count': row[2],
+        'visited_locations': locations,
+        'latest_event_name': row[4],
+        'latest_event_date': row[5],
+        'has_events': row[3] is not None
+    }
@@ -0,0 +1,191 @@
+"""
+Memory FTS - SQLite FTS5 (trigram) shadow index for memory databases
+
+Works on sisters_memory.db and its copies (COPY_ROBOT_*.db, *_TEST.db):
+- sister_shared_events_fts: event_name / description / location
+- {character}_memories_fts: diary_entry / {character}_thought / _emotion / _action
+
+The FTS tables are external-content tables over the original rows
+(rowid = source rowid) kept in sync by AFTER INSERT/UPDATE/DELETE
+triggers. A trigram phrase query matches exactly the rows that
+LIKE '%keyword%' matches, but through the index instead of a full scan.
+
+keyword_condition() is the query helper for call sites: it returns a
+WHERE fragment using the FTS index when the index exists and every term
+has 3+ characters (trigram minimum), and the plain LIKE condition
+otherwise, so callers work unchanged on databases without the index.
+
+Build / drop the index with tools/build_memory_fts.py.
+Requires SQLite 3.34+ (trigram tokenizer) for every process that writes
+to an indexed database, because the triggers reference the FTS tables.
+
+Created: 2026-10-19
+"""
+
+import sqlite3
+from typing import Dict, List, Optional, Sequence, Tuple
+
+CHARACTERS = ("botan", "kasho", "yuri")
+
+EVENT_TABLE = "sister_shared_events"
+EVENT_COLUMNS = ("event_name", "description", "location")
+
+# Trigram tokenizer cannot match shorter terms through the index
+MIN_TERM_LENGTH = 3
+
+
+def fts_table(table: str) -> str:
+    return f"{table}_fts"
+
+
+def indexed_tables() -> Dict[str, Tuple[str, ...]]:
+    """Source table -> candidate text columns"""
+    tables = {EVENT_TABLE: EVENT_COLUMNS}
+    for character in CHARACTERS:
+        tables[f"{character}_memories"] = (
+            "diary_entry",
+            f"{character}_thought",
+            f"{character}_emotion",
+            f"{character}_action",
+        )
+    return tables
+
+
+def _existing_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def fts_columns(conn: sqlite3.Connection, table: str) -> Optional[List[str]]:
+    """Columns of the FTS index for table (None if not indexed)"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (fts_table(table),)
+    ).fetchone()
+    if not exists:
+        return None
+    return [c for c in _existing_columns(conn, fts_table(table)) if c != fts_table(table)]
+
+
+def create_fts_index(conn: sqlite3.Connection, table: str, columns: Sequence[str]) -> int:
+    """Create the FTS table + sync triggers for one source table and fill it
+
+    Args:
+        conn: Writable connection
+        table: Source table
+        columns: Candidate text columns (missing ones are skipped)
+
+    Returns:
+        Number of indexed columns (0 if the table or columns do not exist)
+    """
+    available = set(_existing_columns(conn, table))
+    columns = [c for c in columns if c in available]
+    if not columns:
+        return 0
+
+    fts = fts_table(table)
+    col_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{c}" for c in columns)
+    old_values = ", ".join(f"old.{c}" for c in columns)
+
+    with conn:
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts}
+            USING fts5({col_list}, content='{table}', tokenize='trigram')
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts}(rowid, {col_list}) VALUES (new.rowid, {new_values});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.rowid, {old_values});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.rowid, {old_values});
+                INSERT INTO {fts}(rowid, {col_list}) VALUES (new.rowid, {new_values});
+            END
+        """)
+        conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+    return len(columns)
+
+
+def drop_fts_index(conn: sqlite3.Connection, table: str):
+    """Remove the FTS table and its triggers"""
+    fts = fts_table(table)
+    with conn:
+        for suffix in ("ai", "ad", "au"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+        conn.execute(f"DROP TABLE IF EXISTS {fts}")
+
+
+def ensure_fts_indexes(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Create missing FTS indexes for every known table
+
+    Returns:
+        {source table: indexed column count} for tables that exist
+    """
+    result = {}
+    for table, columns in indexed_tables().items():
+        if not _existing_columns(conn, table):
+            continue
+        if fts_columns(conn, table) is None:
+            result[table] = create_fts_index(conn, table, columns)
+        else:
+            result[table] = len(fts_columns(conn, table))
+    return result
+
+
+def _phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def keyword_condition(
+    conn: sqlite3.Connection,
+    table: str,
+    terms: Dict[str, Sequence[str]],
+    alias: Optional[str] = None
+) -> Tuple[str, list]:
+    """WHERE fragment matching any term in its column (substring, case-insensitive)
+
+    Equivalent to "(col1 LIKE '%a%' OR col1 LIKE '%b%' OR col2 LIKE '%c%')",
+    answered from the FTS index when possible.
+
+    Args:
+        conn: Connection to the memory database
+        table: Source table (sister_shared_events / {character}_memories)
+        terms: {column: [term, ...]}
+        alias: Table alias used in the surrounding query
+
+    Returns:
+        (sql, params)
+    """
+    prefix = f"{alias}." if alias else ""
+    terms = {column: [t for t in values if t] for column, values in terms.items()}
+    terms = {column: values for column, values in terms.items() if values}
+    if not terms:
+        return "0", []
+
+    columns = fts_columns(conn, table)
+    use_fts = (
+        columns is not None
+        and all(column in columns for column in terms)
+        and all(len(t) >= MIN_TERM_LENGTH for values in terms.values() for t in values)
+    )
+
+    if use_fts:
+        fts = fts_table(table)
+        expression = " OR ".join(
+            f"{column} : ({' OR '.join(_phrase(t) for t in values)})"
+            for column, values in terms.items()
+        )
+        return f"{prefix}rowid IN (SELECT rowid FROM {fts} WHERE {fts} MATCH ?)", [expression]
+
+    clauses, params = [], []
+    for column, values in terms.items():
+        for term in values:
+            clauses.append(f"{prefix}{column} LIKE ?")
+            params.append(f"%{term}%")
+    return "(" + " OR ".join(clauses) + ")", params
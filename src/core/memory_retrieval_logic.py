@@ -13,13 +13,14 @@ Author: Claude Code (Design Team)
 Created: 2025-10-23
 """
 
-import sqlite3
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 import re
 
 from .personality_core import PersonalityCore, BotanPersonality, KashoPersonality, YuriPersonality
+from .memory_store import get_memory_store
+from .memory_scoring import MemoryScoreColumns
 
 
 @dataclass
@@ -130,61 +131,21 @@ class MemoryRetrievalLogic:
         elif self.character == "yuri":
             self.personality = YuriPersonality()
 
+        # Shared memory cache (one per db/character across all instances)
+        self.memory_store = get_memory_store(self.db_path, self.character, Memory)
+        # Query-independent score columns (synced with the store on each query)
+        self.score_columns = MemoryScoreColumns(self._calculate_personality_affinity)
+
         print(f"[MemoryRetrievalLogic] Initialized for {self.character}")
         print(f"[MemoryRetrievalLogic] Memory table: {self.memory_table}")
 
     def _load_all_memories(self) -> List[Memory]:
-        """Load all memories for this character"""
-
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute(f"""
-            SELECT
-                m.event_id,
-                s.event_name,
-                s.event_date,
-                m.absolute_day,
-                m.{self.emotion_col} as own_emotion,
-                m.{self.action_col} as own_action,
-                m.{self.thought_col} as own_thought,
-                m.diary_entry,
-                m.{self.sister1_obs_col} as sister1_observed_behavior,
-                m.{self.sister2_obs_col} as sister2_observed_behavior,
-                m.{self.sister1_inf_col} as sister1_inferred_feeling,
-                m.{self.sister2_inf_col} as sister2_inferred_feeling,
-                m.memory_importance,
-                m.created_at
-            FROM {self.memory_table} m
-            JOIN sister_shared_events s ON m.event_id = s.event_id
-            ORDER BY m.event_id
-        """)
-
-        memories = []
-        for row in cursor.fetchall():
-            memory = Memory(
-                event_id=row['event_id'],
-                event_name=row['event_name'],
-                event_date=row['event_date'],
-                absolute_day=row['absolute_day'],
-                own_emotion=row['own_emotion'] or "",
-                own_action=row['own_action'] or "",
-                own_thought=row['own_thought'] or "",
-                diary_entry=row['diary_entry'] or "",
-                sister1_observed_behavior=row['sister1_observed_behavior'],
-                sister2_observed_behavior=row['sister2_observed_behavior'],
-                sister1_inferred_feeling=row['sister1_inferred_feeling'],
-                sister2_inferred_feeling=row['sister2_inferred_feeling'],
-                sister1_name=self.sister1_name,
-                sister2_name=self.sister2_name,
-                memory_importance=row['memory_importance'] or 5,
-                created_at=row['created_at'] or ""
-            )
-            memories.append(memory)
+        """Load all memories for this character
 
-        conn.close()
-        return memories
+        Served from the shared SisterMemoryStore: loaded once per
+        (db, character), then revalidated via PRAGMA data_version.
+        """
+        return self.memory_store.memories()
 
     def retrieve_relevant_memories(
         self,
@@ -206,25 +167,27 @@ class MemoryRetrievalLogic:
             List of MemoryRelevanceScore, sorted by total_score descending
         """
 
-        all_memories = self._load_all_memories()
-
-        # Calculate relevance for each memory
-        scored_memories = []
-        for memory in all_memories:
-            score = self._calculate_relevance_score(
-                memory=memory,
+        # Vectorized scoring (same weights as _calculate_relevance_score)
+        columns = self.score_columns
+        columns.sync(self._load_all_memories())
+
+        return [
+            MemoryRelevanceScore(
+                memory=columns.memories[i],
+                total_score=total,
+                keyword_match_score=keyword,
+                emotional_similarity_score=emotional,
+                temporal_relevance_score=float(columns.temporal[i]),
+                importance_score=float(columns.importance[i]),
+                personality_affinity_score=float(columns.affinity[i])
+            )
+            for i, total, keyword, emotional in columns.top_k(
                 context=context,
-                current_emotion=current_emotion
+                current_emotion=current_emotion,
+                top_k=top_k,
+                relevance_threshold=relevance_threshold
             )
-
-            if score.total_score >= relevance_threshold:
-                scored_memories.append(score)
-
-        # Sort by total_score descending
-        scored_memories.sort(key=lambda x: x.total_score, reverse=True)
-
-        # Return top_k
-        return scored_memories[:top_k]
+        ]
 
     def _calculate_relevance_score(
         self,
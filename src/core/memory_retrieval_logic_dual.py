@@ -18,13 +18,18 @@ Created: 2025-11-04 (Dual implementation)
 Original: 2025-10-23
 """
 
-import sqlite3
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 import re
+import os
+import json
+import bisect
+from dataclasses import asdict, fields
 
 from personality_core import PersonalityCore, BotanPersonality, KashoPersonality, YuriPersonality
+from memory_store import get_memory_store
+from memory_scoring import MemoryScoreColumns
 
 # LangChain imports (only loaded if use_langchain=True)
 try:
@@ -92,7 +97,9 @@ class MemoryRetrievalLogicDual:
         self,
         db_path: str = "/home/koshikawa/toExecUnit/sisters_memory.db",
         character: str = "botan",  # "botan" / "kasho" / "yuri"
-        use_langchain: bool = False  # Toggle between implementations
+        use_langchain: bool = False,  # Toggle between implementations
+        embedding_model: Optional[str] = None,
+        embedding_batch_size: int = 64
     ):
         """
         Initialize memory retrieval system
@@ -101,10 +108,15 @@ class MemoryRetrievalLogicDual:
             db_path: Path to sisters_memory.db
             character: Character name ("botan", "kasho", "yuri")
             use_langchain: If True, use LangChain VectorStore; else use original implementation
+            embedding_model: Ollama embedding model for LangChain mode
+                             (default: MEMORY_EMBEDDING_MODEL or nomic-embed-text)
+            embedding_batch_size: Documents per embedding/upsert batch
         """
         self.db_path = db_path
         self.character = character.lower()
         self.use_langchain = use_langchain
+        self.embedding_model = embedding_model or os.getenv("MEMORY_EMBEDDING_MODEL", "nomic-embed-text")
+        self.embedding_batch_size = embedding_batch_size
 
         # Check LangChain availability if requested
         if use_langchain and not LANGCHAIN_AVAILABLE:
@@ -159,6 +171,11 @@ class MemoryRetrievalLogicDual:
         elif self.character == "yuri":
             self.personality = YuriPersonality()
 
+        # Shared memory cache (one per db/character across all instances)
+        self.memory_store = get_memory_store(self.db_path, self.character, Memory)
+        # Query-independent score columns (synced with the store on each query)
+        self.score_columns = MemoryScoreColumns(self._calculate_personality_affinity)
+
         # Initialize LangChain components if needed
         if self.use_langchain:
             self._init_langchain()
@@ -168,40 +185,53 @@ class MemoryRetrievalLogicDual:
         print(f"[MemoryRetrievalLogicDual] Memory table: {self.memory_table}")
 
     def _init_langchain(self):
-        """Initialize LangChain VectorStore"""
+        """Initialize LangChain VectorStore and sync new memories into it"""
         print("[LangChain] Initializing ChromaDB VectorStore...")
 
-        # Use Ollama for embeddings (qwen2.5:14b - heavyweight for benchmark testing)
+        # Small dedicated embedding model (a 14B chat model took seconds per document)
         self.embeddings = OllamaEmbeddings(
-            model="qwen2.5:14b",
+            model=self.embedding_model,
             base_url="http://localhost:11434"
         )
 
-        # ChromaDB collection name (per character)
-        collection_name = f"{self.character}_memories"
+        # One collection per (character, embedding model): dimensions differ between models
+        model_slug = re.sub(r'[^a-zA-Z0-9]+', '_', self.embedding_model).strip('_')
+        collection_name = f"{self.character}_memories_{model_slug}"
+        persist_directory = f"./{self.character}_memories_chroma"
 
         # Initialize ChromaDB
         self.vectorstore = Chroma(
             collection_name=collection_name,
             embedding_function=self.embeddings,
-            persist_directory=f"./{collection_name}_chroma"
+            persist_directory=persist_directory
         )
 
-        # Check if we need to populate the vectorstore
-        if self.vectorstore._collection.count() == 0:
-            print(f"[LangChain] Populating VectorStore for {self.character}...")
-            self._populate_vectorstore()
-        else:
-            print(f"[LangChain] VectorStore already populated ({self.vectorstore._collection.count()} documents)")
+        # event_id watermark of the last synced memory
+        self._sync_state_path = os.path.join(persist_directory, f"{collection_name}_sync.json")
+        self._sync_watermark = self._load_sync_watermark()
+        self._synced_memories = None
 
-    def _populate_vectorstore(self):
-        """Populate VectorStore with memories from SQLite"""
-        memories = self._load_all_memories()
+        self._sync_vectorstore()
+        print(f"[LangChain] VectorStore ready ({self.vectorstore._collection.count()} documents, model={self.embedding_model})")
 
-        documents = []
-        for mem in memories:
-            # Create searchable text
-            content = f"""
+    def _load_sync_watermark(self) -> int:
+        try:
+            with open(self._sync_state_path, encoding="utf-8") as f:
+                return int(json.load(f)["watermark"])
+        except (OSError, ValueError, KeyError):
+            # No state yet: upsert everything (ids are event_ids, so re-adding is harmless)
+            return -1
+
+    def _save_sync_watermark(self, watermark: int):
+        os.makedirs(os.path.dirname(self._sync_state_path), exist_ok=True)
+        tmp_path = self._sync_state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"watermark": watermark, "model": self.embedding_model}, f)
+        os.replace(tmp_path, self._sync_state_path)
+
+    def _memory_document(self, mem: Memory) -> "Document":
+        """Searchable text + full Memory fields as metadata (persisted id -> Memory map)"""
+        content = f"""
 Event: {mem.event_name}
 Date: {mem.event_date}
 Emotion: {mem.own_emotion}
@@ -210,75 +240,41 @@ Thought: {mem.own_thought}
 Diary: {mem.diary_entry}
 """.strip()
 
-            # Metadata for filtering
-            metadata = {
-                "event_id": mem.event_id,
-                "event_name": mem.event_name,
-                "event_date": mem.event_date,
-                "memory_importance": mem.memory_importance,
-                "own_emotion": mem.own_emotion,
-                "character": self.character
-            }
+        # Chroma metadata cannot hold None (restored as None on retrieval)
+        metadata = {key: value for key, value in asdict(mem).items() if value is not None}
+        metadata["character"] = self.character
+        return Document(page_content=content, metadata=metadata)
 
-            doc = Document(page_content=content, metadata=metadata)
-            documents.append(doc)
+    def _sync_vectorstore(self):
+        """Embed and upsert memories above the event_id watermark (batched)"""
+        memories = self._load_all_memories()
+        if memories is self._synced_memories:
+            return
+
+        # Memories are ordered by event_id
+        start = bisect.bisect_right([mem.event_id for mem in memories], self._sync_watermark)
+        pending = memories[start:]
+        if pending:
+            print(f"[LangChain] Syncing {len(pending)} new memories for {self.character}...")
+        for offset in range(0, len(pending), self.embedding_batch_size):
+            batch = pending[offset:offset + self.embedding_batch_size]
+            self.vectorstore.add_documents(
+                [self._memory_document(mem) for mem in batch],
+                ids=[str(mem.event_id) for mem in batch]
+            )
+            # Persist progress per batch so an interrupted sync resumes here
+            self._sync_watermark = batch[-1].event_id
+            self._save_sync_watermark(self._sync_watermark)
 
-        # Add to vectorstore
-        self.vectorstore.add_documents(documents)
-        print(f"[LangChain] Added {len(documents)} documents to VectorStore")
+        self._synced_memories = memories
 
     def _load_all_memories(self) -> List[Memory]:
-        """Load all memories for this character (same for both implementations)"""
-
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute(f"""
-            SELECT
-                m.event_id,
-                s.event_name,
-                s.event_date,
-                m.absolute_day,
-                m.{self.emotion_col} as own_emotion,
-                m.{self.action_col} as own_action,
-                m.{self.thought_col} as own_thought,
-                m.diary_entry,
-                m.{self.sister1_obs_col} as sister1_observed_behavior,
-                m.{self.sister2_obs_col} as sister2_observed_behavior,
-                m.{self.sister1_inf_col} as sister1_inferred_feeling,
-                m.{self.sister2_inf_col} as sister2_inferred_feeling,
-                m.memory_importance,
-                m.created_at
-            FROM {self.memory_table} m
-            JOIN sister_shared_events s ON m.event_id = s.event_id
-            ORDER BY m.event_id
-        """)
-
-        memories = []
-        for row in cursor.fetchall():
-            memory = Memory(
-                event_id=row['event_id'],
-                event_name=row['event_name'],
-                event_date=row['event_date'],
-                absolute_day=row['absolute_day'],
-                own_emotion=row['own_emotion'] or "",
-                own_action=row['own_action'] or "",
-                own_thought=row['own_thought'] or "",
-                diary_entry=row['diary_entry'] or "",
-                sister1_observed_behavior=row['sister1_observed_behavior'],
-                sister2_observed_behavior=row['sister2_observed_behavior'],
-                sister1_inferred_feeling=row['sister1_inferred_feeling'],
-                sister2_inferred_feeling=row['sister2_inferred_feeling'],
-                sister1_name=self.sister1_name,
-                sister2_name=self.sister2_name,
-                memory_importance=row['memory_importance'] or 5,
-                created_at=row['created_at'] or ""
-            )
-            memories.append(memory)
+        """Load all memories for this character (same for both implementations)
 
-        conn.close()
-        return memories
+        Served from the shared SisterMemoryStore: loaded once per
+        (db, character), then revalidated via PRAGMA data_version.
+        """
+        return self.memory_store.memories()
 
     def retrieve_relevant_memories(
         self,
@@ -333,25 +329,27 @@ Diary: {mem.diary_entry}
         memory importance, and personality affinity.
         """
 
-        all_memories = self._load_all_memories()
-
-        # Calculate relevance for each memory
-        scored_memories = []
-        for memory in all_memories:
-            score = self._calculate_relevance_score(
-                memory=memory,
+        # Vectorized scoring (same weights as _calculate_relevance_score)
+        columns = self.score_columns
+        columns.sync(self._load_all_memories())
+
+        return [
+            MemoryRelevanceScore(
+                memory=columns.memories[i],
+                total_score=total,
+                keyword_match_score=keyword,
+                emotional_similarity_score=emotional,
+                temporal_relevance_score=float(columns.temporal[i]),
+                importance_score=float(columns.importance[i]),
+                personality_affinity_score=float(columns.affinity[i])
+            )
+            for i, total, keyword, emotional in columns.top_k(
                 context=context,
-                current_emotion=current_emotion
+                current_emotion=current_emotion,
+                top_k=top_k,
+                relevance_threshold=relevance_threshold
             )
-
-            if score.total_score >= relevance_threshold:
-                scored_memories.append(score)
-
-        # Sort by total_score descending
-        scored_memories.sort(key=lambda x: x.total_score, reverse=True)
-
-        # Return top_k
-        return scored_memories[:top_k]
+        ]
 
     def _retrieve_with_langchain(
         self,
@@ -366,23 +364,25 @@ Diary: {mem.diary_entry}
         Uses ChromaDB similarity search with Ollama embeddings.
         """
 
+        # Pick up events generated since the last query (no-op if unchanged)
+        self._sync_vectorstore()
+
         # VectorStore similarity search
         docs = self.vectorstore.similarity_search(
             query=context,
             k=top_k * 2  # Fetch more to allow filtering
         )
 
-        # Convert LangChain documents back to Memory objects
-        all_memories = self._load_all_memories()
-        memory_map = {mem.event_id: mem for mem in all_memories}
+        # Rebuild Memory objects from the persisted metadata (no SQLite access).
+        # None values were dropped when indexing, so absent fields were NULL.
+        memory_fields = [f.name for f in fields(Memory)]
 
         scored_memories = []
         for doc in docs:
-            event_id = doc.metadata.get("event_id")
-            if event_id not in memory_map:
+            if "event_id" not in doc.metadata:
                 continue
 
-            memory = memory_map[event_id]
+            memory = Memory(**{k: doc.metadata.get(k) for k in memory_fields})
 
             # Calculate relevance score (using original scoring for consistency)
             # This allows fair comparison: both use same scoring, different retrieval
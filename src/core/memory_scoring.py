@@ -0,0 +1,324 @@
+"""
+Vectorized Memory Relevance Scoring
+
+Columnar (NumPy) version of MemoryRetrievalLogic._calculate_relevance_score.
+Only the keyword term depends on the query; everything else is precomputed
+once per memory and kept in arrays:
+
+- emotion category id (positive / negative / neutral, -1 = no emotion)
+- event date ordinal -> temporal score (recomputed when the date changes)
+- importance (memory_importance / 10)
+- personality affinity (character-specific, query-independent)
+
+Per query: keyword scores from MemoryKeywordIndex + weighted sum +
+partition top-k.
+
+Keyword matching (MemoryKeywordIndex):
+re.findall(r'\\w+', ...) does not segment Japanese, so a query like
+"VTuberになる夢の話" became one "keyword" that never substring-matched any
+memory. Instead, every \\w+ run (NFKC-normalized, lowercased) is split
+into character bigrams (runs of one character stay unigrams), and the
+keyword score is the IDF-weighted share of the query's grams found in a
+memory (0.0-1.0), so particles and other common grams weigh little.
+Postings are stdlib arrays of memory positions; a query only touches the
+posting lists of its own grams.
+
+The other four terms are identical to the per-memory implementation.
+
+Created: 2026-10-19
+"""
+
+import math
+import re
+import unicodedata
+from array import array
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Same weights as _calculate_relevance_score
+WEIGHT_KEYWORD = 0.30
+WEIGHT_EMOTION = 0.25
+WEIGHT_TEMPORAL = 0.15
+WEIGHT_IMPORTANCE = 0.15
+WEIGHT_PERSONALITY = 0.15
+
+POSITIVE_EMOTIONS = ["happy", "excited", "joy", "love", "嬉しい", "楽しい", "ワクワク", "感動"]
+NEGATIVE_EMOTIONS = ["sad", "angry", "fear", "悲しい", "怒り", "不安", "困惑"]
+
+EMOTION_NONE = -1
+EMOTION_POSITIVE = 0
+EMOTION_NEGATIVE = 1
+EMOTION_NEUTRAL = 2
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def categorize_emotion(emotion: str) -> int:
+    """Emotion category id (same rules as _calculate_emotional_similarity)"""
+    if not emotion:
+        return EMOTION_NONE
+    emotion_lower = emotion.lower()
+    if any(e in emotion_lower for e in POSITIVE_EMOTIONS):
+        return EMOTION_POSITIVE
+    if any(e in emotion_lower for e in NEGATIVE_EMOTIONS):
+        return EMOTION_NEGATIVE
+    return EMOTION_NEUTRAL
+
+
+def searchable_fields(memory: Any) -> List[str]:
+    """Fields used for keyword matching"""
+    return [
+        memory.event_name,
+        memory.own_emotion,
+        memory.own_action,
+        memory.own_thought,
+        memory.diary_entry
+    ]
+
+
+def normalize(text: str) -> str:
+    """NFKC + lowercase (full-width alphanumerics, half-width kana)"""
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def query_grams(text: str) -> Set[str]:
+    """Bigrams of every \\w+ run (single-character runs stay unigrams)"""
+    grams = set()
+    for run in _WORD_RE.findall(normalize(text)):
+        if len(run) == 1:
+            grams.add(run)
+        else:
+            grams.update(run[i:i + 2] for i in range(len(run) - 1))
+    return grams
+
+
+def document_grams(texts: Iterable[str]) -> Set[str]:
+    """Unigrams and bigrams of every \\w+ run in the given fields"""
+    grams = set()
+    for text in texts:
+        for run in _WORD_RE.findall(normalize(text)):
+            grams.update(run)
+            grams.update(run[i:i + 2] for i in range(len(run) - 1))
+    return grams
+
+
+class MemoryKeywordIndex:
+    """Append-only n-gram index over memory positions"""
+
+    def __init__(self):
+        self._postings: Dict[str, array] = {}
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def clear(self):
+        self._postings = {}
+        self.size = 0
+
+    def add(self, fields: Iterable[str]) -> int:
+        """Index one memory (event_name / emotion / action / thought / diary)
+
+        Returns:
+            Position of the memory
+        """
+        position = self.size
+        for gram in document_grams(fields):
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = array('i')
+            posting.append(position)
+        self.size += 1
+        return position
+
+    def scores(self, context: str) -> np.ndarray:
+        """Keyword score for every memory (0.0 where nothing matched)
+
+        Args:
+            context: Conversation context (any language)
+
+        Returns:
+            float64 array of length len(self)
+        """
+        grams = query_grams(context)
+        if not grams or self.size == 0:
+            return np.zeros(self.size, dtype=np.float64)
+
+        # IDF over memories; grams that occur nowhere still count in the total
+        total_weight = 0.0
+        positions: List[np.ndarray] = []
+        weights: List[np.ndarray] = []
+        for gram in grams:
+            posting = self._postings.get(gram)
+            df = len(posting) if posting is not None else 0
+            weight = math.log(1.0 + self.size / (df + 0.5))
+            total_weight += weight
+            if df:
+                positions.append(np.array(posting, dtype=np.int64))
+                weights.append(np.full(df, weight))
+
+        if not positions:
+            return np.zeros(self.size, dtype=np.float64)
+        matched = np.bincount(
+            np.concatenate(positions),
+            weights=np.concatenate(weights),
+            minlength=self.size
+        )
+        return matched / total_weight
+
+
+def _date_ordinal(event_date: str) -> int:
+    try:
+        return datetime.strptime(event_date, "%Y-%m-%d").toordinal()
+    except (TypeError, ValueError):
+        return -1
+
+
+class MemoryScoreColumns:
+    """Precomputed columns for one character's memories"""
+
+    def __init__(self, affinity_fn: Callable[[Any], float]):
+        """
+        Args:
+            affinity_fn: Per-memory personality affinity
+                         (MemoryRetrievalLogic._calculate_personality_affinity)
+        """
+        self.affinity_fn = affinity_fn
+        self.memories: List[Any] = []
+        self.emotion_cat = np.empty(0, dtype=np.int8)
+        self.date_ordinal = np.empty(0, dtype=np.int64)
+        self.importance = np.empty(0, dtype=np.float64)
+        self.affinity = np.empty(0, dtype=np.float64)
+        self.temporal = np.empty(0, dtype=np.float64)
+        self._temporal_day: Optional[int] = None
+        self.keyword_index = MemoryKeywordIndex()
+
+    def __len__(self) -> int:
+        return len(self.memories)
+
+    def sync(self, memories: List[Any]):
+        """Bring the columns in line with the store's memory list
+
+        The store replaces its list on every change (copy-on-write), so an
+        identical list object means nothing changed, and a list that starts
+        with the same objects only needs the new tail appended.
+        """
+        if memories is self.memories:
+            return
+        old = self.memories
+        if len(memories) > len(old) and (not old or memories[len(old) - 1] is old[-1]):
+            self._append(memories[len(old):])
+        else:
+            self.memories = []
+            self._reset()
+            self._append(memories)
+        self.memories = memories
+
+    def _reset(self):
+        self.emotion_cat = self.emotion_cat[:0]
+        self.date_ordinal = self.date_ordinal[:0]
+        self.importance = self.importance[:0]
+        self.affinity = self.affinity[:0]
+        self.keyword_index.clear()
+        self._temporal_day = None
+
+    def _append(self, memories: List[Any]):
+        if not memories:
+            return
+        self.emotion_cat = np.concatenate([
+            self.emotion_cat,
+            np.fromiter((categorize_emotion(m.own_emotion) for m in memories), dtype=np.int8, count=len(memories))
+        ])
+        self.date_ordinal = np.concatenate([
+            self.date_ordinal,
+            np.fromiter((_date_ordinal(m.event_date) for m in memories), dtype=np.int64, count=len(memories))
+        ])
+        self.importance = np.concatenate([
+            self.importance,
+            np.fromiter((m.memory_importance / 10.0 for m in memories), dtype=np.float64, count=len(memories))
+        ])
+        self.affinity = np.concatenate([
+            self.affinity,
+            np.fromiter((self.affinity_fn(m) for m in memories), dtype=np.float64, count=len(memories))
+        ])
+
+        for m in memories:
+            self.keyword_index.add(searchable_fields(m))
+        self._temporal_day = None
+
+    def _refresh_temporal(self):
+        """Recompute temporal scores once per calendar day"""
+        today = date.today().toordinal()
+        if self._temporal_day == today and len(self.temporal) == len(self.date_ordinal):
+            return
+        days_ago = (today - self.date_ordinal).astype(np.float64)
+        decayed = np.maximum(0.1, 1.0 / (1.0 + days_ago / 365.0))
+        self.temporal = np.where(self.date_ordinal >= 0, decayed, 0.5)
+        self._temporal_day = today
+
+    def keyword_scores(self, context: str) -> np.ndarray:
+        """Keyword match score per memory (n-gram index, see MemoryKeywordIndex)"""
+        return self.keyword_index.scores(context)
+
+    def emotion_scores(self, current_emotion: Optional[str]) -> np.ndarray:
+        """Emotional similarity per memory (same as _calculate_emotional_similarity)"""
+        if not current_emotion:
+            return np.full(len(self.memories), 0.5)
+        current = categorize_emotion(current_emotion)
+        return np.where(
+            self.emotion_cat == EMOTION_NONE,
+            0.5,
+            np.where(self.emotion_cat == current, 1.0, 0.3)
+        )
+
+    def score(
+        self,
+        context: str,
+        current_emotion: Optional[str] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Total score for every memory
+
+        Returns:
+            (total, keyword, emotional) arrays
+        """
+        self._refresh_temporal()
+        keyword = self.keyword_scores(context)
+        emotional = self.emotion_scores(current_emotion)
+        total = (
+            keyword * WEIGHT_KEYWORD +
+            emotional * WEIGHT_EMOTION +
+            self.temporal * WEIGHT_TEMPORAL +
+            self.importance * WEIGHT_IMPORTANCE +
+            self.affinity * WEIGHT_PERSONALITY
+        )
+        return total, keyword, emotional
+
+    def top_k(
+        self,
+        context: str,
+        current_emotion: Optional[str] = None,
+        top_k: int = 5,
+        relevance_threshold: float = 0.3
+    ) -> List[Tuple[int, float, float, float]]:
+        """Top-k memories above the threshold
+
+        Returns:
+            [(position, total, keyword, emotional), ...] by total descending
+            (ties keep event_id order, like the stable sort it replaces)
+        """
+        if not self.memories or top_k <= 0:
+            return []
+        total, keyword, emotional = self.score(context, current_emotion)
+
+        candidates = np.flatnonzero(total >= relevance_threshold)
+        if len(candidates) > top_k:
+            scores = total[candidates]
+            kth = -np.partition(-scores, top_k - 1)[top_k - 1]
+            # Everything above the k-th score, then ties in event_id order
+            above = candidates[scores > kth]
+            ties = candidates[scores == kth][:top_k - len(above)]
+            candidates = np.sort(np.concatenate([above, ties]))
+        order = candidates[np.argsort(-total[candidates], kind='stable')]
+        return [(int(i), float(total[i]), float(keyword[i]), float(emotional[i])) for i in order]
@@ -0,0 +1,196 @@
+"""
+Sister Memory Store
+
+Shared, per-(db, character) in-memory cache of `{character}_memories JOIN
+sister_shared_events`, used by MemoryRetrievalLogic / MemoryRetrievalLogicDual
+and ConversationHandler instead of reloading SQLite on every query.
+
+Revalidation (cheap, once per access):
+- os.stat(): file replaced (inode/device changed) -> reopen + full reload
+- PRAGMA data_version: changes only when another connection commits
+  -> load rows with event_id above the watermark (new events are appended)
+  -> full reload if the row count no longer matches (rows deleted/rewritten)
+- full_reload_interval: periodic full reload to pick up in-place UPDATEs
+
+Created: 2026-10-19
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+# character -> (own emotion/action/thought columns, sister1, sister2)
+CHARACTER_COLUMNS = {
+    "botan": ("botan", "kasho", "yuri"),
+    "kasho": ("kasho", "botan", "yuri"),
+    "yuri": ("yuri", "kasho", "botan"),
+}
+
+
+class SisterMemoryStore:
+    """Cached memories for one (db, character) pair"""
+
+    def __init__(
+        self,
+        db_path: str,
+        character: str,
+        memory_cls: Type,
+        full_reload_interval: float = 3600.0
+    ):
+        """
+        Args:
+            db_path: Path to sisters_memory.db
+            character: Character name ("botan", "kasho", "yuri")
+            memory_cls: Memory dataclass to build (same fields in every module)
+            full_reload_interval: Seconds between full reloads (in-place UPDATEs)
+        """
+        self.db_path = db_path
+        self.character = character
+        self.memory_cls = memory_cls
+        self.full_reload_interval = full_reload_interval
+
+        own, self.sister1_name, self.sister2_name = CHARACTER_COLUMNS[character]
+        self.memory_table = f"{own}_memories"
+        self._select = f"""
+            SELECT
+                m.event_id,
+                s.event_name,
+                s.event_date,
+                m.absolute_day,
+                m.{own}_emotion as own_emotion,
+                m.{own}_action as own_action,
+                m.{own}_thought as own_thought,
+                m.diary_entry,
+                m.{self.sister1_name}_observed_behavior as sister1_observed_behavior,
+                m.{self.sister2_name}_observed_behavior as sister2_observed_behavior,
+                m.{self.sister1_name}_inferred_feeling as sister1_inferred_feeling,
+                m.{self.sister2_name}_inferred_feeling as sister2_inferred_feeling,
+                m.memory_importance,
+                m.created_at
+            FROM {self.memory_table} m
+            JOIN sister_shared_events s ON m.event_id = s.event_id
+            WHERE m.event_id > ?
+            ORDER BY m.event_id
+        """
+        self._count = f"""
+            SELECT COUNT(*)
+            FROM {self.memory_table} m
+            JOIN sister_shared_events s ON m.event_id = s.event_id
+        """
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._file_id: Optional[Tuple[int, int]] = None
+        self._data_version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._memories: List[Any] = []
+        self._by_id: Dict[int, Any] = {}
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is not None:
+            self._conn.close()
+        # Read-only: never create an empty database at a wrong path
+        self._conn = sqlite3.connect(
+            f"file:{os.path.abspath(self.db_path)}?mode=ro",
+            uri=True,
+            check_same_thread=False
+        )
+        self._conn.row_factory = sqlite3.Row
+
+    def _build(self, row: sqlite3.Row):
+        return self.memory_cls(
+            event_id=row['event_id'],
+            event_name=row['event_name'],
+            event_date=row['event_date'],
+            absolute_day=row['absolute_day'],
+            own_emotion=row['own_emotion'] or "",
+            own_action=row['own_action'] or "",
+            own_thought=row['own_thought'] or "",
+            diary_entry=row['diary_entry'] or "",
+            sister1_observed_behavior=row['sister1_observed_behavior'],
+            sister2_observed_behavior=row['sister2_observed_behavior'],
+            sister1_inferred_feeling=row['sister1_inferred_feeling'],
+            sister2_inferred_feeling=row['sister2_inferred_feeling'],
+            sister1_name=self.sister1_name,
+            sister2_name=self.sister2_name,
+            memory_importance=row['memory_importance'] or 5,
+            created_at=row['created_at'] or ""
+        )
+
+    def _load_since(self, event_id: int) -> List[Any]:
+        return [self._build(row) for row in self._conn.execute(self._select, (event_id,))]
+
+    def _full_reload(self):
+        self._connect()
+        memories = self._load_since(-1)
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        self._memories = memories
+        self._by_id = {m.event_id: m for m in memories}
+        self._loaded_at = time.monotonic()
+
+    def _revalidate(self):
+        stat = os.stat(self.db_path)
+        file_id = (stat.st_dev, stat.st_ino)
+        if (
+            self._conn is None
+            or file_id != self._file_id
+            or time.monotonic() - self._loaded_at > self.full_reload_interval
+        ):
+            self._file_id = file_id
+            self._full_reload()
+            return
+
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return
+        self._data_version = data_version
+
+        watermark = self._memories[-1].event_id if self._memories else -1
+        new = self._load_since(watermark)
+        count = self._conn.execute(self._count).fetchone()[0]
+        if count != len(self._memories) + len(new):
+            # Rows were deleted or inserted below the watermark
+            self._full_reload()
+            return
+        if new:
+            # Copy-on-write: lists already handed out stay unchanged
+            by_id = dict(self._by_id)
+            by_id.update((m.event_id, m) for m in new)
+            self._memories = self._memories + new
+            self._by_id = by_id
+            print(f"[SisterMemoryStore] {self.character}: +{len(new)} memories (total {len(self._memories)})")
+
+    def memories(self) -> List[Any]:
+        """All memories ordered by event_id (treat as read-only)"""
+        with self._lock:
+            self._revalidate()
+            return self._memories
+
+    def memory_map(self) -> Dict[int, Any]:
+        """event_id -> memory (treat as read-only)"""
+        with self._lock:
+            self._revalidate()
+            return self._by_id
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_stores: Dict[Tuple[str, str, Type], SisterMemoryStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_memory_store(db_path: str, character: str, memory_cls: Type) -> SisterMemoryStore:
+    """Shared store for (db_path, character, memory_cls)"""
+    key = (os.path.abspath(db_path), character, memory_cls)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = SisterMemoryStore(db_path, character, memory_cls)
+            _stores[key] = store
+        return store
@@ -166,7 +166,7 @@ class ConversationHandler:
         if not retriever:
             return ""
 
-        # 全記憶を取得
+        # 全記憶を取得（SisterMemoryStoreの共有キャッシュ。DB変更時のみ差分読み込み）
         all_memories = retriever._load_all_memories()
         if not all_memories:
             return ""
@@ -5,13 +5,17 @@ WebSearchを使って未知の単語のセンシティブ度を動的に判定
 検出したNGワードをDBに登録して学習
 """
 
+import atexit
 import sqlite3
 import logging
 import re
+import threading
 from pathlib import Path
-from typing import Dict, Optional, List, Callable
+from typing import Any, Dict, Optional, List, Callable, Tuple
 from datetime import datetime
 
+from ..core.detection_log import DetectionLogWriter, load_statistics
+
 logger = logging.getLogger(__name__)
 
 
@@ -32,7 +36,9 @@ class DynamicSensitiveDetector:
         self,
         db_path: Optional[str] = None,
         websearch_func: Optional[Callable] = None,
-        enable_websearch: bool = True
+        enable_websearch: bool = True,
+        log_batch_size: int = 200,
+        log_flush_interval: float = 1.0
     ):
         """初期化
 
@@ -40,6 +46,8 @@ class DynamicSensitiveDetector:
             db_path: データベースパス
             websearch_func: WebSearch関数（Claude Code提供）
             enable_websearch: WebSearch機能を有効化するか
+            log_batch_size: 検出ログを1トランザクションで書き込む最大件数
+            log_flush_interval: 検出ログを書き込むまでの最大待ち時間（秒）
         """
         if db_path is None:
             db_path = Path(__file__).parent / "database" / "sensitive_filter.db"
@@ -47,6 +55,12 @@ class DynamicSensitiveDetector:
         self.db_path = str(db_path)
         self.websearch_func = websearch_func
         self.enable_websearch = enable_websearch
+        self.log_batch_size = log_batch_size
+        self.log_flush_interval = log_flush_interval
+
+        # 検出ログのwrite-behind書き込み（初回の log_detection で起動）
+        self._log_writer: Optional[DetectionLogWriter] = None
+        self._log_writer_lock = threading.Lock()
 
         # センシティブ判定キーワード（WebSearch結果の分析用）
         self.sensitive_keywords = {
@@ -131,42 +145,71 @@ class DynamicSensitiveDetector:
 
         logger.info(f"Checking word sensitivity via WebSearch: {word}")
 
-        # WebSearchクエリを構築
-        # 注意: センシティブキーワードを含めた検索を行うため、検索バイアスが存在する
-        # この手法の限界:
-        #   1. 検索エンジンが強引に関連記事を探してしまう（False Positive のリスク）
-        #   2. 無関係なワードでもセンシティブと誤判定される可能性
-        #   3. Layer 4（LLM判定）での補正を前提とした設計
-        queries = [
+        results = []
+        for query in self.build_queries(word):
+            try:
+                # WebSearch実行
+                results.append((query, self.websearch_func(query)))
+            except Exception as e:
+                logger.error(f"WebSearch failed: {e}")
+                continue
+
+        return self.analyze_search_results(word, results)
+
+    def build_queries(self, word: str) -> List[str]:
+        """単語の判定に使うWebSearchクエリ
+
+        注意: センシティブキーワードを含めた検索を行うため、検索バイアスが存在する
+        この手法の限界:
+          1. 検索エンジンが強引に関連記事を探してしまう（False Positive のリスク）
+          2. 無関係なワードでもセンシティブと誤判定される可能性
+          3. Layer 4（LLM判定）での補正を前提とした設計
+
+        Args:
+            word: チェック対象単語
+
+        Returns:
+            クエリのリスト
+        """
+        return [
             f"{word} セクハラ VTuber",
             f"{word} 不適切 配信",
             f"{word} ハラスメント"
         ]
 
+    def analyze_search_results(
+        self,
+        word: str,
+        results: List[Tuple[str, Optional[str]]]
+    ) -> Optional[Dict]:
+        """WebSearch結果から単語のセンシティブ度を判定
+
+        Args:
+            word: チェック対象単語
+            results: [(クエリ, 検索結果), ...]（build_queries() の順、結果なしはNone）
+
+        Returns:
+            check_word_sensitivity() と同じ形式（センシティブでない場合None）
+        """
         evidence_texts = []
         detected_category = None
         detected_subcategory = None
         max_severity = 0
 
-        for query in queries:
-            try:
-                # WebSearch実行
-                result = self.websearch_func(query)
-                evidence_texts.append(f"Query: {query}\nResult: {result[:200]}...")
-
-                # 結果からセンシティブキーワードを検出
-                for category, keywords in self.sensitive_keywords.items():
-                    for keyword in keywords:
-                        if keyword.lower() in result.lower():
-                            if detected_category is None:
-                                detected_category = category
-                                detected_subcategory = self._infer_subcategory(word, result, category)
-                                max_severity = self._estimate_severity(category, result)
-                            break
-
-            except Exception as e:
-                logger.error(f"WebSearch failed: {e}")
+        for query, result in results:
+            if result is None:
                 continue
+            evidence_texts.append(f"Query: {query}\nResult: {result[:200]}...")
+
+            # 結果からセンシティブキーワードを検出
+            for category, keywords in self.sensitive_keywords.items():
+                for keyword in keywords:
+                    if keyword.lower() in result.lower():
+                        if detected_category is None:
+                            detected_category = category
+                            detected_subcategory = self._infer_subcategory(word, result, category)
+                            max_severity = self._estimate_severity(category, result)
+                        break
 
         if detected_category:
             return {
@@ -284,32 +327,100 @@ class DynamicSensitiveDetector:
             logger.error(f"Failed to register NG word: {e}")
             return False
 
-    def log_detection(self, text: str, detected_words: List[str], action: str):
-        """検出結果をDBに記録
+    def log_detection(
+        self,
+        text: str,
+        detected_words: List[str],
+        action: str,
+        categories: Optional[List[str]] = None,
+        tier: Optional[str] = None,
+        sensitivity_score: Optional[float] = None
+    ):
+        """検出結果をDBに記録（キューに積むだけで、書き込みはバックグラウンドでまとめて行う）
+
+        comment_log への追加と同時に filter_statistics（日別）・
+        filter_statistics_categories（日別×カテゴリ別）の集計も更新される
 
         Args:
             text: 判定対象テキスト
             detected_words: 検出されたNGワード
             action: 実行されたアクション
+            categories: 検出カテゴリ（カテゴリ別集計用）
+            tier: 判定Tier（Critical → tier1, Warning → tier2 として集計）
+            sensitivity_score: センシティブ度スコア（0.0-1.0）
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            writer = self._get_log_writer()
+            tier_column = {'Critical': 'tier1', 'Warning': 'tier2'}.get(tier)
+
+            queued = writer.log(
+                {
+                    'original_comment': text[:500],  # 最初の500文字
+                    'detected_words': ','.join(detected_words),
+                    'action_taken': action,
+                    'sensitivity_score': sensitivity_score,
+                    'platform': 'line_bot',
+                    'notes': 'Detected by DynamicSensitiveDetector'
+                },
+                {
+                    'action': action,
+                    'sensitivity_score': sensitivity_score,
+                    'tiers': [tier_column] * len(detected_words) if tier_column else [],
+                    'categories': list(categories or [])
+                }
+            )
+            if not queued:
+                logger.warning(f"検出ログのキューが満杯のため破棄: {text[:50]}")
 
-            cursor.execute("""
-                INSERT INTO comment_log
-                (original_comment, detected_words, action_taken, platform, notes)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                text[:500],  # 最初の500文字
-                ','.join(detected_words),
-                action,
-                'line_bot',
-                'Detected by DynamicSensitiveDetector'
-            ))
+        except Exception as e:
+            logger.error(f"Failed to log detection: {e}")
 
-            conn.commit()
-            conn.close()
+    def _get_log_writer(self) -> DetectionLogWriter:
+        with self._log_writer_lock:
+            if self._log_writer is None:
+                self._log_writer = DetectionLogWriter(
+                    self.db_path,
+                    batch_size=self.log_batch_size,
+                    flush_interval=self.log_flush_interval
+                )
+                # 終了時に未書き込みの検出ログを書き出す
+                atexit.register(self._log_writer.close)
+            return self._log_writer
+
+    def flush_logs(self):
+        """キューにある検出ログを書き込む（書き込み完了まで待つ）"""
+        if self._log_writer:
+            self._log_writer.flush()
+
+    def close(self):
+        """検出ログを書き出して書き込みスレッドを停止"""
+        if self._log_writer:
+            self._log_writer.close()
+
+    def get_statistics(self, days: int = 7) -> Dict[str, Any]:
+        """検出統計（filter_statistics の集計済みの値を読むだけで、comment_log は走査しない）
+
+        Args:
+            days: 集計対象の日数（今日を含む）
 
+        Returns:
+            {
+                'daily': [日別集計, ...],
+                'categories': {カテゴリ: {'detections': int, 'comments': int}, ...},
+                'total_comments': int,
+                'log_writer': 書き込みキューの状態 or None
+            }
+        """
+        self.flush_logs()
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                stats = load_statistics(conn, days)
+            finally:
+                conn.close()
         except Exception as e:
-            logger.error(f"Failed to log detection: {e}")
+            logger.error(f"Failed to load statistics: {e}")
+            stats = {'daily': [], 'categories': {}, 'total_comments': 0}
+
+        stats['log_writer'] = self._log_writer.get_stats() if self._log_writer else None
+        return stats
@@ -11,11 +11,13 @@ Integrated Sensitive Detector
 """
 
 import logging
+import time
 from typing import Dict, List, Optional
 from pathlib import Path
 
 from src.line_bot.sensitive_handler import SensitiveHandler
 from src.line_bot.llm_context_judge import LLMContextJudge
+from src.line_bot.verdict_cache import VerdictCache
 from src.core.llm_provider import BaseLLMProvider
 
 logger = logging.getLogger(__name__)
@@ -33,13 +35,19 @@ class IntegratedSensitiveDetector:
     def __init__(
         self,
         llm_provider: BaseLLMProvider,
-        enable_layer4: bool = True
+        enable_layer4: bool = True,
+        verdict_cache: Optional[VerdictCache] = None,
+        batch_size: int = 10,
+        max_concurrency: int = 4
     ):
         """初期化
 
         Args:
             llm_provider: LLMプロバイダー（Layer 4用）
             enable_layer4: Layer 4（LLM判定）を有効化するか
+            verdict_cache: Layer 4判定結果のキャッシュ（Noneの場合はキャッシュしない）
+            batch_size: detect_batch で1プロンプトにまとめる件数
+            max_concurrency: detect_batch で並行に実行するLLM呼び出し数
         """
         # Layer 1: 静的パターンマッチング
         self.static_handler = SensitiveHandler()
@@ -47,7 +55,12 @@ class IntegratedSensitiveDetector:
         # Layer 4: LLM文脈判定
         self.enable_layer4 = enable_layer4
         if enable_layer4:
-            self.llm_judge = LLMContextJudge(llm_provider)
+            self.llm_judge = LLMContextJudge(
+                llm_provider,
+                verdict_cache=verdict_cache,
+                batch_size=batch_size,
+                max_concurrency=max_concurrency
+            )
         else:
             self.llm_judge = None
 
@@ -81,18 +94,45 @@ class IntegratedSensitiveDetector:
         """
         logger.info(f"Integrated detection start: text_length={len(text)}, use_layer4={use_layer4}")
 
-        detection_layers = []
-
         # ===== Layer 1: 静的パターンマッチング =====
         layer1_result = self.static_handler.check(text)
         detected_words = layer1_result.get("matched_patterns", [])
 
         if detected_words:
-            detection_layers.append("layer1")
             logger.info(f"Layer 1 detected: {detected_words}")
 
         # ===== Layer 4: LLM文脈判定（最終防壁） =====
+        # Layer 1で何か検出された場合のみLayer 4を実行
         layer4_result = None
+        layer4_error = None
+        if self._needs_layer4(detected_words, use_layer4):
+            try:
+                layer4_result = self.llm_judge.judge_with_context(
+                    text=text,
+                    detected_words=detected_words,
+                    detection_method="static_pattern"
+                )
+            except Exception as e:
+                layer4_error = e
+
+        return self._build_result(layer1_result, detected_words, use_layer4, layer4_result, layer4_error)
+
+    def _needs_layer4(self, detected_words: List[str], use_layer4: bool) -> bool:
+        return bool(use_layer4 and self.enable_layer4 and self.llm_judge and detected_words)
+
+    def _build_result(
+        self,
+        layer1_result: Dict,
+        detected_words: List[str],
+        use_layer4: bool,
+        layer4_result: Optional[Dict],
+        layer4_error: Optional[Exception] = None
+    ) -> Dict:
+        """Layer 1 / Layer 4 の結果から最終判定を組み立てる"""
+        detection_layers = []
+        if detected_words:
+            detection_layers.append("layer1")
+
         final_tier = layer1_result["tier"]
         final_confidence = layer1_result.get("risk_score", 0.5)
 
@@ -108,16 +148,12 @@ class IntegratedSensitiveDetector:
         reason = layer1_result.get("reasoning", "")
         final_judgment = "Layer 1のみ（静的パターンマッチング）"
 
-        if use_layer4 and self.enable_layer4 and self.llm_judge and detected_words:
-            # Layer 1で何か検出された場合のみLayer 4を実行
+        if self._needs_layer4(detected_words, use_layer4):
             detection_layers.append("layer4")
 
             try:
-                layer4_result = self.llm_judge.judge_with_context(
-                    text=text,
-                    detected_words=detected_words,
-                    detection_method="static_pattern"
-                )
+                if layer4_error is not None:
+                    raise layer4_error
 
                 # Layer 4の判定を最終結果として採用
                 if layer4_result["false_positive"]:
@@ -183,10 +219,45 @@ class IntegratedSensitiveDetector:
         Returns:
             判定結果のリスト
         """
-        results = []
-        for text in texts:
-            result = self.detect(text, use_layer4=use_layer4)
-            results.append(result)
+        started = time.perf_counter()
+
+        # Layer 1（静的パターン）は全件
+        layer1_results = [self.static_handler.check(text) for text in texts]
+        detected_words_list = [r.get("matched_patterns", []) for r in layer1_results]
+
+        # Layer 4 は検出があった件だけをまとめてバルク判定
+        flagged = [i for i, words in enumerate(detected_words_list) if self._needs_layer4(words, use_layer4)]
+        layer4_results: Dict[int, Dict] = {}
+        layer4_error = None
+        if flagged:
+            try:
+                judged = self.llm_judge.bulk_judge(
+                    [texts[i] for i in flagged],
+                    [detected_words_list[i] for i in flagged],
+                    detection_method="static_pattern"
+                )
+                layer4_results = dict(zip(flagged, judged))
+            except Exception as e:
+                logger.error(f"Layer 4 batch judgment failed: {e}")
+                layer4_error = e
+
+        results = [
+            self._build_result(
+                layer1_results[i],
+                detected_words_list[i],
+                use_layer4,
+                layer4_results.get(i),
+                layer4_error if i in flagged else None
+            )
+            for i in range(len(texts))
+        ]
+
+        elapsed = time.perf_counter() - started
+        if texts:
+            logger.info(
+                f"Batch detection: {len(texts)} texts, {len(flagged)} sent to Layer 4, "
+                f"{len(texts) / elapsed:.1f} texts/s"
+            )
 
         return results
 
@@ -205,7 +276,12 @@ class IntegratedSensitiveDetector:
             "layer1_patterns": len(self.static_handler.ng_patterns),
             "layer4_enabled": self.enable_layer4,
             "llm_provider": self.llm_judge.llm_provider.get_provider_name() if self.llm_judge else None,
-            "llm_model": self.llm_judge.llm_provider.get_model_name() if self.llm_judge else None
+            "llm_model": self.llm_judge.llm_provider.get_model_name() if self.llm_judge else None,
+            "layer4_bulk": self.llm_judge.get_bulk_stats() if self.llm_judge else None,
+            "verdict_cache": (
+                self.llm_judge.verdict_cache.get_stats()
+                if self.llm_judge and self.llm_judge.verdict_cache else None
+            )
         }
 
         return stats
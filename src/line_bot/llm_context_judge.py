@@ -7,15 +7,29 @@ WebSearchによる誤検知を補正し、文脈を考慮した高精度判定
 - Layer 3（WebSearch）は補助的な役割
 - Layer 4（LLM判定）が最終防壁として機能
 - False Positive（誤検知）を減らし、文脈を考慮した判定を実現
+
+バルク判定:
+- 複数の (text, detected_words) を1つのJSON配列プロンプトにまとめて判定
+- バッチ間は max_concurrency 件まで並行にLLMを呼ぶ
+- VerdictCache を渡すと、同じ文言・検出ワードの判定結果を再利用する
 """
 
 import json
 import logging
-from typing import Dict, List, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from src.core.llm_provider import BaseLLMProvider
+from src.line_bot.verdict_cache import VerdictCache
 
 logger = logging.getLogger(__name__)
 
+# プロンプト（判定基準・出力形式）を変更したら上げる（キャッシュキーに含まれる）
+PROMPT_VERSION = "layer4-v1"
+
+REQUIRED_FIELDS = ["is_sensitive", "confidence", "reason", "recommended_action"]
+
 
 class LLMContextJudge:
     """Layer 4: LLM文脈判定
@@ -24,13 +38,30 @@ class LLMContextJudge:
     本当にセンシティブかを文脈を考慮して判定する
     """
 
-    def __init__(self, llm_provider: BaseLLMProvider):
+    def __init__(
+        self,
+        llm_provider: BaseLLMProvider,
+        verdict_cache: Optional[VerdictCache] = None,
+        batch_size: int = 10,
+        max_concurrency: int = 4
+    ):
         """初期化
 
         Args:
             llm_provider: LLMプロバイダー（Ollama, OpenAI, Gemini等）
+            verdict_cache: 判定結果キャッシュ（Noneの場合はキャッシュしない）
+            batch_size: バルク判定で1プロンプトにまとめる件数
+            max_concurrency: バルク判定で並行に実行するLLM呼び出し数
         """
         self.llm_provider = llm_provider
+        self.verdict_cache = verdict_cache
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        # モデルが変われば判定も変わるのでキャッシュキーに含める
+        self.prompt_version = f"{PROMPT_VERSION}:{llm_provider.get_provider_name()}/{llm_provider.get_model_name()}"
+        self.bulk_stats = {"items": 0, "cache_hits": 0, "llm_calls": 0, "elapsed": 0.0}
+        # bulk_judge は複数スレッドから呼ばれうるので統計の更新はロック下で行う
+        self._lock = threading.Lock()
         logger.info(f"LLMContextJudge initialized with provider: {llm_provider.get_provider_name()}")
 
     def judge_with_context(
@@ -58,6 +89,30 @@ class LLMContextJudge:
         """
         logger.info(f"LLM context judgment: text_length={len(text)}, detected_words={detected_words}")
 
+        key = None
+        if self.verdict_cache:
+            key = self.verdict_cache.make_key(text, detected_words, self.prompt_version)
+            cached = self.verdict_cache.get_many([key])
+            if key in cached:
+                logger.info("LLM judgment cache hit")
+                return cached[key]
+
+        result, ok = self._judge_single(text, detected_words, detection_method)
+        if ok and key:
+            self.verdict_cache.put_many([self._cache_entry(key, result)])
+        return result
+
+    def _judge_single(
+        self,
+        text: str,
+        detected_words: List[str],
+        detection_method: str
+    ) -> Tuple[Dict, bool]:
+        """1件をLLMで判定
+
+        Returns:
+            (判定結果, LLMの判定として有効か)  失敗時は安全側の結果とFalse
+        """
         # プロンプト生成
         system_prompt = self._build_system_prompt()
         user_prompt = self._build_user_prompt(text, detected_words, detection_method)
@@ -72,23 +127,39 @@ class LLMContextJudge:
             )
 
             # レスポンスをパース
-            result = self._parse_llm_response(response.content)
+            try:
+                result = self._validate_verdict(json.loads(self._extract_json_text(response.content)))
+                ok = True
+            except (json.JSONDecodeError, ValueError) as e:
+                result = self._parse_error_result(e, response.content)
+                ok = False
 
             logger.info(f"LLM judgment result: is_sensitive={result['is_sensitive']}, confidence={result['confidence']}")
 
-            return result
+            return result, ok
 
         except Exception as e:
             logger.error(f"LLM judgment failed: {e}")
             # LLM判定失敗時はLayer 1-3の判定を信頼
-            return {
-                "is_sensitive": True,  # 安全側に倒す
-                "confidence": 0.5,
-                "reason": f"LLM判定失敗、Layer 1-3の判定を採用: {str(e)}",
-                "recommended_action": "warn",
-                "false_positive": False,
-                "context_analysis": "LLM判定エラー"
-            }
+            return self._failure_result(e), False
+
+    def _failure_result(self, error: Exception) -> Dict:
+        """LLM呼び出し失敗時の判定結果（安全側）"""
+        return {
+            "is_sensitive": True,  # 安全側に倒す
+            "confidence": 0.5,
+            "reason": f"LLM判定失敗、Layer 1-3の判定を採用: {str(error)}",
+            "recommended_action": "warn",
+            "false_positive": False,
+            "context_analysis": "LLM判定エラー"
+        }
+
+    def _cache_entry(self, key: str, verdict: Dict) -> Dict:
+        return {
+            "key": key,
+            "prompt_version": self.prompt_version,
+            "verdict": verdict
+        }
 
     def _build_system_prompt(self) -> str:
         """システムプロンプト生成"""
@@ -153,76 +224,202 @@ class LLMContextJudge:
 
 JSON形式で返してください（余計な説明は不要）:"""
 
-    def _parse_llm_response(self, response_text: str) -> Dict:
-        """LLMレスポンスをパースしてDict化
+    def _build_batch_prompt(self, items: List[Tuple[str, List[str], str]]) -> str:
+        """バッチ判定用ユーザープロンプト生成"""
+        messages = [
+            {
+                "id": i,
+                "text": text,
+                "detected_words": detected_words or [],
+                "detection_method": detection_method
+            }
+            for i, (text, detected_words, detection_method) in enumerate(items)
+        ]
+        return f"""以下の{len(items)}件のメッセージをそれぞれ判定してください。
 
-        Args:
-            response_text: LLMからのレスポンステキスト
+**メッセージ一覧（JSON）**:
+{json.dumps(messages, ensure_ascii=False)}
 
-        Returns:
-            パースされた判定結果
-        """
-        try:
-            # JSON部分を抽出（コードブロック内の場合）
-            if "```json" in response_text:
-                start = response_text.find("```json") + 7
-                end = response_text.find("```", start)
-                json_text = response_text[start:end].strip()
-            elif "```" in response_text:
-                start = response_text.find("```") + 3
-                end = response_text.find("```", start)
-                json_text = response_text[start:end].strip()
-            else:
-                json_text = response_text.strip()
-
-            # JSON パース
-            result = json.loads(json_text)
+各メッセージを他のメッセージと独立に、上記のシステムプロンプトの基準に従って判定してください。
+文脈を最優先で考慮し、誤検知の可能性も検討してください。
 
-            # 必須フィールドの検証
-            required_fields = ["is_sensitive", "confidence", "reason", "recommended_action"]
-            for field in required_fields:
-                if field not in result:
-                    raise ValueError(f"Missing required field: {field}")
+各メッセージの判定結果（システムプロンプトの出力形式）に対応する "id" を加え、
+{len(items)}件のJSON配列で返してください（余計な説明は不要）:"""
+
+    def _extract_json_text(self, response_text: str) -> str:
+        """JSON部分を抽出（コードブロック内の場合）"""
+        if "```json" in response_text:
+            start = response_text.find("```json") + 7
+            end = response_text.find("```", start)
+            return response_text[start:end].strip()
+        elif "```" in response_text:
+            start = response_text.find("```") + 3
+            end = response_text.find("```", start)
+            return response_text[start:end].strip()
+        return response_text.strip()
+
+    def _validate_verdict(self, result) -> Dict:
+        """必須フィールドの検証とデフォルト値の設定"""
+        if not isinstance(result, dict):
+            raise ValueError(f"Verdict is not an object: {type(result).__name__}")
+        for field in REQUIRED_FIELDS:
+            if field not in result:
+                raise ValueError(f"Missing required field: {field}")
+
+        if "false_positive" not in result:
+            result["false_positive"] = False
+        if "context_analysis" not in result:
+            result["context_analysis"] = result.get("reason", "")
+        return result
+
+    def _parse_error_result(self, error: Exception, response_text: str) -> Dict:
+        """パース失敗時の判定結果（安全側）"""
+        logger.error(f"Failed to parse LLM response: {error}")
+        logger.debug(f"Response text: {response_text}")
+        return {
+            "is_sensitive": True,
+            "confidence": 0.5,
+            "reason": f"LLMレスポンスのパース失敗: {str(error)}",
+            "recommended_action": "warn",
+            "false_positive": False,
+            "context_analysis": "パースエラー"
+        }
+
+    def _judge_batch(self, items: List[Tuple[str, List[str], str]]) -> Tuple[List[Tuple[Dict, bool]], int]:
+        """1プロンプトで複数件を判定
+
+        配列に含まれなかった件・不正な件は1件ずつ判定し直す。
 
-            # デフォルト値の設定
-            if "false_positive" not in result:
-                result["false_positive"] = False
-            if "context_analysis" not in result:
-                result["context_analysis"] = result.get("reason", "")
+        Returns:
+            ([(判定結果, 有効か), ...], LLM呼び出し回数)
+        """
+        if len(items) == 1:
+            return [self._judge_single(*items[0])], 1
 
-            return result
+        try:
+            response = self.llm_provider.generate(
+                prompt=self._build_batch_prompt(items),
+                system_prompt=self._build_system_prompt(),
+                temperature=0.3,
+                max_tokens=200 + 300 * len(items)
+            )
+        except Exception as e:
+            logger.error(f"LLM batch judgment failed: {e}")
+            return [(self._failure_result(e), False) for _ in items], 1
 
+        verdicts: Dict[int, Dict] = {}
+        try:
+            parsed = json.loads(self._extract_json_text(response.content))
+            if not isinstance(parsed, list):
+                raise ValueError("Batch response is not a JSON array")
+            for entry in parsed:
+                try:
+                    index = int(entry.get("id"))
+                    verdict = self._validate_verdict({k: v for k, v in entry.items() if k != "id"})
+                except (AttributeError, TypeError, ValueError):
+                    continue
+                if 0 <= index < len(items):
+                    verdicts[index] = verdict
         except (json.JSONDecodeError, ValueError) as e:
-            logger.error(f"Failed to parse LLM response: {e}")
-            logger.debug(f"Response text: {response_text}")
-
-            # パース失敗時は安全側に倒す
-            return {
-                "is_sensitive": True,
-                "confidence": 0.5,
-                "reason": f"LLMレスポンスのパース失敗: {str(e)}",
-                "recommended_action": "warn",
-                "false_positive": False,
-                "context_analysis": "パースエラー"
-            }
+            logger.warning(f"Failed to parse batch response, judging items one by one: {e}")
+
+        results = []
+        calls = 1
+        for i, item in enumerate(items):
+            if i in verdicts:
+                results.append((verdicts[i], True))
+            else:
+                results.append(self._judge_single(*item))
+                calls += 1
+        return results, calls
 
     def bulk_judge(
         self,
         texts: List[str],
-        detected_words_list: List[List[str]]
+        detected_words_list: List[List[str]],
+        detection_method: str = "unknown"
     ) -> List[Dict]:
         """複数テキストをまとめて判定
 
+        キャッシュにない件を batch_size 件ずつ1プロンプトにまとめ、
+        最大 max_concurrency 件のLLM呼び出しを並行に実行する。
+        同じ文言・検出ワードの件は1回だけ判定する。
+
         Args:
             texts: 判定対象テキストのリスト
             detected_words_list: 各テキストで検出されたNGワードのリスト
+            detection_method: 検出方法
 
         Returns:
-            判定結果のリスト
+            判定結果のリスト（textsと同じ順）
         """
-        results = []
-        for text, detected_words in zip(texts, detected_words_list):
-            result = self.judge_with_context(text, detected_words)
-            results.append(result)
+        started = time.perf_counter()
+        items = [
+            (text, detected_words or [], detection_method)
+            for text, detected_words in zip(texts, detected_words_list)
+        ]
+        if not items:
+            return []
+
+        if self.verdict_cache:
+            keys = [self.verdict_cache.make_key(text, words, self.prompt_version) for text, words, _ in items]
+            cached = self.verdict_cache.get_many(keys)
+        else:
+            # キャッシュなしでも同一バッチ内の重複は1回だけ判定
+            keys = [json.dumps([text, sorted(set(words))], ensure_ascii=False) for text, words, _ in items]
+            cached = {}
+
+        pending: Dict[str, Tuple[str, List[str], str]] = {}
+        for key, item in zip(keys, items):
+            if key not in cached and key not in pending:
+                pending[key] = item
+
+        pending_keys = list(pending)
+        batches = [
+            pending_keys[i:i + self.batch_size]
+            for i in range(0, len(pending_keys), self.batch_size)
+        ]
+
+        judged: Dict[str, Dict] = {}
+        to_cache = []
+        llm_calls = 0
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+                outputs = executor.map(lambda batch: self._judge_batch([pending[k] for k in batch]), batches)
+                for batch, (batch_results, calls) in zip(batches, outputs):
+                    llm_calls += calls
+                    for key, (result, ok) in zip(batch, batch_results):
+                        judged[key] = result
+                        if ok and self.verdict_cache:
+                            to_cache.append(self._cache_entry(key, result))
+
+        if to_cache:
+            self.verdict_cache.put_many(to_cache)
+
+        results = [dict(cached[key]) if key in cached else dict(judged[key]) for key in keys]
+
+        elapsed = time.perf_counter() - started
+        cache_hits = sum(1 for key in keys if key in cached)
+        with self._lock:
+            self.bulk_stats["items"] += len(items)
+            self.bulk_stats["cache_hits"] += cache_hits
+            self.bulk_stats["llm_calls"] += llm_calls
+            self.bulk_stats["elapsed"] += elapsed
+        logger.info(
+            f"Bulk judgment: {len(items)} items, cache hits {cache_hits} ({cache_hits / len(items):.0%}), "
+            f"{len(pending)} judged in {llm_calls} LLM calls, {len(items) / elapsed:.1f} items/s"
+        )
 
         return results
+
+    def get_bulk_stats(self) -> Dict:
+        """バルク判定の累計統計
+
+        Returns:
+            {"items", "cache_hits", "llm_calls", "elapsed", "cache_hit_rate", "throughput"}
+        """
+        with self._lock:
+            stats = dict(self.bulk_stats)
+        stats["cache_hit_rate"] = stats["cache_hits"] / stats["items"] if stats["items"] else 0.0
+        stats["throughput"] = stats["items"] / stats["elapsed"] if stats["elapsed"] else 0.0
+        return stats
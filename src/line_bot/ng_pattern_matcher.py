@@ -0,0 +1,99 @@
+"""
+NGパターンの結合マッチャー
+
+SensitiveHandler（v2）の静的パターン + DBパターンを、名前付きグループの
+1本の正規表現 (?P<p0>...)|(?P<p1>...)|... にまとめる。
+
+- any_match(): いずれかのパターンに一致するか（結合正規表現の search 1回）
+- find_matches(): 一致した全パターン（パターンごとに re.search した結果と同じ）
+  結合正規表現で最初の一致位置を探し、その位置から始まる後続パターンだけを
+  個別に照合して、次の位置から探索を続ける
+
+マッチャーは構築後に変更しない。NGワードのリロード時は新しいマッチャーを
+別に構築して参照を差し替えるので、判定中のスレッドが読み込み途中の
+パターンリストを見ることはない。
+"""
+
+import logging
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def patterns_version(patterns: Sequence[Dict[str, Any]]) -> Tuple:
+    """パターンリストのバージョン（内容が同じなら同じ値）"""
+    return tuple((p["pattern"], p["tier"], p["category"]) for p in patterns)
+
+
+class NgPatternMatcher:
+    """静的 + DBのNGパターンをまとめたコンパイル済みマッチャー（不変）"""
+
+    def __init__(
+        self,
+        static_patterns: List[Dict[str, Any]],
+        db_patterns: List[Dict[str, Any]],
+        flags: int = re.IGNORECASE
+    ):
+        """初期化（パターンのコンパイル）
+
+        Args:
+            static_patterns: 静的パターン（{"pattern", "tier", "category", ...}）
+            db_patterns: DBから変換したパターン
+            flags: 正規表現フラグ
+        """
+        self.static_patterns = tuple(static_patterns)
+        self.db_patterns = tuple(db_patterns)
+        self.version = (patterns_version(self.static_patterns), patterns_version(self.db_patterns))
+
+        # 個別にコンパイルできないパターンは除外（結合正規表現全体を壊さないため）
+        entries: List[Tuple[Dict[str, Any], re.Pattern]] = []
+        for pattern_dict in self.static_patterns + self.db_patterns:
+            try:
+                entries.append((pattern_dict, re.compile(pattern_dict["pattern"], flags)))
+            except re.error as e:
+                logger.error(f"NGパターンのコンパイル失敗: {pattern_dict['pattern']} - {e}")
+
+        self._entries = entries
+        self._combined: Optional[re.Pattern] = None
+        if entries:
+            self._combined = re.compile(
+                "|".join(f"(?P<p{i}>{compiled.pattern})" for i, (_, compiled) in enumerate(entries)),
+                flags
+            )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def any_match(self, text: str) -> bool:
+        """いずれかのパターンに一致するか"""
+        return self._combined is not None and self._combined.search(text) is not None
+
+    def find_matches(self, text: str) -> List[Dict[str, Any]]:
+        """一致した全パターン（静的 → DB の定義順）
+
+        Args:
+            text: 判定対象テキスト
+
+        Returns:
+            一致したパターン辞書のリスト
+        """
+        if self._combined is None:
+            return []
+
+        matched = set()
+        position = 0
+        while position <= len(text):
+            m = self._combined.search(text, position)
+            if m is None:
+                break
+            start = m.start()
+            first = int(m.lastgroup[1:])
+            matched.add(first)
+            # 同じ位置では先に定義されたパターンが選ばれるので、後続パターンのみ個別に照合
+            for i in range(first + 1, len(self._entries)):
+                if i not in matched and self._entries[i][1].match(text, start):
+                    matched.add(i)
+            position = start + 1
+
+        return [self._entries[i][0] for i in sorted(matched)]
@@ -7,8 +7,11 @@ LLMベースの判定 + NGワードパターンマッチング
 from typing import Dict, Any, Optional, List, Callable
 import logging
 import re
+import threading
 from ..core.llm_tracing import TracedLLM
 from .dynamic_detector import DynamicSensitiveDetector
+from .ng_pattern_matcher import NgPatternMatcher, patterns_version
+from .unknown_word_queue import UnknownWordQueue
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +32,8 @@ class SensitiveHandler:
         judge_model: str = "gpt-4o-mini",
         enable_logging: bool = True,
         enable_layer3: bool = False,
-        websearch_func: Optional[Callable] = None
+        websearch_func: Optional[Callable] = None,
+        max_concurrent_searches: int = 4
     ):
         """初期化
 
@@ -40,6 +44,7 @@ class SensitiveHandler:
             enable_logging: ログ記録の有効化
             enable_layer3: Layer 3（動的学習）を有効化
             websearch_func: WebSearch関数（Layer 3用）
+            max_concurrent_searches: 未知ワード判定のWebSearch同時実行数
         """
         self.mode = mode
         self.judge_provider = judge_provider
@@ -59,9 +64,23 @@ class SensitiveHandler:
             self.dynamic_detector = None
             db_ng_words = []
 
-        # NGワードパターン読み込み（静的 + 動的）
-        self.ng_patterns = self._load_ng_patterns()
-        self.db_ng_patterns = self._convert_db_words_to_patterns(db_ng_words)
+        # NGワードパターン読み込み（静的 + 動的）→ 結合マッチャーにコンパイル
+        self._reload_lock = threading.Lock()
+        self.ng_matcher = NgPatternMatcher(
+            self._load_ng_patterns(),
+            self._convert_db_words_to_patterns(db_ng_words)
+        )
+
+        # Layer 3: 未知ワードのWebSearch判定はバックグラウンドキューで実行
+        # （登録されたNGワードは reload_ng_words でマッチャーに反映）
+        if self.dynamic_detector and self.dynamic_detector.enable_websearch:
+            self.unknown_word_queue = UnknownWordQueue(
+                self.dynamic_detector,
+                on_registered=self.reload_ng_words,
+                max_concurrent_queries=max_concurrent_searches
+            )
+        else:
+            self.unknown_word_queue = None
 
         # LLM初期化（full/hybridモードの場合）
         if mode in ["full", "hybrid"]:
@@ -76,9 +95,24 @@ class SensitiveHandler:
         total_patterns = len(self.ng_patterns) + len(self.db_ng_patterns)
         logger.info(f"SensitiveHandler初期化: mode={mode}, judge={judge_provider}/{judge_model}, NGパターン{total_patterns}件（静的{len(self.ng_patterns)}+DB{len(self.db_ng_patterns)}）, Layer3={enable_layer3}")
 
+    @property
+    def ng_patterns(self) -> List[Dict[str, Any]]:
+        """静的NGパターン（現在のマッチャーのもの）"""
+        return list(self.ng_matcher.static_patterns)
+
+    @property
+    def db_ng_patterns(self) -> List[Dict[str, Any]]:
+        """DBのNGパターン（現在のマッチャーのもの）"""
+        return list(self.ng_matcher.db_patterns)
+
     def reload_ng_words(self) -> int:
         """DBからNGワードを再ロード（即座反映）
 
+        新しいマッチャーを構築してから参照を差し替えるので、判定中の処理は
+        旧マッチャーのまま完了する。NGワードに変化がなければ再構築しない。
+        呼び出し元スレッドで構築するため、イベントループからは
+        asyncio.to_thread 等で呼ぶこと。
+
         Returns:
             ロードしたNGワード数
         """
@@ -86,14 +120,25 @@ class SensitiveHandler:
             logger.warning("Layer 3が無効なため、NGワードをリロードできません")
             return 0
 
-        # DBから最新のNGワードをロード
-        db_ng_words = self.dynamic_detector.load_ng_words_from_db()
-        self.db_ng_patterns = self._convert_db_words_to_patterns(db_ng_words)
+        with self._reload_lock:
+            current = self.ng_matcher
 
-        total_patterns = len(self.ng_patterns) + len(self.db_ng_patterns)
-        logger.info(f"✅ NGワードリロード完了: 静的{len(self.ng_patterns)}+DB{len(self.db_ng_patterns)} = 合計{total_patterns}件")
+            # DBから最新のNGワードをロード
+            db_ng_words = self.dynamic_detector.load_ng_words_from_db()
+            db_patterns = self._convert_db_words_to_patterns(db_ng_words)
+
+            if patterns_version(db_patterns) == current.version[1]:
+                logger.info(f"NGワードに変更なし: DB{len(current.db_patterns)}件")
+                return len(current.db_patterns)
+
+            # 構築完了後に差し替え（参照の代入はアトミック）
+            matcher = NgPatternMatcher(list(current.static_patterns), db_patterns)
+            self.ng_matcher = matcher
 
-        return len(self.db_ng_patterns)
+        total_patterns = len(matcher.static_patterns) + len(matcher.db_patterns)
+        logger.info(f"✅ NGワードリロード完了: 静的{len(matcher.static_patterns)}+DB{len(matcher.db_patterns)} = 合計{total_patterns}件")
+
+        return len(matcher.db_patterns)
 
     def _load_ng_patterns(self) -> List[Dict[str, Any]]:
         """NGパターン読み込み（静的パターン）
@@ -217,58 +262,33 @@ class SensitiveHandler:
         Returns:
             存在する場合True
         """
-        # 静的パターンをチェック
-        for pattern_dict in self.ng_patterns:
-            if re.search(pattern_dict["pattern"], word, re.IGNORECASE):
-                return True
-
-        # DBパターンをチェック
-        for pattern_dict in self.db_ng_patterns:
-            if re.search(pattern_dict["pattern"], word, re.IGNORECASE):
-                return True
-
-        return False
+        # 静的 + DBパターンを結合正規表現1回でチェック
+        return self.ng_matcher.any_match(word)
 
     def _check_unknown_words_with_websearch(self, text: str) -> None:
-        """未知ワードをWebSearchで動的に検出してDB登録
+        """未知ワードをWebSearch判定キューに追加（判定・DB登録はバックグラウンド）
 
         Args:
             text: 対象テキスト
         """
+        if not self.unknown_word_queue:
+            return
+
         # キーワード抽出
         keywords = self._extract_keywords(text)
 
         # 未知ワード（NGリストにないワード）を抽出
-        unknown_words = [word for word in keywords if not self._is_word_in_ng_list(word)]
+        matcher = self.ng_matcher
+        unknown_words = [word for word in keywords if not matcher.any_match(word)]
 
         if not unknown_words:
             logger.debug("未知ワードなし、WebSearch検出をスキップ")
             return
 
-        logger.info(f"未知ワード検出: {len(unknown_words)}個 - WebSearchで判定開始")
-
-        # WebSearchで各未知ワードをチェック
-        newly_registered_count = 0
-        for word in unknown_words[:5]:  # 最大5ワードまで（コスト削減）
-            try:
-                # WebSearchで判定
-                word_info = self.dynamic_detector.check_word_sensitivity(word)
-
-                if word_info:
-                    # センシティブと判定された場合、DB登録
-                    success = self.dynamic_detector.register_ng_word(word_info)
-                    if success:
-                        newly_registered_count += 1
-                        logger.info(f"✅ 新規NGワード登録: {word} (severity={word_info['severity']})")
-
-            except Exception as e:
-                logger.error(f"WebSearch検出エラー: {word} - {e}")
-                continue
-
-        # 新規登録があった場合、NGワードリストをリロード
-        if newly_registered_count > 0:
-            self.reload_ng_words()
-            logger.info(f"🔄 {newly_registered_count}個の新規NGワード登録後、リロード完了")
+        # 確認済みワードはキュー側で除外してから最大5ワードまで（コスト削減）
+        added = self.unknown_word_queue.enqueue(unknown_words, limit=5)
+        if added:
+            logger.info(f"未知ワード検出: {added}個 - バックグラウンドでWebSearch判定")
 
     def _log_detection(self, text: str, result: Dict[str, Any]) -> None:
         """検出結果をログに記録（継続学習用）
@@ -292,17 +312,33 @@ class SensitiveHandler:
         else:
             action = 'allowed'
 
-        # DBにログを記録
+        # DBにログを記録（書き込み・集計はバックグラウンドでまとめて行う）
         try:
             self.dynamic_detector.log_detection(
                 text=text,
                 detected_words=detected_words,
-                action=action
+                action=action,
+                categories=result.get('sensitive_topics', []),
+                tier=tier,
+                sensitivity_score=result.get('risk_score')
             )
             logger.debug(f"検出ログ記録: tier={tier}, action={action}, words={len(detected_words)}")
         except Exception as e:
             logger.error(f"検出ログ記録エラー: {e}")
 
+    def get_statistics(self, days: int = 7) -> Dict[str, Any]:
+        """検出統計（日別・カテゴリ別の集計済みの値）
+
+        Args:
+            days: 集計対象の日数（今日を含む）
+
+        Returns:
+            DynamicSensitiveDetector.get_statistics() の結果（Layer 3無効時は空）
+        """
+        if not self.dynamic_detector:
+            return {'daily': [], 'categories': {}, 'total_comments': 0, 'log_writer': None}
+        return self.dynamic_detector.get_statistics(days)
+
     def check(
         self,
         text: str,
@@ -323,7 +359,7 @@ class SensitiveHandler:
         """
         logger.info(f"センシティブ判定開始: mode={self.mode}, text_length={len(text)}")
 
-        # Layer 3拡張: 未知ワードの動的検出（WebSearch）
+        # Layer 3拡張: 未知ワードの動的検出（WebSearch、応答を待たせない）
         if self.enable_layer3 and enable_dynamic_learning and self.dynamic_detector.enable_websearch:
             self._check_unknown_words_with_websearch(text)
 
@@ -376,19 +412,8 @@ class SensitiveHandler:
         Returns:
             判定結果
         """
-        matched_patterns = []
-
-        # 静的パターンチェック
-        for pattern_dict in self.ng_patterns:
-            pattern = pattern_dict["pattern"]
-            if re.search(pattern, text, re.IGNORECASE):
-                matched_patterns.append(pattern_dict)
-
-        # DBパターンチェック（Layer 3）
-        for pattern_dict in self.db_ng_patterns:
-            pattern = pattern_dict["pattern"]
-            if re.search(pattern, text, re.IGNORECASE):
-                matched_patterns.append(pattern_dict)
+        # 静的パターン + DBパターン（Layer 3）を結合マッチャーでチェック
+        matched_patterns = self.ng_matcher.find_matches(text)
 
         # Tier判定
         if not matched_patterns:
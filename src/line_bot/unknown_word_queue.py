@@ -0,0 +1,329 @@
+"""
+未知ワード検出キュー（Layer 3 バックグラウンド処理）
+
+SensitiveHandler.check() の応答経路からWebSearchを切り離す
+- 確認済みワード: DB（vetted_words テーブル）に永続化し、メモリ上はBloomフィルタで判定
+  → 各ワードのWebSearchは原則1回（偽陽性になったワードは確認されずに残る）
+- クエリ単位で並列実行（実行中の同じクエリには相乗りする）
+- センシティブと判定されたワードは ng_words に登録し、まとめてホットリロード
+"""
+
+import hashlib
+import logging
+import math
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from .dynamic_detector import DynamicSensitiveDetector
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Bloomフィルタ（偽陰性なし・偽陽性率 error_rate）"""
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        """初期化
+
+        Args:
+            capacity: 想定要素数（超えると偽陽性率が上がる）
+            error_rate: 想定要素数での偽陽性率
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # ダブルハッシング: h1 + i * h2
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item: str):
+        """要素を追加"""
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class VettedWordStore:
+    """確認済みワードの永続セット（DB + Bloomフィルタ）"""
+
+    def __init__(self, db_path: str, error_rate: float = 0.001, min_capacity: int = 100000):
+        """初期化
+
+        Args:
+            db_path: データベースパス（sensitive_filter.db）
+            error_rate: Bloomフィルタの偽陽性率
+            min_capacity: Bloomフィルタの最小容量
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._init_db()
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            words = [row[0] for row in conn.execute("SELECT word FROM vetted_words")]
+        finally:
+            conn.close()
+
+        # 既存件数の2倍を確保して偽陽性率を保つ
+        self.bloom = BloomFilter(capacity=max(min_capacity, len(words) * 2), error_rate=error_rate)
+        for word in words:
+            self.bloom.add(word)
+
+        logger.info(f"VettedWordStore initialized: {len(words)} words, bloom={self.bloom.num_bits // 8 // 1024}KB")
+
+    def _init_db(self):
+        """テーブル作成"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS vetted_words (
+                    word TEXT PRIMARY KEY,
+                    verdict TEXT NOT NULL,
+                    checked_at TEXT NOT NULL
+                )
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.bloom
+
+    def __len__(self) -> int:
+        return len(self.bloom)
+
+    def add(self, word: str, verdict: str):
+        """確認済みとして記録
+
+        Args:
+            word: ワード
+            verdict: 判定（"sensitive" / "safe"）
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO vetted_words (word, verdict, checked_at) VALUES (?, ?, ?)",
+                (word, verdict, datetime.now().isoformat())
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        with self._lock:
+            self.bloom.add(word)
+
+
+class UnknownWordQueue:
+    """未知ワードのWebSearch判定をバックグラウンドで行うキュー"""
+
+    def __init__(
+        self,
+        detector: DynamicSensitiveDetector,
+        on_registered: Optional[Callable[[], Any]] = None,
+        vetted_store: Optional[VettedWordStore] = None,
+        max_concurrent_words: int = 2,
+        max_concurrent_queries: int = 4,
+        max_queue_size: int = 1000
+    ):
+        """初期化
+
+        Args:
+            detector: DynamicSensitiveDetector（クエリ生成・結果判定・DB登録）
+            on_registered: 新規NGワード登録後に呼ぶ関数（SensitiveHandler.reload_ng_words）
+            vetted_store: 確認済みワードの記録（Noneなら detector のDBに作成）
+            max_concurrent_words: 同時に判定するワード数
+            max_concurrent_queries: 同時に実行するWebSearchクエリ数
+            max_queue_size: キューの上限（満杯時は受け付けない）
+        """
+        self.detector = detector
+        self.on_registered = on_registered
+        self.vetted = vetted_store or VettedWordStore(detector.db_path)
+
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=max_queue_size)
+        self._pending = set()
+        self._inflight_queries: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._search_executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_queries,
+            thread_name_prefix="websearch"
+        )
+        self._registered_since_reload = 0
+
+        self.stats = {
+            'enqueued': 0,
+            'skipped_vetted': 0,
+            'dropped': 0,
+            'processed': 0,
+            'searches': 0,
+            'deduplicated_searches': 0,
+            'registered': 0,
+            'reloads': 0,
+            'errors': 0
+        }
+
+        self._workers = [
+            threading.Thread(target=self._worker_loop, name=f"unknown-word-{i}", daemon=True)
+            for i in range(max_concurrent_words)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+        logger.info(f"UnknownWordQueue initialized: words={max_concurrent_words}, queries={max_concurrent_queries}, vetted={len(self.vetted)}")
+
+    def enqueue(self, words: Iterable[str], limit: Optional[int] = None) -> int:
+        """未確認のワードをキューに追加（ブロックしない）
+
+        確認済み・キュー内のワードは追加しない（limit の件数にも数えない）
+
+        Args:
+            words: ワードのリスト
+            limit: 追加する最大ワード数（Noneなら無制限）
+
+        Returns:
+            追加したワード数
+        """
+        added = 0
+        for word in words:
+            if limit is not None and added >= limit:
+                break
+            if word in self.vetted:
+                self.stats['skipped_vetted'] += 1
+                continue
+            with self._lock:
+                if word in self._pending:
+                    continue
+                self._pending.add(word)
+            try:
+                self._queue.put_nowait(word)
+            except queue.Full:
+                with self._lock:
+                    self._pending.discard(word)
+                self.stats['dropped'] += 1
+                logger.warning(f"未知ワードキューが満杯のため破棄: {word}")
+                continue
+            added += 1
+
+        self.stats['enqueued'] += added
+        return added
+
+    def join(self):
+        """キュー内のワードの判定完了を待つ"""
+        self._queue.join()
+
+    def stop(self):
+        """ワーカーを停止（キュー内の残りは処理してから）"""
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._search_executor.shutdown(wait=True)
+
+    def get_stats(self) -> Dict:
+        """統計情報"""
+        return {
+            **self.stats,
+            'queue_length': self._queue.qsize(),
+            'vetted_words': len(self.vetted)
+        }
+
+    def _worker_loop(self):
+        while True:
+            word = self._queue.get()
+            try:
+                if word is None:
+                    return
+                self._process_word(word)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"未知ワード判定エラー: {word} - {e}")
+            finally:
+                if word is not None:
+                    with self._lock:
+                        self._pending.discard(word)
+                self._queue.task_done()
+
+            # キューが空になった時点でまとめてリロード
+            if self._queue.empty():
+                self._reload_if_registered()
+
+    def _search(self, query: str) -> Future:
+        """WebSearchを実行（実行中の同じクエリには相乗り）"""
+        with self._lock:
+            future = self._inflight_queries.get(query)
+            if future is not None:
+                self.stats['deduplicated_searches'] += 1
+                return future
+            future = self._search_executor.submit(self.detector.websearch_func, query)
+            self._inflight_queries[query] = future
+            self.stats['searches'] += 1
+
+        def _done(_, query=query):
+            with self._lock:
+                self._inflight_queries.pop(query, None)
+        future.add_done_callback(_done)
+        return future
+
+    def _process_word(self, word: str):
+        """1ワードのクエリを並列実行して判定・登録"""
+        queries = self.detector.build_queries(word)
+        futures = [(query, self._search(query)) for query in queries]
+
+        results = []
+        for query, future in futures:
+            try:
+                results.append((query, future.result()))
+            except Exception as e:
+                logger.error(f"WebSearch failed: {query} - {e}")
+                results.append((query, None))
+
+        self.stats['processed'] += 1
+
+        # 検索結果が1件もない（上限到達・障害）場合は確認済みにしない（次回出現時に再判定）
+        if all(result is None for _, result in results):
+            logger.info(f"WebSearch結果なし、未確認のまま保留: {word}")
+            return
+
+        word_info = self.detector.analyze_search_results(word, results)
+        if word_info is None:
+            self.vetted.add(word, "safe")
+            return
+
+        # DB登録に失敗した場合も未確認のまま（次回出現時に再判定）
+        if not self.detector.register_ng_word(word_info):
+            return
+
+        with self._lock:
+            self._registered_since_reload += 1
+        self.stats['registered'] += 1
+        logger.info(f"✅ 新規NGワード登録: {word} (severity={word_info['severity']})")
+        self.vetted.add(word, "sensitive")
+
+    def _reload_if_registered(self):
+        with self._lock:
+            count = self._registered_since_reload
+            self._registered_since_reload = 0
+        if count == 0 or self.on_registered is None:
+            return
+        try:
+            self.on_registered()
+            self.stats['reloads'] += 1
+            logger.info(f"🔄 {count}個の新規NGワード登録後、リロード完了")
+        except Exception as e:
+            logger.error(f"NGワードリロードエラー: {e}")
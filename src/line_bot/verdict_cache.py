@@ -0,0 +1,200 @@
+"""
+Layer 4 判定キャッシュ
+
+LLMContextJudge の判定結果を永続化し、同じ文言の再判定を省略する
+- キー: 正規化テキスト + 検出ワード（順不同）+ プロンプトバージョン + モデル のSHA256
+- 保存するのはキーと判定結果のみ（ユーザーの発言本文は保存しない）
+- TTL付き（期限切れは読み込み時に無視、cleanup_expired() で削除）
+- ヒット率の集計（プロセス内のみ。読み込みのたびにDBへ書き込まない）
+"""
+
+import json
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import unicodedata
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """判定キー用の正規化（NFKC・小文字化・空白の統一）"""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class VerdictCache:
+    """Layer 4 判定結果の永続キャッシュ（SQLite）"""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        ttl: int = 604800  # 7日間
+    ):
+        """初期化
+
+        Args:
+            db_path: データベースパス
+            ttl: キャッシュTTL（秒）
+        """
+        if db_path is None:
+            db_path = Path(__file__).parent / "database" / "verdict_cache.db"
+
+        self.db_path = str(db_path)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._init_db()
+        logger.info(f"VerdictCache initialized: {self.db_path}, ttl={ttl}s")
+
+    def _init_db(self):
+        """データベース初期化"""
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(verdict_cache)")}
+            if "normalized_text" in columns:
+                # 旧形式（発言本文を保存していた）は破棄して作り直す
+                conn.execute("DROP TABLE verdict_cache")
+                logger.info("VerdictCache: dropped old table with plaintext columns")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS verdict_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    prompt_version TEXT NOT NULL,
+                    verdict TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    expires_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_verdict_expires
+                ON verdict_cache(expires_at)
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(text: str, detected_words: Sequence[str], prompt_version: str) -> str:
+        """キャッシュキー（SHA256）"""
+        payload = json.dumps(
+            [normalize_text(text), sorted(set(detected_words or [])), prompt_version],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Dict]:
+        """有効期限内の判定結果をまとめて取得
+
+        Args:
+            keys: make_key() のキー
+
+        Returns:
+            {key: verdict}（ヒットしたもののみ）
+        """
+        unique_keys = list(dict.fromkeys(keys))
+        found: Dict[str, Dict] = {}
+        if unique_keys:
+            now = datetime.now().isoformat()
+            conn = sqlite3.connect(self.db_path)
+            try:
+                # SQLiteの変数上限を考慮して分割
+                for i in range(0, len(unique_keys), 500):
+                    chunk = unique_keys[i:i + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = conn.execute(f"""
+                        SELECT cache_key, verdict FROM verdict_cache
+                        WHERE cache_key IN ({placeholders}) AND expires_at > ?
+                    """, (*chunk, now)).fetchall()
+                    for key, verdict in rows:
+                        found[key] = json.loads(verdict)
+            except Exception as e:
+                logger.error(f"Failed to read verdict cache: {e}")
+            finally:
+                conn.close()
+
+        with self._lock:
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, entries: List[Dict]):
+        """判定結果をまとめて保存
+
+        Args:
+            entries: [{"key", "prompt_version", "verdict"}, ...]
+        """
+        if not entries:
+            return
+        now = datetime.now()
+        expires_at = (now + timedelta(seconds=self.ttl)).isoformat()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.executemany("""
+                INSERT OR REPLACE INTO verdict_cache
+                (cache_key, prompt_version, verdict, created_at, expires_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, [
+                (
+                    entry["key"],
+                    entry["prompt_version"],
+                    json.dumps(entry["verdict"], ensure_ascii=False),
+                    now.isoformat(),
+                    expires_at
+                )
+                for entry in entries
+            ])
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to write verdict cache: {e}")
+        finally:
+            conn.close()
+
+    def cleanup_expired(self) -> int:
+        """期限切れエントリを削除
+
+        Returns:
+            削除件数
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.execute(
+                "DELETE FROM verdict_cache WHERE expires_at <= ?",
+                (datetime.now().isoformat(),)
+            )
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def get_stats(self) -> Dict:
+        """キャッシュ統計
+
+        Returns:
+            {"entries", "hits", "misses", "hit_rate"}
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            entries = conn.execute(
+                "SELECT COUNT(*) FROM verdict_cache WHERE expires_at > ?",
+                (datetime.now().isoformat(),)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
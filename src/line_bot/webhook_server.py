@@ -9,6 +9,7 @@ from fastapi import FastAPI, Request, HTTPException, Header
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from typing import Optional
+import asyncio
 import hmac
 import hashlib
 import base64
@@ -26,6 +27,7 @@ from . import mock_data
 from .conversation_handler import ConversationHandler, SimpleMockHandler
 from .sensitive_handler_v2 import SensitiveHandler, SimpleMockSensitiveHandler
 from .integrated_sensitive_detector import IntegratedSensitiveDetector
+from .verdict_cache import VerdictCache
 from .session_manager import SessionManager, SimpleMockSessionManager
 from .websearch_client import WebSearchClient, MockWebSearchClient, GoogleSearchClient, SerpApiClient
 from .sticker_analyzer import StickerAnalyzer
@@ -141,7 +143,8 @@ if USE_SENSITIVE_CHECK:
         )
         integrated_detector = IntegratedSensitiveDetector(
             llm_provider=llm_provider,
-            enable_layer4=ENABLE_LAYER4
+            enable_layer4=ENABLE_LAYER4,
+            verdict_cache=VerdictCache() if ENABLE_LAYER4 else None
         )
         logger.info(f"Phase 5統合: IntegratedSensitiveDetector初期化完了（Layer4={ENABLE_LAYER4}）")
         sensitive_handler = None  # 互換性のためNoneに設定
@@ -824,7 +827,8 @@ async def reload_ng_words():
         handler = sensitive_handler
 
     if handler and hasattr(handler, 'reload_ng_words'):
-        count = handler.reload_ng_words()
+        # マッチャーの構築はスレッドで行い、完了後に差し替える
+        count = await asyncio.to_thread(handler.reload_ng_words)
         return {
             "status": "ok",
             "message": f"NGワードを再ロードしました",
@@ -913,7 +917,7 @@ async def add_ng_word(
         conn.close()
 
         # リロード
-        count = handler.reload_ng_words()
+        count = await asyncio.to_thread(handler.reload_ng_words)
 
         return {
             "status": "ok",
@@ -8,6 +8,8 @@ import re
 import logging
 from typing import Dict, List, Optional
 
+from ..core.keyword_engine import KeywordEngine
+
 logger = logging.getLogger(__name__)
 
 
@@ -81,6 +83,14 @@ class WorldviewChecker:
         for category, terms in self.meta_terms.items():
             self.all_meta_terms.extend(terms)
 
+        # 全カテゴリを1つのオートマトンにまとめて1パスで検出
+        # （大文字小文字無視・前後に英数字がない場合のみマッチ）
+        self.meta_term_engine = KeywordEngine(
+            self.meta_terms,
+            ignore_case=True,
+            ascii_word_boundary=True
+        )
+
         logger.info(f"WorldviewChecker初期化完了: {len(self.all_meta_terms)}個のメタ用語を監視")
 
     def check_response(self, text: str) -> Dict:
@@ -99,20 +109,11 @@ class WorldviewChecker:
                 "reason": str  # 理由
             }
         """
-        detected_terms = []
-        detected_categories = set()
-
         # メタ用語を検出
-        for category, terms in self.meta_terms.items():
-            for term in terms:
-                # 日本語と英語の混在に対応した検索
-                # \bは日本語では機能しないので、前後の文字をチェック
-                escaped_term = re.escape(term)
-                # 前後に英数字がない場合にマッチ
-                pattern = r'(?<![a-zA-Z0-9])' + escaped_term + r'(?![a-zA-Z0-9])'
-                if re.search(pattern, text, re.IGNORECASE):
-                    detected_terms.append(term)
-                    detected_categories.add(category)
+        # \bは日本語では機能しないので、前後が英数字でないことを確認する
+        matches = self.meta_term_engine.scan(text)
+        detected_terms = [term for _, term in matches.all_keywords()]
+        detected_categories = set(matches.labels)
 
         # 判定
         is_valid = len(detected_terms) == 0
@@ -7,6 +7,7 @@
 import logging
 from typing import Dict, Optional
 from .postgresql_manager import PostgreSQLManager
+from ..core.keyword_engine import KeywordEngine, KeywordMatches
 
 logger = logging.getLogger(__name__)
 
@@ -46,6 +47,11 @@ CHARACTER_KEYWORDS = {
     }
 }
 
+# 3キャラクター分のキーワードを1つのオートマトンにまとめる（メッセージの走査は1回）
+CHARACTER_KEYWORD_ENGINE = KeywordEngine({
+    character: info["keywords"] for character, info in CHARACTER_KEYWORDS.items()
+})
+
 
 class AutoCharacterSelector:
     """三姉妹自動選択クラス"""
@@ -58,21 +64,27 @@ class AutoCharacterSelector:
         """
         self.mysql_manager = mysql_manager
 
-    def calculate_affinity(self, message: str, character: str) -> int:
+    def calculate_affinity(
+        self,
+        message: str,
+        character: str,
+        matches: Optional[KeywordMatches] = None
+    ) -> int:
         """親和性スコアを計算
 
         Args:
             message: ユーザーメッセージ
             character: キャラクター名 ('botan', 'kasho', 'yuri')
+            matches: CHARACTER_KEYWORD_ENGINE.scan(message) の結果（省略時は走査する）
 
         Returns:
             親和性スコア (1-5)
         """
-        message_lower = message.lower()
+        if matches is None:
+            matches = CHARACTER_KEYWORD_ENGINE.scan(message)
 
         # キーワードマッチング
-        keywords = CHARACTER_KEYWORDS.get(character, {}).get("keywords", [])
-        match_count = sum(1 for keyword in keywords if keyword in message_lower)
+        match_count = matches.count(character)
 
         # スコア計算
         if match_count >= 3:
@@ -99,9 +111,10 @@ class AutoCharacterSelector:
             }
         """
         scores = {}
+        matches = CHARACTER_KEYWORD_ENGINE.scan(message)
 
         for character in ["botan", "kasho", "yuri"]:
-            score = self.calculate_affinity(message, character)
+            score = self.calculate_affinity(message, character, matches)
             scores[character] = score
 
         # 最も親和性が高いキャラクターを選択
@@ -14,6 +14,8 @@ import google.generativeai as genai
 import anthropic
 import requests
 
+from .trend_snapshot_cache import format_trends_text
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -246,7 +248,8 @@ class CloudLLMProvider:
         daily_trends: Optional[List[Dict[str, Any]]] = None,
         conversation_history: Optional[list] = None,
         metadata: Optional[Dict[str, Any]] = None,
-        language: str = "ja"
+        language: str = "ja",
+        trends_text: Optional[str] = None
     ) -> str:
         """
         コンテキスト付き生成
@@ -260,6 +263,7 @@ class CloudLLMProvider:
             conversation_history: 会話履歴 [{"role": "user", "content": "..."}, ...]
             metadata: メタデータ
             language: 応答言語 ("ja" or "en")
+            trends_text: 整形済みトレンド情報（TrendSnapshotCache）。指定時はdaily_trendsより優先
 
         Returns:
             生成されたテキスト
@@ -285,32 +289,11 @@ class CloudLLMProvider:
         if memories:
             system_prompt += f"\n\n【記憶】\n{memories}\n"
 
-        # 今日のトレンド情報を追加
-        if daily_trends:
-            def format_content(content):
-                """contentを文字列化（Grok形式/RSS形式に対応）"""
-                if isinstance(content, dict):
-                    # Grok形式: {"summary": "...", "events": [...]}
-                    if 'summary' in content:
-                        return content['summary'][:200]
-                    # RSS形式: {"category": "...", "items": [...]}
-                    elif 'items' in content and len(content['items']) > 0:
-                        first_item = content['items'][0]
-                        title = first_item.get('title', '')
-                        summary = first_item.get('summary', '')
-                        return f"{title} - {summary}"[:200] if summary else title[:200]
-                    else:
-                        return str(content)[:200]
-                elif isinstance(content, str):
-                    return content[:200]
-                else:
-                    return str(content)[:200]
-
-            trends_text = "\n".join([
-                f"- {trend.get('topic', 'トレンド')}: {format_content(trend.get('content', ''))}..."
-                for trend in daily_trends
-            ])
+        # 今日のトレンド情報を追加（事前整形済みのtrends_textがあればそれを使う）
+        if trends_text is None and daily_trends:
+            trends_text = format_trends_text(daily_trends)
 
+        if trends_text:
             # デバッグ: トレンド情報の内容を確認
             logger.info(f"📰 トレンド情報:\n{trends_text}")
 
@@ -0,0 +1,789 @@
+"""
+組み込みストレージバックエンド（SQLite + NumPy版）
+
+PostgreSQL + pgvector なしで webhook のパイプライン全体を動かすための
+StorageBackend実装。オフライン負荷試験・ローカル開発用。
+
+- リレーショナル部分: sqlite3（db_path=":memory:" でインメモリ）
+- ベクトル検索: embeddingをfloat32 BLOBで保存し、
+  検索キーごとに正規化済み行列をキャッシュしてNumPyで内積計算
+"""
+
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Sequence, Tuple
+
+import numpy as np
+
+from .storage_backend import PERSONALITY_COUNTERS, PERSONALITY_SCORES
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    user_id TEXT PRIMARY KEY,
+    selected_character TEXT,
+    selected_mode TEXT DEFAULT 'auto',
+    feedback_state TEXT DEFAULT 'none',
+    language TEXT DEFAULT 'ja',
+    last_message_at TEXT,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS conversation_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    character TEXT NOT NULL,
+    role TEXT NOT NULL,
+    message TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_history_user_character
+    ON conversation_history(user_id, character, id);
+
+CREATE TABLE IF NOT EXISTS learning_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT,
+    character TEXT NOT NULL,
+    user_id TEXT,
+    user_message TEXT,
+    bot_response TEXT,
+    phase5_user_tier TEXT,
+    phase5_response_tier TEXT,
+    memories_used TEXT,
+    response_time REAL,
+    metadata TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS daily_trends (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    character TEXT,
+    topic TEXT,
+    content TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_trends_character ON daily_trends(character, created_at);
+
+CREATE TABLE IF NOT EXISTS user_personality (
+    user_id TEXT PRIMARY KEY,
+    playfulness_score REAL DEFAULT 0.5,
+    trust_score REAL DEFAULT 0.5,
+    relationship_level INTEGER DEFAULT 1,
+    total_conversations INTEGER DEFAULT 0,
+    positive_interactions INTEGER DEFAULT 0,
+    playful_interactions INTEGER DEFAULT 0,
+    serious_interactions INTEGER DEFAULT 0,
+    correct_teachings INTEGER DEFAULT 0,
+    incorrect_teachings INTEGER DEFAULT 0,
+    risky_statement_count INTEGER DEFAULT 0,
+    moderate_statement_count INTEGER DEFAULT 0,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS user_trust_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT,
+    event_type TEXT,
+    trust_score_before REAL,
+    trust_score_after REAL,
+    delta REAL,
+    statement TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS user_memories (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    character TEXT NOT NULL,
+    memory_type TEXT,
+    memory_text TEXT NOT NULL,
+    context TEXT,
+    embedding BLOB,
+    importance INTEGER DEFAULT 5,
+    confidence REAL DEFAULT 0.5,
+    fact_checked INTEGER DEFAULT 0,
+    fact_check_passed INTEGER,
+    fact_check_source TEXT,
+    learned_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    reference_count INTEGER DEFAULT 0,
+    last_referenced TEXT,
+    UNIQUE (user_id, character, memory_text)
+);
+
+CREATE TABLE IF NOT EXISTS learned_knowledge (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    character TEXT NOT NULL,
+    word TEXT NOT NULL,
+    meaning TEXT NOT NULL,
+    context TEXT,
+    embedding BLOB,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_knowledge_character ON learned_knowledge(character);
+"""
+
+
+def _encode_embedding(embedding: Sequence[float]) -> bytes:
+    """embeddingをfloat32のBLOBに変換"""
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class _VectorIndex:
+    """検索キー単位の正規化済み埋め込み行列（行ID付き）"""
+
+    def __init__(self, ids: List[int], matrix: np.ndarray):
+        self.ids = ids
+        self.matrix = matrix
+
+    def top_k(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """コサイン類似度の上位k件を (行ID, 類似度) で返す"""
+        if not self.ids:
+            return []
+        scores = self.matrix @ query
+        k = min(k, len(self.ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[i], float(scores[i])) for i in top]
+
+    def nearest(self, queries: np.ndarray) -> List[Optional[Tuple[int, float]]]:
+        """各クエリ（正規化済みの行）の最近傍を (行ID, 類似度) で返す"""
+        if not self.ids:
+            return [None] * len(queries)
+        scores = queries @ self.matrix.T
+        best = np.argmax(scores, axis=1)
+        return [(self.ids[j], float(scores[i, j])) for i, j in enumerate(best)]
+
+
+class EmbeddedStorageBackend:
+    """SQLite + NumPy によるStorageBackend実装"""
+
+    def __init__(self, db_path: str = ":memory:"):
+        """初期化
+
+        Args:
+            db_path: SQLiteファイルのパス（":memory:"ならインメモリ）
+        """
+        self.db_path = db_path
+        self.connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        # (テーブル, 検索キー) -> _VectorIndex
+        self._indexes: Dict[Tuple, _VectorIndex] = {}
+        logger.info(f"EmbeddedStorageBackend initialized ({db_path})")
+
+    # ========================================
+    # 接続
+    # ========================================
+
+    def connect(self) -> bool:
+        """SQLiteを開いてスキーマを作成"""
+        if self.connection is not None:
+            return True
+        try:
+            self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.connection.row_factory = sqlite3.Row
+            if self.db_path != ":memory:":
+                self.connection.execute("PRAGMA journal_mode=WAL")
+                self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(SCHEMA)
+            self.connection.commit()
+            return True
+        except Exception as e:
+            logger.error(f"組み込みDB接続失敗: {e}")
+            self.connection = None
+            return False
+
+    def disconnect(self):
+        """接続を切断（インメモリの場合はデータも破棄される）"""
+        with self._lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+            self._indexes.clear()
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.disconnect()
+
+    def _execute(self, sql: str, params: Tuple = ()) -> sqlite3.Cursor:
+        if self.connection is None and not self.connect():
+            raise RuntimeError("組み込みDB未接続")
+        with self._lock:
+            cursor = self.connection.execute(sql, params)
+            self.connection.commit()
+            return cursor
+
+    def _fetchone(self, sql: str, params: Tuple = ()) -> Optional[Dict[str, Any]]:
+        row = self._execute(sql, params).fetchone()
+        return dict(row) if row else None
+
+    def _fetchall(self, sql: str, params: Tuple = ()) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self._execute(sql, params).fetchall()]
+
+    # ========================================
+    # セッション
+    # ========================================
+
+    def get_session(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return self._fetchone("SELECT * FROM sessions WHERE user_id = ?", (user_id,))
+
+    def save_session(
+        self,
+        user_id: str,
+        selected_character: Optional[str] = None,
+        last_message_at: Optional[datetime] = None,
+        language: Optional[str] = None
+    ) -> bool:
+        self._execute("""
+            INSERT INTO sessions (user_id, selected_character, last_message_at, language, updated_at)
+            VALUES (?, ?, ?, COALESCE(?, 'ja'), CURRENT_TIMESTAMP)
+            ON CONFLICT (user_id) DO UPDATE SET
+                selected_character = COALESCE(excluded.selected_character, sessions.selected_character),
+                last_message_at = COALESCE(excluded.last_message_at, sessions.last_message_at),
+                language = COALESCE(?, sessions.language),
+                updated_at = CURRENT_TIMESTAMP
+        """, (
+            user_id, selected_character,
+            (last_message_at or datetime.now()).isoformat(), language, language
+        ))
+        return True
+
+    def _get_session_field(self, user_id: str, column: str, default: str) -> str:
+        row = self._fetchone(f"SELECT {column} FROM sessions WHERE user_id = ?", (user_id,))
+        return row[column] if row and row[column] else default
+
+    def _set_session_field(self, user_id: str, column: str, value: str) -> bool:
+        self._execute(f"""
+            INSERT INTO sessions (user_id, {column}, updated_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT (user_id) DO UPDATE SET
+                {column} = excluded.{column},
+                updated_at = CURRENT_TIMESTAMP
+        """, (user_id, value))
+        return True
+
+    def get_user_mode(self, user_id: str) -> str:
+        return self._get_session_field(user_id, "selected_mode", "auto")
+
+    def set_user_mode(self, user_id: str, mode: str) -> bool:
+        return self._set_session_field(user_id, "selected_mode", mode)
+
+    def get_feedback_state(self, user_id: str) -> str:
+        return self._get_session_field(user_id, "feedback_state", "none")
+
+    def set_feedback_state(self, user_id: str, state: str) -> bool:
+        return self._set_session_field(user_id, "feedback_state", state)
+
+    def get_user_language(self, user_id: str) -> str:
+        return self._get_session_field(user_id, "language", "ja")
+
+    def set_user_language(self, user_id: str, language: str) -> bool:
+        return self._set_session_field(user_id, "language", language)
+
+    # ========================================
+    # 会話履歴
+    # ========================================
+
+    def save_conversation_history(
+        self,
+        user_id: str,
+        character: str,
+        role: str,
+        message: str
+    ) -> Optional[int]:
+        cursor = self._execute("""
+            INSERT INTO conversation_history (user_id, character, role, message)
+            VALUES (?, ?, ?, ?)
+        """, (user_id, character, role, message))
+        return cursor.lastrowid
+
+    def get_conversation_history(
+        self,
+        user_id: str,
+        character: str,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        rows = self._fetchall("""
+            SELECT role, message, created_at
+            FROM conversation_history
+            WHERE user_id = ? AND character = ?
+            ORDER BY id DESC
+            LIMIT ?
+        """, (user_id, character, limit))
+        return list(reversed(rows))
+
+    def get_user_character_stats(self, user_id: str) -> Optional[Dict[str, int]]:
+        rows = self._fetchall("""
+            SELECT character, COUNT(*) AS count
+            FROM conversation_history
+            WHERE user_id = ? AND role = 'user'
+            GROUP BY character
+        """, (user_id,))
+        return {row['character']: row['count'] for row in rows}
+
+    # ========================================
+    # ログ・フィードバック・トレンド
+    # ========================================
+
+    def save_learning_log(
+        self,
+        timestamp: str,
+        character: str,
+        user_id: str,
+        user_message: str,
+        bot_response: str,
+        phase5_user_tier: Optional[str] = None,
+        phase5_response_tier: Optional[str] = None,
+        memories_used: Optional[str] = None,
+        response_time: Optional[float] = None,
+        metadata: Optional[str] = None
+    ) -> Optional[int]:
+        cursor = self._execute("""
+            INSERT INTO learning_logs (
+                timestamp, character, user_id, user_message, bot_response,
+                phase5_user_tier, phase5_response_tier, memories_used,
+                response_time, metadata
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            timestamp, character, user_id, user_message, bot_response,
+            phase5_user_tier, phase5_response_tier, memories_used,
+            response_time, metadata
+        ))
+        return cursor.lastrowid
+
+    def get_learning_log_stats(self) -> Optional[List[Dict[str, Any]]]:
+        return self._fetchall("""
+            SELECT character,
+                   COALESCE(phase5_response_tier, '') AS phase5_response_tier,
+                   COUNT(*) AS log_count,
+                   COALESCE(SUM(response_time), 0) AS response_time_sum,
+                   COUNT(response_time) AS response_time_count
+            FROM learning_logs
+            GROUP BY character, COALESCE(phase5_response_tier, '')
+        """)
+
+    def save_feedback(self, user_id: str, feedback_text: str) -> Optional[int]:
+        return self.save_learning_log(
+            timestamp=datetime.now().isoformat(),
+            character='feedback',
+            user_id=user_id,
+            user_message=feedback_text,
+            bot_response='フィードバック受信'
+        )
+
+    def save_trend(self, character: str, topic: str, content: Any) -> Optional[int]:
+        """トレンドを追加（負荷試験のデータ投入用）"""
+        if not isinstance(content, str):
+            content = json.dumps(content, ensure_ascii=False)
+        cursor = self._execute(
+            "INSERT INTO daily_trends (character, topic, content) VALUES (?, ?, ?)",
+            (character, topic, content)
+        )
+        return cursor.lastrowid
+
+    def get_recent_trends(self, character: str, limit: int = 3) -> List[Dict[str, Any]]:
+        trends = self._fetchall("""
+            SELECT topic, content, created_at
+            FROM daily_trends
+            WHERE character = ?
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+        """, (character, limit))
+        for trend in trends:
+            if isinstance(trend.get('content'), str):
+                try:
+                    trend['content'] = json.loads(trend['content'])
+                except json.JSONDecodeError:
+                    pass
+        return trends
+
+    # ========================================
+    # 個性
+    # ========================================
+
+    def get_personality(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return self._fetchone("SELECT * FROM user_personality WHERE user_id = ?", (user_id,))
+
+    def increment_personality(
+        self,
+        user_id: str,
+        counters: Dict[str, int]
+    ) -> Optional[Dict[str, Any]]:
+        unknown = set(counters) - set(PERSONALITY_COUNTERS)
+        if unknown:
+            raise ValueError(f"Unknown personality counters: {sorted(unknown)}")
+
+        with self._lock:
+            self._execute("INSERT OR IGNORE INTO user_personality (user_id) VALUES (?)", (user_id,))
+            if counters:
+                assignments = ", ".join(f"{column} = {column} + ?" for column in counters)
+                self._execute(
+                    f"UPDATE user_personality SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE user_id = ?",
+                    (*counters.values(), user_id)
+                )
+            return self.get_personality(user_id)
+
+    def set_personality_scores(self, user_id: str, scores: Dict[str, Any]) -> bool:
+        unknown = set(scores) - set(PERSONALITY_SCORES)
+        if unknown:
+            raise ValueError(f"Unknown personality scores: {sorted(unknown)}")
+        if not scores:
+            return True
+        assignments = ", ".join(f"{column} = ?" for column in scores)
+        cursor = self._execute(
+            f"UPDATE user_personality SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE user_id = ?",
+            (*scores.values(), user_id)
+        )
+        return cursor.rowcount > 0
+
+    def save_trust_history(
+        self,
+        user_id: str,
+        event_type: str,
+        trust_score_before: float,
+        trust_score_after: float,
+        delta: float,
+        statement: Optional[str] = None
+    ) -> bool:
+        self._execute("""
+            INSERT INTO user_trust_history (
+                user_id, event_type, trust_score_before, trust_score_after, delta, statement
+            ) VALUES (?, ?, ?, ?, ?, ?)
+        """, (user_id, event_type, trust_score_before, trust_score_after, delta, statement))
+        return True
+
+    # ========================================
+    # ベクトル検索
+    # ========================================
+
+    def _get_index(self, table: str, where: str, params: Tuple) -> _VectorIndex:
+        key = (table, params)
+        index = self._indexes.get(key)
+        if index is not None:
+            return index
+
+        rows = self._execute(
+            f"SELECT id, embedding FROM {table} WHERE {where} AND embedding IS NOT NULL",
+            params
+        ).fetchall()
+        ids = [row['id'] for row in rows]
+        if rows:
+            matrix = np.vstack([np.frombuffer(row['embedding'], dtype=np.float32) for row in rows])
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix = np.ascontiguousarray(matrix / norms, dtype=np.float32)
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+
+        index = _VectorIndex(ids, matrix)
+        with self._lock:
+            self._indexes[key] = index
+        return index
+
+    def _invalidate_index(self, table: str, params: Tuple):
+        with self._lock:
+            self._indexes.pop((table, params), None)
+
+    def save_user_memory(
+        self,
+        user_id: str,
+        character: str,
+        memory_type: str,
+        memory_text: str,
+        context: str,
+        embedding: Sequence[float],
+        importance: int = 5,
+        confidence: float = 0.5,
+        fact_checked: bool = False,
+        fact_check_passed: Optional[bool] = None,
+        fact_check_source: Optional[str] = None
+    ) -> Optional[int]:
+        with self._lock:
+            self._execute("""
+                INSERT INTO user_memories (
+                    user_id, character, memory_type, memory_text, context,
+                    embedding, importance, confidence,
+                    fact_checked, fact_check_passed, fact_check_source
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, character, memory_text) DO UPDATE SET
+                    importance = excluded.importance,
+                    confidence = excluded.confidence,
+                    fact_checked = excluded.fact_checked,
+                    fact_check_passed = excluded.fact_check_passed,
+                    fact_check_source = excluded.fact_check_source,
+                    reference_count = user_memories.reference_count + 1
+            """, (
+                user_id, character, memory_type, memory_text, context,
+                _encode_embedding(embedding), importance, confidence,
+                fact_checked, fact_check_passed, fact_check_source
+            ))
+            row = self._fetchone(
+                "SELECT id FROM user_memories WHERE user_id = ? AND character = ? AND memory_text = ?",
+                (user_id, character, memory_text)
+            )
+            self._invalidate_index("user_memories", (user_id, character))
+        return row['id'] if row else None
+
+    def save_user_memories_bulk(
+        self,
+        user_id: str,
+        character: str,
+        memories: Sequence[Dict[str, Any]]
+    ) -> List[int]:
+        if not memories:
+            return []
+        with self._lock:
+            with self.connection:
+                self.connection.executemany("""
+                    INSERT INTO user_memories (
+                        user_id, character, memory_type, memory_text, context,
+                        embedding, importance, confidence,
+                        fact_checked, fact_check_passed, fact_check_source
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (user_id, character, memory_text) DO UPDATE SET
+                        importance = excluded.importance,
+                        confidence = excluded.confidence,
+                        fact_checked = excluded.fact_checked,
+                        fact_check_passed = excluded.fact_check_passed,
+                        fact_check_source = excluded.fact_check_source,
+                        reference_count = user_memories.reference_count + 1
+                """, [
+                    (
+                        user_id, character, m['memory_type'], m['memory_text'], m['context'],
+                        _encode_embedding(m['embedding']),
+                        m.get('importance', 5), m.get('confidence', 0.5),
+                        m.get('fact_checked', False), m.get('fact_check_passed'), m.get('fact_check_source')
+                    )
+                    for m in memories
+                ])
+            ids = []
+            for m in memories:
+                row = self.connection.execute(
+                    "SELECT id FROM user_memories WHERE user_id = ? AND character = ? AND memory_text = ?",
+                    (user_id, character, m['memory_text'])
+                ).fetchone()
+                if row:
+                    ids.append(row['id'])
+            self._invalidate_index("user_memories", (user_id, character))
+        return ids
+
+    def search_user_memories(
+        self,
+        user_id: str,
+        character: str,
+        embedding: Sequence[float],
+        top_k: int = 5
+    ) -> List[Dict[str, Any]]:
+        index = self._get_index("user_memories", "user_id = ? AND character = ?", (user_id, character))
+        hits = index.top_k(_normalize(np.asarray(embedding, dtype=np.float32)), top_k)
+        results = []
+        for memory_id, similarity in hits:
+            row = self._fetchone("""
+                SELECT id, memory_type, memory_text, context, importance, confidence, learned_at
+                FROM user_memories WHERE id = ?
+            """, (memory_id,))
+            if row:
+                row['similarity'] = similarity
+                results.append(row)
+        return results
+
+    def nearest_user_memories(
+        self,
+        user_id: str,
+        character: str,
+        embeddings: Sequence[Sequence[float]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        if not embeddings:
+            return []
+        index = self._get_index("user_memories", "user_id = ? AND character = ?", (user_id, character))
+        queries = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return [
+            None if hit is None else {'id': hit[0], 'similarity': hit[1]}
+            for hit in index.nearest(queries / norms)
+        ]
+
+    def update_memory_references_bulk(
+        self,
+        updates: Dict[int, Tuple[int, datetime]]
+    ) -> int:
+        if not updates:
+            return 0
+        with self._lock:
+            with self.connection:
+                cursor = self.connection.executemany("""
+                    UPDATE user_memories
+                    SET reference_count = COALESCE(reference_count, 0) + ?,
+                        last_referenced = MAX(COALESCE(last_referenced, ''), ?)
+                    WHERE id = ?
+                """, [
+                    (count, referenced_at.strftime('%Y-%m-%d %H:%M:%S'), memory_id)
+                    for memory_id, (count, referenced_at) in updates.items()
+                ])
+                return cursor.rowcount
+
+    def fetch_user_memories(self, user_id: str, character: str) -> List[Dict[str, Any]]:
+        return self._fetchall("""
+            SELECT id, memory_type, memory_text, context, importance, confidence, learned_at
+            FROM user_memories
+            WHERE user_id = ? AND character = ? AND memory_text IS NOT NULL
+        """, (user_id, character))
+
+    def merge_user_memory(
+        self,
+        memory_id: int,
+        importance: int = 5,
+        confidence: float = 0.5
+    ) -> bool:
+        cursor = self._execute("""
+            UPDATE user_memories
+            SET reference_count = COALESCE(reference_count, 0) + 1,
+                importance = MIN(10, MAX(COALESCE(importance, 0), ?) + 1),
+                confidence = MAX(COALESCE(confidence, 0), ?),
+                last_referenced = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (importance, confidence, memory_id))
+        return cursor.rowcount > 0
+
+    def list_compaction_targets(
+        self,
+        older_than: datetime,
+        max_importance: int,
+        min_group_size: int
+    ) -> List[Tuple[str, str]]:
+        rows = self._fetchall("""
+            SELECT user_id, character
+            FROM user_memories
+            WHERE learned_at < ? AND importance <= ?
+            GROUP BY user_id, character, memory_type
+            HAVING COUNT(*) >= ?
+        """, (older_than.strftime('%Y-%m-%d %H:%M:%S'), max_importance, min_group_size))
+        return sorted({(row['user_id'], row['character']) for row in rows})
+
+    def fetch_compaction_candidates(
+        self,
+        user_id: str,
+        character: str,
+        older_than: datetime,
+        max_importance: int
+    ) -> List[Dict[str, Any]]:
+        return self._fetchall("""
+            SELECT id, memory_type, memory_text, importance, confidence,
+                   reference_count, learned_at
+            FROM user_memories
+            WHERE user_id = ? AND character = ? AND learned_at < ? AND importance <= ?
+        """, (user_id, character, older_than.strftime('%Y-%m-%d %H:%M:%S'), max_importance))
+
+    def replace_user_memories(
+        self,
+        user_id: str,
+        character: str,
+        memory_ids: Sequence[int],
+        summary: Dict[str, Any],
+        embedding: Sequence[float]
+    ) -> Optional[int]:
+        with self._lock:
+            try:
+                # with文で1トランザクション（例外時はロールバック）
+                with self.connection:
+                    self.connection.execute("""
+                        INSERT INTO user_memories (
+                            user_id, character, memory_type, memory_text, context,
+                            embedding, importance, confidence, reference_count
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (user_id, character, memory_text) DO UPDATE SET
+                            reference_count = user_memories.reference_count + excluded.reference_count
+                    """, (
+                        user_id, character, summary['memory_type'], summary['memory_text'],
+                        summary['context'], _encode_embedding(embedding),
+                        summary['importance'], summary['confidence'], summary['reference_count']
+                    ))
+                    summary_id = self.connection.execute(
+                        "SELECT id FROM user_memories WHERE user_id = ? AND character = ? AND memory_text = ?",
+                        (user_id, character, summary['memory_text'])
+                    ).fetchone()['id']
+                    placeholders = ",".join("?" * len(memory_ids))
+                    self.connection.execute(f"""
+                        DELETE FROM user_memories
+                        WHERE id IN ({placeholders}) AND id <> ? AND user_id = ? AND character = ?
+                    """, (*memory_ids, summary_id, user_id, character))
+            except Exception as e:
+                logger.error(f"user_memories圧縮失敗: {e}")
+                return None
+            self._invalidate_index("user_memories", (user_id, character))
+        return summary_id
+
+    def update_memory_reference(self, memory_id: int) -> bool:
+        self._execute("""
+            UPDATE user_memories
+            SET reference_count = reference_count + 1,
+                last_referenced = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (memory_id,))
+        return True
+
+    def save_learned_knowledge(
+        self,
+        character: str,
+        word: str,
+        meaning: str,
+        context: Optional[str],
+        embedding: Sequence[float]
+    ) -> Optional[int]:
+        """学習済み知識を追加（負荷試験のデータ投入用）"""
+        cursor = self._execute("""
+            INSERT INTO learned_knowledge (character, word, meaning, context, embedding)
+            VALUES (?, ?, ?, ?, ?)
+        """, (character, word, meaning, context, _encode_embedding(embedding)))
+        self._invalidate_index("learned_knowledge", (character,))
+        return cursor.lastrowid
+
+    def search_learned_knowledge(
+        self,
+        character: str,
+        embedding: Sequence[float],
+        top_k: int = 3
+    ) -> List[Dict[str, Any]]:
+        index = self._get_index("learned_knowledge", "character = ?", (character,))
+        hits = index.top_k(_normalize(np.asarray(embedding, dtype=np.float32)), top_k)
+        results = []
+        for knowledge_id, similarity in hits:
+            row = self._fetchone(
+                "SELECT word, meaning, context FROM learned_knowledge WHERE id = ?",
+                (knowledge_id,)
+            )
+            if row:
+                row['similarity'] = similarity
+                results.append(row)
+        return results
+
+    def fetch_learned_knowledge(
+        self,
+        character: str,
+        since_id: int = 0,
+        limit: int = 5000
+    ) -> List[Dict[str, Any]]:
+        rows = self._fetchall("""
+            SELECT id, word, meaning, context, created_at, embedding
+            FROM learned_knowledge
+            WHERE character = ? AND embedding IS NOT NULL AND id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (character, since_id, limit))
+        for row in rows:
+            row['embedding'] = np.frombuffer(row['embedding'], dtype=np.float32)
+        return rows
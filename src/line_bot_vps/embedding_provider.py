@@ -0,0 +1,251 @@
+"""
+埋め込みプロバイダー
+
+RAG検索・ユーザー記憶で使う埋め込み生成を差し替え可能にする。
+
+実装:
+- OpenAIEmbeddingProvider: OpenAI Embeddings API（text-embedding-3-small、1536次元）
+- OnnxEmbeddingProvider: ローカルCPU推論（onnxruntime + tokenizers）
+  多言語モデル（例: intfloat/multilingual-e5-small のONNX版）を想定。
+  バッチ化・スレッドプール並列・int8動的量子化に対応。
+
+環境変数:
+- EMBEDDING_PROVIDER: 'openai'（デフォルト）/ 'onnx'
+- ONNX_EMBEDDING_MODEL_DIR: model.onnx と tokenizer.json を置いたディレクトリ
+- ONNX_EMBEDDING_QUANTIZED: '1' ならint8量子化モデルを使う
+
+プロバイダーを切り替えると次元数が変わるため、既存行は
+tools/reembed_vectors.py で再埋め込みすること。
+"""
+
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Protocol, Optional, List, Sequence, runtime_checkable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@runtime_checkable
+class EmbeddingProvider(Protocol):
+    """埋め込みプロバイダーのプロトコル"""
+
+    name: str
+    dim: int
+
+    def embed_query(self, text: str) -> List[float]: ...
+
+    def embed_documents(self, texts: Sequence[str]) -> List[List[float]]: ...
+
+
+class OpenAIEmbeddingProvider:
+    """OpenAI Embeddings API"""
+
+    def __init__(
+        self,
+        model: str = "text-embedding-3-small",
+        dim: int = 1536,
+        batch_size: int = 256,
+        max_retries: int = 3,
+        api_key: Optional[str] = None
+    ):
+        """初期化
+
+        Args:
+            model: 埋め込みモデル名
+            dim: 出力次元数
+            batch_size: 1リクエストあたりの最大テキスト数
+            max_retries: 一時的なエラー時のリトライ回数（指数バックオフ）
+            api_key: APIキー（Noneの場合は環境変数 OPENAI_API_KEY）
+        """
+        from openai import OpenAI
+
+        # グローバルの openai.api_key は書き換えず、専用クライアントを持つ
+        self.client = OpenAI(api_key=api_key or os.getenv('OPENAI_API_KEY'))
+        self.model = model
+        self.name = f"openai:{model}"
+        self.dim = dim
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+
+    def _create(self, texts: List[str]) -> List[List[float]]:
+        """APIを呼び出し（リトライ付き）"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.client.embeddings.create(model=self.model, input=texts)
+                return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                wait = 0.5 * (2 ** attempt)
+                logger.warning(f"⚠️ Embeddings API リトライ {attempt + 1}/{self.max_retries}（{wait:.1f}秒後）: {e}")
+                time.sleep(wait)
+
+    def embed_query(self, text: str) -> List[float]:
+        """検索クエリの埋め込み"""
+        return self._create([text])[0]
+
+    def embed_documents(self, texts: Sequence[str]) -> List[List[float]]:
+        """保存対象テキストの埋め込み（batch_sizeごとにまとめて送信）"""
+        results: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            results.extend(self._create(list(texts[start:start + self.batch_size])))
+        return results
+
+
+def quantize_model(model_path: Path, output_path: Path) -> Path:
+    """ONNXモデルをint8に動的量子化（重みのみ）
+
+    Args:
+        model_path: 元のmodel.onnx
+        output_path: 出力先
+
+    Returns:
+        量子化モデルのパス
+    """
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    quantize_dynamic(str(model_path), str(output_path), weight_type=QuantType.QInt8)
+    logger.info(f"✅ int8量子化モデル作成: {output_path}")
+    return output_path
+
+
+class OnnxEmbeddingProvider:
+    """ローカルONNXモデルによる埋め込み（CPU）"""
+
+    def __init__(
+        self,
+        model_dir: str,
+        quantized: bool = False,
+        batch_size: int = 32,
+        max_length: int = 256,
+        num_workers: Optional[int] = None,
+        query_prefix: str = "query: ",
+        document_prefix: str = "passage: "
+    ):
+        """初期化
+
+        Args:
+            model_dir: model.onnx と tokenizer.json を置いたディレクトリ
+            quantized: Trueならint8量子化モデル（model_int8.onnx、無ければ作成）を使う
+            batch_size: 1回の推論あたりのテキスト数
+            max_length: 最大トークン長（超過分は切り捨て）
+            num_workers: 推論スレッド数（Noneの場合はCPU数に応じて決定）
+            query_prefix: クエリに付与する接頭辞（e5系モデルの規約）
+            document_prefix: 保存テキストに付与する接頭辞
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        model_path = model_dir / "model.onnx"
+        if quantized:
+            int8_path = model_dir / "model_int8.onnx"
+            model_path = int8_path if int8_path.exists() else quantize_model(model_path, int8_path)
+
+        cpu_count = os.cpu_count() or 1
+        self.num_workers = num_workers or max(1, min(4, cpu_count // 2))
+
+        # スレッドプールの各ワーカーでセッションを共有する（InferenceSession.runはスレッドセーフ）
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = max(1, cpu_count // self.num_workers)
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(model_path), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        pad_token = "<pad>" if self.tokenizer.token_to_id("<pad>") is not None else "[PAD]"
+        self.tokenizer.enable_padding(
+            pad_id=self.tokenizer.token_to_id(pad_token) or 0,
+            pad_token=pad_token
+        )
+
+        self.batch_size = batch_size
+        self.query_prefix = query_prefix
+        self.document_prefix = document_prefix
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.num_workers, thread_name_prefix="onnx-embedding"
+        )
+
+        self.name = f"onnx:{model_dir.name}{':int8' if quantized else ''}"
+        self.dim = int(self._run_batch(["dim"]).shape[1])
+        logger.info(
+            f"✅ OnnxEmbeddingProvider初期化: {self.name}, dim={self.dim}, "
+            f"workers={self.num_workers}, batch_size={batch_size}"
+        )
+
+    def _run_batch(self, texts: List[str]) -> np.ndarray:
+        """1バッチを推論し、mean pooling + L2正規化した埋め込みを返す"""
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        output = self.session.run(None, feeds)[0]
+        if output.ndim == 3:
+            # last_hidden_state → パディングを除いた平均
+            mask = attention_mask[:, :, None].astype(np.float32)
+            output = (output * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        output = output.astype(np.float32)
+        output /= np.clip(np.linalg.norm(output, axis=1, keepdims=True), 1e-12, None)
+        return output
+
+    def _embed(self, texts: Sequence[str]) -> np.ndarray:
+        """batch_sizeごとに分割してスレッドプールで並列推論"""
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        batches = [
+            list(texts[start:start + self.batch_size])
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        if len(batches) == 1:
+            return self._run_batch(batches[0])
+        return np.vstack(list(self.executor.map(self._run_batch, batches)))
+
+    def embed_query(self, text: str) -> List[float]:
+        """検索クエリの埋め込み"""
+        return self._run_batch([self.query_prefix + text])[0].tolist()
+
+    def embed_documents(self, texts: Sequence[str]) -> List[List[float]]:
+        """保存対象テキストの埋め込み"""
+        return self._embed([self.document_prefix + t for t in texts]).tolist()
+
+    def close(self):
+        """スレッドプールを停止"""
+        self.executor.shutdown(wait=False)
+
+
+def create_embedding_provider(kind: Optional[str] = None, **kwargs) -> EmbeddingProvider:
+    """環境変数 EMBEDDING_PROVIDER に応じてプロバイダーを生成
+
+    Args:
+        kind: 'openai'（デフォルト）/ 'onnx'
+        **kwargs: プロバイダーのコンストラクタに渡す引数
+
+    Returns:
+        EmbeddingProvider実装
+    """
+    kind = (kind or os.getenv("EMBEDDING_PROVIDER", "openai")).lower()
+
+    if kind == "openai":
+        provider = OpenAIEmbeddingProvider(**kwargs)
+    elif kind == "onnx":
+        kwargs.setdefault("model_dir", os.getenv("ONNX_EMBEDDING_MODEL_DIR", "models/multilingual-e5-small"))
+        kwargs.setdefault("quantized", os.getenv("ONNX_EMBEDDING_QUANTIZED", "0") == "1")
+        provider = OnnxEmbeddingProvider(**kwargs)
+    else:
+        raise ValueError(f"Unsupported embedding provider: {kind}")
+
+    logger.info(f"✅ 埋め込みプロバイダー: {provider.name}（{provider.dim}次元）")
+    return provider
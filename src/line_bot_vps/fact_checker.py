@@ -10,6 +10,8 @@ import re
 from typing import Dict, Optional
 from pathlib import Path
 
+from ..core.keyword_engine import KeywordEngine
+
 logger = logging.getLogger(__name__)
 
 # scripts/grok_utils.pyのask_grok関数を使用
@@ -24,6 +26,27 @@ except ImportError:
     ask_grok = None
 
 
+SERIOUS_TOPICS = [
+    # 医療・健康
+    "健康", "医療", "病気", "薬", "治療", "症状",
+    "病院", "診察", "手術", "がん", "癌",
+
+    # お金
+    "お金", "投資", "借金", "貯金", "株", "FX",
+    "ローン", "クレジット", "振込", "詐欺",
+
+    # 法律
+    "法律", "犯罪", "警察", "裁判", "弁護士",
+    "違法", "逮捕", "訴訟",
+
+    # 災害・事故
+    "災害", "地震", "津波", "台風", "火事",
+    "事故", "怪我", "救急"
+]
+
+SERIOUS_TOPIC_ENGINE = KeywordEngine({"serious": SERIOUS_TOPICS}, ignore_case=False)
+
+
 class FactChecker:
     """ファクトチェッカー（Layer 6）"""
 
@@ -160,6 +183,7 @@ class FactChecker:
             new_info: 新しい情報
             character: キャラクター名
             learned_knowledge_list: 関連するlearned_knowledgeのリスト
+                                    （RAGSearchSystem.search の戻り値、関連度順）
 
         Returns:
             {
@@ -176,8 +200,9 @@ class FactChecker:
             return {'contradicts': False}
 
         try:
-            # 最も関連性の高い知識（similarity最大）を取得
-            most_relevant = max(learned_knowledge_list, key=lambda x: x.get('similarity', 0))
+            # 最も関連性の高い知識（RRF順の先頭）を取得
+            # 語彙検索だけのヒットはsimilarity=0.0のため、similarityで並べ替えない
+            most_relevant = learned_knowledge_list[0]
 
             # Grok APIで矛盾チェック
             contradiction_check_prompt = f"""
@@ -226,28 +251,10 @@ class FactChecker:
         Returns:
             重要な話題ならTrue
         """
-        SERIOUS_TOPICS = [
-            # 医療・健康
-            "健康", "医療", "病気", "薬", "治療", "症状",
-            "病院", "診察", "手術", "がん", "癌",
-
-            # お金
-            "お金", "投資", "借金", "貯金", "株", "FX",
-            "ローン", "クレジット", "振込", "詐欺",
-
-            # 法律
-            "法律", "犯罪", "警察", "裁判", "弁護士",
-            "違法", "逮捕", "訴訟",
-
-            # 災害・事故
-            "災害", "地震", "津波", "台風", "火事",
-            "事故", "怪我", "救急"
-        ]
-
-        for topic in SERIOUS_TOPICS:
-            if topic in message:
-                logger.info(f"🚨 重要な話題検出: {topic}")
-                return True
+        topics = SERIOUS_TOPIC_ENGINE.scan(message).keywords("serious")
+        if topics:
+            logger.info(f"🚨 重要な話題検出: {topics[0]}")
+            return True
 
         return False
 
@@ -0,0 +1,169 @@
+"""
+語彙（文字n-gram）+ ベクトルのハイブリッド検索
+
+- UserMemoryLexicalIndex: ユーザー×キャラクター単位の user_memories 語彙インデックス
+  （LRU + TTL。保存した記憶は add_rows で追記し、圧縮時のみ invalidate する）
+- fuse_results: ベクトル検索と語彙検索の結果をRRFで統合
+
+語彙検索の一致度は 'lexical_coverage'（見出し語のn-gramのうちクエリに含まれる割合）で
+返し、コサイン類似度の 'similarity' とは混ぜない。
+
+埋め込みはスラングや固有名詞の表記をぼかすため、完全一致に近い語彙ヒットは
+ベクトル類似度の閾値に関係なく拾い、RAGSearchSystem側で埋め込み呼び出し自体を
+省略する（語彙ファストパス）判断にも使う。
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Tuple, Hashable, Callable
+
+from .storage_backend import StorageBackend
+from .ngram_index import NgramIndex, reciprocal_rank_fusion
+
+logger = logging.getLogger(__name__)
+
+# 語彙ヒットとして採用する最小coverage（見出し語のn-gramのうちクエリに含まれる割合）
+LEXICAL_MIN_COVERAGE = 0.5
+
+
+class UserMemoryLexicalIndex:
+    """ユーザー×キャラクター単位の user_memories n-gramインデックス"""
+
+    def __init__(
+        self,
+        pg_manager: StorageBackend,
+        max_entries: int = 1024,
+        ttl: float = 300.0
+    ):
+        """初期化
+
+        Args:
+            pg_manager: 記憶を読み込むStorageBackend
+            max_entries: 保持する (user_id, character) の最大数（LRU）
+            ttl: インデックスの有効期間（秒）
+        """
+        self.pg_manager = pg_manager
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # (user_id, character) -> (loaded_at, NgramIndex, {id: row})
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, NgramIndex, Dict[int, Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, user_id: str, character: str):
+        rows = self.pg_manager.fetch_user_memories(user_id, character)
+        index = NgramIndex()
+        by_id = {}
+        for row in rows:
+            index.add(row['id'], row['memory_text'], row.get('context'))
+            by_id[row['id']] = row
+        return time.monotonic(), index, by_id
+
+    def _get(self, user_id: str, character: str):
+        key = (user_id, character)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._load(user_id, character)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def rows(self, user_id: str, character: str) -> Dict[int, Dict[str, Any]]:
+        """キャッシュ中の記憶行 {id: row}（重複判定用）"""
+        return self._get(user_id, character)[2]
+
+    def add_rows(self, user_id: str, character: str, rows: List[Dict[str, Any]]):
+        """保存した記憶を読み込み済みのインデックスに追記（同じIDは置き換え）
+
+        未読み込み（または期限切れ）なら何もしない（次回検索で全件読み込む）。
+        行の辞書は差し替えで更新するため、rows() の戻り値を走査中でも安全。
+
+        Args:
+            rows: fetch_user_memories と同じ形式の行
+        """
+        key = (user_id, character)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                return
+            loaded_at, index, by_id = entry
+            by_id = dict(by_id)
+            for row in rows:
+                by_id[row['id']] = row
+            self._entries[key] = (loaded_at, index, by_id)
+        for row in rows:
+            index.add(row['id'], row['memory_text'], row.get('context'))
+
+    def invalidate(self, user_id: str, character: str):
+        """記憶の削除・置き換え時に呼ぶ（次回検索で読み直す）"""
+        with self._lock:
+            self._entries.pop((user_id, character), None)
+
+    def search(
+        self,
+        user_id: str,
+        character: str,
+        query: str,
+        top_k: int = 5
+    ) -> List[Dict[str, Any]]:
+        """文字n-gramで検索（埋め込み不要）
+
+        Returns:
+            fetch_user_memories の行 + 'lexical_coverage', 'lexical_exact'
+        """
+        _, index, by_id = self._get(user_id, character)
+        results = []
+        for hit in index.search(query, top_k):
+            if hit.doc_id not in by_id:
+                # add_rows の追記途中（次回検索で整合する）
+                continue
+            row = dict(by_id[hit.doc_id])
+            row['lexical_coverage'] = hit.coverage
+            row['lexical_exact'] = hit.exact
+            results.append(row)
+        return results
+
+
+def fuse_results(
+    vector_results: List[Dict[str, Any]],
+    lexical_results: List[Dict[str, Any]],
+    key: Callable[[Dict[str, Any]], Hashable],
+    top_k: int
+) -> List[Dict[str, Any]]:
+    """ベクトル検索と語彙検索の結果をRRFで統合
+
+    同じ行が両方にある場合はベクトル側の行（実際のコサイン類似度）に
+    語彙側の 'lexical_coverage' / 'lexical_exact' を付けて使う。
+    語彙検索だけのヒットには 'similarity' がない。
+
+    Args:
+        vector_results: 閾値で絞り込み済みのベクトル検索結果（類似度順）
+        lexical_results: coverageで絞り込み済みの語彙検索結果（スコア順）
+        key: 行の同一性を判定するキー関数
+        top_k: 件数
+
+    Returns:
+        統合後の結果（RRF順）
+    """
+    rows: Dict[Hashable, Dict[str, Any]] = {}
+    for row in lexical_results:
+        rows[key(row)] = row
+    for row in vector_results:
+        lexical = rows.get(key(row))
+        if lexical is not None:
+            row = {**row, 'lexical_coverage': lexical['lexical_coverage'], 'lexical_exact': lexical['lexical_exact']}
+        rows[key(row)] = row
+
+    order = reciprocal_rank_fusion([
+        [key(row) for row in vector_results],
+        [key(row) for row in lexical_results],
+    ])
+    return [rows[k] for k in order[:top_k]]
@@ -11,26 +11,49 @@ import logging
 import re
 from typing import Dict, Optional, List
 from .postgresql_manager import PostgreSQLManager
+from .storage_backend import StorageBackend
 from .fact_checker import FactChecker
 from .personality_learner import PersonalityLearner
 from .user_memories_manager import UserMemoriesManager
+from .rag_search_system import RAGSearchSystem
+from ..core.keyword_engine import KeywordEngine
 
 logger = logging.getLogger(__name__)
 
+PLAYFUL_INDICATORS = [
+    # 語尾
+    "笑", "w", "ww", "www",
+    "でしょ？", "だろ？", "じゃん？",
+
+    # 絵文字
+    "😂", "🤣", "😆", "😜", "😏",
+
+    # フレーズ
+    "冗談", "嘘", "ウソ", "わざと"
+]
+
+# 含まれる指標1つにつき+0.2（大文字小文字は区別する）
+PLAYFUL_ENGINE = KeywordEngine({"playful": PLAYFUL_INDICATORS}, ignore_case=False)
+
 
 class IntegratedJudgmentEngine:
     """統合判定エンジン（7層防御）"""
 
-    def __init__(self, pg_manager: Optional[PostgreSQLManager] = None):
+    def __init__(
+        self,
+        pg_manager: Optional[StorageBackend] = None,
+        rag_search: Optional[RAGSearchSystem] = None
+    ):
         """初期化
 
         Args:
-            pg_manager: 外部から渡されるPostgreSQLManager（Noneの場合は新規作成）
+            pg_manager: 外部から渡されるStorageBackend（Noneの場合はPostgreSQLManagerを新規作成）
+            rag_search: 共有するRAGSearchSystem（Noneの場合はUserMemoriesManagerが作成）
         """
         self.pg_manager = pg_manager if pg_manager else PostgreSQLManager()
         self.fact_checker = FactChecker()
         self.personality_learner = PersonalityLearner(self.pg_manager)
-        self.user_memories_manager = UserMemoriesManager(self.pg_manager)
+        self.user_memories_manager = UserMemoriesManager(self.pg_manager, rag_search=rag_search)
         logger.info("✅ IntegratedJudgmentEngine初期化")
 
     def connect(self) -> bool:
@@ -204,23 +227,7 @@ class IntegratedJudgmentEngine:
         Returns:
             0.0-1.0のスコア
         """
-        PLAYFUL_INDICATORS = [
-            # 語尾
-            "笑", "w", "ww", "www",
-            "でしょ？", "だろ？", "じゃん？",
-
-            # 絵文字
-            "😂", "🤣", "😆", "😜", "😏",
-
-            # フレーズ
-            "冗談", "嘘", "ウソ", "わざと"
-        ]
-
-        score = 0.0
-        for indicator in PLAYFUL_INDICATORS:
-            if indicator in message:
-                score += 0.2
-
+        score = 0.2 * PLAYFUL_ENGINE.scan(message).count("playful")
         return min(score, 1.0)
 
     def _is_obviously_wrong(self, message: str) -> bool:
@@ -0,0 +1,371 @@
+"""
+learned_knowledge のプロセス内ベクトルインデックス
+
+learned_knowledge は小さく読み取り中心のため、チャット毎のpgvector往復をやめ、
+キャラクターごとに正規化済みfloat32行列をメモリに保持して検索する。
+DBは正本（source of truth）としてのみ使う。
+
+- 検索: 行列積 + argpartition による上位k件（厳密解）
+- 大規模時: hnswlib がインストールされていれば、hnsw_threshold 件以上で HNSW（近似解）
+- 更新: 読み込み済みの最大 id（ウォーターマーク）より後の行だけを差分読み込み
+  （refresh_interval 秒ごと、検索時にバックグラウンドで実行。idで重複を除く）
+- 全件再構築: rebuild_interval 秒ごと（UPDATE/DELETE・再埋め込みの反映用）
+- 語彙検索: 同じ行を文字n-gram転置インデックス（word / meaning）にも載せる
+"""
+
+import time
+import logging
+import threading
+from typing import Optional, List, Dict, Any, Sequence, Set, Tuple
+
+import numpy as np
+
+from .storage_backend import StorageBackend
+from .ngram_index import NgramIndex
+
+try:
+    import hnswlib
+    HNSW_AVAILABLE = True
+except ImportError:
+    HNSW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class CharacterVectorIndex:
+    """1キャラクター分の埋め込み行列（追記のみ、容量は倍々で確保）"""
+
+    def __init__(self, dim: int, hnsw_threshold: Optional[int] = None):
+        """初期化
+
+        Args:
+            dim: 埋め込みの次元数
+            hnsw_threshold: この件数以上でHNSWに切り替え（Noneまたはhnswlib未導入なら常に厳密検索）
+        """
+        self.dim = dim
+        self.hnsw_threshold = hnsw_threshold if HNSW_AVAILABLE else None
+        self.matrix = np.empty((0, dim), dtype=np.float32)
+        self.size = 0
+        self.payloads: List[Dict[str, Any]] = []
+        self.ids: Set[int] = set()
+        self.hnsw = None
+        self._write_lock = threading.Lock()
+
+    def append(self, vectors: np.ndarray, payloads: List[Dict[str, Any]]):
+        """正規化して末尾に追加
+
+        読み取り側は (matrix, size) のスナップショットで検索するため、
+        size を更新する前に行を書き込めばロックなしで検索できる。
+        """
+        if len(payloads) == 0:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors = vectors / norms
+
+        with self._write_lock:
+            needed = self.size + len(payloads)
+            matrix = self.matrix
+            if needed > matrix.shape[0]:
+                matrix = np.empty((max(needed, matrix.shape[0] * 2, 64), self.dim), dtype=np.float32)
+                matrix[:self.size] = self.matrix[:self.size]
+            matrix[self.size:needed] = vectors
+            self.payloads.extend(payloads)
+            self.ids.update(payload['id'] for payload in payloads)
+            self.matrix = matrix
+
+            if self.hnsw is not None:
+                self._hnsw_add(vectors, self.size)
+            elif self.hnsw_threshold is not None and needed >= self.hnsw_threshold:
+                self._build_hnsw(matrix[:needed])
+
+            self.size = needed
+
+    def _build_hnsw(self, vectors: np.ndarray):
+        """HNSWインデックスを構築（正規化済みなので内積空間）"""
+        index = hnswlib.Index(space='ip', dim=self.dim)
+        index.init_index(max_elements=max(len(vectors) * 2, 1024), ef_construction=200, M=16)
+        index.add_items(vectors, np.arange(len(vectors)))
+        index.set_ef(64)
+        self.hnsw = index
+        logger.info(f"✅ HNSWインデックス構築: {len(vectors)}件")
+
+    def _hnsw_add(self, vectors: np.ndarray, start: int):
+        if start + len(vectors) > self.hnsw.get_max_elements():
+            self.hnsw.resize_index((start + len(vectors)) * 2)
+        self.hnsw.add_items(vectors, np.arange(start, start + len(vectors)))
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """コサイン類似度の上位k件を (位置, 類似度) で返す
+
+        Args:
+            query: 正規化済みクエリベクトル
+            k: 件数
+        """
+        matrix, size, hnsw = self.matrix, self.size, self.hnsw
+        if size == 0:
+            return []
+        k = min(k, size)
+
+        if hnsw is not None:
+            labels, distances = hnsw.knn_query(query, k=k)
+            return [(int(i), 1.0 - float(d)) for i, d in zip(labels[0], distances[0])]
+
+        scores = matrix[:size] @ query
+        if k < size:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(size)
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+
+class LearnedKnowledgeIndex:
+    """キャラクター別の learned_knowledge インデックス（差分更新付き）
+
+    読み込み（初回構築・差分・再構築）はチャット処理をブロックしないよう
+    バックグラウンドスレッドで行い、完成したインデックスを差し替える。
+    初回構築が終わるまでは ready() が False を返す（呼び出し側はDB検索を使う）。
+    """
+
+    def __init__(
+        self,
+        pg_manager: StorageBackend,
+        refresh_interval: float = 30.0,
+        rebuild_interval: float = 3600.0,
+        hnsw_threshold: Optional[int] = 200_000,
+        batch_size: int = 5000
+    ):
+        """初期化
+
+        Args:
+            pg_manager: 正本を読むStorageBackend
+            refresh_interval: ウォーターマーク以降の差分を確認する間隔（秒）
+            rebuild_interval: 全件を読み直す間隔（秒）
+            hnsw_threshold: この件数以上のキャラクターはHNSWで検索（Noneで無効）
+            batch_size: 1回の読み込み件数
+        """
+        self.pg_manager = pg_manager
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.hnsw_threshold = hnsw_threshold
+        self.batch_size = batch_size
+
+        # character -> (ベクトルインデックス, 語彙インデックス)。組ごと差し替える
+        self._entries: Dict[str, Tuple[CharacterVectorIndex, NgramIndex]] = {}
+        # character -> 読み込み済みの最大id（ウォーターマーク）
+        self._watermarks: Dict[str, int] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._built_at: Dict[str, float] = {}
+        # character -> 読み込み失敗後に再試行できる時刻
+        self._retry_at: Dict[str, float] = {}
+        # 読み込み中のキャラクター（1キャラクターにつき同時に1つだけ）
+        self._loading: Set[str] = set()
+        self._lock = threading.Lock()
+        logger.info(
+            f"LearnedKnowledgeIndex initialized (refresh={refresh_interval}s, "
+            f"hnsw={'on' if HNSW_AVAILABLE and hnsw_threshold else 'off'})"
+        )
+
+    def _load_since(
+        self,
+        character: str,
+        since_id: int,
+        entry: Optional[Tuple[CharacterVectorIndex, NgramIndex]]
+    ) -> Tuple[Optional[Tuple[CharacterVectorIndex, NgramIndex]], int]:
+        """since_id より後の行を読み込んでインデックスに追加
+
+        Returns:
+            (インデックスの組（行がなければ None）, 新しいウォーターマーク)
+        """
+        index, lexical = entry if entry is not None else (None, None)
+        loaded = 0
+
+        while True:
+            rows = self.pg_manager.fetch_learned_knowledge(
+                character=character,
+                since_id=since_id,
+                limit=self.batch_size
+            )
+            if not rows:
+                break
+            since_id = rows[-1]['id']
+
+            vectors = np.array([row['embedding'] for row in rows], dtype=np.float32)
+            if index is None or index.dim != vectors.shape[1]:
+                # 初回、または埋め込みモデル変更で次元が変わった場合
+                index = CharacterVectorIndex(vectors.shape[1], self.hnsw_threshold)
+                lexical = NgramIndex()
+
+            # 読み込み済みのidは追加しない（ウォーターマークが戻っても重複させない）
+            keep = [i for i, row in enumerate(rows) if row['id'] not in index.ids]
+            if keep:
+                base = index.size
+                index.append(vectors[keep], [
+                    {
+                        'id': rows[i]['id'],
+                        'word': rows[i]['word'],
+                        'meaning': rows[i]['meaning'],
+                        'context': rows[i]['context'],
+                    }
+                    for i in keep
+                ])
+                # 語彙インデックスの文書IDはベクトル行列上の位置
+                for offset, i in enumerate(keep):
+                    lexical.add(base + offset, rows[i]['word'], rows[i]['meaning'])
+                loaded += len(keep)
+
+            if len(rows) < self.batch_size:
+                break
+
+        if loaded:
+            logger.info(f"📚 learned_knowledge インデックス更新: {character} +{loaded}件（計{index.size}件）")
+        return ((index, lexical) if index is not None else None), since_id
+
+    def rebuild(self, character: str):
+        """全件を読み直してインデックスを作り直す（完成後に差し替え）"""
+        entry, watermark = self._load_since(character, 0, None)
+        with self._lock:
+            self._store(character, entry, watermark)
+            now = time.monotonic()
+            self._checked_at[character] = now
+            self._built_at[character] = now
+
+    def refresh(self, character: str):
+        """ウォーターマーク以降の差分だけを読み込む"""
+        with self._lock:
+            entry = self._entries.get(character)
+            since_id = self._watermarks.get(character, 0)
+        entry, watermark = self._load_since(character, since_id, entry)
+        with self._lock:
+            self._store(character, entry, watermark)
+            self._checked_at[character] = time.monotonic()
+
+    def _store(
+        self,
+        character: str,
+        entry: Optional[Tuple[CharacterVectorIndex, NgramIndex]],
+        watermark: int
+    ):
+        if entry is not None:
+            self._entries[character] = entry
+        else:
+            self._entries.pop(character, None)
+        self._watermarks[character] = watermark
+
+    def _stale_job(self, character: str, now: float):
+        """必要な読み込み（rebuild / refresh / None）を判定（_lock を保持して呼ぶ）"""
+        if now < self._retry_at.get(character, 0.0):
+            return None
+        if character not in self._built_at or now - self._built_at[character] > self.rebuild_interval:
+            return self.rebuild
+        if now - self._checked_at.get(character, 0.0) > self.refresh_interval:
+            return self.refresh
+        return None
+
+    def _run(self, job, character: str):
+        try:
+            job(character)
+        except Exception as e:
+            logger.error(f"❌ learned_knowledge インデックス読み込み失敗: {character}: {e}")
+            with self._lock:
+                # 失敗時は refresh_interval の間は再試行しない
+                self._retry_at[character] = time.monotonic() + self.refresh_interval
+        finally:
+            with self._lock:
+                self._loading.discard(character)
+
+    def _ensure_fresh(self, character: str):
+        """古ければバックグラウンドで読み込みを開始（待たない）"""
+        now = time.monotonic()
+        with self._lock:
+            # 判定はロック内でやり直し、読み込み中なら何もしない
+            if character in self._loading:
+                return
+            job = self._stale_job(character, now)
+            if job is None:
+                return
+            self._loading.add(character)
+
+        threading.Thread(
+            target=self._run, args=(job, character),
+            name=f"knowledge-index-{character}", daemon=True
+        ).start()
+
+    def ready(self, character: str) -> bool:
+        """初回構築が終わっていれば True（古ければ更新をバックグラウンドで開始）"""
+        self._ensure_fresh(character)
+        return character in self._built_at
+
+    def search(
+        self,
+        character: str,
+        embedding: Sequence[float],
+        top_k: int = 3
+    ) -> List[Dict[str, Any]]:
+        """StorageBackend.search_learned_knowledge と同じ形式で検索
+
+        Returns:
+            [{'word', 'meaning', 'context', 'similarity'}, ...]（類似度の高い順）
+        """
+        self._ensure_fresh(character)
+        entry = self._entries.get(character)
+        if entry is None:
+            return []
+        index = entry[0]
+
+        query = np.asarray(embedding, dtype=np.float32)
+        if query.shape[0] != index.dim:
+            logger.warning(f"⚠️ クエリ次元({query.shape[0]})がインデックス({index.dim})と不一致")
+            return []
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        results = []
+        for position, similarity in index.search(query, top_k):
+            payload = index.payloads[position]
+            results.append({
+                'word': payload['word'],
+                'meaning': payload['meaning'],
+                'context': payload['context'],
+                'similarity': similarity,
+            })
+        return results
+
+    def lexical_search(
+        self,
+        character: str,
+        query: str,
+        top_k: int = 3
+    ) -> List[Dict[str, Any]]:
+        """文字n-gramで検索（埋め込み不要）
+
+        Returns:
+            [{'word', 'meaning', 'context', 'lexical_coverage', 'lexical_exact'}, ...]
+        """
+        self._ensure_fresh(character)
+        entry = self._entries.get(character)
+        if entry is None:
+            return []
+        index, lexical = entry
+
+        results = []
+        for hit in lexical.search(query, top_k):
+            if hit.doc_id >= len(index.payloads):
+                # 差分追加の途中（次回検索で整合する）
+                continue
+            payload = index.payloads[hit.doc_id]
+            results.append({
+                'word': payload['word'],
+                'meaning': payload['meaning'],
+                'context': payload['context'],
+                'lexical_coverage': hit.coverage,
+                'lexical_exact': hit.exact,
+            })
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        """キャラクターごとの件数"""
+        return {character: entry[0].size for character, entry in self._entries.items()}
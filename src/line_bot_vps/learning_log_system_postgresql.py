@@ -9,6 +9,7 @@ import logging
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from .postgresql_manager import PostgreSQLManager
+from .storage_backend import StorageBackend
 
 logger = logging.getLogger(__name__)
 
@@ -16,11 +17,11 @@ logger = logging.getLogger(__name__)
 class LearningLogSystemPostgreSQL:
     """学習ログシステム（PostgreSQL版）"""
 
-    def __init__(self, pg_manager: Optional[PostgreSQLManager] = None):
+    def __init__(self, pg_manager: Optional[StorageBackend] = None):
         """初期化
 
         Args:
-            pg_manager: 外部から渡されるPostgreSQLManager（Noneの場合は新規作成）
+            pg_manager: 外部から渡されるStorageBackend（Noneの場合はPostgreSQLManagerを新規作成）
         """
         self.pg_manager = pg_manager if pg_manager else PostgreSQLManager()
         self.connected = False
@@ -91,6 +92,51 @@ class LearningLogSystemPostgreSQL:
             logger.info(f"✅ 学習ログ保存: ID={log_id}, character={character}")
         return log_id
 
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        統計情報を取得
+
+        learning_log_statsカウンター（INSERT/UPDATE/DELETEトリガーで増分更新）から
+        数行を読むだけで、learning_logs全件の集計は行わない。
+        カウンター未作成のDBではバックエンド側でlearning_logsを集計する。
+
+        Returns:
+            統計情報（LearningLogSystem.get_stats と同じ形式）
+        """
+        stats = {
+            "total_logs": 0,
+            "character_counts": {},
+            "phase5_stats": {},
+            "avg_response_time": None
+        }
+
+        if not self.connected:
+            if not self.connect():
+                logger.error("PostgreSQL未接続のため、統計取得失敗")
+                return stats
+
+        rows = self.pg_manager.get_learning_log_stats()
+        if not rows:
+            return stats
+
+        response_time_sum = 0.0
+        response_time_count = 0
+        for row in rows:
+            count = row['log_count']
+            tier = row['phase5_response_tier'] or None
+            stats["total_logs"] += count
+            stats["character_counts"][row['character']] = (
+                stats["character_counts"].get(row['character'], 0) + count
+            )
+            stats["phase5_stats"][tier] = stats["phase5_stats"].get(tier, 0) + count
+            response_time_sum += row['response_time_sum']
+            response_time_count += row['response_time_count']
+
+        if response_time_count:
+            stats["avg_response_time"] = response_time_sum / response_time_count
+
+        return stats
+
     def __enter__(self):
         """コンテキストマネージャーのサポート"""
         self.connect()
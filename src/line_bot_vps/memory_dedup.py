@@ -0,0 +1,280 @@
+"""
+user_memories の書き込み時重複排除・圧縮
+
+書き込み時:
+1. SimHash（文字trigram、64bit）で既存記憶とほぼ同一の文面を検出
+   → 埋め込みを生成せずに既存行へマージ
+2. それ以外は埋め込みを生成し、同ユーザー×キャラクターの最近傍を1件検索
+   （一括保存ではバッチ全件の最近傍を1回の検索でまとめて取得）
+   → コサイン類似度が閾値以上なら既存行へマージ
+3. どちらにも該当しなければ新規保存（生成した埋め込みはそのまま使う）
+
+一括保存では、既存記憶と比べる前にバッチ内どうしもSimHashと
+コサイン類似度で比べ、ほぼ同一のものは先に出た1件だけを残す。
+
+マージは reference_count +1、importance +1（上限10）、confidence は大きい方。
+
+圧縮（build_summaries）:
+古い低重要度の記憶を memory_type ごとに1行の要約にまとめる。
+実行は tools/compact_user_memories.py（cronで定期実行）。
+"""
+
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, Sequence, Tuple
+
+import numpy as np
+
+from .ngram_index import normalize_text, char_ngrams
+
+logger = logging.getLogger(__name__)
+
+SIMHASH_BITS = 64
+
+# SimHashのハミング距離がこれ以下なら同一とみなす（64bit中）
+DEFAULT_SIMHASH_DISTANCE = 3
+
+# 埋め込みのコサイン類似度がこれ以上なら同一とみなす
+DEFAULT_DUPLICATE_SIMILARITY = 0.92
+
+# 要約行の memory_text 最大長
+SUMMARY_MAX_LENGTH = 500
+
+# 記憶IDごとのSimHashを保持する最大件数（超えたら作り直す）
+MAX_CACHED_SIMHASHES = 100_000
+
+
+def simhash(text: str) -> int:
+    """文字trigramのSimHash（64bit）"""
+    grams = char_ngrams(normalize_text(text), (3,))
+    if not grams:
+        return 0
+    weights = [0] * SIMHASH_BITS
+    for gram in grams:
+        h = int.from_bytes(hashlib.blake2b(gram.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+@dataclass
+class DuplicateCheck:
+    """重複判定の結果"""
+    duplicate_id: Optional[int]
+    embedding: Optional[List[float]]
+    reason: str = ""
+
+
+class MemoryDeduplicator:
+    """user_memories の書き込み時重複判定"""
+
+    def __init__(
+        self,
+        rag_search,
+        simhash_distance: int = DEFAULT_SIMHASH_DISTANCE,
+        similarity_threshold: float = DEFAULT_DUPLICATE_SIMILARITY
+    ):
+        """初期化
+
+        Args:
+            rag_search: RAGSearchSystem（埋め込み生成・記憶キャッシュ・ベクトル検索に使う）
+            simhash_distance: SimHash一致とみなすハミング距離
+            similarity_threshold: 埋め込み一致とみなすコサイン類似度
+        """
+        self.rag_search = rag_search
+        self.simhash_distance = simhash_distance
+        self.similarity_threshold = similarity_threshold
+        # memory_id -> (memory_text, SimHash)。キャッシュ行（呼び出し元にも返る）には書き込まない
+        self._simhashes: Dict[int, Tuple[str, int]] = {}
+
+    def _row_simhash(self, memory_id: int, memory_text: str) -> int:
+        cached = self._simhashes.get(memory_id)
+        if cached is not None and cached[0] == memory_text:
+            return cached[1]
+        if len(self._simhashes) >= MAX_CACHED_SIMHASHES:
+            self._simhashes = {}
+        value = simhash(memory_text)
+        self._simhashes[memory_id] = (memory_text, value)
+        return value
+
+    def simhash_matches(
+        self,
+        user_id: str,
+        character: str,
+        memory_texts: Sequence[str]
+    ) -> List[Optional[int]]:
+        """SimHashで既存記憶とほぼ同一の文面をまとめて探す（埋め込み不要）
+
+        Args:
+            user_id: ユーザーID
+            character: キャラクター名
+            memory_texts: 保存しようとしている記憶のリスト
+
+        Returns:
+            入力と同じ順序の一致した記憶ID（一致なしはNone）
+        """
+        rows = self.rag_search.memory_lexical_index.rows(user_id, character)
+        if not rows:
+            return [None] * len(memory_texts)
+        existing = [
+            (memory_id, self._row_simhash(memory_id, row['memory_text']))
+            for memory_id, row in rows.items()
+        ]
+
+        matches = []
+        for memory_text in memory_texts:
+            target = simhash(memory_text)
+            matches.append(next(
+                (memory_id for memory_id, value in existing
+                 if hamming_distance(target, value) <= self.simhash_distance),
+                None
+            ))
+        return matches
+
+    def embedding_matches(
+        self,
+        user_id: str,
+        character: str,
+        embeddings: Sequence[Sequence[float]]
+    ) -> List[Optional[int]]:
+        """埋め込みのコサイン類似度で既存記憶と同じものをまとめて探す（最近傍検索は1回）
+
+        Args:
+            user_id: ユーザーID
+            character: キャラクター名
+            embeddings: 保存しようとしている記憶の埋め込み
+
+        Returns:
+            入力と同じ順序の一致した記憶ID（一致なしはNone）
+        """
+        nearest = self.rag_search.pg_manager.nearest_user_memories(user_id, character, embeddings)
+        return [
+            row['id'] if row is not None and float(row['similarity']) >= self.similarity_threshold else None
+            for row in nearest
+        ]
+
+    def simhash_unique(self, memory_texts: Sequence[str]) -> List[int]:
+        """バッチ内でSimHashがほぼ同一の文面を除く
+
+        Args:
+            memory_texts: 保存しようとしている記憶のリスト
+
+        Returns:
+            残す要素のインデックス（先に出たものを残す）
+        """
+        kept, values = [], []
+        for i, memory_text in enumerate(memory_texts):
+            value = simhash(memory_text)
+            if all(hamming_distance(value, other) > self.simhash_distance for other in values):
+                kept.append(i)
+                values.append(value)
+        return kept
+
+    def embedding_unique(self, embeddings: Sequence[Sequence[float]]) -> List[int]:
+        """バッチ内でコサイン類似度が閾値以上の埋め込みを除く
+
+        Args:
+            embeddings: 保存しようとしている記憶の埋め込み
+
+        Returns:
+            残す要素のインデックス（先に出たものを残す）
+        """
+        if not embeddings:
+            return []
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = matrix / norms
+        similarities = matrix @ matrix.T
+
+        kept: List[int] = []
+        for i in range(len(matrix)):
+            if not kept or similarities[i, kept].max() < self.similarity_threshold:
+                kept.append(i)
+        return kept
+
+    def check(
+        self,
+        user_id: str,
+        character: str,
+        memory_text: str,
+        embedding: Optional[List[float]] = None
+    ) -> DuplicateCheck:
+        """重複判定
+
+        Args:
+            user_id: ユーザーID
+            character: キャラクター名
+            memory_text: 保存しようとしている記憶
+            embedding: 生成済みの埋め込み（Noneなら必要になった時点で生成）
+
+        Returns:
+            DuplicateCheck（duplicate_idがあればマージ先、embeddingは新規保存に再利用できる）
+        """
+        memory_id = self.simhash_matches(user_id, character, [memory_text])[0]
+        if memory_id is not None:
+            return DuplicateCheck(memory_id, embedding, "simhash")
+
+        if embedding is None:
+            embedding = self.rag_search.generate_embedding(memory_text, query=False)
+            if not embedding:
+                return DuplicateCheck(None, None, "embedding_failed")
+
+        memory_id = self.embedding_matches(user_id, character, [embedding])[0]
+        if memory_id is not None:
+            return DuplicateCheck(memory_id, embedding, "embedding")
+
+        return DuplicateCheck(None, embedding)
+
+
+def build_summaries(
+    candidates: List[Dict[str, Any]],
+    min_group_size: int = 5
+) -> List[Tuple[List[int], Dict[str, Any]]]:
+    """圧縮対象の記憶を memory_type ごとに要約行へまとめる
+
+    Args:
+        candidates: fetch_compaction_candidates の結果
+        min_group_size: この件数未満の memory_type はまとめない
+
+    Returns:
+        [(置き換える記憶IDのリスト, 要約行), ...]
+        要約行は memory_type / memory_text / context / importance / confidence / reference_count
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for row in candidates:
+        groups.setdefault(row['memory_type'] or 'other', []).append(row)
+
+    summaries = []
+    for memory_type, rows in groups.items():
+        if len(rows) < min_group_size:
+            continue
+
+        # よく参照された記憶から順に、重複文面を除いて連結
+        rows.sort(key=lambda r: (r['reference_count'] or 0, r['importance'] or 0), reverse=True)
+        texts, seen = [], set()
+        for row in rows:
+            key = normalize_text(row['memory_text'])
+            if key in seen:
+                continue
+            seen.add(key)
+            texts.append(row['memory_text'].strip())
+        memory_text = f"{memory_type}まとめ: " + " / ".join(texts)
+        if len(memory_text) > SUMMARY_MAX_LENGTH:
+            memory_text = memory_text[:SUMMARY_MAX_LENGTH - 1] + "…"
+
+        summaries.append(([row['id'] for row in rows], {
+            'memory_type': memory_type,
+            'memory_text': memory_text,
+            'context': f"{len(rows)}件の記憶を圧縮",
+            'importance': min(10, max(row['importance'] or 0 for row in rows) + 1),
+            'confidence': sum(row['confidence'] or 0 for row in rows) / len(rows),
+            'reference_count': sum(row['reference_count'] or 0 for row in rows),
+        }))
+
+    return summaries
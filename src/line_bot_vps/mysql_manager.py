@@ -162,13 +162,21 @@ class MySQLManager:
         self,
         user_id: str,
         selected_character: Optional[str] = None,
-        last_message_at: Optional[datetime] = None
+        last_message_at: Optional[datetime] = None,
+        language: Optional[str] = None
     ) -> bool:
         """ユーザーセッションを保存（INSERT or UPDATE）
 
+        Note:
+            MySQL版のsessionsテーブルにはlanguage列がないため、languageを
+            指定するとNotImplementedErrorを送出する
+
         Returns:
             成功したらTrue
         """
+        if language is not None:
+            raise NotImplementedError("MySQL版は言語設定に非対応")
+
         if not self.connection:
             logger.error("MySQL未接続")
             return False
@@ -467,3 +475,149 @@ class MySQLManager:
             logger.error(f"フィードバック状態設定失敗: {e}")
             self.connection.rollback()
             return False
+
+    # ========================================
+    # StorageBackend互換（MySQL版は旧構成のため一部のみ対応）
+    # 非対応の操作は黙って失敗させず NotImplementedError を送出する。
+    # create_storage_backend() は require_full=True（デフォルト）で
+    # MySQLを拒否するため、LINE Bot本体からは呼ばれない。
+    # ========================================
+
+    def get_user_language(self, user_id: str) -> str:
+        """ユーザーの言語設定を取得（MySQL版はlanguage列なしのため非対応）"""
+        raise NotImplementedError("MySQL版は言語設定に非対応")
+
+    def set_user_language(self, user_id: str, language: str) -> bool:
+        """ユーザーの言語設定を変更（MySQL版は非対応）"""
+        raise NotImplementedError("MySQL版は言語設定に非対応")
+
+    def get_user_character_stats(self, user_id: str) -> Optional[Dict[str, int]]:
+        """ユーザーのキャラクター別会話数を取得（conversation_historyを集計）"""
+        if not self.connection:
+            logger.error("MySQL未接続")
+            return None
+
+        try:
+            with self.connection.cursor() as cursor:
+                sql = """
+                    SELECT `character`, COUNT(*) as count
+                    FROM conversation_history
+                    WHERE user_id = %s AND role = 'user'
+                    GROUP BY `character`
+                """
+                cursor.execute(sql, (user_id,))
+                return {row['character']: row['count'] for row in cursor.fetchall()}
+
+        except Exception as e:
+            logger.error(f"会話数集計失敗: {e}")
+            return None
+
+    def get_learning_log_stats(self) -> Optional[List[Dict[str, Any]]]:
+        """学習ログのグローバル集計を取得（learning_logsを集計）"""
+        if not self.connection:
+            logger.error("MySQL未接続")
+            return None
+
+        try:
+            with self.connection.cursor() as cursor:
+                sql = """
+                    SELECT `character`,
+                           COALESCE(phase5_response_tier, '') as phase5_response_tier,
+                           COUNT(*) as log_count,
+                           COALESCE(SUM(response_time), 0) as response_time_sum,
+                           COUNT(response_time) as response_time_count
+                    FROM learning_logs
+                    GROUP BY `character`, COALESCE(phase5_response_tier, '')
+                """
+                cursor.execute(sql)
+                return list(cursor.fetchall())
+
+        except Exception as e:
+            logger.error(f"学習ログ集計失敗: {e}")
+            return None
+
+    def get_personality(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """個性を取得（MySQL版は非対応）"""
+        raise NotImplementedError("MySQL版は個性学習に非対応")
+
+    def increment_personality(self, user_id: str, counters: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        """個性カウンターを加算（MySQL版は非対応）"""
+        raise NotImplementedError("MySQL版は個性学習に非対応")
+
+    def set_personality_scores(self, user_id: str, scores: Dict[str, Any]) -> bool:
+        """個性スコアを更新（MySQL版は非対応）"""
+        raise NotImplementedError("MySQL版は個性学習に非対応")
+
+    def save_trust_history(
+        self,
+        user_id: str,
+        event_type: str,
+        trust_score_before: float,
+        trust_score_after: float,
+        delta: float,
+        statement: Optional[str] = None
+    ) -> bool:
+        """信頼度履歴を記録（MySQL版は非対応）"""
+        raise NotImplementedError("MySQL版は個性学習に非対応")
+
+    def save_user_memory(self, user_id: str, character: str, memory_type: str,
+                         memory_text: str, context: str, embedding,
+                         importance: int = 5, confidence: float = 0.5,
+                         fact_checked: bool = False,
+                         fact_check_passed: Optional[bool] = None,
+                         fact_check_source: Optional[str] = None) -> Optional[int]:
+        """ユーザー記憶を保存（MySQL版はベクトル検索非対応）"""
+        raise NotImplementedError("MySQL版はユーザー記憶（ベクトル検索）に非対応")
+
+    def search_user_memories(self, user_id: str, character: str, embedding, top_k: int = 5) -> List[Dict[str, Any]]:
+        """ユーザー記憶を検索（MySQL版はベクトル検索非対応）"""
+        raise NotImplementedError("MySQL版はユーザー記憶（ベクトル検索）に非対応")
+
+    def nearest_user_memories(self, user_id: str, character: str, embeddings) -> List[Optional[Dict[str, Any]]]:
+        """記憶の最近傍をまとめて取得（MySQL版はベクトル検索非対応）"""
+        raise NotImplementedError("MySQL版はユーザー記憶（ベクトル検索）に非対応")
+
+    def update_memory_reference(self, memory_id: int) -> bool:
+        """記憶の参照カウントを更新（MySQL版は非対応）"""
+        raise NotImplementedError("MySQL版はユーザー記憶に非対応")
+
+    def save_user_memories_bulk(self, user_id: str, character: str, memories) -> List[int]:
+        """ユーザー記憶の一括保存（MySQL版は非対応）"""
+        raise NotImplementedError("MySQL版はユーザー記憶（ベクトル検索）に非対応")
+
+    def update_memory_references_bulk(self, updates: Dict[int, Any]) -> int:
+        """参照カウントの一括更新（MySQL版は非対応）"""
+        raise NotImplementedError("MySQL版はユーザー記憶に非対応")
+
+    def fetch_user_memories(self, user_id: str, character: str) -> List[Dict[str, Any]]:
+        """ユーザー記憶を取得（MySQL版は非対応）"""
+        raise NotImplementedError("MySQL版はユーザー記憶に非対応")
+
+    def merge_user_memory(self, memory_id: int, importance: int = 5, confidence: float = 0.5) -> bool:
+        """重複記憶のマージ（MySQL版は非対応）"""
+        raise NotImplementedError("MySQL版はユーザー記憶に非対応")
+
+    def list_compaction_targets(self, older_than: datetime, max_importance: int, min_group_size: int) -> List:
+        """記憶圧縮の対象列挙（MySQL版は非対応）"""
+        raise NotImplementedError("MySQL版は記憶圧縮に非対応")
+
+    def fetch_compaction_candidates(self, user_id: str, character: str, older_than: datetime, max_importance: int) -> List[Dict[str, Any]]:
+        """記憶圧縮の候補取得（MySQL版は非対応）"""
+        raise NotImplementedError("MySQL版は記憶圧縮に非対応")
+
+    def replace_user_memories(self, user_id: str, character: str, memory_ids, summary: Dict[str, Any], embedding) -> Optional[int]:
+        """記憶の要約置き換え（MySQL版は非対応）"""
+        raise NotImplementedError("MySQL版は記憶圧縮に非対応")
+
+    def search_learned_knowledge(self, character: str, embedding, top_k: int = 3) -> List[Dict[str, Any]]:
+        """学習済み知識を検索（MySQL版はベクトル検索非対応）"""
+        raise NotImplementedError("MySQL版は学習済み知識（ベクトル検索）に非対応")
+
+    def fetch_learned_knowledge(
+        self,
+        character: str,
+        since_id: int = 0,
+        limit: int = 5000
+    ) -> List[Dict[str, Any]]:
+        """学習済み知識を取得（MySQL版は非対応）"""
+        raise NotImplementedError("MySQL版は学習済み知識に非対応")
@@ -0,0 +1,179 @@
+"""
+日本語向け文字n-gram転置インデックス
+
+単語境界のない日本語・スラング・固有名詞を、埋め込みを使わずに引くための
+文字bigram/trigramの転置インデックス（BM25スコア）。
+
+- key: 見出し語（learned_knowledge.word / user_memories.memory_text）
+- body: 補足テキスト（meaning / context）
+- coverage: keyのn-gramのうちクエリに含まれる割合（0〜1）。
+  keyがクエリに完全に含まれていれば exact=True（coverage=1.0）
+
+reciprocal_rank_fusion() でベクトル検索の順位と統合する。
+"""
+
+import math
+import threading
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Set
+
+NGRAM_SIZES = (2, 3)
+
+# BM25パラメータ
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# RRFの定数（一般的な既定値）
+RRF_K = 60
+
+
+def normalize_text(text: str) -> str:
+    """NFKC正規化・小文字化・空白除去（全角英数や半角カナの揺れを吸収）"""
+    return "".join(unicodedata.normalize("NFKC", text or "").lower().split())
+
+
+def char_ngrams(text: str, sizes: Sequence[int] = NGRAM_SIZES) -> List[str]:
+    """正規化済みテキストの文字n-gram（1文字のテキストはそのまま1-gram）"""
+    if len(text) < min(sizes):
+        return [text] if text else []
+    return [text[i:i + n] for n in sizes for i in range(len(text) - n + 1)]
+
+
+@dataclass
+class LexicalHit:
+    """n-gram検索の1件"""
+    doc_id: Hashable
+    score: float
+    coverage: float
+    exact: bool
+
+
+class NgramIndex:
+    """文字n-gram転置インデックス（追加・削除・BM25検索）"""
+
+    def __init__(self, sizes: Sequence[int] = NGRAM_SIZES):
+        self.sizes = tuple(sizes)
+        self._postings: Dict[str, Dict[Hashable, int]] = {}
+        self._doc_grams: Dict[Hashable, Counter] = {}
+        self._doc_len: Dict[Hashable, int] = {}
+        self._doc_keys: Dict[Hashable, str] = {}
+        self._key_grams: Dict[Hashable, Set[str]] = {}
+        self._total_len = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_grams)
+
+    def __contains__(self, doc_id: Hashable) -> bool:
+        return doc_id in self._doc_grams
+
+    def add(self, doc_id: Hashable, key: str, body: Optional[str] = None):
+        """文書を追加（同じdoc_idは置き換え）
+
+        Args:
+            doc_id: 文書ID
+            key: 見出し語（完全一致判定・coverageの対象）
+            body: 補足テキスト（BM25スコアのみに寄与）
+        """
+        key_norm = normalize_text(key)
+        key_grams = char_ngrams(key_norm, self.sizes)
+        grams = Counter(key_grams)
+        if body:
+            grams.update(char_ngrams(normalize_text(body), self.sizes))
+
+        with self._lock:
+            if doc_id in self._doc_grams:
+                self._remove_locked(doc_id)
+            for gram, tf in grams.items():
+                self._postings.setdefault(gram, {})[doc_id] = tf
+            self._doc_grams[doc_id] = grams
+            self._doc_len[doc_id] = sum(grams.values())
+            self._doc_keys[doc_id] = key_norm
+            self._key_grams[doc_id] = set(key_grams)
+            self._total_len += self._doc_len[doc_id]
+
+    def remove(self, doc_id: Hashable):
+        """文書を削除"""
+        with self._lock:
+            if doc_id in self._doc_grams:
+                self._remove_locked(doc_id)
+
+    def _remove_locked(self, doc_id: Hashable):
+        grams = self._doc_grams.pop(doc_id)
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[gram]
+        self._doc_keys.pop(doc_id, None)
+        self._key_grams.pop(doc_id, None)
+        self._total_len -= self._doc_len.pop(doc_id)
+
+    def search(self, query: str, top_k: int = 5) -> List[LexicalHit]:
+        """BM25スコア順に検索（完全一致のkeyを優先）
+
+        Args:
+            query: 検索クエリ
+            top_k: 件数
+
+        Returns:
+            LexicalHitのリスト（exact優先、BM25スコアの高い順）
+        """
+        query_norm = normalize_text(query)
+        query_grams = Counter(char_ngrams(query_norm, self.sizes))
+        if not query_grams:
+            return []
+
+        with self._lock:
+            n_docs = len(self._doc_grams)
+            if n_docs == 0:
+                return []
+            avg_len = self._total_len / n_docs
+
+            scores: Dict[Hashable, float] = {}
+            for gram, qtf in query_grams.items():
+                posting = self._postings.get(gram)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    doc_len = self._doc_len[doc_id]
+                    denom = tf + BM25_K1 * (1 - BM25_B + BM25_B * doc_len / avg_len)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + qtf * idf * tf * (BM25_K1 + 1) / denom
+
+            hits = []
+            query_gram_set = set(query_grams)
+            for doc_id, score in scores.items():
+                key = self._doc_keys[doc_id]
+                key_grams = self._key_grams[doc_id]
+                exact = len(key) >= min(self.sizes) and key in query_norm
+                coverage = 1.0 if exact else (
+                    len(key_grams & query_gram_set) / len(key_grams) if key_grams else 0.0
+                )
+                hits.append(LexicalHit(doc_id, score, coverage, exact))
+
+        hits.sort(key=lambda h: (h.exact, h.score), reverse=True)
+        return hits[:top_k]
+
+
+def reciprocal_rank_fusion(
+    rankings: Iterable[Sequence[Hashable]],
+    k: int = RRF_K
+) -> List[Hashable]:
+    """複数の順位リストをRRF（Σ 1/(k + rank)）で統合
+
+    Args:
+        rankings: 各検索結果のID列（良い順）
+        k: RRF定数
+
+    Returns:
+        統合後のID列（良い順）
+    """
+    fused: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused, key=fused.get, reverse=True)
@@ -7,6 +7,7 @@ Personality Learner - 個性学習システム（Layer 7）
 import logging
 from typing import Optional, Dict
 from .postgresql_manager import PostgreSQLManager
+from .storage_backend import StorageBackend
 
 logger = logging.getLogger(__name__)
 
@@ -14,11 +15,11 @@ logger = logging.getLogger(__name__)
 class PersonalityLearner:
     """個性学習システム（Layer 7）"""
 
-    def __init__(self, pg_manager: Optional[PostgreSQLManager] = None):
+    def __init__(self, pg_manager: Optional[StorageBackend] = None):
         """初期化
 
         Args:
-            pg_manager: 外部から渡されるPostgreSQLManager（Noneの場合は新規作成）
+            pg_manager: 外部から渡されるStorageBackend（Noneの場合はPostgreSQLManagerを新規作成）
         """
         self.pg_manager = pg_manager if pg_manager else PostgreSQLManager()
         logger.info("✅ PersonalityLearner初期化")
@@ -49,32 +50,16 @@ class PersonalityLearner:
                 ...
             }
         """
-        if not self.pg_manager.connection:
-            logger.error("PostgreSQL未接続")
-            return self._get_default_personality()
-
-        try:
-            with self.pg_manager.connection.cursor() as cursor:
-                sql = "SELECT * FROM user_personality WHERE user_id = %s"
-                cursor.execute(sql, (user_id,))
-                result = cursor.fetchone()
-
-                if not result:
-                    # 初回ユーザー → デフォルト値を返す
-                    logger.info(f"新規ユーザー: {user_id[:8]}... (デフォルト個性を返す)")
-                    return self._get_default_personality()
-
-                # 結果を辞書に変換
-                columns = [desc[0] for desc in cursor.description]
-                personality = dict(zip(columns, result))
+        personality = self.pg_manager.get_personality(user_id)
 
-                logger.debug(f"個性取得: user_id={user_id[:8]}..., playfulness={personality['playfulness_score']:.2f}, trust={personality['trust_score']:.2f}")
-                return personality
-
-        except Exception as e:
-            logger.error(f"❌ 個性取得失敗: {e}")
+        if not personality:
+            # 初回ユーザー（または取得失敗）→ デフォルト値を返す
+            logger.info(f"新規ユーザー: {user_id[:8]}... (デフォルト個性を返す)")
             return self._get_default_personality()
 
+        logger.debug(f"個性取得: user_id={user_id[:8]}..., playfulness={personality['playfulness_score']:.2f}, trust={personality['trust_score']:.2f}")
+        return personality
+
     def _get_default_personality(self) -> Dict:
         """デフォルトの個性を返す（初回ユーザー用）"""
         return {
@@ -110,57 +95,22 @@ class PersonalityLearner:
         Returns:
             成功したらTrue
         """
-        if not self.pg_manager.connection:
-            logger.error("PostgreSQL未接続")
+        # プロレス/真面目カウントを更新
+        counter = 'playful_interactions' if interaction_type == 'playful' else 'serious_interactions'
+        personality = self.pg_manager.increment_personality(user_id, {counter: 1})
+        if personality is None:
+            logger.error(f"❌ プロレス傾向更新失敗: user_id={user_id[:8]}...")
             return False
 
-        try:
-            with self.pg_manager.connection.cursor() as cursor:
-                # ユーザーが存在するか確認
-                cursor.execute("SELECT user_id FROM user_personality WHERE user_id = %s", (user_id,))
-                exists = cursor.fetchone() is not None
-
-                if not exists:
-                    # 新規ユーザー → INSERT
-                    cursor.execute("""
-                        INSERT INTO user_personality (user_id)
-                        VALUES (%s)
-                    """, (user_id,))
-
-                # プロレス/真面目カウントを更新
-                if interaction_type == 'playful':
-                    cursor.execute("""
-                        UPDATE user_personality
-                        SET playful_interactions = playful_interactions + 1,
-                            updated_at = NOW()
-                        WHERE user_id = %s
-                    """, (user_id,))
-                else:
-                    cursor.execute("""
-                        UPDATE user_personality
-                        SET serious_interactions = serious_interactions + 1,
-                            updated_at = NOW()
-                        WHERE user_id = %s
-                    """, (user_id,))
-
-                # playfulness_scoreを再計算
-                playfulness_score = self.calculate_playfulness_score(user_id)
-                cursor.execute("""
-                    UPDATE user_personality
-                    SET playfulness_score = %s,
-                        updated_at = NOW()
-                    WHERE user_id = %s
-                """, (playfulness_score, user_id))
-
-                self.pg_manager.connection.commit()
-                logger.info(f"✅ プロレス傾向更新: user_id={user_id[:8]}..., type={interaction_type}, score={playfulness_score:.2f}")
-                return True
-
-        except Exception as e:
-            logger.error(f"❌ プロレス傾向更新失敗: {e}")
-            self.pg_manager.connection.rollback()
+        # playfulness_scoreを再計算
+        playfulness_score = self._playfulness_from(personality)
+        if not self.pg_manager.set_personality_scores(user_id, {'playfulness_score': playfulness_score}):
+            logger.error(f"❌ プロレス傾向スコア保存失敗: user_id={user_id[:8]}...")
             return False
 
+        logger.info(f"✅ プロレス傾向更新: user_id={user_id[:8]}..., type={interaction_type}, score={playfulness_score:.2f}")
+        return True
+
     def calculate_playfulness_score(self, user_id: str) -> float:
         """
         ユーザーのプロレス傾向を計算
@@ -171,35 +121,21 @@ class PersonalityLearner:
         Returns:
             プロレス傾向スコア（0.0〜1.0）
         """
-        if not self.pg_manager.connection:
-            logger.error("PostgreSQL未接続")
-            return 0.5
-
-        try:
-            with self.pg_manager.connection.cursor() as cursor:
-                cursor.execute("""
-                    SELECT playful_interactions, serious_interactions
-                    FROM user_personality
-                    WHERE user_id = %s
-                """, (user_id,))
-
-                result = cursor.fetchone()
-
-                if not result:
-                    return 0.5  # デフォルト（中立）
+        personality = self.pg_manager.get_personality(user_id)
+        if not personality:
+            return 0.5  # デフォルト（中立）
+        return self._playfulness_from(personality)
 
-                playful_interactions, serious_interactions = result
-                total_interactions = playful_interactions + serious_interactions
+    @staticmethod
+    def _playfulness_from(personality: Dict) -> float:
+        playful_interactions = personality['playful_interactions']
+        serious_interactions = personality['serious_interactions']
+        total_interactions = playful_interactions + serious_interactions
 
-                if total_interactions == 0:
-                    return 0.5  # デフォルト
+        if total_interactions == 0:
+            return 0.5  # デフォルト
 
-                playfulness_score = playful_interactions / total_interactions
-                return playfulness_score
-
-        except Exception as e:
-            logger.error(f"❌ プロレス傾向計算失敗: {e}")
-            return 0.5
+        return playful_interactions / total_interactions
 
     def update_trust(
         self,
@@ -218,72 +154,34 @@ class PersonalityLearner:
         Returns:
             成功したらTrue
         """
-        if not self.pg_manager.connection:
-            logger.error("PostgreSQL未接続")
+        # 現在の信頼度を取得
+        current = self.pg_manager.get_personality(user_id)
+        trust_score_before = current['trust_score'] if current else 0.5
+
+        # 正解/誤りカウントを更新
+        counter = 'correct_teachings' if teaching_result == 'correct' else 'incorrect_teachings'
+        personality = self.pg_manager.increment_personality(user_id, {counter: 1})
+        if personality is None:
+            logger.error(f"❌ 信頼度更新失敗: user_id={user_id[:8]}...")
             return False
 
-        try:
-            with self.pg_manager.connection.cursor() as cursor:
-                # 現在の信頼度を取得
-                cursor.execute("SELECT trust_score FROM user_personality WHERE user_id = %s", (user_id,))
-                result = cursor.fetchone()
-
-                trust_score_before = result[0] if result else 0.5
-
-                # ユーザーが存在するか確認
-                if not result:
-                    # 新規ユーザー → INSERT
-                    cursor.execute("""
-                        INSERT INTO user_personality (user_id)
-                        VALUES (%s)
-                    """, (user_id,))
-                    trust_score_before = 0.5
-
-                # 正解/誤りカウントを更新
-                if teaching_result == 'correct':
-                    cursor.execute("""
-                        UPDATE user_personality
-                        SET correct_teachings = correct_teachings + 1,
-                            updated_at = NOW()
-                        WHERE user_id = %s
-                    """, (user_id,))
-                else:
-                    cursor.execute("""
-                        UPDATE user_personality
-                        SET incorrect_teachings = incorrect_teachings + 1,
-                            updated_at = NOW()
-                        WHERE user_id = %s
-                    """, (user_id,))
-
-                # trust_scoreを再計算
-                trust_score = self.calculate_trust_score(user_id)
-                cursor.execute("""
-                    UPDATE user_personality
-                    SET trust_score = %s,
-                        updated_at = NOW()
-                    WHERE user_id = %s
-                """, (trust_score, user_id))
-
-                # 信頼度履歴を記録
-                delta = trust_score - trust_score_before
-                event_type = 'correct_teaching' if teaching_result == 'correct' else 'incorrect_teaching'
-
-                cursor.execute("""
-                    INSERT INTO user_trust_history (
-                        user_id, event_type, trust_score_before, trust_score_after,
-                        delta, statement
-                    ) VALUES (%s, %s, %s, %s, %s, %s)
-                """, (user_id, event_type, trust_score_before, trust_score, delta, statement))
-
-                self.pg_manager.connection.commit()
-                logger.info(f"✅ 信頼度更新: user_id={user_id[:8]}..., result={teaching_result}, score={trust_score:.2f} (Δ{delta:+.2f})")
-                return True
-
-        except Exception as e:
-            logger.error(f"❌ 信頼度更新失敗: {e}")
-            self.pg_manager.connection.rollback()
+        # trust_scoreを再計算
+        trust_score = self._trust_from(personality)
+        if not self.pg_manager.set_personality_scores(user_id, {'trust_score': trust_score}):
+            logger.error(f"❌ 信頼度スコア保存失敗: user_id={user_id[:8]}...")
             return False
 
+        # 信頼度履歴を記録
+        delta = trust_score - trust_score_before
+        event_type = 'correct_teaching' if teaching_result == 'correct' else 'incorrect_teaching'
+        if not self.pg_manager.save_trust_history(
+            user_id, event_type, trust_score_before, trust_score, delta, statement
+        ):
+            logger.warning(f"⚠️ 信頼度履歴の記録失敗: user_id={user_id[:8]}...")
+
+        logger.info(f"✅ 信頼度更新: user_id={user_id[:8]}..., result={teaching_result}, score={trust_score:.2f} (Δ{delta:+.2f})")
+        return True
+
     def calculate_trust_score(self, user_id: str) -> float:
         """
         ユーザーの信頼度を計算
@@ -294,35 +192,21 @@ class PersonalityLearner:
         Returns:
             信頼度スコア（0.0〜1.0）
         """
-        if not self.pg_manager.connection:
-            logger.error("PostgreSQL未接続")
-            return 0.5
-
-        try:
-            with self.pg_manager.connection.cursor() as cursor:
-                cursor.execute("""
-                    SELECT correct_teachings, incorrect_teachings
-                    FROM user_personality
-                    WHERE user_id = %s
-                """, (user_id,))
-
-                result = cursor.fetchone()
-
-                if not result:
-                    return 0.5  # デフォルト（中立）
+        personality = self.pg_manager.get_personality(user_id)
+        if not personality:
+            return 0.5  # デフォルト（中立）
+        return self._trust_from(personality)
 
-                correct_teachings, incorrect_teachings = result
-                total_teachings = correct_teachings + incorrect_teachings
+    @staticmethod
+    def _trust_from(personality: Dict) -> float:
+        correct_teachings = personality['correct_teachings']
+        incorrect_teachings = personality['incorrect_teachings']
+        total_teachings = correct_teachings + incorrect_teachings
 
-                if total_teachings == 0:
-                    return 0.5  # デフォルト
+        if total_teachings == 0:
+            return 0.5  # デフォルト
 
-                trust_score = correct_teachings / total_teachings
-                return trust_score
-
-        except Exception as e:
-            logger.error(f"❌ 信頼度計算失敗: {e}")
-            return 0.5
+        return correct_teachings / total_teachings
 
     def update_relationship_level(
         self,
@@ -339,58 +223,25 @@ class PersonalityLearner:
         Returns:
             成功したらTrue
         """
-        if not self.pg_manager.connection:
-            logger.error("PostgreSQL未接続")
+        # 会話カウントを更新
+        counters = {'total_conversations': 1}
+        if interaction_positive:
+            counters['positive_interactions'] = 1
+
+        personality = self.pg_manager.increment_personality(user_id, counters)
+        if personality is None:
+            logger.error(f"❌ 関係性レベル更新失敗: user_id={user_id[:8]}...")
             return False
 
-        try:
-            with self.pg_manager.connection.cursor() as cursor:
-                # ユーザーが存在するか確認
-                cursor.execute("SELECT user_id FROM user_personality WHERE user_id = %s", (user_id,))
-                exists = cursor.fetchone() is not None
-
-                if not exists:
-                    # 新規ユーザー → INSERT
-                    cursor.execute("""
-                        INSERT INTO user_personality (user_id)
-                        VALUES (%s)
-                    """, (user_id,))
-
-                # 会話カウントを更新
-                if interaction_positive:
-                    cursor.execute("""
-                        UPDATE user_personality
-                        SET total_conversations = total_conversations + 1,
-                            positive_interactions = positive_interactions + 1,
-                            updated_at = NOW()
-                        WHERE user_id = %s
-                    """, (user_id,))
-                else:
-                    cursor.execute("""
-                        UPDATE user_personality
-                        SET total_conversations = total_conversations + 1,
-                            updated_at = NOW()
-                        WHERE user_id = %s
-                    """, (user_id,))
-
-                # relationship_levelを再計算
-                relationship_level = self.calculate_relationship_level(user_id)
-                cursor.execute("""
-                    UPDATE user_personality
-                    SET relationship_level = %s,
-                        updated_at = NOW()
-                    WHERE user_id = %s
-                """, (relationship_level, user_id))
-
-                self.pg_manager.connection.commit()
-                logger.info(f"✅ 関係性レベル更新: user_id={user_id[:8]}..., level={relationship_level}")
-                return True
-
-        except Exception as e:
-            logger.error(f"❌ 関係性レベル更新失敗: {e}")
-            self.pg_manager.connection.rollback()
+        # relationship_levelを再計算
+        relationship_level = self._relationship_level_from(personality)
+        if not self.pg_manager.set_personality_scores(user_id, {'relationship_level': relationship_level}):
+            logger.error(f"❌ 関係性レベル保存失敗: user_id={user_id[:8]}...")
             return False
 
+        logger.info(f"✅ 関係性レベル更新: user_id={user_id[:8]}..., level={relationship_level}")
+        return True
+
     def calculate_relationship_level(self, user_id: str) -> int:
         """
         関係性レベルを計算（1〜10）
@@ -401,43 +252,30 @@ class PersonalityLearner:
         Returns:
             関係性レベル（1〜10）
         """
-        if not self.pg_manager.connection:
-            logger.error("PostgreSQL未接続")
-            return 1
-
-        try:
-            with self.pg_manager.connection.cursor() as cursor:
-                cursor.execute("""
-                    SELECT total_conversations, positive_interactions
-                    FROM user_personality
-                    WHERE user_id = %s
-                """, (user_id,))
-
-                result = cursor.fetchone()
+        personality = self.pg_manager.get_personality(user_id)
+        if not personality:
+            return 1  # デフォルト（初対面）
+        return self._relationship_level_from(personality)
 
-                if not result:
-                    return 1  # デフォルト（初対面）
+    @staticmethod
+    def _relationship_level_from(personality: Dict) -> int:
+        total_conversations = personality['total_conversations']
+        positive_interactions = personality['positive_interactions']
 
-                total_conversations, positive_interactions = result
-
-                if total_conversations == 0:
-                    return 1
-
-                # 会話回数ベース（最大5）
-                base_level = min(total_conversations / 10, 5)
+        if total_conversations == 0:
+            return 1
 
-                # ポジティブ度ベース（最大5）
-                positive_ratio = positive_interactions / total_conversations
-                bonus_level = positive_ratio * 5
+        # 会話回数ベース（最大5）
+        base_level = min(total_conversations / 10, 5)
 
-                relationship_level = int(base_level + bonus_level)
+        # ポジティブ度ベース（最大5）
+        positive_ratio = positive_interactions / total_conversations
+        bonus_level = positive_ratio * 5
 
-                # 1〜10の範囲に収める
-                return max(1, min(relationship_level, 10))
+        relationship_level = int(base_level + bonus_level)
 
-        except Exception as e:
-            logger.error(f"❌ 関係性レベル計算失敗: {e}")
-            return 1
+        # 1〜10の範囲に収める
+        return max(1, min(relationship_level, 10))
 
     def __enter__(self):
         """コンテキストマネージャーのサポート"""
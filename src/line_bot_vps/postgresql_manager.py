@@ -5,18 +5,29 @@ VPS内のlocalhost PostgreSQLに直接接続
 LINE Bot用シンプル版（暗号化なし、既存DBスキーマ対応）
 """
 
+import io
 import psycopg2
+import psycopg2.errors
 import psycopg2.extras
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Sequence, Tuple
 from datetime import datetime
 import os
 
+from .storage_backend import PERSONALITY_COUNTERS, PERSONALITY_SCORES
+from .vector_codec import get_vector_type, encode_text, build_copy_payload
+
 logger = logging.getLogger(__name__)
 
+# bulk_update_embeddings で書き換えを許可するテーブル
+EMBEDDING_TABLES = ('user_memories', 'learned_knowledge')
+
 
 class PostgreSQLManager:
-    """PostgreSQLデータベース管理クラス（既存DBスキーマ対応）"""
+    """PostgreSQLデータベース管理クラス（既存DBスキーマ対応）
+
+    StorageBackendプロトコルの本番実装。
+    """
 
     def __init__(self):
         """初期化"""
@@ -29,6 +40,9 @@ class PostgreSQLManager:
             'port': int(os.getenv('POSTGRES_PORT', '5432')),
         }
 
+        # 埋め込み列の型（'vector' / 'halfvec'）
+        self.vector_type = get_vector_type()
+
         self.connection = None
         logger.info("PostgreSQLManager initialized")
 
@@ -264,6 +278,158 @@ class PostgreSQLManager:
             logger.error(f"会話履歴取得失敗: {e}")
             return []
 
+    def get_user_character_stats(self, user_id: str) -> Optional[Dict[str, int]]:
+        """ユーザーのキャラクター別会話数を取得（user_character_statsカウンター）
+
+        conversation_historyへのINSERTトリガーで増分更新されるため、
+        履歴件数に関係なく最大3行の参照で済む。
+
+        Args:
+            user_id: LINEユーザーID
+
+        Returns:
+            {キャラクター名: 会話数}（カウンター未作成などで取得できない場合はNone）
+        """
+        if not self._ensure_connection():
+            logger.error("PostgreSQL未接続")
+            return None
+
+        try:
+            with self.connection.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+                sql = """
+                    SELECT character, message_count
+                    FROM user_character_stats
+                    WHERE user_id = %s
+                """
+                cursor.execute(sql, (user_id,))
+                return {row['character']: row['message_count'] for row in cursor.fetchall()}
+
+        except psycopg2.errors.UndefinedTable:
+            # マイグレーション未適用: conversation_historyを直接集計
+            return self._count_user_messages(user_id)
+
+        except Exception as e:
+            logger.warning(f"会話数カウンター取得失敗: {e}")
+            return None
+
+    def _count_user_messages(self, user_id: str) -> Optional[Dict[str, int]]:
+        """conversation_historyを直接集計（カウンター未作成時のフォールバック）"""
+        try:
+            with self.connection.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+                # キャラクター別会話数を取得
+                cursor.execute("""
+                    SELECT character, COUNT(*) as count
+                    FROM conversation_history
+                    WHERE user_id = %s AND role = 'user'
+                    GROUP BY character
+                """, (user_id,))
+                return {row['character']: row['count'] for row in cursor.fetchall()}
+
+        except Exception as e:
+            logger.error(f"❌ 統計取得エラー: {e}")
+            return None
+
+    def get_learning_log_stats(self) -> Optional[List[Dict[str, Any]]]:
+        """学習ログのグローバル集計を取得（learning_log_statsカウンター）
+
+        カウンター未作成のDBでは learning_logs を直接集計する。
+
+        Returns:
+            キャラクター×Phase 5判定ごとの集計行のリスト
+            （取得できない場合はNone）
+        """
+        if not self._ensure_connection():
+            logger.error("PostgreSQL未接続")
+            return None
+
+        try:
+            with self.connection.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+                sql = """
+                    SELECT character, phase5_response_tier, log_count,
+                           response_time_sum, response_time_count
+                    FROM learning_log_stats
+                """
+                cursor.execute(sql)
+                return [dict(row) for row in cursor.fetchall()]
+
+        except psycopg2.errors.UndefinedTable:
+            # マイグレーション未適用: learning_logsを直接集計
+            return self._count_learning_logs()
+
+        except Exception as e:
+            logger.warning(f"学習ログ集計取得失敗: {e}")
+            return None
+
+    def _count_learning_logs(self) -> Optional[List[Dict[str, Any]]]:
+        """learning_logsを直接集計（カウンター未作成時のフォールバック）"""
+        try:
+            with self.connection.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+                cursor.execute("""
+                    SELECT character,
+                           COALESCE(phase5_response_tier, '') AS phase5_response_tier,
+                           COUNT(*) AS log_count,
+                           COALESCE(SUM(response_time), 0) AS response_time_sum,
+                           COUNT(response_time) AS response_time_count
+                    FROM learning_logs
+                    GROUP BY character, COALESCE(phase5_response_tier, '')
+                """)
+                return [dict(row) for row in cursor.fetchall()]
+
+        except Exception as e:
+            logger.error(f"❌ 学習ログ集計エラー: {e}")
+            return None
+
+    def backfill_stats(self) -> Dict[str, int]:
+        """統計カウンターを既存データから再集計
+
+        migrations/20261019_add_user_character_stats.sql 適用後に1回実行する。
+        集計中の書き込みで数がずれないよう、元テーブルをSHAREロックして
+        1トランザクションで作り直す。
+
+        Returns:
+            {"user_character_stats": 行数, "learning_log_stats": 行数}
+        """
+        if not self._ensure_connection():
+            raise RuntimeError("PostgreSQL未接続")
+
+        with self.connection.cursor() as cursor:
+            try:
+                cursor.execute("BEGIN")
+                cursor.execute("LOCK TABLE conversation_history, learning_logs IN SHARE MODE")
+
+                cursor.execute("DELETE FROM user_character_stats")
+                cursor.execute("""
+                    INSERT INTO user_character_stats (
+                        user_id, character, message_count, last_message_at, updated_at
+                    )
+                    SELECT user_id, character, COUNT(*), MAX(created_at), NOW()
+                    FROM conversation_history
+                    WHERE role = 'user' AND user_id IS NOT NULL AND character IS NOT NULL
+                    GROUP BY user_id, character
+                """)
+                user_rows = cursor.rowcount
+
+                cursor.execute("DELETE FROM learning_log_stats")
+                cursor.execute("""
+                    INSERT INTO learning_log_stats (
+                        character, phase5_response_tier, log_count,
+                        response_time_sum, response_time_count, updated_at
+                    )
+                    SELECT character, COALESCE(phase5_response_tier, ''), COUNT(*),
+                           COALESCE(SUM(response_time), 0), COUNT(response_time), NOW()
+                    FROM learning_logs
+                    GROUP BY character, COALESCE(phase5_response_tier, '')
+                """)
+                log_rows = cursor.rowcount
+
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+
+        logger.info(f"✅ 統計カウンター再集計: user_character_stats={user_rows}行, learning_log_stats={log_rows}行")
+        return {"user_character_stats": user_rows, "learning_log_stats": log_rows}
+
     def __enter__(self):
         """コンテキストマネージャー（with文）のサポート"""
         self.connect()
@@ -534,3 +700,758 @@ class PostgreSQLManager:
         except Exception as e:
             logger.error(f"言語設定失敗: {e}")
             return False
+
+    # ========================================
+    # 個性（Layer 7: user_personality）
+    # ========================================
+
+    def get_personality(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """ユーザーの個性を取得
+
+        Returns:
+            user_personalityの行（存在しない場合はNone）
+        """
+        if not self._ensure_connection():
+            logger.error("PostgreSQL未接続")
+            return None
+
+        try:
+            with self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                cursor.execute("SELECT * FROM user_personality WHERE user_id = %s", (user_id,))
+                result = cursor.fetchone()
+                return dict(result) if result else None
+
+        except Exception as e:
+            logger.error(f"個性取得失敗: {e}")
+            return None
+
+    def increment_personality(
+        self,
+        user_id: str,
+        counters: Dict[str, int]
+    ) -> Optional[Dict[str, Any]]:
+        """個性カウンターを加算（行がなければ作成）
+
+        Args:
+            user_id: ユーザーID
+            counters: {列名: 加算値}（PERSONALITY_COUNTERSの列のみ）
+
+        Returns:
+            更新後のuser_personalityの行（失敗時はNone）
+        """
+        unknown = set(counters) - set(PERSONALITY_COUNTERS)
+        if unknown:
+            raise ValueError(f"Unknown personality counters: {sorted(unknown)}")
+
+        if not self._ensure_connection():
+            logger.error("PostgreSQL未接続")
+            return None
+
+        try:
+            with self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                columns = list(counters)
+                insert_columns = "".join(f", {column}" for column in columns)
+                insert_values = ", %s" * len(columns)
+                assignments = "".join(
+                    f"{column} = user_personality.{column} + EXCLUDED.{column}, " for column in columns
+                )
+                sql = f"""
+                    INSERT INTO user_personality (user_id{insert_columns})
+                    VALUES (%s{insert_values})
+                    ON CONFLICT (user_id) DO UPDATE SET
+                        {assignments}updated_at = NOW()
+                    RETURNING *
+                """
+                cursor.execute(sql, (user_id, *counters.values()))
+                return dict(cursor.fetchone())
+
+        except Exception as e:
+            logger.error(f"個性カウンター更新失敗: {e}")
+            return None
+
+    def set_personality_scores(self, user_id: str, scores: Dict[str, Any]) -> bool:
+        """個性スコア（playfulness_score等）を更新
+
+        Args:
+            user_id: ユーザーID
+            scores: {列名: 値}（PERSONALITY_SCORESの列のみ）
+
+        Returns:
+            成功したらTrue
+        """
+        unknown = set(scores) - set(PERSONALITY_SCORES)
+        if unknown:
+            raise ValueError(f"Unknown personality scores: {sorted(unknown)}")
+        if not scores:
+            return True
+
+        if not self._ensure_connection():
+            logger.error("PostgreSQL未接続")
+            return False
+
+        try:
+            with self.connection.cursor() as cursor:
+                assignments = ", ".join(f"{column} = %s" for column in scores)
+                cursor.execute(
+                    f"UPDATE user_personality SET {assignments}, updated_at = NOW() WHERE user_id = %s",
+                    (*scores.values(), user_id)
+                )
+                return cursor.rowcount > 0
+
+        except Exception as e:
+            logger.error(f"個性スコア更新失敗: {e}")
+            return False
+
+    def save_trust_history(
+        self,
+        user_id: str,
+        event_type: str,
+        trust_score_before: float,
+        trust_score_after: float,
+        delta: float,
+        statement: Optional[str] = None
+    ) -> bool:
+        """信頼度履歴を記録（user_trust_history）"""
+        if not self._ensure_connection():
+            logger.error("PostgreSQL未接続")
+            return False
+
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO user_trust_history (
+                        user_id, event_type, trust_score_before, trust_score_after,
+                        delta, statement
+                    ) VALUES (%s, %s, %s, %s, %s, %s)
+                """, (user_id, event_type, trust_score_before, trust_score_after, delta, statement))
+                return True
+
+        except Exception as e:
+            logger.error(f"信頼度履歴記録失敗: {e}")
+            return False
+
+    # ========================================
+    # ユーザー記憶・学習済み知識（pgvector）
+    # ========================================
+
+    def save_user_memory(
+        self,
+        user_id: str,
+        character: str,
+        memory_type: str,
+        memory_text: str,
+        context: str,
+        embedding: Sequence[float],
+        importance: int = 5,
+        confidence: float = 0.5,
+        fact_checked: bool = False,
+        fact_check_passed: Optional[bool] = None,
+        fact_check_source: Optional[str] = None
+    ) -> Optional[int]:
+        """ユーザー記憶を保存（同一memory_textは参照カウントを加算）
+
+        Returns:
+            挿入（更新）されたレコードのID（失敗時はNone）
+        """
+        if not self._ensure_connection():
+            logger.error("PostgreSQL未接続")
+            return None
+
+        try:
+            with self.connection.cursor() as cursor:
+                sql = f"""
+                    INSERT INTO user_memories (
+                        user_id, character, memory_type, memory_text, context,
+                        embedding, importance, confidence,
+                        fact_checked, fact_check_passed, fact_check_source,
+                        learned_at
+                    ) VALUES (
+                        %s, %s, %s, %s, %s, %s::{self.vector_type}, %s, %s, %s, %s, %s, NOW()
+                    )
+                    ON CONFLICT (user_id, character, memory_text) DO UPDATE SET
+                        importance = EXCLUDED.importance,
+                        confidence = EXCLUDED.confidence,
+                        fact_checked = EXCLUDED.fact_checked,
+                        fact_check_passed = EXCLUDED.fact_check_passed,
+                        fact_check_source = EXCLUDED.fact_check_source,
+                        reference_count = user_memories.reference_count + 1
+                    RETURNING id
+                """
+
+                cursor.execute(sql, (
+                    user_id, character, memory_type, memory_text, context,
+                    encode_text(embedding, self.vector_type), importance, confidence,
+                    fact_checked, fact_check_passed, fact_check_source
+                ))
+                return cursor.fetchone()[0]
+
+        except Exception as e:
+            logger.error(f"user_memory保存失敗: {e}")
+            return None
+
+    def save_user_memories_bulk(
+        self,
+        user_id: str,
+        character: str,
+        memories: Sequence[Dict[str, Any]]
+    ) -> List[int]:
+        """複数のユーザー記憶を1回の複数行INSERTで保存
+
+        Args:
+            user_id: ユーザーID
+            character: キャラクター名
+            memories: save_user_memory の引数と同じキー（memory_type, memory_text, context,
+                      embedding, importance, confidence, fact_checked, fact_check_passed,
+                      fact_check_source）を持つ辞書のリスト。memory_textは重複しないこと
+
+        Returns:
+            挿入（更新）されたレコードのIDのリスト（失敗時は空）
+        """
+        if not memories:
+            return []
+        if not self._ensure_connection():
+            logger.error("PostgreSQL未接続")
+            return []
+
+        rows = [
+            (
+                user_id, character, m['memory_type'], m['memory_text'], m['context'],
+                encode_text(m['embedding'], self.vector_type),
+                m.get('importance', 5), m.get('confidence', 0.5),
+                m.get('fact_checked', False), m.get('fact_check_passed'), m.get('fact_check_source')
+            )
+            for m in memories
+        ]
+
+        try:
+            with self.connection.cursor() as cursor:
+                result = psycopg2.extras.execute_values(cursor, """
+                    INSERT INTO user_memories (
+                        user_id, character, memory_type, memory_text, context,
+                        embedding, importance, confidence,
+                        fact_checked, fact_check_passed, fact_check_source,
+                        learned_at
+                    ) VALUES %s
+                    ON CONFLICT (user_id, character, memory_text) DO UPDATE SET
+                        importance = EXCLUDED.importance,
+                        confidence = EXCLUDED.confidence,
+                        fact_checked = EXCLUDED.fact_checked,
+                        fact_check_passed = EXCLUDED.fact_check_passed,
+                        fact_check_source = EXCLUDED.fact_check_source,
+                        reference_count = user_memories.reference_count + 1
+                    RETURNING id
+                """, rows,
+                    template=f"(%s, %s, %s, %s, %s, %s::{self.vector_type}, %s, %s, %s, %s, %s, NOW())",
+                    fetch=True
+                )
+                return [row[0] for row in result]
+
+        except Exception as e:
+            logger.error(f"user_memories一括保存失敗: {e}")
+            return []
+
+    def search_user_memories(
+        self,
+        user_id: str,
+        character: str,
+        embedding: Sequence[float],
+        top_k: int = 5
+    ) -> List[Dict[str, Any]]:
+        """ユーザー記憶をコサイン類似度で検索（類似度の高い順）"""
+        if not self._ensure_connection():
+            logger.error("PostgreSQL未接続")
+            return []
+
+        try:
+            with self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                # pgvectorのコサイン距離（<=> 演算子）。クエリベクトルは1回だけバインドし、
+                # ORDER BYは別名で参照する（インデックススキャンはそのまま使われる）
+                sql = f"""
+                    SELECT
+                        id,
+                        memory_type,
+                        memory_text,
+                        context,
+                        importance,
+                        confidence,
+                        learned_at,
+                        embedding <=> %s::{self.vector_type} as distance
+                    FROM user_memories
+                    WHERE user_id = %s AND character = %s AND embedding IS NOT NULL
+                    ORDER BY distance
+                    LIMIT %s
+                """
+                cursor.execute(sql, (
+                    encode_text(embedding, self.vector_type), user_id, character, top_k
+                ))
+                return [self._with_similarity(row) for row in cursor.fetchall()]
+
+        except Exception as e:
+            logger.error(f"user_memories検索失敗: {e}")
+            return []
+
+    def nearest_user_memories(
+        self,
+        user_id: str,
+        character: str,
+        embeddings: Sequence[Sequence[float]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """各埋め込みの最近傍の記憶を1回のクエリでまとめて取得（重複判定用）
+
+        Returns:
+            入力と同じ順序の {'id', 'similarity'}（記憶がなければNone）
+        """
+        if not embeddings:
+            return []
+        if not self._ensure_connection():
+            logger.error("PostgreSQL未接続")
+            return [None] * len(embeddings)
+
+        try:
+            with self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                # クエリベクトルごとにLATERALで最近傍1件（各行でインデックススキャン）
+                sql = f"""
+                    SELECT q.ord, m.id, m.distance
+                    FROM unnest(%s::text[]) WITH ORDINALITY AS q(vec, ord)
+                    CROSS JOIN LATERAL (
+                        SELECT id, embedding <=> q.vec::{self.vector_type} as distance
+                        FROM user_memories
+                        WHERE user_id = %s AND character = %s AND embedding IS NOT NULL
+                        ORDER BY distance
+                        LIMIT 1
+                    ) m
+                """
+                cursor.execute(sql, (
+                    [encode_text(embedding, self.vector_type) for embedding in embeddings],
+                    user_id, character
+                ))
+                nearest: List[Optional[Dict[str, Any]]] = [None] * len(embeddings)
+                for row in cursor.fetchall():
+                    nearest[row['ord'] - 1] = {'id': row['id'], 'similarity': 1 - row['distance']}
+                return nearest
+
+        except Exception as e:
+            logger.error(f"user_memories最近傍検索失敗: {e}")
+            return [None] * len(embeddings)
+
+    def update_memory_references_bulk(
+        self,
+        updates: Dict[int, Tuple[int, datetime]]
+    ) -> int:
+        """参照カウント・最終参照日時を1回のUPDATEでまとめて反映
+
+        Args:
+            updates: {memory_id: (加算する参照回数, 最終参照日時)}
+
+        Returns:
+            更新した行数（失敗時は例外）
+        """
+        if not updates:
+            return 0
+        if not self._ensure_connection():
+            raise RuntimeError("PostgreSQL未接続")
+
+        with self.connection.cursor() as cursor:
+            psycopg2.extras.execute_values(cursor, """
+                UPDATE user_memories AS m
+                SET reference_count = COALESCE(m.reference_count, 0) + v.n,
+                    last_referenced = GREATEST(m.last_referenced, v.ts)
+                FROM (VALUES %s) AS v(id, n, ts)
+                WHERE m.id = v.id
+            """, [
+                (memory_id, count, referenced_at)
+                for memory_id, (count, referenced_at) in updates.items()
+            ], template="(%s::integer, %s::integer, %s::timestamp)")
+            return cursor.rowcount
+
+    def fetch_user_memories(self, user_id: str, character: str) -> List[Dict[str, Any]]:
+        """ユーザー×キャラクターの記憶を全件取得（embeddingなし、n-gramインデックス構築用）"""
+        if not self._ensure_connection():
+            logger.error("PostgreSQL未接続")
+            return []
+
+        try:
+            with self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                cursor.execute("""
+                    SELECT id, memory_type, memory_text, context, importance, confidence, learned_at
+                    FROM user_memories
+                    WHERE user_id = %s AND character = %s AND memory_text IS NOT NULL
+                """, (user_id, character))
+                return [dict(row) for row in cursor.fetchall()]
+
+        except Exception as e:
+            logger.error(f"user_memories取得失敗: {e}")
+            return []
+
+    def merge_user_memory(
+        self,
+        memory_id: int,
+        importance: int = 5,
+        confidence: float = 0.5
+    ) -> bool:
+        """重複した記憶を既存行にマージ（参照カウント+1、重要度+1（上限10）、信頼度は大きい方）"""
+        if not self._ensure_connection():
+            logger.error("PostgreSQL未接続")
+            return False
+
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE user_memories
+                    SET reference_count = COALESCE(reference_count, 0) + 1,
+                        importance = LEAST(10, GREATEST(COALESCE(importance, 0), %s) + 1),
+                        confidence = GREATEST(COALESCE(confidence, 0), %s),
+                        last_referenced = NOW()
+                    WHERE id = %s
+                """, (importance, confidence, memory_id))
+                return cursor.rowcount > 0
+
+        except Exception as e:
+            logger.error(f"user_memoryマージ失敗: {e}")
+            return False
+
+    def list_compaction_targets(
+        self,
+        older_than: datetime,
+        max_importance: int,
+        min_group_size: int
+    ) -> List[Tuple[str, str]]:
+        """圧縮対象の記憶を min_group_size 件以上持つ (user_id, character) を列挙"""
+        if not self._ensure_connection():
+            logger.error("PostgreSQL未接続")
+            return []
+
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT user_id, character
+                    FROM user_memories
+                    WHERE learned_at < %s AND importance <= %s AND user_id IS NOT NULL
+                    GROUP BY user_id, character, memory_type
+                    HAVING COUNT(*) >= %s
+                """, (older_than, max_importance, min_group_size))
+                return sorted(set(cursor.fetchall()))
+
+        except Exception as e:
+            logger.error(f"圧縮対象の列挙失敗: {e}")
+            return []
+
+    def fetch_compaction_candidates(
+        self,
+        user_id: str,
+        character: str,
+        older_than: datetime,
+        max_importance: int
+    ) -> List[Dict[str, Any]]:
+        """圧縮候補（古い低重要度の記憶）を取得"""
+        if not self._ensure_connection():
+            logger.error("PostgreSQL未接続")
+            return []
+
+        try:
+            with self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                cursor.execute("""
+                    SELECT id, memory_type, memory_text, importance, confidence,
+                           reference_count, learned_at
+                    FROM user_memories
+                    WHERE user_id = %s AND character = %s
+                      AND learned_at < %s AND importance <= %s
+                """, (user_id, character, older_than, max_importance))
+                return [dict(row) for row in cursor.fetchall()]
+
+        except Exception as e:
+            logger.error(f"圧縮候補の取得失敗: {e}")
+            return []
+
+    def replace_user_memories(
+        self,
+        user_id: str,
+        character: str,
+        memory_ids: Sequence[int],
+        summary: Dict[str, Any],
+        embedding: Sequence[float]
+    ) -> Optional[int]:
+        """複数の記憶を1行の要約に置き換え（1トランザクション）
+
+        Returns:
+            要約行のID（失敗時はNone）
+        """
+        if not self._ensure_connection():
+            logger.error("PostgreSQL未接続")
+            return None
+
+        with self.connection.cursor() as cursor:
+            try:
+                cursor.execute("BEGIN")
+                cursor.execute(f"""
+                    INSERT INTO user_memories (
+                        user_id, character, memory_type, memory_text, context,
+                        embedding, importance, confidence, reference_count, learned_at
+                    ) VALUES (
+                        %s, %s, %s, %s, %s, %s::{self.vector_type}, %s, %s, %s, NOW()
+                    )
+                    ON CONFLICT (user_id, character, memory_text) DO UPDATE SET
+                        reference_count = user_memories.reference_count + EXCLUDED.reference_count
+                    RETURNING id
+                """, (
+                    user_id, character, summary['memory_type'], summary['memory_text'],
+                    summary['context'], encode_text(embedding, self.vector_type),
+                    summary['importance'], summary['confidence'], summary['reference_count']
+                ))
+                summary_id = cursor.fetchone()[0]
+                cursor.execute("""
+                    DELETE FROM user_memories
+                    WHERE id = ANY(%s) AND id <> %s AND user_id = %s AND character = %s
+                """, (list(memory_ids), summary_id, user_id, character))
+                cursor.execute("COMMIT")
+                return summary_id
+            except Exception as e:
+                cursor.execute("ROLLBACK")
+                logger.error(f"user_memories圧縮失敗: {e}")
+                return None
+
+    def update_memory_reference(self, memory_id: int) -> bool:
+        """記憶の参照カウントと最終参照日時を更新"""
+        if not self._ensure_connection():
+            logger.error("PostgreSQL未接続")
+            return False
+
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE user_memories
+                    SET reference_count = reference_count + 1,
+                        last_referenced = NOW()
+                    WHERE id = %s
+                """, (memory_id,))
+                return True
+
+        except Exception as e:
+            logger.error(f"参照カウント更新失敗: {e}")
+            return False
+
+    def search_learned_knowledge(
+        self,
+        character: str,
+        embedding: Sequence[float],
+        top_k: int = 3
+    ) -> List[Dict[str, Any]]:
+        """学習済み知識をコサイン類似度で検索（類似度の高い順）"""
+        if not self._ensure_connection():
+            logger.error("PostgreSQL未接続")
+            return []
+
+        try:
+            with self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                # pgvectorのコサイン距離（<=> 演算子）。クエリベクトルは1回だけバインド
+                sql = f"""
+                    SELECT
+                        word,
+                        meaning,
+                        context,
+                        embedding <=> %s::{self.vector_type} as distance
+                    FROM learned_knowledge
+                    WHERE character = %s AND embedding IS NOT NULL
+                    ORDER BY distance
+                    LIMIT %s
+                """
+                cursor.execute(sql, (
+                    encode_text(embedding, self.vector_type), character, top_k
+                ))
+                return [self._with_similarity(row) for row in cursor.fetchall()]
+
+        except Exception as e:
+            logger.error(f"learned_knowledge検索失敗: {e}")
+            return []
+
+    def fetch_learned_knowledge(
+        self,
+        character: str,
+        since_id: int = 0,
+        limit: int = 5000
+    ) -> List[Dict[str, Any]]:
+        """学習済み知識を id 順に取得（ウォーターマーク以降のみ）
+
+        LearnedKnowledgeIndex の差分読み込み用。created_at はNULLになりうるため
+        ウォーターマークには使わない。
+
+        Args:
+            character: キャラクター名
+            since_id: このidより後の行を返す（0なら先頭から）
+            limit: 最大件数
+
+        Returns:
+            [{'id', 'word', 'meaning', 'context', 'created_at', 'embedding'(list)}, ...]
+        """
+        if not self._ensure_connection():
+            logger.error("PostgreSQL未接続")
+            return []
+
+        try:
+            with self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                cursor.execute("""
+                    SELECT id, word, meaning, context, created_at, embedding::real[] AS embedding
+                    FROM learned_knowledge
+                    WHERE character = %s AND embedding IS NOT NULL AND id > %s
+                    ORDER BY id
+                    LIMIT %s
+                """, (character, since_id, limit))
+                return [dict(row) for row in cursor.fetchall()]
+
+        except Exception as e:
+            logger.error(f"learned_knowledge取得失敗: {e}")
+            return []
+
+    @staticmethod
+    def _with_similarity(row: Dict[str, Any]) -> Dict[str, Any]:
+        """検索結果のコサイン距離を類似度（1 - 距離）に置き換え"""
+        result = dict(row)
+        result['similarity'] = 1 - result.pop('distance')
+        return result
+
+    def bulk_update_embeddings(
+        self,
+        table: str,
+        rows: Sequence[Tuple[int, Sequence[float]]]
+    ) -> int:
+        """embedding列を一括更新（COPY BINARYで一時テーブルに流し込みUPDATE）
+
+        テキスト表現を経由しないため、再埋め込みなど大量更新向け。
+
+        Args:
+            table: 'user_memories' / 'learned_knowledge'
+            rows: (id, embedding) のリスト
+
+        Returns:
+            更新した行数
+        """
+        if table not in EMBEDDING_TABLES:
+            raise ValueError(f"Unsupported embedding table: {table}")
+        if not rows:
+            return 0
+        if not self._ensure_connection():
+            raise RuntimeError("PostgreSQL未接続")
+
+        payload = build_copy_payload(rows, self.vector_type)
+
+        with self.connection.cursor() as cursor:
+            try:
+                cursor.execute("BEGIN")
+                cursor.execute(f"""
+                    CREATE TEMP TABLE embedding_updates (
+                        id BIGINT PRIMARY KEY,
+                        embedding {self.vector_type}
+                    ) ON COMMIT DROP
+                """)
+                cursor.copy_expert(
+                    "COPY embedding_updates (id, embedding) FROM STDIN WITH (FORMAT binary)",
+                    io.BytesIO(payload)
+                )
+                cursor.execute(f"""
+                    UPDATE {table} AS t
+                    SET embedding = u.embedding
+                    FROM embedding_updates AS u
+                    WHERE t.id = u.id
+                """)
+                updated = cursor.rowcount
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+
+        logger.info(f"✅ embedding一括更新: {table} {updated}行")
+        return updated
+
+    def fetch_embedding_texts(
+        self,
+        table: str,
+        after_id: int = 0,
+        limit: int = 500
+    ) -> List[Tuple[int, str]]:
+        """再埋め込み用に (id, 埋め込み対象テキスト) をid順に取得（キーセットページング）
+
+        Args:
+            table: 'user_memories' / 'learned_knowledge'
+            after_id: このIDより後の行を取得
+            limit: 最大件数
+
+        Returns:
+            (id, テキスト) のリスト
+        """
+        if table not in EMBEDDING_TABLES:
+            raise ValueError(f"Unsupported embedding table: {table}")
+        if not self._ensure_connection():
+            raise RuntimeError("PostgreSQL未接続")
+
+        # learned_knowledge は「単語: 意味」、user_memories は記憶本文を埋め込む
+        text_expr = "word || ': ' || meaning" if table == 'learned_knowledge' else "memory_text"
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT id, {text_expr}
+                FROM {table}
+                WHERE id > %s AND {text_expr} IS NOT NULL
+                ORDER BY id
+                LIMIT %s
+            """, (after_id, limit))
+            return cursor.fetchall()
+
+    def get_embedding_dimension(self, table: str) -> Optional[int]:
+        """embedding列の宣言次元数（vector(N) / halfvec(N) のN）を取得"""
+        if table not in EMBEDDING_TABLES:
+            raise ValueError(f"Unsupported embedding table: {table}")
+        if not self._ensure_connection():
+            raise RuntimeError("PostgreSQL未接続")
+
+        with self.connection.cursor() as cursor:
+            # pgvectorはatttypmodに次元数を格納する
+            cursor.execute("""
+                SELECT atttypmod
+                FROM pg_attribute
+                WHERE attrelid = %s::regclass AND attname = 'embedding'
+            """, (table,))
+            row = cursor.fetchone()
+            return row[0] if row and row[0] > 0 else None
+
+    def set_embedding_dimension(self, table: str, dim: int):
+        """embedding列の次元数を変更（既存の埋め込みとインデックスは破棄される）
+
+        埋め込みモデルを切り替えるとき（tools/reembed_vectors.py）に使う。
+        再埋め込み後に rebuild_embedding_index() でインデックスを作り直すこと。
+        """
+        if table not in EMBEDDING_TABLES:
+            raise ValueError(f"Unsupported embedding table: {table}")
+        if not self._ensure_connection():
+            raise RuntimeError("PostgreSQL未接続")
+
+        with self.connection.cursor() as cursor:
+            try:
+                cursor.execute("BEGIN")
+                cursor.execute(f"DROP INDEX IF EXISTS idx_{table}_embedding")
+                cursor.execute(f"""
+                    ALTER TABLE {table}
+                    ALTER COLUMN embedding TYPE {self.vector_type}({int(dim)})
+                    USING NULL
+                """)
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+
+        logger.info(f"✅ {table}.embedding を {self.vector_type}({dim}) に変更")
+
+    def rebuild_embedding_index(self, table: str, lists: int = 100):
+        """embedding列のivfflatインデックスを作り直す（データ投入後に実行）"""
+        if table not in EMBEDDING_TABLES:
+            raise ValueError(f"Unsupported embedding table: {table}")
+        if not self._ensure_connection():
+            raise RuntimeError("PostgreSQL未接続")
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DROP INDEX IF EXISTS idx_{table}_embedding")
+            cursor.execute(f"""
+                CREATE INDEX idx_{table}_embedding ON {table}
+                USING ivfflat (embedding {self.vector_type}_cosine_ops)
+                WITH (lists = {int(lists)})
+            """)
+
+        logger.info(f"✅ idx_{table}_embedding を再作成")
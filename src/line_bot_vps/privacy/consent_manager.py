@@ -6,13 +6,17 @@ Supports Japan's APPI (Act on the Protection of Personal Information).
 """
 
 import os
+import time
 import logging
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 from enum import Enum
 
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import PoolError, ThreadedConnectionPool
 
 from .policy_messages import PrivacyPolicyMessages
 from .encryption import ConversationEncryption
@@ -29,9 +33,34 @@ class ConsentStatus(Enum):
 
 
 class ConsentManager:
-    """Manage user consent for data processing (LINE Bot version)."""
-
-    def __init__(self):
+    """Manage user consent for data processing (LINE Bot version).
+
+    Connections come from a pool shared by every ConsentManager with the same
+    connection parameters, and consent records are cached in-process so that
+    per-message gates (has_valid_consent / needs_consent) normally skip the
+    database entirely. Every write through this class invalidates the cached
+    record for that user.
+    """
+
+    # Shared pools keyed by connection parameters, each with a semaphore of
+    # size maxconn so callers wait for a free connection instead of PoolError
+    _pools: Dict[Tuple, Tuple[ThreadedConnectionPool, threading.BoundedSemaphore]] = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(
+        self,
+        min_connections: int = 1,
+        max_connections: int = 5,
+        cache_ttl: float = 300.0,
+        pool_timeout: float = 30.0
+    ):
+        """
+        Args:
+            min_connections: Minimum pooled connections
+            max_connections: Maximum pooled connections
+            cache_ttl: Seconds a cached consent record stays valid
+            pool_timeout: Seconds to wait for a free pooled connection
+        """
         self.connection_params = {
             "host": os.getenv("POSTGRES_HOST", "162.43.4.11"),
             "port": int(os.getenv("POSTGRES_PORT", "5432")),
@@ -39,161 +68,246 @@ class ConsentManager:
             "password": os.getenv("POSTGRES_PASSWORD", "sistersSafe2024"),
             "database": os.getenv("POSTGRES_DB", "sisters_on_whatsapp"),
         }
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.pool_timeout = pool_timeout
         self.encryption = ConversationEncryption()
 
-    def _get_connection(self):
-        """Get database connection."""
-        return psycopg2.connect(**self.connection_params, connect_timeout=10)
+        # user_hash -> (consent record or None, expires_at)
+        self.cache_ttl = cache_ttl
+        self._cache: Dict[str, Tuple[Optional[Dict], float]] = {}
+        self._cache_lock = threading.Lock()
+        # Bumped on every invalidation so a read that raced a write is not cached
+        self._cache_generation = 0
+
+    def _get_pool(self) -> Tuple[ThreadedConnectionPool, threading.BoundedSemaphore]:
+        """Get (or lazily create) the shared connection pool and its semaphore."""
+        key = tuple(sorted(self.connection_params.items()))
+        entry = self._pools.get(key)
+        if entry is not None and not entry[0].closed:
+            return entry
+
+        with self._pools_lock:
+            entry = self._pools.get(key)
+            if entry is None or entry[0].closed:
+                pool = ThreadedConnectionPool(
+                    self.min_connections,
+                    self.max_connections,
+                    **self.connection_params,
+                    connect_timeout=10
+                )
+                entry = (pool, threading.BoundedSemaphore(self.max_connections))
+                self._pools[key] = entry
+                logger.info(f"Consent DB pool created (max={self.max_connections})")
+            return entry
+
+    @contextmanager
+    def _connection(self):
+        """Borrow a pooled connection; commit on success, rollback on error.
+
+        Waits up to pool_timeout seconds when all connections are in use.
+        """
+        pool, slots = self._get_pool()
+        if not slots.acquire(timeout=self.pool_timeout):
+            raise PoolError(f"no consent DB connection available within {self.pool_timeout}s")
+        try:
+            conn = pool.getconn()
+            broken = False
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+                raise
+            finally:
+                pool.putconn(conn, close=broken or bool(conn.closed))
+        finally:
+            slots.release()
+
+    @classmethod
+    def close_pools(cls):
+        """Close all shared pools (call on application shutdown)."""
+        with cls._pools_lock:
+            for pool, _ in cls._pools.values():
+                if not pool.closed:
+                    pool.closeall()
+            cls._pools.clear()
+
+    def _cache_get(self, user_hash: str) -> Tuple[bool, Optional[Dict]]:
+        """Return (hit, record) from the consent cache."""
+        with self._cache_lock:
+            entry = self._cache.get(user_hash)
+            if entry is None:
+                return False, None
+            record, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._cache[user_hash]
+                return False, None
+            return True, dict(record) if record else None
+
+    def _cache_put(self, user_hash: str, record: Optional[Dict], generation: Optional[int] = None):
+        with self._cache_lock:
+            if generation is not None and generation != self._cache_generation:
+                return
+            self._cache[user_hash] = (
+                dict(record) if record else None,
+                time.monotonic() + self.cache_ttl
+            )
+
+    def invalidate_cache(self, user_id: Optional[str] = None):
+        """Drop cached consent for one user (or everyone if user_id is None)."""
+        with self._cache_lock:
+            self._cache_generation += 1
+            if user_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(self.encryption.hash_user_id(user_id), None)
+
+    def _invalidate_hash(self, user_hash: str):
+        with self._cache_lock:
+            self._cache_generation += 1
+            self._cache.pop(user_hash, None)
 
     def ensure_table_exists(self):
         """Create user_consents table if not exists."""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        # Add LINE Bot specific columns if not exists
-        cursor.execute("""
-            DO $$
-            BEGIN
-                IF NOT EXISTS (SELECT 1 FROM information_schema.columns
-                               WHERE table_name = 'user_consents' AND column_name = 'user_hash') THEN
-                    ALTER TABLE user_consents ADD COLUMN user_hash VARCHAR(64);
-                    CREATE UNIQUE INDEX IF NOT EXISTS idx_consents_user_hash ON user_consents(user_hash);
-                END IF;
-                IF NOT EXISTS (SELECT 1 FROM information_schema.columns
-                               WHERE table_name = 'user_consents' AND column_name = 'user_id') THEN
-                    ALTER TABLE user_consents ADD COLUMN user_id VARCHAR(255);
-                END IF;
-            END $$;
-        """)
-
-        conn.commit()
-        conn.close()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+
+            # Add LINE Bot specific columns if not exists
+            cursor.execute("""
+                DO $$
+                BEGIN
+                    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                                   WHERE table_name = 'user_consents' AND column_name = 'user_hash') THEN
+                        ALTER TABLE user_consents ADD COLUMN user_hash VARCHAR(64);
+                        CREATE UNIQUE INDEX IF NOT EXISTS idx_consents_user_hash ON user_consents(user_hash);
+                    END IF;
+                    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                                   WHERE table_name = 'user_consents' AND column_name = 'user_id') THEN
+                        ALTER TABLE user_consents ADD COLUMN user_id VARCHAR(255);
+                    END IF;
+                END $$;
+            """)
+
         logger.info("user_consents table ready for LINE Bot")
 
     def get_user_consent(self, user_id: str) -> Optional[Dict]:
-        """Get user's consent record."""
+        """Get user's consent record (cached)."""
         user_hash = self.encryption.hash_user_id(user_id)
 
-        conn = self._get_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        hit, record = self._cache_get(user_hash)
+        if hit:
+            return record
 
-        # Try by user_hash (LINE Bot records)
-        cursor.execute("""
-            SELECT * FROM user_consents WHERE user_hash = %s
-        """, (user_hash,))
-        result = cursor.fetchone()
+        generation = self._cache_generation
+        with self._connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
 
-        conn.close()
-        return dict(result) if result else None
+            # Try by user_hash (LINE Bot records)
+            cursor.execute("""
+                SELECT * FROM user_consents WHERE user_hash = %s
+            """, (user_hash,))
+            result = cursor.fetchone()
+
+        record = dict(result) if result else None
+        self._cache_put(user_hash, record, generation)
+        return record
 
     def create_pending_consent(self, user_id: str, language: str = "ja") -> Dict:
         """Create a pending consent record for new user."""
         user_hash = self.encryption.hash_user_id(user_id)
         encrypted_user_id = self.encryption.encrypt(user_id)
 
-        conn = self._get_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-
-        cursor.execute("""
-            INSERT INTO user_consents (
-                user_hash, user_id, phone_number, region, status, language,
-                policy_url_shown, platform, created_at
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, 'line', %s)
-            ON CONFLICT (user_hash) DO UPDATE SET
-                last_reminded_at = CURRENT_TIMESTAMP
-            RETURNING *
-        """, (
-            user_hash,
-            encrypted_user_id,
-            encrypted_user_id,  # Use encrypted user_id for phone_number field
-            "japan",
-            ConsentStatus.PENDING.value,
-            language,
-            PrivacyPolicyMessages.POLICY_URL,
-            datetime.now()
-        ))
-
-        result = cursor.fetchone()
-        conn.commit()
-        conn.close()
+        with self._connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+            cursor.execute("""
+                INSERT INTO user_consents (
+                    user_hash, user_id, phone_number, region, status, language,
+                    policy_url_shown, platform, created_at
+                )
+                VALUES (%s, %s, %s, %s, %s, %s, %s, 'line', %s)
+                ON CONFLICT (user_hash) DO UPDATE SET
+                    last_reminded_at = CURRENT_TIMESTAMP
+                RETURNING *
+            """, (
+                user_hash,
+                encrypted_user_id,
+                encrypted_user_id,  # Use encrypted user_id for phone_number field
+                "japan",
+                ConsentStatus.PENDING.value,
+                language,
+                PrivacyPolicyMessages.POLICY_URL,
+                datetime.now()
+            ))
+
+            result = cursor.fetchone()
+
+        self._invalidate_hash(user_hash)
 
         logger.info(f"Created pending consent for LINE user {user_hash[:8]}...")
         return dict(result)
 
-    def grant_consent(self, user_id: str) -> bool:
-        """Record user's consent."""
+    def _update_status(self, user_id: str, sql: str, params: Tuple) -> bool:
+        """Run a consent UPDATE ... RETURNING id and invalidate the cache."""
         user_hash = self.encryption.hash_user_id(user_id)
 
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql, params + (user_hash,))
+                result = cursor.fetchone()
+        finally:
+            self._invalidate_hash(user_hash)
 
-        cursor.execute("""
+        return result is not None
+
+    def grant_consent(self, user_id: str) -> bool:
+        """Record user's consent."""
+        updated = self._update_status(user_id, """
             UPDATE user_consents
             SET status = %s,
                 consent_given_at = CURRENT_TIMESTAMP,
                 consent_method = 'line_message'
             WHERE user_hash = %s
             RETURNING id
-        """, (ConsentStatus.GRANTED.value, user_hash))
-
-        result = cursor.fetchone()
-        conn.commit()
-        conn.close()
+        """, (ConsentStatus.GRANTED.value,))
 
-        if result:
-            logger.info(f"Consent granted for LINE user {user_hash[:8]}...")
-            return True
-        return False
+        if updated:
+            logger.info(f"Consent granted for LINE user {self.encryption.hash_user_id(user_id)[:8]}...")
+        return updated
 
     def decline_consent(self, user_id: str) -> bool:
         """Record user's decline."""
-        user_hash = self.encryption.hash_user_id(user_id)
-
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
+        updated = self._update_status(user_id, """
             UPDATE user_consents
             SET status = %s,
                 consent_withdrawn_at = CURRENT_TIMESTAMP
             WHERE user_hash = %s
             RETURNING id
-        """, (ConsentStatus.DECLINED.value, user_hash))
-
-        result = cursor.fetchone()
-        conn.commit()
-        conn.close()
+        """, (ConsentStatus.DECLINED.value,))
 
-        if result:
-            logger.info(f"Consent declined for LINE user {user_hash[:8]}...")
-            return True
-        return False
+        if updated:
+            logger.info(f"Consent declined for LINE user {self.encryption.hash_user_id(user_id)[:8]}...")
+        return updated
 
     def withdraw_consent(self, user_id: str) -> bool:
         """Record consent withdrawal (for data deletion)."""
-        user_hash = self.encryption.hash_user_id(user_id)
-
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
+        updated = self._update_status(user_id, """
             UPDATE user_consents
             SET status = %s,
                 consent_withdrawn_at = CURRENT_TIMESTAMP,
                 data_deletion_requested_at = CURRENT_TIMESTAMP
             WHERE user_hash = %s
             RETURNING id
-        """, (ConsentStatus.WITHDRAWN.value, user_hash))
-
-        result = cursor.fetchone()
-        conn.commit()
-        conn.close()
+        """, (ConsentStatus.WITHDRAWN.value,))
 
-        if result:
-            logger.info(f"Consent withdrawn for LINE user {user_hash[:8]}...")
-            return True
-        return False
+        if updated:
+            logger.info(f"Consent withdrawn for LINE user {self.encryption.hash_user_id(user_id)[:8]}...")
+        return updated
 
     def has_valid_consent(self, user_id: str) -> bool:
         """Check if user has valid consent."""
@@ -213,33 +327,26 @@ class ConsentManager:
 
         return consent["status"] in [ConsentStatus.PENDING.value, ConsentStatus.DECLINED.value]
 
+    _RECORD_DELETION_SQL = """
+        UPDATE user_consents
+        SET data_deleted_at = CURRENT_TIMESTAMP,
+            metadata = COALESCE(metadata, '{}'::jsonb) || '{"deletion_completed": true}'::jsonb
+        WHERE user_hash = %s
+        RETURNING id
+    """
+
     def record_data_deletion(self, user_id: str) -> bool:
         """Record that user's data has been deleted."""
-        user_hash = self.encryption.hash_user_id(user_id)
-
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            UPDATE user_consents
-            SET data_deleted_at = CURRENT_TIMESTAMP,
-                metadata = COALESCE(metadata, '{}'::jsonb) || '{"deletion_completed": true}'::jsonb
-            WHERE user_hash = %s
-            RETURNING id
-        """, (user_hash,))
-
-        result = cursor.fetchone()
-        conn.commit()
-        conn.close()
-
-        return result is not None
+        return self._update_status(user_id, self._RECORD_DELETION_SQL, ())
 
     def delete_user_data(self, user_id: str) -> Dict:
-        """Delete all user data from all tables."""
-        user_hash = self.encryption.hash_user_id(user_id)
+        """Delete all user data from all tables.
 
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        All deletes and the deletion record run in a single transaction.
+        A table that is missing (or lacks the user_hash column) is skipped
+        via a savepoint so it does not abort the rest of the deletion.
+        """
+        user_hash = self.encryption.hash_user_id(user_id)
 
         deleted_counts = {}
 
@@ -252,40 +359,45 @@ class ConsentManager:
             ("feedback", "user_hash"),
         ]
 
-        for table, column in tables:
-            try:
-                cursor.execute(f"DELETE FROM {table} WHERE {column} = %s", (user_hash,))
-                deleted_counts[table] = cursor.rowcount
-            except Exception as e:
-                logger.warning(f"Error deleting from {table}: {e}")
-                deleted_counts[table] = 0
-
-        conn.commit()
-        conn.close()
-
-        # Record the deletion
-        self.record_data_deletion(user_id)
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+
+                for table, column in tables:
+                    cursor.execute("SAVEPOINT delete_user_table")
+                    try:
+                        cursor.execute(f"DELETE FROM {table} WHERE {column} = %s", (user_hash,))
+                        deleted_counts[table] = cursor.rowcount
+                        cursor.execute("RELEASE SAVEPOINT delete_user_table")
+                    except psycopg2.Error as e:
+                        cursor.execute("ROLLBACK TO SAVEPOINT delete_user_table")
+                        logger.warning(f"Error deleting from {table}: {e}")
+                        deleted_counts[table] = 0
+
+                # Record the deletion
+                cursor.execute(self._RECORD_DELETION_SQL, (user_hash,))
+        finally:
+            self._invalidate_hash(user_hash)
 
         logger.info(f"Deleted data for LINE user {user_hash[:8]}...: {deleted_counts}")
         return deleted_counts
 
     def get_consent_statistics(self) -> Dict:
         """Get consent statistics for compliance reporting."""
-        conn = self._get_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-
-        cursor.execute("""
-            SELECT
-                platform,
-                status,
-                COUNT(*) as count
-            FROM user_consents
-            GROUP BY platform, status
-            ORDER BY platform, status
-        """)
-
-        results = cursor.fetchall()
-        conn.close()
+        with self._connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+            cursor.execute("""
+                SELECT
+                    platform,
+                    status,
+                    COUNT(*) as count
+                FROM user_consents
+                GROUP BY platform, status
+                ORDER BY platform, status
+            """)
+
+            results = cursor.fetchall()
 
         stats = {}
         for row in results:
@@ -2,26 +2,75 @@
 RAG検索システム（PostgreSQL + pgvector版）
 
 学習済み知識（learned_knowledgeテーブル）をセマンティック検索
+ベクトル検索自体はStorageBackend（PostgreSQLManager等）に委譲する
+埋め込み生成はEmbeddingProvider（OpenAI / ローカルONNX）に委譲する
+learned_knowledgeはプロセス内インデックス（LearnedKnowledgeIndex）で検索する
+
+ハイブリッド検索:
+- 文字n-gram（語彙）検索とベクトル検索をRRFで統合
+- 見出し語がクエリに完全一致で含まれる場合は埋め込み生成を省略（語彙ファストパス）
+- 'similarity' はコサイン類似度のみ（語彙検索だけのヒットは0.0）。
+  語彙の一致度は 'lexical_coverage'（語彙ヒットでなければNone）で返す
+- 結果はRRF順（先頭が最も関連度が高い）。利用側は 'similarity' で
+  並べ替えず、この順序をそのまま使う
 """
 
-import os
 import logging
-from typing import List, Dict, Optional
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional, Sequence
 from .postgresql_manager import PostgreSQLManager
+from .storage_backend import StorageBackend
+from .embedding_provider import EmbeddingProvider, create_embedding_provider
+from .knowledge_index import LearnedKnowledgeIndex
+from .hybrid_retrieval import UserMemoryLexicalIndex, fuse_results, LEXICAL_MIN_COVERAGE
 
 logger = logging.getLogger(__name__)
 
 
+def _match_label(row: Dict) -> str:
+    """ログ用: 類似度と語彙coverage"""
+    parts = []
+    if 'similarity' in row:
+        parts.append(f"類似度: {float(row['similarity']):.2f}")
+    if row.get('lexical_coverage') is not None:
+        parts.append(f"語彙: {row['lexical_coverage']:.2f}")
+    return ", ".join(parts)
+
+
 class RAGSearchSystem:
     """RAG検索システム（PostgreSQL + pgvector）"""
 
-    def __init__(self, pg_manager: Optional[PostgreSQLManager] = None):
+    def __init__(
+        self,
+        pg_manager: Optional[StorageBackend] = None,
+        embedding_provider: Optional[EmbeddingProvider] = None,
+        use_knowledge_index: bool = True,
+        lexical_fast_path: bool = True,
+        query_cache_size: int = 256
+    ):
         """初期化
 
         Args:
-            pg_manager: 外部から渡されるPostgreSQLManager（Noneの場合は新規作成）
+            pg_manager: 外部から渡されるStorageBackend（Noneの場合はPostgreSQLManagerを新規作成）
+            embedding_provider: 埋め込みプロバイダー（Noneの場合は初回使用時に環境変数 EMBEDDING_PROVIDER に従って作成。
+                                作成に失敗した場合は語彙検索のみで動作）
+            use_knowledge_index: Trueならlearned_knowledgeをプロセス内インデックスで検索
+                                 （Falseなら毎回StorageBackendに問い合わせ、語彙検索も行わない）
+            lexical_fast_path: Trueなら語彙の完全一致ヒットがあるとき埋め込み生成を省略
+            query_cache_size: クエリembeddingのLRUキャッシュ件数
+                              （同じ発話で知識・記憶の両方を検索するため）
         """
         self.pg_manager = pg_manager if pg_manager else PostgreSQLManager()
+        self._embedding_provider = embedding_provider
+        self._embedding_provider_failed = False
+        self._embedding_provider_lock = threading.Lock()
+        self.knowledge_index = LearnedKnowledgeIndex(self.pg_manager) if use_knowledge_index else None
+        self.memory_lexical_index = UserMemoryLexicalIndex(self.pg_manager)
+        self.lexical_fast_path = lexical_fast_path
+        self.query_cache_size = query_cache_size
+        self._query_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._query_cache_lock = threading.Lock()
         self.connected = False
         logger.info("✅ RAG検索システム初期化（PostgreSQL + pgvector）")
 
@@ -37,30 +86,79 @@ class RAGSearchSystem:
             self.pg_manager.disconnect()
             self.connected = False
 
-    def generate_embedding(self, text: str) -> Optional[List[float]]:
+    @property
+    def embedding_provider(self) -> Optional[EmbeddingProvider]:
+        """埋め込みプロバイダー（初回アクセス時に作成、失敗したらNone）
+
+        OPENAI_API_KEY 未設定などで作成できない場合も起動は止めず、
+        embeddingなし（語彙検索のみ）で動作させる。
         """
-        OpenAI Embeddings API（text-embedding-3-small、$0.02/1M tokens）でembeddingを生成
+        if self._embedding_provider is None and not self._embedding_provider_failed:
+            with self._embedding_provider_lock:
+                if self._embedding_provider is None and not self._embedding_provider_failed:
+                    try:
+                        self._embedding_provider = create_embedding_provider()
+                    except Exception as e:
+                        self._embedding_provider_failed = True
+                        logger.error(f"❌ 埋め込みプロバイダー作成失敗（語彙検索のみで動作）: {e}")
+        return self._embedding_provider
+
+    def generate_embedding(self, text: str, query: bool = True) -> Optional[List[float]]:
+        """
+        埋め込みプロバイダーでembeddingを生成
 
         Args:
             text: テキスト
+            query: True=検索クエリ、False=保存するテキスト
+                   （e5系のローカルモデルは接頭辞を使い分ける）
 
         Returns:
-            embedding（1536次元ベクトル）
+            embedding（プロバイダーの次元数のベクトル、失敗時はNone）
         """
+        provider = self.embedding_provider
+        if provider is None:
+            return None
         try:
-            import openai
+            if not query:
+                return provider.embed_documents([text])[0]
+
+            with self._query_cache_lock:
+                cached = self._query_cache.get(text)
+                if cached is not None:
+                    self._query_cache.move_to_end(text)
+                    return cached
+
+            embedding = provider.embed_query(text)
+            with self._query_cache_lock:
+                self._query_cache[text] = embedding
+                while len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+            return embedding
+
+        except Exception as e:
+            logger.error(f"❌ Embedding生成エラー（{provider.name}）: {e}")
+            return None
 
-            openai.api_key = os.getenv('OPENAI_API_KEY')
+    def generate_embeddings(self, texts: Sequence[str]) -> Optional[List[List[float]]]:
+        """
+        保存するテキストのembeddingをまとめて生成（1回のバッチ呼び出し）
 
-            response = openai.embeddings.create(
-                model="text-embedding-3-small",
-                input=text
-            )
+        Args:
+            texts: テキストのリスト
 
-            return response.data[0].embedding
+        Returns:
+            embeddingのリスト（入力と同じ順序、失敗時はNone）
+        """
+        if not texts:
+            return []
+        provider = self.embedding_provider
+        if provider is None:
+            return None
+        try:
+            return provider.embed_documents(texts)
 
         except Exception as e:
-            logger.error(f"❌ Embeddings API Error: {e}")
+            logger.error(f"❌ Embedding一括生成エラー（{provider.name}）: {e}")
             return None
 
     def search_learned_knowledge(
@@ -71,13 +169,13 @@ class RAGSearchSystem:
         similarity_threshold: float = 0.6
     ) -> List[Dict]:
         """
-        RAG検索: ユーザーの質問に意味的に近い学習済み知識を検索
+        RAG検索: ユーザーの質問に関連する学習済み知識を検索（語彙 + ベクトル）
 
         Args:
             character: キャラクター名
             query: ユーザーの質問
             top_k: 上位何件取得するか
-            similarity_threshold: 類似度の閾値（デフォルト0.6）
+            similarity_threshold: ベクトル類似度の閾値（デフォルト0.6、語彙ヒットには適用しない）
 
         Returns:
             [
@@ -85,65 +183,58 @@ class RAGSearchSystem:
                     'word': '単語',
                     'meaning': '意味',
                     'context': '文脈',
-                    'similarity': 0.95
+                    'similarity': 0.95,
+                    'lexical_coverage': None
                 },
                 ...
-            ]
+            ]（RRF順）
         """
-        # クエリのembeddingを生成
-        query_embedding = self.generate_embedding(query)
-
-        if not query_embedding:
-            logger.error("❌ クエリのembedding生成失敗")
-            return []
-
         if not self.connected:
             if not self.connect():
-                logger.error("PostgreSQL未接続のため、RAG検索失敗")
+                logger.error("DB未接続のため、RAG検索失敗")
                 return []
 
         try:
-            cursor = self.pg_manager.connection.cursor()
-
-            # pgvectorのコサイン類似度検索（<=> 演算子）
-            search_query = """
-            SELECT
-                word,
-                meaning,
-                context,
-                1 - (embedding <=> %s::vector) as similarity
-            FROM learned_knowledge
-            WHERE character = %s AND embedding IS NOT NULL
-            ORDER BY embedding <=> %s::vector
-            LIMIT %s
-            """
-
-            # embeddingをPostgreSQL配列形式に変換
-            embedding_str = '[' + ','.join(map(str, query_embedding)) + ']'
-
-            cursor.execute(search_query, (
-                embedding_str,
-                character,
-                embedding_str,
-                top_k
-            ))
-
-            results = cursor.fetchall()
-
-            # 結果を整形（閾値以上のみ）
+            lexical = []
+            if self.knowledge_index is not None:
+                lexical = [
+                    row for row in self.knowledge_index.lexical_search(character, query, top_k)
+                    if row['lexical_coverage'] >= LEXICAL_MIN_COVERAGE
+                ]
+
+            if self.lexical_fast_path and lexical and lexical[0]['lexical_exact']:
+                logger.info(f"⚡ RAG語彙ファストパス: {lexical[0]['word']}（embedding省略）")
+                vector = []
+            else:
+                query_embedding = self.generate_embedding(query)
+                if not query_embedding:
+                    # 埋め込みに失敗しても語彙ヒットは返す
+                    logger.error("❌ クエリのembedding生成失敗（語彙検索の結果のみ使用）")
+                    vector = []
+                elif self.knowledge_index is not None and self.knowledge_index.ready(character):
+                    vector = self.knowledge_index.search(character, query_embedding, top_k)
+                else:
+                    # インデックスの初回構築が終わるまではDBで検索
+                    vector = self.pg_manager.search_learned_knowledge(
+                        character=character,
+                        embedding=query_embedding,
+                        top_k=top_k
+                    )
+                vector = [row for row in vector if float(row['similarity']) >= similarity_threshold]
+
+            results = fuse_results(vector, lexical, key=lambda row: row['word'], top_k=top_k)
+
             knowledge_list = []
             for row in results:
-                word, meaning, context, similarity = row
-                similarity_float = float(similarity)
-
-                if similarity_float >= similarity_threshold:
-                    knowledge_list.append({
-                        'word': word,
-                        'meaning': meaning,
-                        'context': context,
-                        'similarity': similarity_float
-                    })
-                    logger.info(f"📚 RAG検索ヒット: {word} (類似度: {similarity_float:.2f})")
+                similarity_float = float(row.get('similarity', 0.0))
+                knowledge_list.append({
+                    'word': row['word'],
+                    'meaning': row['meaning'],
+                    'context': row['context'],
+                    'similarity': similarity_float,
+                    'lexical_coverage': row.get('lexical_coverage')
+                })
+                logger.info(f"📚 RAG検索ヒット: {row['word']} ({_match_label(row)})")
 
             if knowledge_list:
                 logger.info(f"✅ RAG検索: {len(knowledge_list)}件の関連知識を検出")
@@ -165,90 +256,76 @@ class RAGSearchSystem:
         similarity_threshold: float = 0.6
     ) -> List[Dict]:
         """
-        RAG検索: ユーザーについて学んだ記憶を検索
+        RAG検索: ユーザーについて学んだ記憶を検索（語彙 + ベクトル）
 
         Args:
             user_id: ユーザーID
             character: キャラクター名
             query: ユーザーの質問
             top_k: 上位何件取得するか
-            similarity_threshold: 類似度の閾値（デフォルト0.6）
+            similarity_threshold: ベクトル類似度の閾値（デフォルト0.6、語彙ヒットには適用しない）
 
         Returns:
             [
                 {
+                    'id': 123,
                     'memory_type': 'preference',
                     'memory_text': '犬アレルギー',
                     'context': '俺、犬アレルギーなんだよね',
                     'importance': 8,
                     'confidence': 0.9,
                     'learned_at': '2025-11-18 10:30:00',
-                    'similarity': 0.92
+                    'similarity': 0.92,
+                    'lexical_coverage': 1.0
                 },
                 ...
-            ]
+            ]（RRF順）
         """
-        # クエリのembeddingを生成
-        query_embedding = self.generate_embedding(query)
-
-        if not query_embedding:
-            logger.error("❌ クエリのembedding生成失敗")
-            return []
-
         if not self.connected:
             if not self.connect():
-                logger.error("PostgreSQL未接続のため、RAG検索失敗")
+                logger.error("DB未接続のため、RAG検索失敗")
                 return []
 
         try:
-            cursor = self.pg_manager.connection.cursor()
-
-            # pgvectorのコサイン類似度検索（<=> 演算子）
-            search_query = """
-            SELECT
-                memory_type,
-                memory_text,
-                context,
-                importance,
-                confidence,
-                learned_at,
-                1 - (embedding <=> %s::vector) as similarity
-            FROM user_memories
-            WHERE user_id = %s AND character = %s AND embedding IS NOT NULL
-            ORDER BY embedding <=> %s::vector
-            LIMIT %s
-            """
-
-            # embeddingをPostgreSQL配列形式に変換
-            embedding_str = '[' + ','.join(map(str, query_embedding)) + ']'
-
-            cursor.execute(search_query, (
-                embedding_str,
-                user_id,
-                character,
-                embedding_str,
-                top_k
-            ))
-
-            results = cursor.fetchall()
-
-            # 結果を整形（閾値以上のみ）
+            lexical = [
+                row for row in self.memory_lexical_index.search(user_id, character, query, top_k)
+                if row['lexical_coverage'] >= LEXICAL_MIN_COVERAGE
+            ]
+
+            if self.lexical_fast_path and lexical and lexical[0]['lexical_exact']:
+                logger.info(f"⚡ user_memories語彙ファストパス: {lexical[0]['memory_text']}（embedding省略）")
+                vector = []
+            else:
+                query_embedding = self.generate_embedding(query)
+                if not query_embedding:
+                    logger.error("❌ クエリのembedding生成失敗（語彙検索の結果のみ使用）")
+                    vector = []
+                else:
+                    vector = self.pg_manager.search_user_memories(
+                        user_id=user_id,
+                        character=character,
+                        embedding=query_embedding,
+                        top_k=top_k
+                    )
+                vector = [row for row in vector if float(row['similarity']) >= similarity_threshold]
+
+            results = fuse_results(vector, lexical, key=lambda row: row['id'], top_k=top_k)
+
             memory_list = []
             for row in results:
-                memory_type, memory_text, context, importance, confidence, learned_at, similarity = row
-                similarity_float = float(similarity)
-
-                if similarity_float >= similarity_threshold:
-                    memory_list.append({
-                        'memory_type': memory_type,
-                        'memory_text': memory_text,
-                        'context': context,
-                        'importance': importance,
-                        'confidence': confidence,
-                        'learned_at': str(learned_at),
-                        'similarity': similarity_float
-                    })
-                    logger.info(f"💾 RAG検索ヒット（user_memories）: {memory_text} (類似度: {similarity_float:.2f})")
+                similarity_float = float(row.get('similarity', 0.0))
+                memory_list.append({
+                    'id': row.get('id'),
+                    'memory_type': row['memory_type'],
+                    'memory_text': row['memory_text'],
+                    'context': row['context'],
+                    'importance': row['importance'],
+                    'confidence': row['confidence'],
+                    'learned_at': str(row['learned_at']),
+                    'similarity': similarity_float,
+                    'lexical_coverage': row.get('lexical_coverage')
+                })
+                logger.info(f"💾 RAG検索ヒット（user_memories）: {row['memory_text']} ({_match_label(row)})")
 
             if memory_list:
                 logger.info(f"✅ user_memories RAG検索: {len(memory_list)}件の記憶を検出")
@@ -261,6 +338,14 @@ class RAGSearchSystem:
             logger.error(f"❌ user_memories RAG検索エラー: {e}")
             return []
 
+    def add_user_memories(self, user_id: str, character: str, rows: List[Dict]):
+        """記憶の保存後に呼ぶ（語彙インデックスに追記）"""
+        self.memory_lexical_index.add_rows(user_id, character, rows)
+
+    def invalidate_user_memories(self, user_id: str, character: str):
+        """記憶の削除・置き換え後に呼ぶ（語彙インデックスを読み直させる）"""
+        self.memory_lexical_index.invalidate(user_id, character)
+
     def __enter__(self):
         """コンテキストマネージャーのサポート"""
         self.connect()
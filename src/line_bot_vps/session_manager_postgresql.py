@@ -8,7 +8,7 @@ import logging
 from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 from .postgresql_manager import PostgreSQLManager
-import psycopg2.extras
+from .storage_backend import StorageBackend
 
 logger = logging.getLogger(__name__)
 
@@ -18,11 +18,11 @@ CharacterType = Literal["botan", "kasho", "yuri"]
 class SessionManagerPostgreSQL:
     """セッション管理クラス（PostgreSQL版）"""
 
-    def __init__(self, pg_manager: Optional[PostgreSQLManager] = None):
+    def __init__(self, pg_manager: Optional[StorageBackend] = None):
         """初期化
 
         Args:
-            pg_manager: 外部から渡されるPostgreSQLManager（Noneの場合は新規作成）
+            pg_manager: 外部から渡されるStorageBackend（Noneの場合はPostgreSQLManagerを新規作成）
         """
         self.pg_manager = pg_manager if pg_manager else PostgreSQLManager()
         self.connected = False
@@ -217,41 +217,29 @@ class SessionManagerPostgreSQL:
     def get_user_stats(self, user_id: str) -> Dict[str, int]:
         """ユーザーの会話統計を取得
 
+        user_character_statsカウンターから取得する（O(1)）。
+        カウンター未作成のDBではバックエンド側でconversation_historyを集計する。
+
         Args:
             user_id: LINEユーザーID
 
         Returns:
             統計情報 {"total": 総数, "botan": 牡丹, "kasho": Kasho, "yuri": ユリ}
         """
+        stats = {"total": 0, "botan": 0, "kasho": 0, "yuri": 0}
+
         if not self.connected:
             if not self.connect():
-                return {"total": 0, "botan": 0, "kasho": 0, "yuri": 0}
-
-        try:
-            connection = self.pg_manager.connection
-            with connection.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
-                # キャラクター別会話数を取得
-                cursor.execute("""
-                    SELECT character, COUNT(*) as count
-                    FROM conversation_history
-                    WHERE user_id = %s AND role = 'user'
-                    GROUP BY character
-                """, (user_id,))
-                results = cursor.fetchall()
-
-                # 集計
-                stats = {"total": 0, "botan": 0, "kasho": 0, "yuri": 0}
-                for row in results:
-                    char = row['character']
-                    count = row['count']
-                    stats[char] = count
-                    stats['total'] += count
-
                 return stats
 
-        except Exception as e:
-            logger.error(f"❌ 統計取得エラー: {e}")
-            return {"total": 0, "botan": 0, "kasho": 0, "yuri": 0}
+        counts = self.pg_manager.get_user_character_stats(user_id) or {}
+
+        # 集計
+        for char, count in counts.items():
+            stats[char] = count
+            stats['total'] += count
+
+        return stats
 
     def get_language(self, user_id: str) -> str:
         """ユーザーの言語設定を取得
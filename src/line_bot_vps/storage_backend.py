@@ -0,0 +1,271 @@
+"""
+ストレージバックエンドのインターフェース
+
+LINE Bot（VPS版）が永続化に使う操作を1つのプロトコルにまとめる。
+セッション、会話履歴、学習ログ、個性、ユーザー記憶、知識検索を含む。
+
+実装:
+- PostgreSQLManager: 本番（PostgreSQL + pgvector）
+- MySQLManager: 旧構成（ベクトル検索・個性・言語設定は非対応、NotImplementedErrorを送出）
+- EmbeddedStorageBackend: SQLite + NumPy（オフライン負荷試験・ローカル開発用）
+
+webhook_server_vps.py は create_storage_backend() 経由でバックエンドを
+受け取るため、環境変数 STORAGE_BACKEND だけで差し替えられる。
+"""
+
+import os
+import logging
+from datetime import datetime
+from typing import Protocol, Optional, List, Dict, Any, Sequence, Tuple, runtime_checkable
+
+logger = logging.getLogger(__name__)
+
+
+@runtime_checkable
+class StorageBackend(Protocol):
+    """LINE Bot永続化層のプロトコル"""
+
+    # ---- 接続 ----
+    def connect(self) -> bool: ...
+
+    def disconnect(self) -> None: ...
+
+    # ---- セッション ----
+    def get_session(self, user_id: str) -> Optional[Dict[str, Any]]: ...
+
+    def save_session(
+        self,
+        user_id: str,
+        selected_character: Optional[str] = None,
+        last_message_at: Optional[datetime] = None,
+        language: Optional[str] = None
+    ) -> bool: ...
+
+    def get_user_mode(self, user_id: str) -> str: ...
+
+    def set_user_mode(self, user_id: str, mode: str) -> bool: ...
+
+    def get_feedback_state(self, user_id: str) -> str: ...
+
+    def set_feedback_state(self, user_id: str, state: str) -> bool: ...
+
+    def get_user_language(self, user_id: str) -> str: ...
+
+    def set_user_language(self, user_id: str, language: str) -> bool: ...
+
+    # ---- 会話履歴 ----
+    def save_conversation_history(
+        self,
+        user_id: str,
+        character: str,
+        role: str,
+        message: str
+    ) -> Optional[int]: ...
+
+    def get_conversation_history(
+        self,
+        user_id: str,
+        character: str,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]: ...
+
+    def get_user_character_stats(self, user_id: str) -> Optional[Dict[str, int]]: ...
+
+    # ---- ログ・フィードバック・トレンド ----
+    def save_learning_log(
+        self,
+        timestamp: str,
+        character: str,
+        user_id: str,
+        user_message: str,
+        bot_response: str,
+        phase5_user_tier: Optional[str] = None,
+        phase5_response_tier: Optional[str] = None,
+        memories_used: Optional[str] = None,
+        response_time: Optional[float] = None,
+        metadata: Optional[str] = None
+    ) -> Optional[int]: ...
+
+    def get_learning_log_stats(self) -> Optional[List[Dict[str, Any]]]: ...
+
+    def save_feedback(self, user_id: str, feedback_text: str) -> Optional[int]: ...
+
+    def get_recent_trends(self, character: str, limit: int = 3) -> List[Dict[str, Any]]: ...
+
+    # ---- 個性（Layer 7） ----
+    def get_personality(self, user_id: str) -> Optional[Dict[str, Any]]: ...
+
+    def increment_personality(
+        self,
+        user_id: str,
+        counters: Dict[str, int]
+    ) -> Optional[Dict[str, Any]]: ...
+
+    def set_personality_scores(self, user_id: str, scores: Dict[str, Any]) -> bool: ...
+
+    def save_trust_history(
+        self,
+        user_id: str,
+        event_type: str,
+        trust_score_before: float,
+        trust_score_after: float,
+        delta: float,
+        statement: Optional[str] = None
+    ) -> bool: ...
+
+    # ---- ユーザー記憶・知識検索（ベクトル） ----
+    def save_user_memory(
+        self,
+        user_id: str,
+        character: str,
+        memory_type: str,
+        memory_text: str,
+        context: str,
+        embedding: Sequence[float],
+        importance: int = 5,
+        confidence: float = 0.5,
+        fact_checked: bool = False,
+        fact_check_passed: Optional[bool] = None,
+        fact_check_source: Optional[str] = None
+    ) -> Optional[int]: ...
+
+    def search_user_memories(
+        self,
+        user_id: str,
+        character: str,
+        embedding: Sequence[float],
+        top_k: int = 5
+    ) -> List[Dict[str, Any]]: ...
+
+    def nearest_user_memories(
+        self,
+        user_id: str,
+        character: str,
+        embeddings: Sequence[Sequence[float]]
+    ) -> List[Optional[Dict[str, Any]]]: ...
+
+    def save_user_memories_bulk(
+        self,
+        user_id: str,
+        character: str,
+        memories: Sequence[Dict[str, Any]]
+    ) -> List[int]: ...
+
+    def update_memory_reference(self, memory_id: int) -> bool: ...
+
+    def update_memory_references_bulk(
+        self,
+        updates: Dict[int, Tuple[int, datetime]]
+    ) -> int: ...
+
+    def fetch_user_memories(self, user_id: str, character: str) -> List[Dict[str, Any]]: ...
+
+    def merge_user_memory(
+        self,
+        memory_id: int,
+        importance: int = 5,
+        confidence: float = 0.5
+    ) -> bool: ...
+
+    def list_compaction_targets(
+        self,
+        older_than: datetime,
+        max_importance: int,
+        min_group_size: int
+    ) -> List[Tuple[str, str]]: ...
+
+    def fetch_compaction_candidates(
+        self,
+        user_id: str,
+        character: str,
+        older_than: datetime,
+        max_importance: int
+    ) -> List[Dict[str, Any]]: ...
+
+    def replace_user_memories(
+        self,
+        user_id: str,
+        character: str,
+        memory_ids: Sequence[int],
+        summary: Dict[str, Any],
+        embedding: Sequence[float]
+    ) -> Optional[int]: ...
+
+    def search_learned_knowledge(
+        self,
+        character: str,
+        embedding: Sequence[float],
+        top_k: int = 3
+    ) -> List[Dict[str, Any]]: ...
+
+    def fetch_learned_knowledge(
+        self,
+        character: str,
+        since_id: int = 0,
+        limit: int = 5000
+    ) -> List[Dict[str, Any]]: ...
+
+
+# 個性カウンターとして increment_personality に渡せる列
+PERSONALITY_COUNTERS = (
+    'total_conversations',
+    'positive_interactions',
+    'playful_interactions',
+    'serious_interactions',
+    'correct_teachings',
+    'incorrect_teachings',
+    'risky_statement_count',
+    'moderate_statement_count',
+)
+
+# set_personality_scores で更新できる列
+PERSONALITY_SCORES = (
+    'playfulness_score',
+    'trust_score',
+    'relationship_level',
+)
+
+
+def create_storage_backend(
+    kind: Optional[str] = None,
+    require_full: bool = True,
+    **kwargs
+) -> StorageBackend:
+    """環境変数 STORAGE_BACKEND に応じてバックエンドを生成
+
+    Args:
+        kind: 'postgresql'（デフォルト）/ 'mysql' / 'embedded'
+        require_full: Trueの場合、個性・ユーザー記憶・言語設定など
+                      プロトコル全体を実装していないバックエンド（MySQL）を拒否する
+        **kwargs: バックエンドのコンストラクタに渡す引数
+                  （embeddedの場合 db_path など）
+
+    Returns:
+        StorageBackend実装
+
+    Raises:
+        ValueError: 未知のバックエンド、または require_full=True で MySQL を指定した場合
+    """
+    kind = (kind or os.getenv("STORAGE_BACKEND", "postgresql")).lower()
+
+    if kind in ("postgresql", "postgres", "pg"):
+        from .postgresql_manager import PostgreSQLManager
+        backend = PostgreSQLManager(**kwargs)
+    elif kind == "mysql":
+        if require_full:
+            raise ValueError(
+                "MySQL backend does not support personality, user memories or language settings; "
+                "use postgresql or embedded (or pass require_full=False for session/log-only use)"
+            )
+        from .mysql_manager import MySQLManager
+        backend = MySQLManager(**kwargs)
+    elif kind in ("embedded", "sqlite", "memory"):
+        from .embedded_storage import EmbeddedStorageBackend
+        if "db_path" not in kwargs:
+            kwargs["db_path"] = os.getenv("EMBEDDED_DB_PATH", ":memory:")
+        backend = EmbeddedStorageBackend(**kwargs)
+    else:
+        raise ValueError(f"Unsupported storage backend: {kind}")
+
+    logger.info(f"✅ ストレージバックエンド: {type(backend).__name__}")
+    return backend
@@ -0,0 +1,222 @@
+"""
+トレンドスナップショットキャッシュ
+
+daily_trendsをキャラクターごとに事前パース・事前整形して保持する。
+トレンドは1日数回しか更新されないため、チャット応答ごとのSELECT・
+json.loads・文字列整形を省き、キャッシュ参照だけで済ませる。
+
+更新契機:
+- daily_trendsへのINSERT/UPDATE/DELETE時のNOTIFY（LISTENスレッドで受信）
+- TTL経過（NOTIFYを取りこぼした場合のフォールバック）
+
+トリガー: migrations/20261019_add_daily_trends_notify.sql
+"""
+
+import select
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List
+
+import psycopg2
+import psycopg2.extensions
+
+from .postgresql_manager import PostgreSQLManager
+from .storage_backend import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+# migrations/20261019_add_daily_trends_notify.sql と一致させること
+TRENDS_CHANNEL = "daily_trends_changed"
+
+
+def format_trend_content(content: Any) -> str:
+    """contentを文字列化（Grok形式/RSS形式に対応）"""
+    if isinstance(content, dict):
+        # Grok形式: {"summary": "...", "events": [...]}
+        if 'summary' in content:
+            return content['summary'][:200]
+        # RSS形式: {"category": "...", "items": [...]}
+        elif 'items' in content and len(content['items']) > 0:
+            first_item = content['items'][0]
+            title = first_item.get('title', '')
+            summary = first_item.get('summary', '')
+            return f"{title} - {summary}"[:200] if summary else title[:200]
+        else:
+            return str(content)[:200]
+    elif isinstance(content, str):
+        return content[:200]
+    else:
+        return str(content)[:200]
+
+
+def format_trends_text(daily_trends: List[Dict[str, Any]]) -> str:
+    """トレンド情報をシステムプロンプト用のテキストに整形"""
+    return "\n".join([
+        f"- {trend.get('topic', 'トレンド')}: {format_trend_content(trend.get('content', ''))}..."
+        for trend in daily_trends
+    ])
+
+
+@dataclass
+class TrendSnapshot:
+    """キャラクター1人分のトレンドスナップショット"""
+    character: str
+    trends: List[Dict[str, Any]] = field(default_factory=list)
+    trends_text: str = ""
+    loaded_at: float = 0.0
+
+
+class TrendSnapshotCache:
+    """キャラクター別トレンドスナップショットのキャッシュ"""
+
+    def __init__(
+        self,
+        pg_manager: Optional[StorageBackend] = None,
+        limit: int = 3,
+        ttl: float = 3600.0,
+        listen: bool = True
+    ):
+        """初期化
+
+        Args:
+            pg_manager: トレンド取得に使うStorageBackend（Noneの場合はPostgreSQLManagerを新規作成）
+            limit: キャラクターごとのトレンド件数
+            ttl: スナップショットの有効期間（秒）
+            listen: TrueならLISTENスレッドでNOTIFYを受信して即時更新（PostgreSQLManagerのみ）
+        """
+        self.pg_manager = pg_manager if pg_manager else PostgreSQLManager()
+        self.limit = limit
+        self.ttl = ttl
+        self.listen = listen
+
+        self._snapshots: Dict[str, TrendSnapshot] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._listener: Optional[threading.Thread] = None
+        logger.info(f"TrendSnapshotCache initialized (limit={limit}, ttl={ttl}s)")
+
+    def get(self, character: str) -> TrendSnapshot:
+        """スナップショットを取得
+
+        通常はキャッシュを返すだけ。初回（未ロード）のみ同期的に読み込む。
+        LISTENスレッドが動いていない場合はTTL切れもここで再読み込みする。
+        """
+        snapshot = self._snapshots.get(character)
+        if snapshot is None:
+            return self.refresh(character)
+
+        listener_alive = self._listener is not None and self._listener.is_alive()
+        if not listener_alive and time.monotonic() - snapshot.loaded_at > self.ttl:
+            return self.refresh(character)
+
+        return snapshot
+
+    def refresh(self, character: str) -> TrendSnapshot:
+        """DBから読み直してスナップショットを差し替え"""
+        trends = self.pg_manager.get_recent_trends(character=character, limit=self.limit)
+        snapshot = TrendSnapshot(
+            character=character,
+            trends=trends,
+            trends_text=format_trends_text(trends) if trends else "",
+            loaded_at=time.monotonic()
+        )
+        with self._lock:
+            self._snapshots[character] = snapshot
+        logger.debug(f"トレンドスナップショット更新: character={character}, count={len(trends)}")
+        return snapshot
+
+    def invalidate(self, character: Optional[str] = None):
+        """スナップショットを破棄（次回getで再読み込み）"""
+        with self._lock:
+            if character is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(character, None)
+
+    def start(self):
+        """LISTENスレッドを開始"""
+        if not self.listen or (self._listener and self._listener.is_alive()):
+            return
+        self._stop_event.clear()
+        self._listener = threading.Thread(
+            target=self._listen_loop,
+            name="trend-snapshot-listener",
+            daemon=True
+        )
+        self._listener.start()
+
+    def stop(self):
+        """LISTENスレッドを停止"""
+        self._stop_event.set()
+        if self._listener:
+            self._listener.join(timeout=5)
+            self._listener = None
+
+    def _open_listen_connection(self):
+        """LISTEN専用の接続を開く（共有接続はクエリ用なので使わない）"""
+        conn = psycopg2.connect(
+            host=self.pg_manager.pg_config['host'],
+            port=self.pg_manager.pg_config['port'],
+            user=self.pg_manager.pg_config['user'],
+            password=self.pg_manager.pg_config['password'],
+            database=self.pg_manager.pg_config['database'],
+            connect_timeout=10
+        )
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {TRENDS_CHANNEL}")
+        return conn
+
+    def _refresh_expired(self):
+        """TTL切れのスナップショットを再読み込み"""
+        now = time.monotonic()
+        for character, snapshot in list(self._snapshots.items()):
+            if now - snapshot.loaded_at > self.ttl:
+                self.refresh(character)
+
+    def _handle_notify(self, payload: str):
+        """NOTIFYのpayload（キャラクター名）に応じて再読み込み"""
+        if payload and payload in self._snapshots:
+            self.refresh(payload)
+        elif not payload:
+            # キャラクター不明の変更は全キャラクター分を読み直す
+            for character in list(self._snapshots):
+                self.refresh(character)
+
+    def _listen_loop(self):
+        """NOTIFY受信ループ（接続断時は再接続）"""
+        poll_interval = min(self.ttl, 60.0)
+        conn = None
+
+        while not self._stop_event.is_set():
+            try:
+                if conn is None or conn.closed:
+                    conn = self._open_listen_connection()
+                    logger.info(f"✅ トレンド更新通知をLISTEN開始: {TRENDS_CHANNEL}")
+                    # 接続断の間に取りこぼした更新を反映
+                    self._handle_notify("")
+
+                if select.select([conn], [], [], poll_interval) != ([], [], []):
+                    conn.poll()
+                    payloads = set()
+                    while conn.notifies:
+                        payloads.add(conn.notifies.pop(0).payload)
+                    for payload in payloads:
+                        self._handle_notify(payload)
+
+                self._refresh_expired()
+
+            except Exception as e:
+                logger.warning(f"⚠️ トレンド更新通知の受信エラー（再接続します）: {e}")
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                conn = None
+                self._stop_event.wait(poll_interval)
+
+        if conn is not None and not conn.closed:
+            conn.close()
@@ -7,35 +7,150 @@ User Memories Manager - ユーザー記憶管理システム
 import os
 import logging
 import json
-from typing import List, Dict, Optional
-from datetime import datetime
+import threading
+from typing import List, Dict, Optional, Tuple
+from datetime import datetime, timedelta
 from .postgresql_manager import PostgreSQLManager
+from .storage_backend import StorageBackend
 from .rag_search_system import RAGSearchSystem
 from .fact_checker import FactChecker
+from .memory_dedup import MemoryDeduplicator, build_summaries
+from .ngram_index import normalize_text
 
 logger = logging.getLogger(__name__)
 
 
+def _index_row(memory_id: int, memory: Dict) -> Dict:
+    """保存した記憶を語彙インデックス用の行（fetch_user_memories と同じ形式）にする"""
+    return {
+        'id': memory_id,
+        'memory_type': memory['memory_type'],
+        'memory_text': memory['memory_text'],
+        'context': memory.get('context'),
+        'importance': memory.get('importance', 5),
+        'confidence': memory.get('confidence', 0.5),
+        'learned_at': datetime.now(),
+    }
+
+
+class ReferenceCountUpdater:
+    """参照カウント・最終参照日時の遅延一括更新
+
+    record() はメモリ上で加算するだけで、flush_interval 秒ごと（または
+    max_pending 件たまった時点）に1回のUPDATEでまとめて反映する。
+    """
+
+    def __init__(
+        self,
+        pg_manager: StorageBackend,
+        flush_interval: float = 10.0,
+        max_pending: int = 500
+    ):
+        """初期化
+
+        Args:
+            pg_manager: 反映先のStorageBackend
+            flush_interval: 定期反映の間隔（秒）
+            max_pending: この件数（記憶ID数）を超えたら即時反映
+        """
+        self.pg_manager = pg_manager
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        # memory_id -> (参照回数, 最終参照日時)
+        self._pending: Dict[int, Tuple[int, datetime]] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, memory_id: int):
+        """参照を記録（DBには書かない）"""
+        with self._lock:
+            count, _ = self._pending.get(memory_id, (0, None))
+            self._pending[memory_id] = (count + 1, datetime.now())
+            should_flush = len(self._pending) >= self.max_pending
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> int:
+        """たまった参照をDBに反映
+
+        Returns:
+            更新した行数
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            updated = self.pg_manager.update_memory_references_bulk(pending)
+            logger.debug(f"参照カウント一括更新: {len(pending)}件")
+            return updated
+        except Exception as e:
+            # 失敗分は戻して次回に再試行
+            logger.warning(f"⚠️ 参照カウント一括更新失敗（次回再試行）: {e}")
+            with self._lock:
+                for memory_id, (count, referenced_at) in pending.items():
+                    current_count, current_at = self._pending.get(memory_id, (0, referenced_at))
+                    self._pending[memory_id] = (count + current_count, max(referenced_at, current_at))
+            return 0
+
+    def start(self):
+        """定期反映スレッドを開始"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="memory-reference-flusher",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """定期反映スレッドを停止し、残りを反映"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+
 class UserMemoriesManager:
     """user_memories 管理システム"""
 
-    def __init__(self, pg_manager: Optional[PostgreSQLManager] = None):
+    def __init__(
+        self,
+        pg_manager: Optional[StorageBackend] = None,
+        rag_search: Optional[RAGSearchSystem] = None
+    ):
         """初期化
 
         Args:
-            pg_manager: 外部から渡されるPostgreSQLManager（Noneの場合は新規作成）
+            pg_manager: 外部から渡されるStorageBackend（Noneの場合はPostgreSQLManagerを新規作成）
+            rag_search: 共有するRAGSearchSystem（埋め込みプロバイダーも共有される）
         """
         self.pg_manager = pg_manager if pg_manager else PostgreSQLManager()
-        self.rag_search = RAGSearchSystem(self.pg_manager)
+        self.rag_search = rag_search if rag_search else RAGSearchSystem(self.pg_manager)
+        self.deduplicator = MemoryDeduplicator(self.rag_search)
+        self.reference_updater = ReferenceCountUpdater(self.pg_manager)
         self.fact_checker = FactChecker()
         logger.info("✅ UserMemoriesManager初期化")
 
     def connect(self) -> bool:
-        """PostgreSQL接続"""
-        return self.rag_search.connect()
+        """PostgreSQL接続（参照カウントの定期反映も開始）"""
+        connected = self.rag_search.connect()
+        if connected:
+            self.reference_updater.start()
+        return connected
 
     def disconnect(self):
-        """PostgreSQL切断"""
+        """PostgreSQL切断（未反映の参照カウントは切断前に書き込む）"""
+        self.reference_updater.stop()
         self.rag_search.disconnect()
 
     async def extract_memories_from_conversation(
@@ -85,19 +200,25 @@ class UserMemoriesManager:
         }
 
         # 簡易的な抽出（実際はLLMで行う）
-        for memory_type, patterns_list in memory_patterns.items():
-            for patterns in patterns_list:
-                for pattern in patterns:
-                    if pattern in user_message:
-                        # パターンにマッチした場合、記憶として抽出
-                        memories.append({
-                            'memory_type': memory_type,
-                            'memory_text': user_message,  # 仮: メッセージ全体
-                            'context': user_message,
-                            'importance': 5,
-                            'requires_fact_check': False
-                        })
-                        break
+        # memory_textはメッセージ全体なので、最初にマッチしたタイプで1件だけ抽出する
+        # （複数パターンに当たっても同じ文面の行を重複して作らない）
+        matched_type = next(
+            (
+                memory_type
+                for memory_type, patterns_list in memory_patterns.items()
+                for patterns in patterns_list
+                if any(pattern in user_message for pattern in patterns)
+            ),
+            None
+        )
+        if matched_type:
+            memories.append({
+                'memory_type': matched_type,
+                'memory_text': user_message,  # 仮: メッセージ全体
+                'context': user_message,
+                'importance': 5,
+                'requires_fact_check': False
+            })
 
         logger.info(f"💭 会話から{len(memories)}件の記憶を抽出")
         return memories
@@ -131,60 +252,139 @@ class UserMemoriesManager:
             fact_check_source: ファクトチェックのソース
 
         Returns:
-            挿入されたレコードのID（失敗時はNone）
+            挿入されたレコードのID（既存記憶にマージした場合はそのID、失敗時はNone）
         """
-        if not self.pg_manager.connection:
-            logger.error("PostgreSQL未接続")
-            return None
-
         try:
-            # embeddingを生成
-            embedding = self.rag_search.generate_embedding(memory_text)
+            # 重複判定（SimHash → 埋め込み類似度）。重複なら既存行にマージ
+            check = self.deduplicator.check(user_id, character, memory_text)
+            if check.duplicate_id is not None:
+                if self.pg_manager.merge_user_memory(check.duplicate_id, importance, confidence):
+                    # 文面は変わらないので語彙インデックスはそのまま
+                    logger.info(f"🔁 user_memoryマージ（{check.reason}）: ID={check.duplicate_id}, text={memory_text[:50]}")
+                    return check.duplicate_id
+
+            # embedding（重複判定で生成済みならそれを使う）
+            embedding = check.embedding or self.rag_search.generate_embedding(memory_text, query=False)
 
             if not embedding:
                 logger.error("❌ embedding生成失敗")
                 return None
 
-            # embeddingをPostgreSQL配列形式に変換
-            embedding_str = '[' + ','.join(map(str, embedding)) + ']'
-
-            with self.pg_manager.connection.cursor() as cursor:
-                sql = """
-                    INSERT INTO user_memories (
-                        user_id, character, memory_type, memory_text, context,
-                        embedding, importance, confidence,
-                        fact_checked, fact_check_passed, fact_check_source,
-                        learned_at
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s::vector, %s, %s, %s, %s, %s, NOW()
-                    )
-                    ON CONFLICT (user_id, character, memory_text) DO UPDATE SET
-                        importance = EXCLUDED.importance,
-                        confidence = EXCLUDED.confidence,
-                        fact_checked = EXCLUDED.fact_checked,
-                        fact_check_passed = EXCLUDED.fact_check_passed,
-                        fact_check_source = EXCLUDED.fact_check_source,
-                        reference_count = user_memories.reference_count + 1
-                    RETURNING id
-                """
-
-                cursor.execute(sql, (
-                    user_id, character, memory_type, memory_text, context,
-                    embedding_str, importance, confidence,
-                    fact_checked, fact_check_passed, fact_check_source
-                ))
-
-                memory_id = cursor.fetchone()[0]
-                self.pg_manager.connection.commit()
+            memory_id = self.pg_manager.save_user_memory(
+                user_id=user_id,
+                character=character,
+                memory_type=memory_type,
+                memory_text=memory_text,
+                context=context,
+                embedding=embedding,
+                importance=importance,
+                confidence=confidence,
+                fact_checked=fact_checked,
+                fact_check_passed=fact_check_passed,
+                fact_check_source=fact_check_source
+            )
 
+            if memory_id:
+                self.rag_search.add_user_memories(user_id, character, [_index_row(memory_id, {
+                    'memory_type': memory_type,
+                    'memory_text': memory_text,
+                    'context': context,
+                    'importance': importance,
+                    'confidence': confidence,
+                })])
                 logger.info(f"✅ user_memory保存: ID={memory_id}, type={memory_type}, text={memory_text[:50]}")
-                return memory_id
+            return memory_id
 
         except Exception as e:
             logger.error(f"❌ user_memory保存失敗: {e}")
-            self.pg_manager.connection.rollback()
             return None
 
+    def save_user_memories_bulk(
+        self,
+        user_id: str,
+        character: str,
+        memories: List[Dict]
+    ) -> List[int]:
+        """
+        複数のユーザー記憶をまとめて保存
+
+        埋め込みは1回のバッチ呼び出しで生成し、新規分は1回の複数行INSERTで書き込む。
+        バッチ内でほぼ同一の記憶（SimHash・コサイン類似度）は先に出た1件にまとめ、
+        既存記憶と重複するものはマージする。
+
+        Args:
+            user_id: ユーザーID
+            character: キャラクター名
+            memories: save_user_memory の引数（memory_type, memory_text, context,
+                      importance, confidence, fact_checked, fact_check_passed, fact_check_source）の辞書リスト
+
+        Returns:
+            保存（またはマージ）した記憶のIDリスト
+        """
+        # バッチ内のほぼ同一の文面を除去（SimHash）
+        candidates = [memory for memory in memories if normalize_text(memory['memory_text'])]
+        unique = [
+            candidates[i]
+            for i in self.deduplicator.simhash_unique([memory['memory_text'] for memory in candidates])
+        ]
+        if not unique:
+            return []
+
+        try:
+            saved_ids = []
+
+            # SimHashで既存記憶と一致するものは埋め込みなしでマージ
+            remaining = []
+            duplicate_ids = self.deduplicator.simhash_matches(
+                user_id, character, [memory['memory_text'] for memory in unique]
+            )
+            for memory, duplicate_id in zip(unique, duplicate_ids):
+                if duplicate_id is not None and self.pg_manager.merge_user_memory(
+                    duplicate_id, memory.get('importance', 5), memory.get('confidence', 0.5)
+                ):
+                    saved_ids.append(duplicate_id)
+                else:
+                    remaining.append(memory)
+
+            if remaining:
+                # embeddingを1回のバッチ呼び出しで生成
+                embeddings = self.rag_search.generate_embeddings([m['memory_text'] for m in remaining])
+                if not embeddings:
+                    logger.error("❌ embedding一括生成失敗")
+                    return saved_ids
+
+                # バッチ内で意味がほぼ同じものを除去（コサイン類似度）
+                kept = self.deduplicator.embedding_unique(embeddings)
+                remaining = [remaining[i] for i in kept]
+                embeddings = [embeddings[i] for i in kept]
+
+                # 既存記憶との重複は最近傍検索1回でまとめて判定
+                duplicate_ids = self.deduplicator.embedding_matches(user_id, character, embeddings)
+                new_memories = []
+                for memory, embedding, duplicate_id in zip(remaining, embeddings, duplicate_ids):
+                    if duplicate_id is not None and self.pg_manager.merge_user_memory(
+                        duplicate_id, memory.get('importance', 5), memory.get('confidence', 0.5)
+                    ):
+                        saved_ids.append(duplicate_id)
+                    else:
+                        new_memories.append({**memory, 'embedding': embedding})
+
+                new_ids = self.pg_manager.save_user_memories_bulk(user_id, character, new_memories)
+                saved_ids.extend(new_ids)
+                if len(new_ids) == len(new_memories):
+                    self.rag_search.add_user_memories(user_id, character, [
+                        _index_row(memory_id, memory) for memory_id, memory in zip(new_ids, new_memories)
+                    ])
+                else:
+                    self.rag_search.invalidate_user_memories(user_id, character)
+
+            logger.info(f"✅ user_memories一括保存: {len(saved_ids)}件（候補{len(memories)}件）")
+            return saved_ids
+
+        except Exception as e:
+            logger.error(f"❌ user_memories一括保存失敗: {e}")
+            return []
+
     async def extract_and_save(
         self,
         user_id: str,
@@ -215,8 +415,8 @@ class UserMemoriesManager:
             logger.debug("抽出された記憶なし")
             return 0
 
-        # 2. 各記憶を保存
-        saved_count = 0
+        # 2. ファクトチェック後、まとめて保存
+        to_save = []
         for memory in memories:
             # ファクトチェック（Phase 3）
             fact_check_result = None
@@ -235,22 +435,18 @@ class UserMemoriesManager:
                         logger.info(f"⚠️ 確認できないため低信頼度で保存: {memory['memory_text'][:50]}")
                         memory['confidence'] = 0.3
 
-            # 保存
-            memory_id = self.save_user_memory(
-                user_id=user_id,
-                character=character,
-                memory_type=memory['memory_type'],
-                memory_text=memory['memory_text'],
-                context=memory['context'],
-                importance=memory.get('importance', 5),
-                confidence=memory.get('confidence', 0.5),
-                fact_checked=fact_check_result is not None,
-                fact_check_passed=fact_check_result['passed'] if fact_check_result else None,
-                fact_check_source='grok' if fact_check_result else None
-            )
+            to_save.append({
+                'memory_type': memory['memory_type'],
+                'memory_text': memory['memory_text'],
+                'context': memory['context'],
+                'importance': memory.get('importance', 5),
+                'confidence': memory.get('confidence', 0.5),
+                'fact_checked': fact_check_result is not None,
+                'fact_check_passed': fact_check_result['passed'] if fact_check_result else None,
+                'fact_check_source': 'grok' if fact_check_result else None
+            })
 
-            if memory_id:
-                saved_count += 1
+        saved_count = len(self.save_user_memories_bulk(user_id, character, to_save))
 
         logger.info(f"💾 {saved_count}件の記憶を保存")
         return saved_count
@@ -295,6 +491,72 @@ class UserMemoriesManager:
             similarity_threshold=similarity_threshold
         )
 
+    def compact(
+        self,
+        user_id: str,
+        character: str,
+        older_than_days: int = 90,
+        max_importance: int = 3,
+        min_group_size: int = 5
+    ) -> int:
+        """
+        古い低重要度の記憶を memory_type ごとに1行の要約へ圧縮
+
+        Args:
+            user_id: ユーザーID
+            character: キャラクター名
+            older_than_days: この日数より前に学習した記憶が対象
+            max_importance: この重要度以下の記憶が対象
+            min_group_size: この件数未満の memory_type はまとめない
+
+        Returns:
+            削除（要約に統合）した記憶の件数
+        """
+        older_than = datetime.now() - timedelta(days=older_than_days)
+        candidates = self.pg_manager.fetch_compaction_candidates(
+            user_id, character, older_than, max_importance
+        )
+        summaries = build_summaries(candidates, min_group_size)
+        if not summaries:
+            return 0
+
+        embeddings = self.rag_search.generate_embeddings([summary['memory_text'] for _, summary in summaries])
+        if not embeddings:
+            logger.error("❌ 要約のembedding生成失敗")
+            return 0
+
+        compacted = 0
+        for (memory_ids, summary), embedding in zip(summaries, embeddings):
+            summary_id = self.pg_manager.replace_user_memories(
+                user_id, character, memory_ids, summary, embedding
+            )
+            if summary_id:
+                compacted += len(memory_ids)
+                logger.info(f"🗜️ user_memories圧縮: {len(memory_ids)}件 → ID={summary_id} ({summary['memory_type']})")
+
+        self.rag_search.invalidate_user_memories(user_id, character)
+        return compacted
+
+    def compact_all(
+        self,
+        older_than_days: int = 90,
+        max_importance: int = 3,
+        min_group_size: int = 5
+    ) -> int:
+        """
+        圧縮対象を持つ全ユーザー×キャラクターを圧縮（定期ジョブ用）
+
+        Returns:
+            削除（要約に統合）した記憶の件数
+        """
+        older_than = datetime.now() - timedelta(days=older_than_days)
+        targets = self.pg_manager.list_compaction_targets(older_than, max_importance, min_group_size)
+        total = 0
+        for user_id, character in targets:
+            total += self.compact(user_id, character, older_than_days, max_importance, min_group_size)
+        logger.info(f"✅ user_memories圧縮完了: {len(targets)}組, {total}件を統合")
+        return total
+
     def update_reference_count(self, memory_id: int) -> bool:
         """
         記憶の参照カウントを更新
@@ -305,27 +567,9 @@ class UserMemoriesManager:
         Returns:
             成功したらTrue
         """
-        if not self.pg_manager.connection:
-            logger.error("PostgreSQL未接続")
-            return False
-
-        try:
-            with self.pg_manager.connection.cursor() as cursor:
-                sql = """
-                    UPDATE user_memories
-                    SET reference_count = reference_count + 1,
-                        last_referenced = NOW()
-                    WHERE id = %s
-                """
-                cursor.execute(sql, (memory_id,))
-                self.pg_manager.connection.commit()
-                logger.debug(f"参照カウント更新: memory_id={memory_id}")
-                return True
-
-        except Exception as e:
-            logger.error(f"❌ 参照カウント更新失敗: {e}")
-            self.pg_manager.connection.rollback()
-            return False
+        self.reference_updater.record(memory_id)
+        logger.debug(f"参照カウント更新を予約: memory_id={memory_id}")
+        return True
 
     def __enter__(self):
         """コンテキストマネージャーのサポート"""
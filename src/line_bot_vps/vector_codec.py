@@ -0,0 +1,106 @@
+"""
+pgvector用ベクトルコーデック
+
+embeddingをPostgreSQLへ送る際の変換をまとめる。
+
+- encode_text: 1回のINSERT/検索用のテキスト表現。float32（halfvecはfloat16）で
+  往復可能な最小桁数に丸めるため、str(float)連結の約半分のサイズになる
+- encode_binary: pgvectorのバイナリ受信形式（vector_recv / halfvec_recv）。
+  COPY ... (FORMAT binary) での一括書き込みに使う
+- build_copy_payload: (id, embedding) 行をCOPYバイナリストリームに変換
+
+列の型は環境変数 PGVECTOR_TYPE（'vector' / 'halfvec'）で切り替える。
+halfvecへの移行: migrations/20261019_embedding_halfvec.sql
+"""
+
+import os
+import struct
+from typing import Iterable, Sequence, Tuple, Union
+
+import numpy as np
+
+# 型名 → (ビッグエンディアンdtype, 往復に必要な有効桁数)
+VECTOR_TYPES = {
+    'vector': ('>f4', 9),
+    'halfvec': ('>f2', 5),
+}
+
+EMBEDDING_DIM = 1536
+
+# COPY BINARY のヘッダ（署名 + flags + ヘッダ拡張長）とトレーラ
+_COPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+_COPY_TRAILER = struct.pack('>h', -1)
+
+Embedding = Union[Sequence[float], np.ndarray]
+
+
+def get_vector_type() -> str:
+    """環境変数 PGVECTOR_TYPE から埋め込み列の型名を取得"""
+    vector_type = os.getenv('PGVECTOR_TYPE', 'vector').lower()
+    if vector_type not in VECTOR_TYPES:
+        raise ValueError(f"Unsupported PGVECTOR_TYPE: {vector_type}")
+    return vector_type
+
+
+def to_float32(embedding: Embedding) -> np.ndarray:
+    """embeddingを連続したfloat32配列に変換（コピーは必要な場合のみ）"""
+    return np.ascontiguousarray(embedding, dtype=np.float32)
+
+
+def encode_text(embedding: Embedding, vector_type: str = 'vector') -> str:
+    """pgvectorのテキスト表現 '[x1,x2,...]' に変換
+
+    Args:
+        embedding: 埋め込みベクトル
+        vector_type: 'vector' / 'halfvec'
+
+    Returns:
+        %s::vector（%s::halfvec）にバインドする文字列
+    """
+    _, digits = VECTOR_TYPES[vector_type]
+    values = to_float32(embedding)
+    if vector_type == 'halfvec':
+        values = values.astype(np.float16)
+    fmt = f'%.{digits}g'
+    return '[' + ','.join(map(fmt.__mod__, values.tolist())) + ']'
+
+
+def encode_binary(embedding: Embedding, vector_type: str = 'vector') -> bytes:
+    """pgvectorのバイナリ受信形式に変換
+
+    形式: int16 次元数 + int16 予約(0) + 要素（ビッグエンディアン）
+
+    Args:
+        embedding: 埋め込みベクトル
+        vector_type: 'vector' / 'halfvec'
+
+    Returns:
+        COPY BINARY のフィールド値
+    """
+    dtype, _ = VECTOR_TYPES[vector_type]
+    values = to_float32(embedding)
+    return struct.pack('>hh', values.shape[0], 0) + values.astype(dtype).tobytes()
+
+
+def build_copy_payload(
+    rows: Iterable[Tuple[int, Embedding]],
+    vector_type: str = 'vector'
+) -> bytes:
+    """(id, embedding) 行を COPY ... (FORMAT binary) のストリームに変換
+
+    対象テーブルの列は (id bigint, embedding vector/halfvec) を想定。
+
+    Args:
+        rows: (id, embedding) のイテラブル
+        vector_type: 'vector' / 'halfvec'
+
+    Returns:
+        copy_expertに渡すバイト列
+    """
+    parts = [_COPY_HEADER]
+    for row_id, embedding in rows:
+        vector_bytes = encode_binary(embedding, vector_type)
+        parts.append(struct.pack('>hiqi', 2, 8, row_id, len(vector_bytes)))
+        parts.append(vector_bytes)
+    parts.append(_COPY_TRAILER)
+    return b''.join(parts)
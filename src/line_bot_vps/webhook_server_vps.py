@@ -30,6 +30,7 @@ from .cloud_llm_provider import CloudLLMProvider
 from .learning_log_system_postgresql import LearningLogSystemPostgreSQL
 from .session_manager_postgresql import SessionManagerPostgreSQL
 from .postgresql_manager import PostgreSQLManager
+from .storage_backend import create_storage_backend
 from .rag_search_system import RAGSearchSystem
 from .terms_flex_message import create_terms_flex_message
 from .help_flex_message import create_help_flex_message
@@ -39,6 +40,7 @@ from .auto_character_selector import AutoCharacterSelector
 from .integrated_judgment_engine import IntegratedJudgmentEngine
 from .adaptive_response_generator import AdaptiveResponseGenerator
 from .user_memories_manager import UserMemoriesManager
+from .trend_snapshot_cache import TrendSnapshotCache
 
 # 既存のモジュールを活用
 import sys
@@ -263,9 +265,10 @@ llm_provider = CloudLLMProvider(
 )
 logger.info(f"✅ CloudLLMProvider初期化完了（{VPS_LLM_PROVIDER}: {VPS_LLM_MODEL}）")
 
-# グローバルなPostgreSQLManager（VPS内localhost接続）
-pg_manager = PostgreSQLManager()
-logger.info("✅ PostgreSQLManager初期化完了")
+# グローバルなストレージバックエンド（デフォルト: PostgreSQLManager、VPS内localhost接続）
+# STORAGE_BACKEND=embedded でSQLite + NumPy版（負荷試験・ローカル開発用）に切り替え
+pg_manager = create_storage_backend()
+logger.info(f"✅ ストレージバックエンド初期化完了（{type(pg_manager).__name__}）")
 
 # 学習ログシステム初期化（PostgreSQL版）
 learning_log_system = LearningLogSystemPostgreSQL(pg_manager=pg_manager)
@@ -292,7 +295,7 @@ rag_search_system = RAGSearchSystem(pg_manager=pg_manager)
 logger.info("✅ RAGSearchSystem初期化完了（PostgreSQL + pgvector）")
 
 # 統合判定エンジン初期化（7層防御）
-integrated_judgment_engine = IntegratedJudgmentEngine(pg_manager=pg_manager)
+integrated_judgment_engine = IntegratedJudgmentEngine(pg_manager=pg_manager, rag_search=rag_search_system)
 logger.info("✅ IntegratedJudgmentEngine初期化完了（7層防御）")
 
 # 臨機応変な応答生成システム初期化
@@ -300,9 +303,17 @@ adaptive_response_generator = AdaptiveResponseGenerator()
 logger.info("✅ AdaptiveResponseGenerator初期化完了")
 
 # ユーザー記憶管理システム初期化
-user_memories_manager = UserMemoriesManager(pg_manager=pg_manager)
+user_memories_manager = UserMemoriesManager(pg_manager=pg_manager, rag_search=rag_search_system)
 logger.info("✅ UserMemoriesManager初期化完了")
 
+# トレンドスナップショットキャッシュ初期化（NOTIFY + TTLで更新）
+trend_cache = TrendSnapshotCache(
+    pg_manager=pg_manager,
+    limit=3,
+    listen=isinstance(pg_manager, PostgreSQLManager)
+)
+logger.info("✅ TrendSnapshotCache初期化完了")
+
 # ========================================
 # アプリケーションライフサイクル
 # ========================================
@@ -329,6 +340,8 @@ async def startup_event():
         # ユーザー記憶管理システムもpg_managerを共有
         user_memories_manager.connect()
         logger.info("✅ ユーザー記憶管理システム接続完了")
+        # トレンド更新通知のLISTENを開始
+        trend_cache.start()
     else:
         logger.error("❌ PostgreSQL接続失敗")
 
@@ -337,6 +350,7 @@ async def shutdown_event():
     """アプリケーション終了時の処理"""
     logger.info("👋 VPS LINE Bot終了")
     # PostgreSQL切断
+    trend_cache.stop()
     user_memories_manager.disconnect()
     integrated_judgment_engine.disconnect()
     rag_search_system.disconnect()
@@ -486,19 +500,24 @@ async def generate_response(
                 user_context = "\n\n【このユーザーについて覚えていること】\n"
                 for m in user_memories:
                     user_context += f"- {m['memory_text']}\n"
+                    # 参照カウントは ReferenceCountUpdater がまとめてDBに反映
+                    if m.get('id') is not None:
+                        user_memories_manager.update_reference_count(m['id'])
 
                 # システムプロンプトにユーザー記憶を追加
                 character_prompt += user_context
         except Exception as e:
             logger.warning(f"⚠️ user_memories検索失敗（スキップ）: {e}")
 
-        # 今日のトレンド情報を取得（PostgreSQLから）※グローバルpg_managerを使用
+        # 今日のトレンド情報を取得（スナップショットキャッシュから）
         daily_trends = None
+        trends_text = None
         try:
-            if pg_manager.connection or pg_manager.connect():
-                daily_trends = pg_manager.get_recent_trends(character=character, limit=3)
-                if daily_trends:
-                    logger.info(f"✅ トレンド情報取得: {len(daily_trends)}件")
+            trend_snapshot = trend_cache.get(character)
+            if trend_snapshot.trends:
+                daily_trends = trend_snapshot.trends
+                trends_text = trend_snapshot.trends_text
+                logger.info(f"✅ トレンド情報取得: {len(daily_trends)}件")
         except Exception as e:
             logger.warning(f"⚠️ トレンド情報取得失敗（スキップ）: {e}")
 
@@ -526,6 +545,7 @@ async def generate_response(
                 character_prompt=character_prompt,
                 memories=memories,
                 daily_trends=daily_trends,
+                trends_text=trends_text,
                 conversation_history=conversation_history,
                 metadata={
                     "user_id": user_id,
@@ -0,0 +1,100 @@
+"""
+CopyRobotChecker のインクリメンタルスキャンのテスト
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "sensitive_system"))
+
+from core.copy_robot_checker import CopyRobotChecker
+
+
+def create_sensitive_db(path: Path):
+    conn = sqlite3.connect(path)
+    schema = Path(__file__).parent.parent / "sensitive_system" / "database" / "schema.sql"
+    conn.executescript(schema.read_text(encoding="utf-8"))
+    conn.execute("""
+        INSERT INTO ng_words (word, category, severity, pattern_type, action, added_by)
+        VALUES ('バカ', 'tier2_insult', 5, 'partial', 'warn', 'test')
+    """)
+    conn.commit()
+    conn.close()
+
+
+def create_copy_robot_db(path: Path, descriptions):
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE sister_shared_events (
+            event_id INTEGER PRIMARY KEY, event_number INTEGER, event_name TEXT,
+            event_date TEXT, description TEXT, participants TEXT, cultural_context TEXT
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO sister_shared_events (event_number, event_name, event_date, description) VALUES (?, ?, ?, ?)",
+        [(i, f"イベント{i}", "2025-01-01", text) for i, text in enumerate(descriptions, 1)]
+    )
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def dbs(tmp_path):
+    sensitive_db = tmp_path / "sensitive_filter.db"
+    create_sensitive_db(sensitive_db)
+    robot_a = tmp_path / "COPY_ROBOT_A.db"
+    robot_b = tmp_path / "COPY_ROBOT_B.db"
+    create_copy_robot_db(robot_a, ["バカだな", "楽しかった"])
+    create_copy_robot_db(robot_b, ["楽しかった", "おいしかった"])
+    return sensitive_db, robot_a, robot_b
+
+
+def scan(robot_db, sensitive_db, full=False):
+    checker = CopyRobotChecker(str(robot_db), sensitive_db_path=str(sensitive_db), workers=0)
+    return checker.scan_copy_robot(full=full)
+
+
+def test_state_is_kept_per_copy_robot_db(dbs):
+    """別のDBを続けてスキャンしても前のDBの結果が混ざらない"""
+    sensitive_db, robot_a, robot_b = dbs
+
+    result_a = scan(robot_a, sensitive_db)
+    assert result_a['statistics']['sensitive_detected'] == 1
+
+    result_b = scan(robot_b, sensitive_db)
+    assert result_b['statistics']['sensitive_detected'] == 0
+    assert result_b['statistics']['rows_filtered'] == 2
+    assert result_b['events'] == []
+
+    # 2回目以降はそれぞれのDBの状態から差分スキャン
+    again_a = scan(robot_a, sensitive_db)
+    assert again_a['statistics']['rows_filtered'] == 0
+    assert again_a['statistics']['sensitive_detected'] == 1
+    assert again_a['events'][0]['event_name'] == "イベント1"
+
+    again_b = scan(robot_b, sensitive_db)
+    assert again_b['statistics']['rows_filtered'] == 0
+    assert again_b['statistics']['sensitive_detected'] == 0
+
+
+def test_incremental_scan_matches_full_scan(dbs):
+    """追加された行だけをスキャンしても全件スキャンと同じ結果になる"""
+    sensitive_db, robot_a, _ = dbs
+    scan(robot_a, sensitive_db)
+
+    conn = sqlite3.connect(robot_a)
+    conn.execute(
+        "INSERT INTO sister_shared_events (event_number, event_name, event_date, description) "
+        "VALUES (3, 'イベント3', '2025-01-02', 'またバカなことを')"
+    )
+    conn.commit()
+    conn.close()
+
+    incremental = scan(robot_a, sensitive_db)
+    assert incremental['statistics']['rows_filtered'] == 1
+    full = scan(robot_a, sensitive_db, full=True)
+    assert incremental['events'] == full['events']
+    assert incremental['statistics']['sensitive_detected'] == 2
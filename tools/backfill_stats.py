@@ -0,0 +1,51 @@
+"""
+Statistics Counter Backfill
+===========================
+
+Rebuilds user_character_stats / learning_log_stats from the existing
+conversation_history and learning_logs rows.
+
+Run once after applying migrations/20261019_add_user_character_stats.sql.
+From then on the INSERT/UPDATE/DELETE triggers keep the counters up to date, so
+re-running is only needed if the counters are suspected to have drifted.
+
+Usage:
+    python tools/backfill_stats.py
+
+Requirements:
+    - POSTGRES_* environment variables (or .env)
+"""
+
+import sys
+import logging
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.line_bot_vps.postgresql_manager import PostgreSQLManager
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    load_dotenv()
+
+    pg_manager = PostgreSQLManager()
+    if not pg_manager.connect():
+        print("[ERROR] PostgreSQL connection failed")
+        return 1
+
+    try:
+        result = pg_manager.backfill_stats()
+    finally:
+        pg_manager.disconnect()
+
+    print(f"[OK] user_character_stats: {result['user_character_stats']} rows")
+    print(f"[OK] learning_log_stats:   {result['learning_log_stats']} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Memory Capabilities Builder
+===========================
+
+Creates (or drops) the materialized memory_capabilities tables, the
+created_at index and the sync triggers on sister_shared_events of a memory
+database (sisters_memory.db, COPY_ROBOT_*.db, *_TEST.db).
+See src/core/memory_capabilities.py.
+
+HallucinationDetector never installs them itself; until this tool has been
+run it answers with direct queries. Re-run after the term or location
+lists change (the detector falls back while the definitions differ).
+
+Usage:
+    python tools/build_memory_capabilities.py /home/koshikawa/toExecUnit/sisters_memory.db
+    python tools/build_memory_capabilities.py sisters_memory_COPY_ROBOT_20251024_143000.db --rebuild
+    python tools/build_memory_capabilities.py sisters_memory.db --drop
+"""
+
+import argparse
+import sqlite3
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core.memory_capabilities import (
+    drop_capabilities,
+    ensure_capabilities,
+    load_capabilities,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build memory_capabilities tables and triggers on a memory database")
+    parser.add_argument("db_path")
+    parser.add_argument("--rebuild", action="store_true", help="drop and recreate tables and triggers")
+    parser.add_argument("--drop", action="store_true", help="remove tables, index and triggers")
+    args = parser.parse_args()
+
+    if not Path(args.db_path).exists():
+        print(f"[ERROR] {args.db_path} not found")
+        return 1
+
+    conn = sqlite3.connect(args.db_path)
+    try:
+        if args.drop or args.rebuild:
+            drop_capabilities(conn)
+            print("[OK] memory_capabilities dropped")
+            if args.drop:
+                return 0
+
+        if not ensure_capabilities(conn):
+            print(f"[ERROR] {args.db_path} has no sister_shared_events table")
+            return 1
+
+        capabilities = load_capabilities(conn)
+        print(f"[OK] memory_capabilities installed (version {capabilities['version']})")
+        print(f"     streaming events: {capabilities['streaming_event_count']}, "
+              f"viewer interactions: {capabilities['viewer_interaction_count']}, "
+              f"visited: {', '.join(capabilities['visited_locations']) or '-'}")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+Memory FTS Index Builder
+========================
+
+Creates (or drops) the FTS5 trigram shadow indexes and their sync triggers
+on a memory database (sisters_memory.db, COPY_ROBOT_*.db, *_TEST.db).
+See src/core/memory_fts.py.
+
+Once built, the index is maintained by triggers. Every process that
+writes to the database must use SQLite 3.34+ (trigram tokenizer).
+
+Usage:
+    python tools/build_memory_fts.py /home/koshikawa/toExecUnit/sisters_memory.db
+    python tools/build_memory_fts.py sisters_memory_COPY_ROBOT_20251024_143000.db --rebuild
+    python tools/build_memory_fts.py sisters_memory.db --drop
+"""
+
+import argparse
+import sqlite3
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core.memory_fts import (
+    drop_fts_index,
+    ensure_fts_indexes,
+    indexed_tables,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build FTS5 trigram indexes on a memory database")
+    parser.add_argument("db_path")
+    parser.add_argument("--rebuild", action="store_true", help="drop and recreate existing indexes")
+    parser.add_argument("--drop", action="store_true", help="remove indexes and triggers")
+    args = parser.parse_args()
+
+    if not Path(args.db_path).exists():
+        print(f"[ERROR] {args.db_path} not found")
+        return 1
+    if sqlite3.sqlite_version_info < (3, 34, 0):
+        print(f"[ERROR] SQLite {sqlite3.sqlite_version} has no trigram tokenizer (3.34+ required)")
+        return 1
+
+    conn = sqlite3.connect(args.db_path)
+    try:
+        if args.drop or args.rebuild:
+            for table in indexed_tables():
+                drop_fts_index(conn, table)
+            print("[OK] FTS indexes dropped")
+            if args.drop:
+                return 0
+
+        for table, columns in ensure_fts_indexes(conn).items():
+            print(f"[OK] {table}: {columns} columns indexed")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
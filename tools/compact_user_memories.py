@@ -0,0 +1,74 @@
+"""
+User Memories Compaction
+========================
+
+Consolidates each user's old, low-importance user_memories into one
+summary row per memory_type. The summary is re-embedded, and the originals
+are deleted in the same transaction.
+
+Intended to run periodically, e.g. daily from cron:
+    0 4 * * * cd /path/to/AI-Vtuber-Project && python tools/compact_user_memories.py
+
+Usage:
+    python tools/compact_user_memories.py
+    python tools/compact_user_memories.py --older-than-days 30 --max-importance 4 --min-group-size 3
+    python tools/compact_user_memories.py --user-id U123 --character botan
+
+Requirements:
+    - POSTGRES_* environment variables (or .env)
+    - EMBEDDING_PROVIDER settings (see .env.vps.example)
+"""
+
+import argparse
+import sys
+import logging
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.line_bot_vps.storage_backend import create_storage_backend
+from src.line_bot_vps.user_memories_manager import UserMemoriesManager
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact old low-importance user memories")
+    parser.add_argument("--older-than-days", type=int, default=90)
+    parser.add_argument("--max-importance", type=int, default=3)
+    parser.add_argument("--min-group-size", type=int, default=5)
+    parser.add_argument("--user-id", default=None, help="compact a single user (requires --character)")
+    parser.add_argument("--character", default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    load_dotenv()
+
+    manager = UserMemoriesManager(pg_manager=create_storage_backend())
+    if not manager.connect():
+        print("[ERROR] database connection failed")
+        return 1
+
+    try:
+        if args.user_id:
+            if not args.character:
+                print("[ERROR] --character is required with --user-id")
+                return 1
+            compacted = manager.compact(
+                args.user_id, args.character,
+                args.older_than_days, args.max_importance, args.min_group_size
+            )
+        else:
+            compacted = manager.compact_all(
+                args.older_than_days, args.max_importance, args.min_group_size
+            )
+    finally:
+        manager.disconnect()
+
+    print(f"[OK] {compacted} memories consolidated into summary rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
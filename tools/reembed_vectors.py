@@ -0,0 +1,107 @@
+"""
+Re-embed learned_knowledge / user_memories
+==========================================
+
+Regenerates the embedding column with the configured EmbeddingProvider.
+Run this after switching EMBEDDING_PROVIDER (e.g. OpenAI -> local ONNX),
+because vectors from different models are not comparable.
+
+If the provider's dimension differs from the column (vector(1536) for
+text-embedding-3-small), the column is redeclared as vector(N) / halfvec(N).
+Existing embeddings are dropped, all rows are re-embedded in batches and
+written back via COPY BINARY, and the ivfflat index is then rebuilt.
+
+Texts:
+    learned_knowledge: "word: meaning"
+    user_memories:     memory_text
+
+Usage:
+    EMBEDDING_PROVIDER=onnx ONNX_EMBEDDING_MODEL_DIR=models/multilingual-e5-small \
+        python tools/reembed_vectors.py
+    python tools/reembed_vectors.py --tables learned_knowledge --batch-size 256
+    python tools/reembed_vectors.py --dry-run
+
+Requirements:
+    - POSTGRES_* environment variables (or .env)
+    - EMBEDDING_PROVIDER / ONNX_EMBEDDING_MODEL_DIR / OPENAI_API_KEY as appropriate
+"""
+
+import argparse
+import sys
+import time
+import logging
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.line_bot_vps.postgresql_manager import PostgreSQLManager, EMBEDDING_TABLES
+from src.line_bot_vps.embedding_provider import create_embedding_provider
+
+
+def reembed_table(pg_manager: PostgreSQLManager, provider, table: str, batch_size: int, dry_run: bool) -> int:
+    """1テーブル分を再埋め込み"""
+    current_dim = pg_manager.get_embedding_dimension(table)
+    print(f"\n[{table}] column dim={current_dim}, provider dim={provider.dim}")
+
+    if dry_run:
+        rows = pg_manager.fetch_embedding_texts(table, 0, batch_size)
+        print(f"[DRY-RUN] first batch: {len(rows)} rows")
+        return 0
+
+    if current_dim != provider.dim:
+        pg_manager.set_embedding_dimension(table, provider.dim)
+        print(f"[OK] embedding column redeclared as {pg_manager.vector_type}({provider.dim})")
+
+    total = 0
+    last_id = 0
+    start = time.perf_counter()
+    while True:
+        rows = pg_manager.fetch_embedding_texts(table, last_id, batch_size)
+        if not rows:
+            break
+        ids = [row_id for row_id, _ in rows]
+        embeddings = provider.embed_documents([text for _, text in rows])
+        total += pg_manager.bulk_update_embeddings(table, list(zip(ids, embeddings)))
+        last_id = ids[-1]
+
+        elapsed = time.perf_counter() - start
+        print(f"  {total} rows ({total / elapsed:,.1f} rows/s), last id={last_id}")
+
+    pg_manager.rebuild_embedding_index(table)
+    print(f"[OK] {table}: {total} rows re-embedded, index rebuilt")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embed vector columns with the configured provider")
+    parser.add_argument("--tables", default=",".join(EMBEDDING_TABLES))
+    parser.add_argument("--provider", default=None, help="openai / onnx (default: EMBEDDING_PROVIDER)")
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    load_dotenv()
+
+    provider = create_embedding_provider(args.provider)
+    print(f"[INFO] provider: {provider.name} ({provider.dim} dims)")
+
+    pg_manager = PostgreSQLManager()
+    if not pg_manager.connect():
+        print("[ERROR] PostgreSQL connection failed")
+        return 1
+
+    try:
+        for table in args.tables.split(","):
+            reembed_table(pg_manager, provider, table.strip(), args.batch_size, args.dry_run)
+    finally:
+        pg_manager.disconnect()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())